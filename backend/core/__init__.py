@@ -34,17 +34,25 @@ from core.middleware import (
     require_admin,
     require_auth,
 )
+from core.retry import RetryPolicy, is_conflict_error
 from core.tables import (
+    ALL_TABLES,
+    TABLE_AUDIT_LOGS,
     TABLE_DOCUMENT_TYPES,
     TABLE_NUMBER_LOGS,
     TABLE_SEQUENCES,
     TABLE_USERS,
+    bootstrap_tables,
+    ensure_table,
+    get_audit_logs_table,
+    get_bootstrap_check_count,
     get_document_types_table,
     get_number_logs_table,
     get_sequences_table,
     get_table_client,
     get_table_service_client,
     get_users_table,
+    is_bootstrapped,
 )
 
 __all__ = [
@@ -82,15 +90,25 @@ __all__ = [
     "create_error_response",
     "create_json_response",
     "get_request_body",
+    # Retry
+    "RetryPolicy",
+    "is_conflict_error",
     # Tables
     "TABLE_USERS",
     "TABLE_DOCUMENT_TYPES",
     "TABLE_SEQUENCES",
     "TABLE_NUMBER_LOGS",
+    "TABLE_AUDIT_LOGS",
+    "ALL_TABLES",
     "get_table_service_client",
     "get_table_client",
+    "ensure_table",
+    "is_bootstrapped",
+    "bootstrap_tables",
+    "get_bootstrap_check_count",
     "get_users_table",
     "get_document_types_table",
     "get_sequences_table",
     "get_number_logs_table",
+    "get_audit_logs_table",
 ]
@@ -0,0 +1,134 @@
+"""In-process caches for Controle PGM backend.
+
+Caches live per worker process and reset on cold start. Other instances do not
+see each other's invalidations, so cached data must tolerate being stale for up
+to the configured TTL.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from typing import Any, Generic, TypeVar
+
+from core import metrics
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe LRU cache whose entries expire after a time-to-live.
+
+    Stored values may be None (e.g., to remember "not found" results);
+    use the hit flag returned by get() to tell a cached None from a miss.
+
+    With max_weight, entries are also evicted while the summed weight of the
+    values (e.g., rows held) is over the cap, to bound memory for values of
+    very different sizes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float | None,
+        max_entries: int = 1024,
+        max_weight: int | None = None,
+        weigh: Callable[[V], int] | None = None,
+    ):
+        """
+        Args:
+            name: Cache name used in hit/miss metrics.
+            ttl_seconds: Entry lifetime; None keeps entries until evicted.
+            max_entries: Least recently used entries are evicted past this size.
+            max_weight: Least recently used entries are evicted past this total weight.
+            weigh: Weight of a value (1 if omitted).
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda value: 1)
+        self._entries: OrderedDict[Hashable, tuple[float | None, V, int]] = OrderedDict()
+        self._weight = 0
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> tuple[bool, V | None]:
+        """
+        Look up a key.
+
+        Returns:
+            Tuple of (hit, value). value is None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    metrics.increment("cache.hits", cache=self.name)
+                    return True, value
+                self._drop(key)
+
+        metrics.increment("cache.misses", cache=self.name)
+        return False, None
+
+    def set(self, key: Hashable, value: V, ttl_seconds: float | None = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key.
+            value: Value to store (None allowed).
+            ttl_seconds: Override the cache's default TTL for this entry.
+        """
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        weight = self._weigh(value)
+
+        with self._lock:
+            self._drop(key)
+            if self.max_weight is not None and weight > self.max_weight:
+                return  # Would evict everything else and still not fit
+            self._entries[key] = (expires_at, value, weight)
+            self._weight += weight
+            while len(self._entries) > self.max_entries or (
+                self.max_weight is not None and self._weight > self.max_weight
+            ):
+                self._drop(next(iter(self._entries)))
+                metrics.increment("cache.evictions", cache=self.name)
+
+    def _drop(self, key: Hashable) -> None:
+        """Remove an entry if present (lock held)."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._weight -= entry[2]
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop one key, or every entry when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._weight = 0
+            else:
+                self._drop(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        """Get size and hit/miss counters for this cache."""
+        hits = metrics.get_counter("cache.hits", cache=self.name)
+        misses = metrics.get_counter("cache.misses", cache=self.name)
+        with self._lock:
+            weight = self._weight
+        return {
+            "entries": len(self),
+            "weight": weight,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": metrics.get_counter("cache.evictions", cache=self.name),
+        }
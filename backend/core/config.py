@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from functools import lru_cache
 from typing import Literal
 
@@ -33,6 +33,25 @@ def get_current_year() -> int:
     return get_brazil_now().year
 
 
+def is_closed_year(year: int | None, today: date | None = None) -> bool:
+    """Check if a year no longer gets numbers.
+
+    Past years are closed from February on: late documents of December are
+    still numbered in January.
+
+    Args:
+        year: Year to check (None is never closed).
+        today: Reference day, defaults to today in Brazil time.
+
+    Returns:
+        bool: True if the year's history no longer changes.
+    """
+    if year is None:
+        return False
+    today = today or get_brazil_now().date()
+    return year < today.year - 1 or (year == today.year - 1 and today.month > 1)
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
@@ -44,6 +63,23 @@ class Settings(BaseSettings):
 
     # Azure Tables
     azure_tables_connection_string: str = "UseDevelopmentStorage=true"
+    # When to check that tables exist: "lazy" (first use per worker),
+    # "startup" (all tables when the worker starts) or "off" (provisioned by Bicep)
+    tables_bootstrap_mode: Literal["lazy", "startup", "off"] = "lazy"
+    # Where SEQUENCE rows live: "split" (Sequences table) or "colocated" (in the
+    # NumberLogs partition of their logs, so each generate is one transaction)
+    sequence_storage_layout: Literal["split", "colocated"] = "split"
+    # Combine concurrent generates for the same partition in a worker into one increment
+    sequence_combining_enabled: bool = True
+    # Backoff for sequence ETag conflicts (decorrelated jitter, bounded by a deadline)
+    sequence_retry_base_delay_ms: int = 10
+    sequence_retry_max_delay_ms: int = 500
+    sequence_retry_deadline_ms: int = 3000
+    # Backoff for HistoryStats counter ETag conflicts; a partition still not
+    # updated at the deadline is marked for rebuild
+    history_stats_retry_base_delay_ms: int = 20
+    history_stats_retry_max_delay_ms: int = 500
+    history_stats_retry_deadline_ms: int = 3000
 
     # Azure Redis Cache (for production rate limiting)
     redis_connection_string: str = ""
@@ -66,6 +102,45 @@ class Settings(BaseSettings):
     password_min_length: int = 8
     bcrypt_cost_factor: int = 12
 
+    # Fallbacks for rows that predate an index, one flag per index: disable each
+    # once scripts/backfill_indexes.py has backfilled that index
+    # Table scan by Code when a document type code index row is missing
+    doctype_code_index_fallback: bool = True
+    # Table scan by Email when a user email index row is missing
+    user_email_index_fallback: bool = True
+    # Keep history queries by user or year off the HistoryIndex table
+    history_index_fallback: bool = True
+    # How long a HistoryIndex write is retried before its logs are marked for repair
+    history_index_retry_deadline_ms: int = 5000
+    # How often each worker checks for logs marked for repair; the index serves
+    # no reads while there are any
+    history_index_repair_check_seconds: int = 30
+
+    # Per-worker cache of document types used by number generation
+    document_type_cache_ttl_seconds: int = 300
+
+    # Stream GET /history/export through the Azure Functions HTTP streams extension
+    # (azurefunctions-extensions-http-fastapi); otherwise the CSV is buffered
+    history_export_streaming: bool = False
+
+    # Partitions read at the same time by one history query spanning several
+    # "{code}_{year}" partitions (per query, per worker)
+    history_partition_concurrency: int = 8
+
+    # Per-worker cache of history pages. Local writes invalidate their partitions
+    # at once; pages that may include open years also expire after the TTL (writes
+    # from other instances), pages of closed years stay until evicted
+    history_cache_ttl_seconds: int = 30
+    # Rows held by the history cache per worker (0 disables it)
+    history_cache_max_rows: int = 20000
+
+    # Gzip CSV snapshots of closed years served by GET /history/export:
+    # "off", "blob" (container in the storage account of AZURE_TABLES_CONNECTION_STRING,
+    # requires azure-storage-blob) or "filesystem" (directory below)
+    export_snapshot_storage: Literal["off", "blob", "filesystem"] = "off"
+    export_snapshot_container: str = "history-exports"
+    export_snapshot_dir: str = "exports"
+
     # Rate Limiting
     rate_limit_requests: int = 100
     rate_limit_window_minutes: int = 1
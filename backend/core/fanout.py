@@ -0,0 +1,119 @@
+"""Bounded fan-out over table partitions for Controle PGM.
+
+Queries that span several partitions read them concurrently instead of one
+after another, at most HISTORY_PARTITION_CONCURRENCY partitions at a time per
+query: threads for the sync services, tasks for the async ones. The time and
+rows read per partition are logged once per query.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from core import metrics
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def concurrency_limit(partitions: int) -> int:
+    """Partitions of a query read at the same time (at least one)."""
+    return max(1, min(settings.history_partition_concurrency, partitions))
+
+
+class PartitionTimings:
+    """Time and rows read per partition by one query, logged when it is done."""
+
+    def __init__(self, query: str):
+        """
+        Args:
+            query: Query name used in the log line and metrics.
+        """
+        self.query = query
+        self._started = time.perf_counter()
+        self._partitions: dict[str, list[float]] = {}  # partition -> [seconds, rows]
+        self._lock = Lock()
+
+    def add(self, partition: str, seconds: float, rows: int) -> None:
+        """Count one read (a page, or a whole partition) of a partition."""
+        with self._lock:
+            totals = self._partitions.setdefault(partition, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += rows
+        metrics.observe("partition_reads.seconds", seconds, query=self.query)
+
+    def log(self) -> None:
+        """Log the query's wall time and the time spent on each partition."""
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        with self._lock:
+            partitions = sorted(self._partitions.items())
+        details = ", ".join(
+            f"{partition} {int(rows)} rows/{seconds * 1000:.0f} ms"
+            for partition, (seconds, rows) in partitions
+        )
+        logger.info(
+            f"{self.query}: {len(partitions)} partitions in {elapsed_ms:.0f} ms ({details})"
+        )
+
+
+def map_partitions(
+    read: Callable[[str], list[dict]], partitions: list[str], query: str
+) -> list[list[dict]]:
+    """Read every partition on a bounded thread pool.
+
+    Args:
+        read: Reads the rows of one partition.
+        partitions: Partition keys to read.
+        query: Query name for the timing log.
+
+    Returns:
+        The rows of each partition, in the order of partitions.
+    """
+    timings = PartitionTimings(query)
+
+    def timed_read(partition: str) -> list[dict]:
+        start = time.perf_counter()
+        rows = read(partition)
+        timings.add(partition, time.perf_counter() - start, len(rows))
+        return rows
+
+    with ThreadPoolExecutor(max_workers=concurrency_limit(len(partitions))) as pool:
+        # list() re-raises the first failure
+        results = list(pool.map(timed_read, partitions))
+
+    timings.log()
+    return results
+
+
+async def gather_partitions(
+    read: Callable[[str], Awaitable[list[dict]]], partitions: list[str], query: str
+) -> list[list[dict]]:
+    """Read every partition concurrently, a bounded number at a time.
+
+    Args:
+        read: Reads the rows of one partition.
+        partitions: Partition keys to read.
+        query: Query name for the timing log.
+
+    Returns:
+        The rows of each partition, in the order of partitions.
+    """
+    timings = PartitionTimings(query)
+    limit = asyncio.Semaphore(concurrency_limit(len(partitions)))
+
+    async def timed_read(partition: str) -> list[dict]:
+        async with limit:
+            start = time.perf_counter()
+            rows = await read(partition)
+        timings.add(partition, time.perf_counter() - start, len(rows))
+        return rows
+
+    results = await asyncio.gather(*(timed_read(partition) for partition in partitions))
+
+    timings.log()
+    return list(results)
@@ -0,0 +1,95 @@
+"""In-process metrics for Controle PGM backend.
+
+Counters and timings are kept per worker process. They reset on cold start,
+like the in-memory rate limiter, and are meant for logs, debugging and tests.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from threading import Lock
+from typing import Any
+
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = defaultdict(float)
+_timings: dict[tuple[str, tuple[tuple[str, str], ...]], dict[str, float]] = {}
+_metrics_lock = Lock()
+
+
+def _key(name: str, tags: dict[str, Any]) -> tuple[str, tuple[tuple[str, str], ...]]:
+    """Build a hashable metric key from a name and its tags."""
+    return name, tuple(sorted((k, str(v)) for k, v in tags.items()))
+
+
+def increment(name: str, value: float = 1, **tags: Any) -> None:
+    """
+    Increment a counter.
+
+    Args:
+        name: Metric name (e.g., "tables.bootstrap_checks").
+        value: Amount to add.
+        **tags: Optional dimensions (e.g., table="Users").
+    """
+    with _metrics_lock:
+        _counters[_key(name, tags)] += value
+
+
+def observe(name: str, value: float, **tags: Any) -> None:
+    """
+    Record a timing or size observation.
+
+    Args:
+        name: Metric name (e.g., "sequence.retry_seconds").
+        value: Observed value.
+        **tags: Optional dimensions.
+    """
+    with _metrics_lock:
+        stats = _timings.setdefault(_key(name, tags), {"count": 0, "sum": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["sum"] += value
+        stats["max"] = max(stats["max"], value)
+
+
+def get_counter(name: str, **tags: Any) -> float:
+    """
+    Get the current value of a counter.
+
+    Without tags, returns the sum across every tag combination.
+    """
+    with _metrics_lock:
+        if tags:
+            return _counters.get(_key(name, tags), 0)
+        return sum(v for (n, _), v in _counters.items() if n == name)
+
+
+def get_observations(name: str, **tags: Any) -> dict[str, float]:
+    """Get count, sum and max recorded for an observation."""
+    with _metrics_lock:
+        stats = _timings.get(_key(name, tags))
+        return dict(stats) if stats else {"count": 0, "sum": 0.0, "max": 0.0}
+
+
+def snapshot() -> dict[str, Any]:
+    """Return a copy of all counters and observations, for logging."""
+    with _metrics_lock:
+        return {
+            "counters": {
+                _format_key(name, tags): value for (name, tags), value in _counters.items()
+            },
+            "observations": {
+                _format_key(name, tags): dict(stats) for (name, tags), stats in _timings.items()
+            },
+        }
+
+
+def reset() -> None:
+    """Clear all metrics (used by tests)."""
+    with _metrics_lock:
+        _counters.clear()
+        _timings.clear()
+
+
+def _format_key(name: str, tags: tuple[tuple[str, str], ...]) -> str:
+    """Format a metric key as name{tag=value,...}."""
+    if not tags:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in tags) + "}"
@@ -4,7 +4,8 @@ from __future__ import annotations
 
 import inspect
 import json
-from collections.abc import Callable
+from collections.abc import Callable, Collection, Mapping
+from datetime import date
 from functools import wraps
 from typing import Any, TypeVar
 
@@ -58,37 +59,58 @@ def create_json_response(
     )
 
 
-def require_auth(func_handler: F) -> F:
+def authenticate(req: func.HttpRequest, admin_only: bool = False) -> dict[str, Any]:
     """
-    Decorator to require authentication for an Azure Function.
-
-    Extracts user from JWT token in cookie and passes to handler.
-    Handler receives 'current_user' as keyword argument.
+    Extract the current user from the JWT token in the auth cookie.
 
-    Usage:
-        @require_auth
-        def my_function(req: func.HttpRequest, current_user: dict) -> func.HttpResponse:
-            ...
+    Raises:
+        UnauthorizedError: If the token is missing or invalid.
+        ForbiddenError: If admin_only and the user is not an admin.
     """
+    # Extract token from cookie
+    cookie_header = req.headers.get("Cookie")
+    token = extract_token_from_cookie(cookie_header)
 
-    @wraps(func_handler)
-    def wrapper(req: func.HttpRequest, *args: Any, **kwargs: Any) -> func.HttpResponse:
-        try:
-            # Extract token from cookie
-            cookie_header = req.headers.get("Cookie")
-            token = extract_token_from_cookie(cookie_header)
+    if not token:
+        raise UnauthorizedError()
 
-            if not token:
-                raise UnauthorizedError()
+    # Verify token and extract user
+    current_user = extract_user_from_token(token)
 
-            # Verify token and extract user
-            current_user = extract_user_from_token(token)
+    # Check admin role
+    if admin_only and current_user.get("role") != "admin":
+        raise ForbiddenError("Acesso restrito a administradores")
 
-            # Pass user to handler
-            return func_handler(req, *args, current_user=current_user, **kwargs)
+    return current_user
 
-        except ControlePGMError as e:
-            return create_error_response(e)
+
+def _inject_current_user(func_handler: F, admin_only: bool) -> F:
+    """Wrap a sync or async handler so it receives the authenticated user."""
+    if inspect.iscoroutinefunction(func_handler):
+
+        @wraps(func_handler)
+        async def wrapper(req: func.HttpRequest, *args: Any, **kwargs: Any) -> func.HttpResponse:
+            try:
+                current_user = authenticate(req, admin_only)
+
+                # Pass user to handler
+                return await func_handler(req, *args, current_user=current_user, **kwargs)
+
+            except ControlePGMError as e:
+                return create_error_response(e)
+
+    else:
+
+        @wraps(func_handler)
+        def wrapper(req: func.HttpRequest, *args: Any, **kwargs: Any) -> func.HttpResponse:
+            try:
+                current_user = authenticate(req, admin_only)
+
+                # Pass user to handler
+                return func_handler(req, *args, current_user=current_user, **kwargs)
+
+            except ControlePGMError as e:
+                return create_error_response(e)
 
     # Remove 'current_user' from signature so Azure Functions doesn't expect it as a binding
     sig = inspect.signature(func_handler)
@@ -98,48 +120,57 @@ def require_auth(func_handler: F) -> F:
     return wrapper  # type: ignore
 
 
+def require_auth(func_handler: F) -> F:
+    """
+    Decorator to require authentication for an Azure Function.
+
+    Extracts user from JWT token in cookie and passes to handler.
+    Handler receives 'current_user' as keyword argument.
+    Works with both sync and async handlers.
+
+    Usage:
+        @require_auth
+        async def my_function(req: func.HttpRequest, current_user: dict) -> func.HttpResponse:
+            ...
+    """
+    return _inject_current_user(func_handler, admin_only=False)
+
+
 def require_admin(func_handler: F) -> F:
     """
     Decorator to require admin role for an Azure Function.
 
     Must be used after @require_auth or combined.
     Handler receives 'current_user' as keyword argument.
+    Works with both sync and async handlers.
 
     Usage:
         @require_admin
-        def admin_only_function(req: func.HttpRequest, current_user: dict) -> func.HttpResponse:
+        async def admin_only_function(req: func.HttpRequest, current_user: dict) -> func.HttpResponse:
             ...
     """
+    return _inject_current_user(func_handler, admin_only=True)
 
-    @wraps(func_handler)
-    def wrapper(req: func.HttpRequest, *args: Any, **kwargs: Any) -> func.HttpResponse:
-        try:
-            # Extract token from cookie
-            cookie_header = req.headers.get("Cookie")
-            token = extract_token_from_cookie(cookie_header)
-
-            if not token:
-                raise UnauthorizedError()
 
-            # Verify token and extract user
-            current_user = extract_user_from_token(token)
+def _unexpected_error_response(e: Exception) -> func.HttpResponse:
+    """Log an unexpected exception and build a 500 response."""
+    import logging
 
-            # Check admin role
-            if current_user.get("role") != "admin":
-                raise ForbiddenError("Acesso restrito a administradores")
+    from core.config import settings
 
-            # Pass user to handler
-            return func_handler(req, *args, current_user=current_user, **kwargs)
+    logging.error(f"Unexpected error: {str(e)}", exc_info=True)
 
-        except ControlePGMError as e:
-            return create_error_response(e)
+    # Only show detailed error in development mode
+    if settings.is_development:
+        error_message = f"Erro interno do servidor: {str(e)}"
+    else:
+        error_message = "Erro interno do servidor. Tente novamente mais tarde."
 
-    # Remove 'current_user' from signature so Azure Functions doesn't expect it as a binding
-    sig = inspect.signature(func_handler)
-    params = [p for p in sig.parameters.values() if p.name != "current_user"]
-    wrapper.__signature__ = sig.replace(parameters=params)
-
-    return wrapper  # type: ignore
+    return func.HttpResponse(
+        body=json.dumps({"error": error_message}),
+        status_code=500,
+        mimetype="application/json",
+    )
 
 
 def handle_errors(func_handler: F) -> F:
@@ -148,12 +179,27 @@ def handle_errors(func_handler: F) -> F:
 
     Catches ControlePGMError exceptions and returns JSON error responses.
     Catches unexpected exceptions and returns 500 error.
+    Works with both sync and async handlers.
 
     Usage:
         @handle_errors
-        def my_function(req: func.HttpRequest) -> func.HttpResponse:
+        async def my_function(req: func.HttpRequest) -> func.HttpResponse:
             ...
     """
+    if inspect.iscoroutinefunction(func_handler):
+
+        @wraps(func_handler)
+        async def async_wrapper(
+            req: func.HttpRequest, *args: Any, **kwargs: Any
+        ) -> func.HttpResponse:
+            try:
+                return await func_handler(req, *args, **kwargs)
+            except ControlePGMError as e:
+                return create_error_response(e)
+            except Exception as e:
+                return _unexpected_error_response(e)
+
+        return async_wrapper  # type: ignore
 
     @wraps(func_handler)
     def wrapper(req: func.HttpRequest, *args: Any, **kwargs: Any) -> func.HttpResponse:
@@ -162,24 +208,7 @@ def handle_errors(func_handler: F) -> F:
         except ControlePGMError as e:
             return create_error_response(e)
         except Exception as e:
-            # Log unexpected errors
-            import logging
-
-            from core.config import settings
-
-            logging.error(f"Unexpected error: {str(e)}", exc_info=True)
-
-            # Only show detailed error in development mode
-            if settings.is_development:
-                error_message = f"Erro interno do servidor: {str(e)}"
-            else:
-                error_message = "Erro interno do servidor. Tente novamente mais tarde."
-
-            return func.HttpResponse(
-                body=json.dumps({"error": error_message}),
-                status_code=500,
-                mimetype="application/json",
-            )
+            return _unexpected_error_response(e)
 
     return wrapper  # type: ignore
 
@@ -206,3 +235,55 @@ def get_request_body(req: func.HttpRequest) -> dict[str, Any]:
         return body
     except ValueError:
         raise BadRequestError("Corpo da requisição deve ser JSON válido")
+
+
+def get_date_param(params: Mapping[str, str], name: str) -> date | None:
+    """
+    Parse an optional ISO date (YYYY-MM-DD) query parameter.
+
+    Args:
+        params: Query parameters of the request.
+        name: Query parameter name.
+
+    Returns:
+        The date, or None if the parameter is missing or empty.
+
+    Raises:
+        BadRequestError: If the parameter is not a valid date.
+    """
+    from core.exceptions import BadRequestError
+
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise BadRequestError(f"Parâmetro '{name}' deve ser uma data (AAAA-MM-DD)")
+
+
+def get_fields_param(params: Mapping[str, str], allowed: Collection[str]) -> set[str] | None:
+    """
+    Parse the optional fields= query parameter of a list endpoint.
+
+    Args:
+        params: Query parameters of the request.
+        allowed: Field names of the listed items.
+
+    Returns:
+        Names of the item fields to return, or None for every field.
+
+    Raises:
+        BadRequestError: If a name is not an item field.
+    """
+    from core.exceptions import BadRequestError
+
+    value = params.get("fields")
+    if not value:
+        return None
+
+    fields = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = sorted(fields - set(allowed))
+    if unknown:
+        raise BadRequestError(f"Campos desconhecidos em 'fields': {', '.join(unknown)}")
+    return fields or None
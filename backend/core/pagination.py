@@ -0,0 +1,73 @@
+"""Opaque pagination cursors for Controle PGM list endpoints.
+
+A cursor wraps an Azure Tables continuation token together with a fingerprint
+of the query it belongs to. Clients treat it as an opaque string and send it
+back unchanged to get the next page.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any
+
+from core.exceptions import BadRequestError
+
+# Bump when the payload layout changes; older cursors are then rejected
+CURSOR_VERSION = 1
+
+
+def query_fingerprint(query: str | None) -> str:
+    """Short hash identifying the query a cursor was issued for."""
+    return hashlib.sha256((query or "").encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(token: dict[str, Any], query: str | None) -> str:
+    """
+    Encode a continuation token as an opaque, URL-safe cursor.
+
+    Args:
+        token: Continuation token returned by the Azure Tables pager.
+        query: OData filter of the query being paged.
+
+    Returns:
+        Cursor string for the next page.
+    """
+    payload = {"v": CURSOR_VERSION, "q": query_fingerprint(query), "t": token}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, query: str | None) -> dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string sent by the client.
+        query: OData filter of the query being paged.
+
+    Returns:
+        Continuation token to resume the query from.
+
+    Raises:
+        BadRequestError: If the cursor is malformed, from another version or
+            was issued for a different query.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise BadRequestError("Cursor de paginação inválido")
+
+    if (
+        not isinstance(payload, dict)
+        or payload.get("v") != CURSOR_VERSION
+        or not isinstance(payload.get("t"), dict)
+    ):
+        raise BadRequestError("Cursor de paginação inválido")
+    if payload.get("q") != query_fingerprint(query):
+        raise BadRequestError("Cursor de paginação não corresponde aos filtros")
+
+    return payload["t"]
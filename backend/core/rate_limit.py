@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
 import logging
 import time
@@ -49,29 +51,33 @@ def _clean_old_requests(key: str, window_seconds: int) -> None:
     _rate_limit_store[key] = [t for t in _rate_limit_store[key] if t > cutoff]
 
 
-def _check_rate_limit_memory(key: str, max_requests: int, window_seconds: int) -> bool:
+def _check_rate_limit_memory(
+    key: str, max_requests: int, window_seconds: int, cost: int = 1
+) -> bool:
     """Check rate limit using in-memory store."""
     with _rate_limit_lock:
         _clean_old_requests(key, window_seconds)
 
-        if len(_rate_limit_store[key]) >= max_requests:
+        if len(_rate_limit_store[key]) + cost > max_requests:
             return False
 
-        _rate_limit_store[key].append(time.time())
+        _rate_limit_store[key].extend([time.time()] * cost)
         return True
 
 
-def _check_rate_limit_redis(key: str, max_requests: int, window_seconds: int) -> bool:
+def _check_rate_limit_redis(
+    key: str, max_requests: int, window_seconds: int, cost: int = 1
+) -> bool:
     """Check rate limit using Redis."""
     redis_client = _get_redis_client()
     if not redis_client:
-        return _check_rate_limit_memory(key, max_requests, window_seconds)
+        return _check_rate_limit_memory(key, max_requests, window_seconds, cost)
 
     try:
         redis_key = f"rate_limit:{key}"
-        current = redis_client.incr(redis_key)
+        current = redis_client.incrby(redis_key, cost)
 
-        if current == 1:
+        if current == cost:
             # First request, set expiration
             redis_client.expire(redis_key, window_seconds)
 
@@ -79,10 +85,10 @@ def _check_rate_limit_redis(key: str, max_requests: int, window_seconds: int) ->
     except Exception as e:
         logger.error(f"Redis rate limit error: {e}")
         # Fallback to memory
-        return _check_rate_limit_memory(key, max_requests, window_seconds)
+        return _check_rate_limit_memory(key, max_requests, window_seconds, cost)
 
 
-def _check_rate_limit(key: str, max_requests: int, window_seconds: int) -> bool:
+def _check_rate_limit(key: str, max_requests: int, window_seconds: int, cost: int = 1) -> bool:
     """
     Check if request should be rate limited.
 
@@ -90,19 +96,35 @@ def _check_rate_limit(key: str, max_requests: int, window_seconds: int) -> bool:
         key: Unique identifier for the rate limit (e.g., user_id or IP)
         max_requests: Maximum requests allowed in the window
         window_seconds: Time window in seconds
+        cost: How many requests this call counts as (e.g., numbers in a batch)
 
     Returns:
         True if request is allowed, False if rate limited
     """
     if settings.use_redis_rate_limit:
-        return _check_rate_limit_redis(key, max_requests, window_seconds)
-    return _check_rate_limit_memory(key, max_requests, window_seconds)
+        return _check_rate_limit_redis(key, max_requests, window_seconds, cost)
+    return _check_rate_limit_memory(key, max_requests, window_seconds, cost)
+
+
+def _rate_limited_response(window_seconds: int) -> func.HttpResponse:
+    """Build the 429 response for a rejected request."""
+    return func.HttpResponse(
+        body=json.dumps(
+            {"error": "Limite de requisições excedido. Tente novamente em alguns instantes."}
+        ),
+        status_code=429,
+        headers={
+            "Retry-After": str(window_seconds),
+            "Content-Type": "application/json",
+        },
+    )
 
 
 def rate_limit(
     max_requests: int | None = None,
     window_minutes: int | None = None,
     key_func: Callable[[func.HttpRequest], str] | None = None,
+    cost_func: Callable[[func.HttpRequest], int] | None = None,
 ) -> Callable[[F], F]:
     """
     Decorator to apply rate limiting to an endpoint.
@@ -112,19 +134,22 @@ def rate_limit(
         window_minutes: Time window in minutes (default from settings)
         key_func: Function to extract rate limit key from request
                   Default: uses user_id from current_user or IP address
+        cost_func: Function returning how many requests a call counts as
+                   Default: every call counts as one request
+
+    Works with both sync and async handlers.
 
     Usage:
         @rate_limit(max_requests=10, window_minutes=1)
         @require_auth
-        def my_endpoint(req, current_user):
+        async def my_endpoint(req, current_user):
             ...
     """
     _max = max_requests or settings.rate_limit_requests
     _window = (window_minutes or settings.rate_limit_window_minutes) * 60
 
     def decorator(func_handler: F) -> F:
-        @wraps(func_handler)
-        def wrapper(req: func.HttpRequest, *args: Any, **kwargs: Any) -> func.HttpResponse:
+        def check(req: func.HttpRequest, kwargs: dict[str, Any]) -> tuple[str, int]:
             # Determine rate limit key
             if key_func:
                 key = key_func(req)
@@ -135,20 +160,36 @@ def rate_limit(
                 # Fall back to IP address
                 key = f"ip:{req.headers.get('X-Forwarded-For', 'unknown')}"
 
+            cost = max(1, cost_func(req)) if cost_func else 1
+            return key, cost
+
+        if inspect.iscoroutinefunction(func_handler):
+
+            @wraps(func_handler)
+            async def async_wrapper(
+                req: func.HttpRequest, *args: Any, **kwargs: Any
+            ) -> func.HttpResponse:
+                key, cost = check(req, kwargs)
+
+                # Redis is a network round trip: keep it off the event loop
+                if settings.use_redis_rate_limit:
+                    allowed = await asyncio.to_thread(_check_rate_limit, key, _max, _window, cost)
+                else:
+                    allowed = _check_rate_limit(key, _max, _window, cost)
+                if not allowed:
+                    return _rate_limited_response(_window)
+
+                return await func_handler(req, *args, **kwargs)
+
+            return async_wrapper  # type: ignore
+
+        @wraps(func_handler)
+        def wrapper(req: func.HttpRequest, *args: Any, **kwargs: Any) -> func.HttpResponse:
+            key, cost = check(req, kwargs)
+
             # Check rate limit
-            if not _check_rate_limit(key, _max, _window):
-                return func.HttpResponse(
-                    body=json.dumps(
-                        {
-                            "error": "Limite de requisições excedido. Tente novamente em alguns instantes."
-                        }
-                    ),
-                    status_code=429,
-                    headers={
-                        "Retry-After": str(_window),
-                        "Content-Type": "application/json",
-                    },
-                )
+            if not _check_rate_limit(key, _max, _window, cost):
+                return _rate_limited_response(_window)
 
             return func_handler(req, *args, **kwargs)
 
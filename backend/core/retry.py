@@ -0,0 +1,85 @@
+"""Retry policy for optimistic concurrency conflicts in Azure Tables."""
+
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass, field
+
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError
+from azure.data.tables import TableErrorCode, TableTransactionError
+
+# Transaction error codes that mean "someone else wrote first"
+_CONFLICT_ERROR_CODES = (
+    TableErrorCode.UPDATE_CONDITION_NOT_SATISFIED,
+    TableErrorCode.CONDITION_NOT_MET,
+    TableErrorCode.ENTITY_ALREADY_EXISTS,
+)
+
+
+def is_conflict_error(error: BaseException) -> bool:
+    """
+    Check if a write failed because a concurrent writer got there first.
+
+    Covers 412 on conditional updates (ResourceModifiedError), 409 on creates
+    (ResourceExistsError) and the same conditions inside a transaction.
+
+    Args:
+        error: Exception raised by an Azure Tables call.
+
+    Returns:
+        True if the operation can be retried after re-reading.
+    """
+    if isinstance(error, TableTransactionError):
+        return error.error_code in _CONFLICT_ERROR_CODES
+    return isinstance(error, ResourceModifiedError | ResourceExistsError)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Decorrelated-jitter backoff bounded by a deadline instead of a retry count.
+
+    Each delay is drawn from [base_delay, 3 * previous_delay] and capped at
+    max_delay, so instances that conflicted together spread out instead of
+    retrying in lockstep.
+    """
+
+    base_delay: float = 0.01
+    max_delay: float = 0.5
+    deadline: float = 3.0
+
+    def start(self) -> RetryState:
+        """Start tracking one operation's retries."""
+        return RetryState(policy=self)
+
+
+@dataclass
+class RetryState:
+    """Retry bookkeeping for a single operation."""
+
+    policy: RetryPolicy
+    attempts: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _last_delay: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the operation started."""
+        return time.monotonic() - self.started_at
+
+    def next_delay(self) -> float | None:
+        """
+        Get how long to wait before the next attempt.
+
+        Returns:
+            Delay in seconds, or None if the deadline would be exceeded.
+        """
+        previous = self._last_delay or self.policy.base_delay
+        delay = min(
+            self.policy.max_delay,
+            random.uniform(self.policy.base_delay, previous * 3),
+        )
+        if self.elapsed + delay > self.policy.deadline:
+            return None
+        self._last_delay = delay
+        return delay
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import re
 import secrets
 import time
@@ -116,3 +117,15 @@ def add_random_delay(min_ms: int = 50, max_ms: int = 150) -> None:
     """
     delay = secrets.randbelow(max_ms - min_ms) + min_ms
     time.sleep(delay / 1000)
+
+
+async def add_random_delay_async(min_ms: int = 50, max_ms: int = 150) -> None:
+    """
+    Add a random delay to prevent timing attacks, without blocking the event loop.
+
+    Args:
+        min_ms: Minimum delay in milliseconds.
+        max_ms: Maximum delay in milliseconds.
+    """
+    delay = secrets.randbelow(max_ms - min_ms) + min_ms
+    await asyncio.sleep(delay / 1000)
@@ -2,15 +2,16 @@
 
 from __future__ import annotations
 
+import logging
 from functools import lru_cache
-from typing import TYPE_CHECKING
+from threading import Lock
 
 from azure.data.tables import TableClient, TableServiceClient
 
+from core import metrics
 from core.config import settings
 
-if TYPE_CHECKING:
-    pass
+logger = logging.getLogger(__name__)
 
 
 # Table names
@@ -19,6 +20,28 @@ TABLE_DOCUMENT_TYPES = "DocumentTypes"
 TABLE_SEQUENCES = "Sequences"
 TABLE_NUMBER_LOGS = "NumberLogs"
 TABLE_AUDIT_LOGS = "AuditLogs"
+TABLE_HISTORY_STATS = "HistoryStats"
+TABLE_HISTORY_INDEX = "HistoryIndex"
+
+# Max operations in an Azure Tables entity-group transaction
+TRANSACTION_LIMIT = 100
+
+ALL_TABLES = (
+    TABLE_USERS,
+    TABLE_DOCUMENT_TYPES,
+    TABLE_SEQUENCES,
+    TABLE_NUMBER_LOGS,
+    TABLE_AUDIT_LOGS,
+    TABLE_HISTORY_STATS,
+    TABLE_HISTORY_INDEX,
+)
+
+# Per-worker registry of table clients and of tables already checked for existence.
+# TableClient is thread-safe and keeps its own HTTP connection pool, so one instance
+# per table is shared by every request served by this worker.
+_table_clients: dict[str, TableClient] = {}
+_bootstrapped_tables: set[str] = set()
+_registry_lock = Lock()
 
 
 @lru_cache
@@ -29,11 +52,61 @@ def get_table_service_client() -> TableServiceClient:
     )
 
 
+def is_bootstrapped(table_name: str) -> bool:
+    """Whether this worker already checked that the table exists."""
+    return table_name in _bootstrapped_tables
+
+
+def mark_bootstrapped(table_name: str) -> None:
+    """Record that the table was checked, so it is not checked again."""
+    _bootstrapped_tables.add(table_name)
+
+
+def ensure_table(table_name: str) -> None:
+    """
+    Make sure a table exists, at most once per worker.
+
+    Each call that actually reaches Azure Tables is counted in the
+    "tables.bootstrap_checks" metric.
+
+    Args:
+        table_name: Name of the table to check.
+    """
+    if is_bootstrapped(table_name):
+        return
+
+    with _registry_lock:
+        if is_bootstrapped(table_name):
+            return
+
+        metrics.increment("tables.bootstrap_checks", table=table_name)
+        try:
+            get_table_service_client().create_table_if_not_exists(table_name)
+        except Exception as e:
+            # Table might already exist or we might not have permissions
+            # In production, tables should be created via Bicep
+            logger.warning(f"Could not ensure table '{table_name}' exists: {e}")
+
+        mark_bootstrapped(table_name)
+
+
+def bootstrap_tables(table_names: tuple[str, ...] = ALL_TABLES) -> None:
+    """
+    Check every application table once, e.g. at worker startup.
+
+    After this, get_table_client() serves all tables without further checks.
+    """
+    for table_name in table_names:
+        ensure_table(table_name)
+
+
 def get_table_client(table_name: str) -> TableClient:
     """
     Get a TableClient for the specified table.
 
-    Creates the table if it doesn't exist.
+    The client is built once per worker and reused. The table is checked
+    for existence (and created if missing) only the first time it is used,
+    unless TABLES_BOOTSTRAP_MODE is "off".
 
     Args:
         table_name: Name of the table to access.
@@ -41,20 +114,44 @@ def get_table_client(table_name: str) -> TableClient:
     Returns:
         TableClient instance for the specified table.
     """
-    import contextlib
+    table_client = _table_clients.get(table_name)
 
-    service_client = get_table_service_client()
-    table_client = service_client.get_table_client(table_name)
+    if table_client is None:
+        with _registry_lock:
+            table_client = _table_clients.get(table_name)
+            if table_client is None:
+                table_client = get_table_service_client().get_table_client(table_name)
+                _table_clients[table_name] = table_client
 
-    # Create table if it doesn't exist (idempotent)
-    # Table might already exist or we might not have permissions
-    # In production, tables should be created via Bicep
-    with contextlib.suppress(Exception):
-        service_client.create_table_if_not_exists(table_name)
+    if settings.tables_bootstrap_mode != "off":
+        ensure_table(table_name)
 
     return table_client
 
 
+def get_bootstrap_check_count(table_name: str | None = None) -> int:
+    """
+    Get how many table existence checks this worker has made.
+
+    Args:
+        table_name: Optional table to count; all tables if omitted.
+
+    Returns:
+        Number of create_table_if_not_exists round trips.
+    """
+    if table_name:
+        return int(metrics.get_counter("tables.bootstrap_checks", table=table_name))
+    return int(metrics.get_counter("tables.bootstrap_checks"))
+
+
+def reset_table_clients() -> None:
+    """Forget cached clients and bootstrap state (used by tests)."""
+    with _registry_lock:
+        _table_clients.clear()
+        _bootstrapped_tables.clear()
+    get_table_service_client.cache_clear()
+
+
 def get_users_table() -> TableClient:
     """Get TableClient for Users table."""
     return get_table_client(TABLE_USERS)
@@ -78,3 +175,13 @@ def get_number_logs_table() -> TableClient:
 def get_audit_logs_table() -> TableClient:
     """Get TableClient for AuditLogs table."""
     return get_table_client(TABLE_AUDIT_LOGS)
+
+
+def get_history_stats_table() -> TableClient:
+    """Get TableClient for HistoryStats table."""
+    return get_table_client(TABLE_HISTORY_STATS)
+
+
+def get_history_index_table() -> TableClient:
+    """Get TableClient for HistoryIndex table."""
+    return get_table_client(TABLE_HISTORY_INDEX)
@@ -0,0 +1,134 @@
+"""Async Azure Tables client factory for Controle PGM (azure.data.tables.aio).
+
+Used by the HTTP handlers, which run on the worker's event loop. Scripts and
+other synchronous callers keep using core.tables.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from azure.data.tables.aio import TableClient, TableServiceClient
+
+from core import metrics
+from core.config import settings
+from core.tables import (
+    TABLE_AUDIT_LOGS,
+    TABLE_DOCUMENT_TYPES,
+    TABLE_HISTORY_INDEX,
+    TABLE_HISTORY_STATS,
+    TABLE_NUMBER_LOGS,
+    TABLE_SEQUENCES,
+    TABLE_USERS,
+    is_bootstrapped,
+    mark_bootstrapped,
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-worker async clients. They share one aiohttp session through the service
+# client, so every request on the event loop reuses the same connection pool.
+# Bootstrap state is shared with core.tables: a table checked by either side is
+# not checked again.
+_service_client: TableServiceClient | None = None
+_table_clients: dict[str, TableClient] = {}
+
+
+def get_table_service_client() -> TableServiceClient:
+    """Get the shared async TableServiceClient instance."""
+    global _service_client
+    if _service_client is None:
+        _service_client = TableServiceClient.from_connection_string(
+            conn_str=settings.azure_tables_connection_string
+        )
+    return _service_client
+
+
+async def ensure_table(table_name: str) -> None:
+    """
+    Make sure a table exists, at most once per worker.
+
+    Args:
+        table_name: Name of the table to check.
+    """
+    if is_bootstrapped(table_name):
+        return
+
+    # Mark first: concurrent coroutines would otherwise all make the same check
+    mark_bootstrapped(table_name)
+    metrics.increment("tables.bootstrap_checks", table=table_name)
+    try:
+        await get_table_service_client().create_table_if_not_exists(table_name)
+    except Exception as e:
+        # In production, tables should be created via Bicep
+        logger.warning(f"Could not ensure table '{table_name}' exists: {e}")
+
+
+async def get_table_client(table_name: str) -> TableClient:
+    """
+    Get an async TableClient for the specified table.
+
+    The client is built once per worker and reused. The table is checked for
+    existence the first time it is used, unless TABLES_BOOTSTRAP_MODE is "off".
+
+    Args:
+        table_name: Name of the table to access.
+
+    Returns:
+        Async TableClient instance for the specified table.
+    """
+    table_client = _table_clients.get(table_name)
+    if table_client is None:
+        table_client = get_table_service_client().get_table_client(table_name)
+        _table_clients[table_name] = table_client
+
+    if settings.tables_bootstrap_mode != "off":
+        await ensure_table(table_name)
+
+    return table_client
+
+
+async def close_table_clients() -> None:
+    """Close the shared async clients and their connection pool."""
+    global _service_client
+    for table_client in _table_clients.values():
+        await table_client.close()
+    _table_clients.clear()
+    if _service_client is not None:
+        await _service_client.close()
+        _service_client = None
+
+
+async def get_users_table() -> TableClient:
+    """Get async TableClient for Users table."""
+    return await get_table_client(TABLE_USERS)
+
+
+async def get_document_types_table() -> TableClient:
+    """Get async TableClient for DocumentTypes table."""
+    return await get_table_client(TABLE_DOCUMENT_TYPES)
+
+
+async def get_sequences_table() -> TableClient:
+    """Get async TableClient for Sequences table."""
+    return await get_table_client(TABLE_SEQUENCES)
+
+
+async def get_number_logs_table() -> TableClient:
+    """Get async TableClient for NumberLogs table."""
+    return await get_table_client(TABLE_NUMBER_LOGS)
+
+
+async def get_audit_logs_table() -> TableClient:
+    """Get async TableClient for AuditLogs table."""
+    return await get_table_client(TABLE_AUDIT_LOGS)
+
+
+async def get_history_stats_table() -> TableClient:
+    """Get async TableClient for HistoryStats table."""
+    return await get_table_client(TABLE_HISTORY_STATS)
+
+
+async def get_history_index_table() -> TableClient:
+    """Get async TableClient for HistoryIndex table."""
+    return await get_table_client(TABLE_HISTORY_INDEX)
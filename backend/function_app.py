@@ -2,6 +2,8 @@
 
 import azure.functions as func
 
+from core.config import settings
+from core.tables import bootstrap_tables
 from functions.auth.change_password import bp as change_password_bp
 
 # Import auth blueprints
@@ -16,12 +18,15 @@ from functions.document_types.get import bp as get_document_type_bp
 from functions.document_types.list import bp as list_document_types_bp
 from functions.document_types.update import bp as update_document_type_bp
 from functions.history.export import bp as export_history_bp
+from functions.history.histogram import bp as histogram_bp
 
 # Import history blueprints
 from functions.history.list import bp as list_history_bp
+from functions.history.recent import bp as recent_history_bp
 
 # Import numbers blueprint
 from functions.numbers.generate import bp as generate_number_bp
+from functions.numbers.generate_batch import bp as generate_batch_bp
 from functions.users.create import bp as create_user_bp
 from functions.users.delete import bp as delete_user_bp
 from functions.users.get import bp as get_user_bp
@@ -34,6 +39,10 @@ from functions.users.update import bp as update_user_bp
 # Create the main Function App
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
+# Check all tables once per worker instead of on the first request to each one
+if settings.tables_bootstrap_mode == "startup":
+    bootstrap_tables()
+
 
 # =============================================================================
 # Health Check Endpoint
@@ -41,7 +50,7 @@ app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
 
 @app.route(route="health", methods=["GET"])
-def health_check(req: func.HttpRequest) -> func.HttpResponse:
+async def health_check(req: func.HttpRequest) -> func.HttpResponse:
     """Health check endpoint for monitoring."""
     import json
 
@@ -64,6 +73,7 @@ app.register_functions(change_password_bp)
 
 # Numbers endpoints
 app.register_functions(generate_number_bp)
+app.register_functions(generate_batch_bp)
 
 # Document types endpoints
 app.register_functions(list_document_types_bp)
@@ -75,6 +85,8 @@ app.register_functions(delete_document_type_bp)
 # History endpoints
 app.register_functions(list_history_bp)
 app.register_functions(export_history_bp)
+app.register_functions(histogram_bp)
+app.register_functions(recent_history_bp)
 
 # Users endpoints
 app.register_functions(list_users_bp)
@@ -10,7 +10,7 @@ from core.middleware import (
     require_auth,
 )
 from models.user import ChangePasswordRequest, CurrentUser
-from services.user_service import UserService
+from services.aio import UserService
 
 # Create blueprint for change password
 bp = func.Blueprint()
@@ -19,7 +19,7 @@ bp = func.Blueprint()
 @bp.route(route="auth/change-password", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_auth
-def change_password(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def change_password(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Change current user's password.
 
     POST /api/auth/change-password
@@ -45,14 +45,14 @@ def change_password(req: func.HttpRequest, current_user: CurrentUser) -> func.Ht
     validate_password_policy(change_data.new_password)
 
     # Change password
-    UserService.change_password(
+    await UserService.change_password(
         user_id=current_user["user_id"],
         current_password=change_data.current_password,
         new_password=change_data.new_password,
     )
 
     # Get updated user
-    user = UserService.get_by_id(current_user["user_id"])
+    user = await UserService.get_by_id(current_user["user_id"])
 
     # Create new token without must_change_password flag
     token = create_token(
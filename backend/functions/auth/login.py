@@ -6,8 +6,8 @@ from core.auth import create_auth_cookie, create_token
 from core.middleware import create_json_response, get_request_body, handle_errors
 from core.rate_limit import rate_limit
 from models.user import LoginRequest, LoginResponse
-from services.audit_service import AuditAction, AuditService
-from services.user_service import UserService
+from services.aio import AuditService, UserService
+from services.audit_service import AuditAction
 
 # Create blueprint for auth functions
 bp = func.Blueprint()
@@ -21,7 +21,7 @@ def _get_client_ip(req: func.HttpRequest) -> str | None:
 @bp.route(route="auth/login", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @rate_limit(max_requests=5, window_minutes=1)  # Strict rate limit for login attempts
-def login(req: func.HttpRequest) -> func.HttpResponse:
+async def login(req: func.HttpRequest) -> func.HttpResponse:
     """Handle user login.
 
     POST /api/auth/login
@@ -52,10 +52,10 @@ def login(req: func.HttpRequest) -> func.HttpResponse:
 
     try:
         # Verify credentials
-        user = UserService.verify_credentials(login_data.email, login_data.password)
+        user = await UserService.verify_credentials(login_data.email, login_data.password)
 
         # Log successful login
-        AuditService.log(
+        await AuditService.log(
             action=AuditAction.LOGIN_SUCCESS,
             actor_id=user.RowKey,
             actor_email=user.Email,
@@ -89,7 +89,7 @@ def login(req: func.HttpRequest) -> func.HttpResponse:
 
     except Exception as e:
         # Log failed login attempt
-        AuditService.log(
+        await AuditService.log(
             action=AuditAction.LOGIN_FAILED,
             actor_id=None,
             actor_email=login_data.email,
@@ -11,7 +11,7 @@ bp = func.Blueprint()
 
 @bp.route(route="auth/logout", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
-def logout(req: func.HttpRequest) -> func.HttpResponse:
+async def logout(req: func.HttpRequest) -> func.HttpResponse:
     """Handle user logout.
 
     POST /api/auth/logout
@@ -12,7 +12,7 @@ bp = func.Blueprint()
 @bp.route(route="auth/me", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_auth
-def me(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def me(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Get current authenticated user info.
 
     GET /api/auth/me
@@ -10,7 +10,7 @@ from core.middleware import (
 )
 from models.document_type import DocumentTypeCreate, DocumentTypeResponse
 from models.user import CurrentUser
-from services.document_type_service import DocumentTypeService
+from services.aio import DocumentTypeService
 
 bp = func.Blueprint()
 
@@ -18,7 +18,9 @@ bp = func.Blueprint()
 @bp.route(route="document-types", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_admin
-def create_document_type(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def create_document_type(
+    req: func.HttpRequest, current_user: CurrentUser
+) -> func.HttpResponse:
     """Create a new document type.
 
     POST /api/document-types
@@ -46,7 +48,7 @@ def create_document_type(req: func.HttpRequest, current_user: CurrentUser) -> fu
     body = get_request_body(req)
     request_data = DocumentTypeCreate(**body)
 
-    entity = DocumentTypeService.create(request_data)
+    entity = await DocumentTypeService.create(request_data)
     response = DocumentTypeResponse.from_entity(entity)
 
     return create_json_response(response.model_dump(mode="json"), status_code=201)
@@ -8,7 +8,7 @@ from core.middleware import (
     require_admin,
 )
 from models.user import CurrentUser
-from services.document_type_service import DocumentTypeService
+from services.aio import DocumentTypeService
 
 bp = func.Blueprint()
 
@@ -18,7 +18,9 @@ bp = func.Blueprint()
 )
 @handle_errors
 @require_admin
-def delete_document_type(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def delete_document_type(
+    req: func.HttpRequest, current_user: CurrentUser
+) -> func.HttpResponse:
     """Delete a document type permanently (Hard Delete).
 
     DELETE /api/document-types/{doc_type_id}
@@ -35,7 +37,7 @@ def delete_document_type(req: func.HttpRequest, current_user: CurrentUser) -> fu
     """
     doc_type_id = req.route_params.get("doc_type_id")
 
-    DocumentTypeService.delete_permanently(doc_type_id)
+    await DocumentTypeService.delete_permanently(doc_type_id)
 
     return create_json_response(
         {"success": True, "message": "Tipo de documento excluído com sucesso"}, status_code=200
@@ -10,7 +10,7 @@ from core.middleware import (
 )
 from models.document_type import DocumentTypeResponse
 from models.user import CurrentUser
-from services.document_type_service import DocumentTypeService
+from services.aio import DocumentTypeService
 
 bp = func.Blueprint()
 
@@ -20,7 +20,7 @@ bp = func.Blueprint()
 )
 @handle_errors
 @require_auth
-def get_document_type(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def get_document_type(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Get a document type by ID.
 
     GET /api/document-types/{doc_type_id}
@@ -40,7 +40,7 @@ def get_document_type(req: func.HttpRequest, current_user: CurrentUser) -> func.
     """
     doc_type_id = req.route_params.get("doc_type_id")
 
-    entity = DocumentTypeService.get_by_id(doc_type_id)
+    entity = await DocumentTypeService.get_by_id(doc_type_id)
     if not entity:
         raise NotFoundError("Tipo de documento não encontrado")
 
@@ -2,10 +2,16 @@
 
 import azure.functions as func
 
-from core.middleware import create_json_response, handle_errors, require_auth
-from models.document_type import DocumentTypeListResponse, DocumentTypeResponse
+from core.middleware import (
+    create_json_response,
+    get_fields_param,
+    handle_errors,
+    require_auth,
+)
+from models.document_type import DocumentTypeRow
+from models.rows import row_to_json
 from models.user import CurrentUser
-from services.document_type_service import DocumentTypeService
+from services.aio import DocumentTypeService
 
 bp = func.Blueprint()
 
@@ -13,13 +19,16 @@ bp = func.Blueprint()
 @bp.route(route="document-types", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_auth
-def list_document_types(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def list_document_types(
+    req: func.HttpRequest, current_user: CurrentUser
+) -> func.HttpResponse:
     """List all active document types.
 
     GET /api/document-types
 
     Query parameters:
         all (optional): If "true", include inactive types (admin only)
+        fields (optional): Comma-separated item fields to return (default: all)
 
     Response (200):
         {
@@ -39,17 +48,15 @@ def list_document_types(req: func.HttpRequest, current_user: CurrentUser) -> fun
     """
     # Check if admin wants all document types
     include_all = req.params.get("all", "").lower() == "true"
+    fields = get_fields_param(req.params, DocumentTypeRow._fields)
 
-    if include_all and current_user["role"] == "admin":
-        doc_types = DocumentTypeService.list_all()
-    else:
-        doc_types = DocumentTypeService.list_active()
-
-    items = [DocumentTypeResponse.from_entity(dt) for dt in doc_types]
-
-    response = DocumentTypeListResponse(
-        items=items,
-        total=len(items),
+    items = await DocumentTypeService.list_rows(
+        include_inactive=include_all and current_user["role"] == "admin"
     )
 
-    return create_json_response(response.model_dump(mode="json"), status_code=200)
+    response = {
+        "items": [row_to_json(item, fields) for item in items],
+        "total": len(items),
+    }
+
+    return create_json_response(response, status_code=200)
@@ -10,7 +10,7 @@ from core.middleware import (
 )
 from models.document_type import DocumentTypeResponse, DocumentTypeUpdate
 from models.user import CurrentUser
-from services.document_type_service import DocumentTypeService
+from services.aio import DocumentTypeService
 
 bp = func.Blueprint()
 
@@ -20,7 +20,9 @@ bp = func.Blueprint()
 )
 @handle_errors
 @require_admin
-def update_document_type(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def update_document_type(
+    req: func.HttpRequest, current_user: CurrentUser
+) -> func.HttpResponse:
     """Update a document type.
 
     PUT /api/document-types/{doc_type_id}
@@ -49,7 +51,7 @@ def update_document_type(req: func.HttpRequest, current_user: CurrentUser) -> fu
     body = get_request_body(req)
     request_data = DocumentTypeUpdate(**body)
 
-    entity = DocumentTypeService.update(doc_type_id, request_data)
+    entity = await DocumentTypeService.update(doc_type_id, request_data)
     response = DocumentTypeResponse.from_entity(entity)
 
     return create_json_response(response.model_dump(mode="json"), status_code=200)
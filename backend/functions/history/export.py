@@ -1,74 +1,254 @@
 """History export endpoint for Controle PGM."""
 
+import contextlib
+import gzip
+import io
+import logging
+import tempfile
+from collections.abc import AsyncIterator, Callable, Iterator, Mapping
 from datetime import datetime
+from functools import wraps
+from typing import Any, BinaryIO
 
 import azure.functions as func
 
-from core.middleware import (
-    handle_errors,
-    require_auth,
-)
+from core import metrics
+from core.config import settings
+from core.exceptions import BadRequestError
+from core.middleware import get_date_param, handle_errors, require_auth
 from models.user import CurrentUser
-from services.history_service import HistoryService
+from services.aio import ExportSnapshotService, HistoryService
+from services.export_snapshot_service import SPOOL_MAX_BYTES
 
-bp = func.Blueprint()
+try:
+    from azurefunctions.extensions.http.fastapi import (
+        Request,
+        Response,
+        StreamingResponse,
+    )
+except ImportError:  # HTTP streams extension not installed: buffered responses only
+    Request = Response = StreamingResponse = None
 
+logger = logging.getLogger(__name__)
 
-@bp.route(route="history/export", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
-@handle_errors
-@require_auth
-def export_history(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
-    """Export history to CSV file.
+bp = func.Blueprint()
 
-    GET /api/history/export
+# Stream the CSV to the client instead of building the response body in the worker
+STREAMING_ENABLED = settings.history_export_streaming and StreamingResponse is not None
 
-    Query parameters:
-        document_type_code: Filter by document type (optional)
-        year: Filter by year (optional)
-        user_id: Filter by user ID (optional)
-        action: Filter by action type ('generated' or 'corrected') (optional)
+# Bytes of CSV decompressed at a time from a snapshot
+DECOMPRESS_CHUNK_BYTES = 256 * 1024
 
-    Response (200):
-        CSV file download
-    """
-    # Parse query parameters
-    document_type_code = req.params.get("document_type_code")
-    year_str = req.params.get("year")
-    user_id = req.params.get("user_id")
-    action = req.params.get("action")
 
-    # Convert numeric parameters
-    year = int(year_str) if year_str else None
+def _parse_export_params(params: Mapping[str, str]) -> dict:
+    """Read the export filters from the query string."""
+    document_type_code = params.get("document_type_code")
+    year_str = params.get("year")
+    action = params.get("action")
 
     # Validate action
     if action and action not in ("generated", "corrected"):
         action = None
 
-    # Generate CSV
-    csv_content = HistoryService.export_csv(
-        document_type_code=document_type_code.upper() if document_type_code else None,
-        year=year,
-        user_id=user_id,
-        action=action,
-    )
+    try:
+        year = int(year_str) if year_str else None
+    except ValueError:
+        raise BadRequestError("Parâmetro 'year' deve ser um número")
+
+    return {
+        "document_type_code": document_type_code.upper() if document_type_code else None,
+        "year": year,
+        "user_id": params.get("user_id"),
+        "action": action,
+        "date_from": get_date_param(params, "from"),
+        "date_to": get_date_param(params, "to"),
+    }
 
-    # Generate filename
+
+def _export_headers(document_type_code: str | None, year: int | None) -> dict[str, str]:
+    """Build the download headers with a filename describing the filters."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     parts = ["historico"]
     if document_type_code:
-        parts.append(document_type_code.upper())
+        parts.append(document_type_code)
     if year:
         parts.append(str(year))
     parts.append(timestamp)
     filename = "_".join(parts) + ".csv"
 
-    return func.HttpResponse(
-        body=csv_content.encode("utf-8-sig"),  # BOM for Excel compatibility
-        status_code=200,
-        mimetype="text/csv",
-        charset="utf-8",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"',
-            "Cache-Control": "no-cache",
-        },
-    )
+    return {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-cache",
+    }
+
+
+def _accepts_gzip(headers: Mapping[str, str]) -> bool:
+    """Whether the client accepts a gzip-encoded body."""
+    return "gzip" in headers.get("Accept-Encoding", "")
+
+
+def _iter_decompressed(snapshot: bytes) -> Iterator[bytes]:
+    """Decompress a gzip snapshot a chunk at a time, never whole."""
+    with gzip.GzipFile(fileobj=io.BytesIO(snapshot)) as csv_file:
+        while chunk := csv_file.read(DECOMPRESS_CHUNK_BYTES):
+            yield chunk
+
+
+def _http_streams_response(func_handler: Callable[..., Any]) -> Callable[..., Any]:
+    """Convert the error responses of handle_errors/require_auth for HTTP streams.
+
+    Handlers of the HTTP streams extension must return its own Response types;
+    the func.HttpResponse built by the shared decorators is copied into one.
+    """
+
+    @wraps(func_handler)
+    async def wrapper(req: Request, *args: Any, **kwargs: Any) -> Response:
+        response = await func_handler(req, *args, **kwargs)
+        if isinstance(response, func.HttpResponse):
+            return Response(
+                response.get_body(),
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                media_type=response.mimetype,
+            )
+        return response
+
+    return wrapper
+
+
+async def _stream_export(
+    first_chunks: list[bytes], chunks: AsyncIterator[bytes]
+) -> AsyncIterator[bytes]:
+    """Send the chunks read before answering, then the rest of the export.
+
+    The status line is sent by then, so an error can only abort the download
+    (the client sees an incomplete transfer): it is logged and counted here.
+    """
+    try:
+        for chunk in first_chunks:
+            yield chunk
+        async for chunk in chunks:
+            yield chunk
+    except Exception:
+        logger.exception("History export failed mid-stream")
+        metrics.increment("history_export.stream_errors")
+        raise
+    finally:
+        await chunks.aclose()
+
+
+async def _write_export(body: BinaryIO, params: dict, use_gzip: bool) -> None:
+    """Write the live CSV export into a file, gzip-compressed or not."""
+    chunks = HistoryService.iter_export_csv(**params)
+    # mtime=0: the same history always compresses to the same bytes
+    with (
+        gzip.GzipFile(fileobj=body, mode="wb", mtime=0)
+        if use_gzip
+        else contextlib.nullcontext(body)
+    ) as output:
+        try:
+            async for chunk in chunks:
+                output.write(chunk)
+        finally:
+            await chunks.aclose()
+
+
+if STREAMING_ENABLED:
+
+    @bp.route(route="history/export", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+    @_http_streams_response
+    @handle_errors
+    @require_auth
+    async def export_history(req: Request, current_user: CurrentUser) -> Response:
+        """Export history to CSV file, streamed as it is read.
+
+        GET /api/history/export
+
+        Same parameters and response as the buffered variant below; rows are
+        sent one Azure Tables page at a time.
+        """
+        params = _parse_export_params(req.query_params)
+        headers = _export_headers(params["document_type_code"], params["year"])
+
+        snapshot = await ExportSnapshotService.find(**params)
+        if snapshot is not None and _accepts_gzip(req.headers):
+            return Response(
+                snapshot,
+                media_type="text/csv; charset=utf-8",
+                headers={**headers, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+            )
+        if snapshot is not None:
+            return StreamingResponse(
+                _iter_decompressed(snapshot),
+                media_type="text/csv; charset=utf-8",
+                headers={**headers, "Vary": "Accept-Encoding"},
+            )
+
+        # Read the CSV header and the first page before answering, so errors of
+        # the first table read still get an error response
+        chunks = HistoryService.iter_export_csv(**params)
+        first_chunks = []
+        async for chunk in chunks:
+            first_chunks.append(chunk)
+            if len(first_chunks) == 2:
+                break
+
+        return StreamingResponse(
+            _stream_export(first_chunks, chunks),
+            media_type="text/csv; charset=utf-8",
+            headers=headers,
+        )
+
+else:
+
+    @bp.route(route="history/export", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+    @handle_errors
+    @require_auth
+    async def export_history(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+        """Export history to CSV file.
+
+        GET /api/history/export
+
+        Query parameters:
+            document_type_code: Filter by document type (optional)
+            year: Filter by year (optional)
+            user_id: Filter by user ID (optional)
+            action: Filter by action type ('generated' or 'corrected') (optional)
+            from: First day, YYYY-MM-DD, inclusive (optional)
+            to: Last day, YYYY-MM-DD, inclusive (optional)
+
+        Exports of a whole closed year, or of one document type in it, are
+        served from their gzip snapshot while it is fresh (see
+        ExportSnapshotService).
+
+        Response (200):
+            CSV file download, gzip-encoded if the client accepts gzip
+        """
+        params = _parse_export_params(req.params)
+        headers = _export_headers(params["document_type_code"], params["year"])
+
+        snapshot = await ExportSnapshotService.find(**params)
+        use_gzip = _accepts_gzip(req.headers)
+
+        # Without HTTP streams the body must be complete: it is built in a spooled
+        # temp file (on disk past SPOOL_MAX_BYTES), gzip-compressed for clients
+        # that accept it, and only read into memory once, whole
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as body:
+            if snapshot is not None and use_gzip:
+                body.write(snapshot)
+            elif snapshot is not None:
+                for chunk in _iter_decompressed(snapshot):
+                    body.write(chunk)
+            else:
+                await _write_export(body, params, use_gzip)
+            body.seek(0)
+            content = body.read()
+
+        encoding_headers = {"Content-Encoding": "gzip"} if use_gzip else {}
+        return func.HttpResponse(
+            body=content,
+            status_code=200,
+            mimetype="text/csv",
+            charset="utf-8",
+            headers={**headers, **encoding_headers, "Vary": "Accept-Encoding"},
+        )
@@ -0,0 +1,77 @@
+"""History histogram endpoint for Controle PGM."""
+
+import azure.functions as func
+
+from core.exceptions import BadRequestError
+from core.middleware import (
+    create_json_response,
+    get_date_param,
+    handle_errors,
+    require_auth,
+)
+from models.number_log import HistogramResponse
+from models.user import CurrentUser
+from services.aio import HistoryStatsService
+
+bp = func.Blueprint()
+
+
+@bp.route(route="history/histogram", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+@handle_errors
+@require_auth
+async def get_histogram(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+    """Get numbers issued per day or month for a document type and year.
+
+    GET /api/history/histogram
+
+    Query parameters:
+        document_type_code: Document type (required)
+        year: Year (required)
+        granularity: 'day' or 'month' (default: 'month')
+        start: First date of the range, YYYY-MM-DD (optional)
+        end: Last date of the range, YYYY-MM-DD (optional)
+
+    Response (200):
+        {
+            "document_type_code": "OF",
+            "year": 2025,
+            "granularity": "month",
+            "buckets": [
+                {"period": "2025-03", "generated": 42, "corrected": 1},
+                ...
+            ]
+        }
+
+    Periods without numbers are omitted.
+
+    Errors:
+        400 - Missing or invalid parameters
+    """
+    document_type_code = req.params.get("document_type_code")
+    year_str = req.params.get("year", "")
+    granularity = req.params.get("granularity", "month")
+
+    if not document_type_code or not year_str.isdigit():
+        raise BadRequestError("Parâmetros 'document_type_code' e 'year' são obrigatórios")
+    if granularity not in ("day", "month"):
+        raise BadRequestError("Parâmetro 'granularity' deve ser 'day' ou 'month'")
+
+    document_type_code = document_type_code.upper()
+    year = int(year_str)
+
+    buckets = await HistoryStatsService.get_histogram(
+        document_type_code,
+        year,
+        granularity,
+        start=get_date_param(req.params, "start"),
+        end=get_date_param(req.params, "end"),
+    )
+
+    response = HistogramResponse(
+        document_type_code=document_type_code,
+        year=year,
+        granularity=granularity,  # type: ignore
+        buckets=buckets,
+    )
+
+    return create_json_response(response.model_dump(), status_code=200)
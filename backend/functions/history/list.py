@@ -4,12 +4,15 @@ import azure.functions as func
 
 from core.middleware import (
     create_json_response,
+    get_date_param,
+    get_fields_param,
     handle_errors,
     require_auth,
 )
-from models.number_log import HistoryFilter
+from models.number_log import HistoryFilter, NumberLogRow
+from models.rows import row_to_json
 from models.user import CurrentUser
-from services.history_service import HistoryService
+from services.aio import HistoryService
 
 bp = func.Blueprint()
 
@@ -17,20 +20,37 @@ bp = func.Blueprint()
 @bp.route(route="history", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_auth
-def list_history(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def list_history(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """List number generation history with filters.
 
     GET /api/history
 
+    Pages are addressed by an opaque cursor: omit it for the first page and send
+    back next_cursor to get the following one. Requests that still send a page
+    number get the legacy page-number response.
+
     Query parameters:
         document_type_code: Filter by document type (optional)
         year: Filter by year (optional)
         user_id: Filter by user ID (optional)
         action: Filter by action type ('generated' or 'corrected') (optional)
-        page: Page number (default: 1)
+        from: First day, YYYY-MM-DD, inclusive (optional)
+        to: Last day, YYYY-MM-DD, inclusive (optional)
+        cursor: next_cursor from the previous page (optional)
+        include_total: 'true' to count all matching records (optional, slower)
+        page: Page number (legacy, disables cursor pagination)
         page_size: Items per page (default: 50, max: 100)
+        fields: Comma-separated item fields to return (optional, default: all)
 
     Response (200):
+        {
+            "items": [...],
+            "total": null,
+            "page_size": 50,
+            "next_cursor": "eyJ2Ijox..."
+        }
+
+    Legacy response (200, when page is sent):
         {
             "items": [...],
             "total": 150,
@@ -44,14 +64,18 @@ def list_history(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpR
     year_str = req.params.get("year")
     user_id = req.params.get("user_id")
     action = req.params.get("action")
-    page_str = req.params.get("page", "1")
+    cursor = req.params.get("cursor") or None
+    include_total = req.params.get("include_total", "").lower() == "true"
+    page_str = req.params.get("page")
     page_size_str = req.params.get("page_size", "50")
 
     # Convert numeric parameters
     year = int(year_str) if year_str else None
-    page = int(page_str) if page_str.isdigit() else 1
+    page = int(page_str) if page_str and page_str.isdigit() else 1
     page_size = int(page_size_str) if page_size_str.isdigit() else 50
 
+    fields = get_fields_param(req.params, NumberLogRow._fields)
+
     # Validate action
     if action and action not in ("generated", "corrected"):
         action = None
@@ -62,19 +86,35 @@ def list_history(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpR
         year=year,
         user_id=user_id,
         action=action,  # type: ignore
+        date_from=get_date_param(req.params, "from"),
+        date_to=get_date_param(req.params, "to"),
         page=page,
         page_size=min(page_size, 100),  # Cap at 100
     )
 
-    result = HistoryService.list_history(filters)
+    if page_str is not None and cursor is None:
+        # Clients that predate cursor pagination
+        result = await HistoryService.list_history(filters)
+
+        return create_json_response(
+            {
+                "items": [row_to_json(item, fields) for item in result.items],
+                "total": result.total,
+                "page": result.page,
+                "page_size": result.page_size,
+                "total_pages": result.total_pages,
+            },
+            status_code=200,
+        )
+
+    result = await HistoryService.list_history_page(filters, cursor, include_total)
 
     return create_json_response(
         {
-            "items": [item.model_dump(mode="json") for item in result.items],
+            "items": [row_to_json(item, fields) for item in result.items],
             "total": result.total,
-            "page": result.page,
             "page_size": result.page_size,
-            "total_pages": result.total_pages,
+            "next_cursor": result.next_cursor,
         },
         status_code=200,
     )
@@ -0,0 +1,54 @@
+"""Recent activity endpoint for Controle PGM."""
+
+import azure.functions as func
+
+from core.middleware import create_json_response, get_fields_param, handle_errors, require_auth
+from models.number_log import NumberLogRow
+from models.rows import row_to_json
+from models.user import CurrentUser
+from services.aio import HistoryService
+
+bp = func.Blueprint()
+
+
+@bp.route(route="history/recent", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+@handle_errors
+@require_auth
+async def recent_activity(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+    """Get the newest numbers generated or corrected, across years and types.
+
+    GET /api/history/recent
+
+    Only about `limit` rows of each partition are read, however long the
+    history is.
+
+    Query parameters:
+        limit: Number of items (default: 20, max: 100)
+        document_type_code: Filter by document type (optional)
+        year: Filter by year (optional)
+        fields: Comma-separated item fields to return (optional, default: all)
+
+    Response (200):
+        {
+            "items": [...]
+        }
+    """
+    document_type_code = req.params.get("document_type_code")
+    year_str = req.params.get("year", "")
+    limit_str = req.params.get("limit", "20")
+
+    year = int(year_str) if year_str.isdigit() else None
+    limit = int(limit_str) if limit_str.isdigit() and int(limit_str) > 0 else 20
+
+    fields = get_fields_param(req.params, NumberLogRow._fields)
+
+    items = await HistoryService.recent_activity(
+        limit=min(limit, 100),  # Cap at 100
+        document_type_code=document_type_code.upper() if document_type_code else None,
+        year=year,
+    )
+
+    return create_json_response(
+        {"items": [row_to_json(item, fields) for item in items]},
+        status_code=200,
+    )
@@ -11,7 +11,7 @@ from core.middleware import (
 from core.rate_limit import rate_limit
 from models.sequence import GenerateNumberRequest, GenerateNumberResponse
 from models.user import CurrentUser
-from services.number_service import NumberService
+from services.aio import NumberService
 
 bp = func.Blueprint()
 
@@ -20,7 +20,7 @@ bp = func.Blueprint()
 @handle_errors
 @rate_limit(max_requests=30, window_minutes=1)  # 30 requests per minute per user
 @require_auth
-def generate_number(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def generate_number(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Generate next document number.
 
     POST /api/numbers/generate
@@ -47,7 +47,7 @@ def generate_number(req: func.HttpRequest, current_user: CurrentUser) -> func.Ht
     body = get_request_body(req)
     request_data = GenerateNumberRequest(**body)
 
-    number, formatted, document_type_name = NumberService.generate_number(
+    number, formatted, document_type_name = await NumberService.generate_number(
         document_type_code=request_data.document_type_code.upper(),
         year=request_data.year,
         user=current_user,
@@ -0,0 +1,98 @@
+"""Batch number generation endpoint for Controle PGM."""
+
+import azure.functions as func
+
+from core.middleware import (
+    create_json_response,
+    get_request_body,
+    handle_errors,
+    require_auth,
+)
+from core.rate_limit import rate_limit
+from models.sequence import GenerateBatchRequest, GenerateBatchResponse
+from models.user import CurrentUser
+from services.aio import NumberService
+
+bp = func.Blueprint()
+
+
+def _batch_cost(req: func.HttpRequest) -> int:
+    """Charge a batch as many requests as the numbers it reserves."""
+    try:
+        count = int(req.get_json().get("count", 1))
+    except (ValueError, TypeError, AttributeError):
+        return 1  # Invalid body, rejected by validation later
+    return min(max(count, 1), 100)
+
+
+def _batch_key(req: func.HttpRequest) -> str:
+    """Rate limit batches on their own key, apart from single generates.
+
+    POST /numbers/generate allows 30 requests per minute, each one a sequence
+    write for one number. A batch is a single sequence write for up to 100
+    numbers, so its budget is counted in numbers instead. On the shared "ip:"
+    key any batch above 30 numbers could never pass; on its own key a client
+    gets at most 100 batch numbers plus 30 single generates per minute.
+    """
+    return f"batch:ip:{req.headers.get('X-Forwarded-For', 'unknown')}"
+
+
+@bp.route(route="numbers/generate-batch", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+@handle_errors
+# 100 numbers per minute, separate from the generate budget (see _batch_key)
+@rate_limit(max_requests=100, window_minutes=1, key_func=_batch_key, cost_func=_batch_cost)
+@require_auth
+async def generate_batch(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+    """Reserve several contiguous document numbers at once.
+
+    POST /api/numbers/generate-batch
+
+    Request body:
+        {
+            "document_type_code": "OF",
+            "year": 2025,
+            "count": 3
+        }
+
+    Response (200):
+        {
+            "first_number": 43,
+            "last_number": 45,
+            "count": 3,
+            "document_type_code": "OF",
+            "document_type_name": "Ofício",
+            "year": 2025,
+            "formatted": ["OF 0043/2025", "OF 0044/2025", "OF 0045/2025"]
+        }
+
+    Errors:
+        400 - Invalid request (count must be between 1 and 100)
+        404 - Document type not found
+        409 - Generation failed
+        429 - Rate limit exceeded (each number counts as one request)
+    """
+    body = get_request_body(req)
+    request_data = GenerateBatchRequest(**body)
+    document_type_code = request_data.document_type_code.upper()
+
+    first_number, last_number, document_type_name = await NumberService.generate_batch(
+        document_type_code=document_type_code,
+        year=request_data.year,
+        count=request_data.count,
+        user=current_user,
+    )
+
+    response = GenerateBatchResponse(
+        first_number=first_number,
+        last_number=last_number,
+        count=request_data.count,
+        document_type_code=document_type_code,
+        document_type_name=document_type_name,
+        year=request_data.year,
+        formatted=[
+            NumberService.format_number(document_type_code, number, request_data.year)
+            for number in range(first_number, last_number + 1)
+        ],
+    )
+
+    return create_json_response(response.model_dump(), status_code=200)
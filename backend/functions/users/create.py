@@ -9,8 +9,8 @@ from core.middleware import (
     require_admin,
 )
 from models.user import CurrentUser, UserCreate, UserResponse
-from services.audit_service import AuditAction, AuditService
-from services.user_service import UserService
+from services.aio import AuditService, UserService
+from services.audit_service import AuditAction
 
 bp = func.Blueprint()
 
@@ -23,7 +23,7 @@ def _get_client_ip(req: func.HttpRequest) -> str | None:
 @bp.route(route="users", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_admin
-def create_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def create_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Create a new user.
 
     POST /api/users
@@ -55,11 +55,11 @@ def create_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpRe
     body = get_request_body(req)
     request_data = UserCreate(**body)
 
-    entity = UserService.create(request_data)
+    entity = await UserService.create(request_data)
     response = UserResponse.from_entity(entity)
 
     # Log user creation
-    AuditService.log_user_action(
+    await AuditService.log_user_action(
         action=AuditAction.USER_CREATED,
         actor=current_user,
         target_user_id=entity.RowKey,
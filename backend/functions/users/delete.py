@@ -10,8 +10,8 @@ from core.middleware import (
 )
 from core.security import is_valid_uuid
 from models.user import CurrentUser
-from services.audit_service import AuditAction, AuditService
-from services.user_service import UserService
+from services.aio import AuditService, UserService
+from services.audit_service import AuditAction
 
 bp = func.Blueprint()
 
@@ -19,7 +19,7 @@ bp = func.Blueprint()
 @bp.route(route="users/{user_id}", methods=["DELETE"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_admin
-def delete_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def delete_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Delete a user permanently (Hard Delete).
 
     DELETE /api/users/{user_id}
@@ -40,15 +40,15 @@ def delete_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpRe
         raise BadRequestError("ID de usuário inválido")
 
     # Check if user exists
-    user = UserService.get_by_id(user_id)
+    user = await UserService.get_by_id(user_id)
     if not user:
         raise NotFoundError("Usuário não encontrado")
 
     # Delete user permanently (handles admin protection internally)
-    UserService.delete_permanently(user_id, current_user["user_id"])
+    await UserService.delete_permanently(user_id, current_user["user_id"])
 
     # Log user deletion
-    AuditService.log_user_action(
+    await AuditService.log_user_action(
         action=AuditAction.USER_DEACTIVATED,  # Reuse or add USER_DELETED
         actor=current_user,
         target_user_id=user_id,
@@ -10,7 +10,7 @@ from core.middleware import (
 )
 from core.security import is_valid_uuid
 from models.user import CurrentUser, UserResponse
-from services.user_service import UserService
+from services.aio import UserService
 
 bp = func.Blueprint()
 
@@ -18,7 +18,7 @@ bp = func.Blueprint()
 @bp.route(route="users/{user_id}", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_admin
-def get_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def get_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Get a user by ID.
 
     GET /api/users/{user_id}
@@ -44,7 +44,7 @@ def get_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpRespo
     if not is_valid_uuid(user_id):
         raise BadRequestError("ID de usuário inválido")
 
-    entity = UserService.get_by_id(user_id)
+    entity = await UserService.get_by_id(user_id)
     if not entity:
         raise NotFoundError("Usuário não encontrado")
 
@@ -4,11 +4,13 @@ import azure.functions as func
 
 from core.middleware import (
     create_json_response,
+    get_fields_param,
     handle_errors,
     require_admin,
 )
-from models.user import CurrentUser, UserResponse
-from services.user_service import UserService
+from models.rows import row_to_json
+from models.user import CurrentUser, UserRow
+from services.aio import UserService
 
 bp = func.Blueprint()
 
@@ -16,11 +18,14 @@ bp = func.Blueprint()
 @bp.route(route="users", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_admin
-def list_users(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def list_users(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """List all users.
 
     GET /api/users
 
+    Query parameters:
+        fields: Comma-separated item fields to return (optional, default: all)
+
     Response (200):
         [
             {
@@ -35,11 +40,12 @@ def list_users(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpRes
             }
         ]
     """
-    entities = UserService.list_all()
+    fields = get_fields_param(req.params, UserRow._fields)
+    users = await UserService.list_rows()
 
     # Sort by name
-    entities.sort(key=lambda x: x.Name.lower())
+    users.sort(key=lambda x: x.name.lower())
 
-    response = [UserResponse.from_entity(e).model_dump(mode="json") for e in entities]
+    response = [row_to_json(u, fields) for u in users]
 
     return create_json_response(response, status_code=200)
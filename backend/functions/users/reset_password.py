@@ -10,8 +10,8 @@ from core.middleware import (
 )
 from core.security import is_valid_uuid
 from models.user import CurrentUser
-from services.audit_service import AuditAction, AuditService
-from services.user_service import UserService
+from services.aio import AuditService, UserService
+from services.audit_service import AuditAction
 
 bp = func.Blueprint()
 
@@ -21,7 +21,9 @@ bp = func.Blueprint()
 )
 @handle_errors
 @require_admin
-def reset_user_password(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def reset_user_password(
+    req: func.HttpRequest, current_user: CurrentUser
+) -> func.HttpResponse:
     """Reset a user's password to a temporary one.
 
     POST /api/users/{user_id}/reset-password
@@ -43,15 +45,15 @@ def reset_user_password(req: func.HttpRequest, current_user: CurrentUser) -> fun
         raise BadRequestError("ID de usuário inválido")
 
     # Check if user exists
-    user = UserService.get_by_id(user_id)
+    user = await UserService.get_by_id(user_id)
     if not user:
         raise NotFoundError("Usuário não encontrado")
 
     # Reset password and get temporary one
-    temp_password = UserService.reset_password(user_id)
+    temp_password = await UserService.reset_password(user_id)
 
     # Log password reset
-    AuditService.log_user_action(
+    await AuditService.log_user_action(
         action=AuditAction.USER_PASSWORD_RESET,
         actor=current_user,
         target_user_id=user_id,
@@ -11,7 +11,7 @@ from core.middleware import (
 )
 from core.security import is_valid_uuid
 from models.user import CurrentUser, UserResponse
-from services.user_service import UserService
+from services.aio import UserService
 
 bp = func.Blueprint()
 
@@ -19,7 +19,7 @@ bp = func.Blueprint()
 @bp.route(route="users/{user_id}", methods=["PUT"], auth_level=func.AuthLevel.ANONYMOUS)
 @handle_errors
 @require_admin
-def update_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
+async def update_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpResponse:
     """Update a user.
 
     PUT /api/users/{user_id}
@@ -56,7 +56,7 @@ def update_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpRe
     body = get_request_body(req)
 
     # Get user first to check if exists
-    user = UserService.get_by_id(user_id)
+    user = await UserService.get_by_id(user_id)
     if not user:
         raise NotFoundError("Usuário não encontrado")
 
@@ -70,7 +70,7 @@ def update_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpRe
         # Check if trying to remove admin role
         if body["role"] == "user" and user.Role == "admin":
             # Use the remove_admin_role method for safety
-            UserService.remove_admin_role(user_id, current_user["user_id"])
+            await UserService.remove_admin_role(user_id, current_user["user_id"])
             updates = {}  # Already updated
         elif body["role"] == "admin" and user.Role == "user":
             updates["Role"] = "admin"
@@ -78,17 +78,17 @@ def update_user(req: func.HttpRequest, current_user: CurrentUser) -> func.HttpRe
     if "is_active" in body:
         if not body["is_active"] and user.IsActive:
             # Use deactivate method for safety
-            UserService.deactivate(user_id, current_user["user_id"])
+            await UserService.deactivate(user_id, current_user["user_id"])
             updates = {}  # Already updated
         elif body["is_active"] and not user.IsActive:
             updates["IsActive"] = True
 
     # Apply remaining updates if any
     if updates:
-        UserService.update(user_id, updates)
+        await UserService.update(user_id, updates)
 
     # Get fresh user data
-    entity = UserService.get_by_id(user_id)
+    entity = await UserService.get_by_id(user_id)
     response = UserResponse.from_entity(entity)
 
     return create_json_response(response.model_dump(mode="json"), status_code=200)
@@ -5,6 +5,7 @@ from .document_type import (
     DocumentTypeEntity,
     DocumentTypeListResponse,
     DocumentTypeResponse,
+    DocumentTypeRow,
     DocumentTypeUpdate,
 )
 from .number_log import (
@@ -14,8 +15,11 @@ from .number_log import (
     HistoryResponse,
     NumberLogEntity,
     NumberLogResponse,
+    NumberLogRow,
 )
 from .sequence import (
+    GenerateBatchRequest,
+    GenerateBatchResponse,
     GenerateNumberRequest,
     GenerateNumberResponse,
     SequenceEntity,
@@ -30,6 +34,7 @@ from .user import (
     UserCreate,
     UserEntity,
     UserResponse,
+    UserRow,
     UserUpdate,
 )
 
@@ -39,6 +44,7 @@ __all__ = [
     "UserCreate",
     "UserUpdate",
     "UserResponse",
+    "UserRow",
     "LoginRequest",
     "LoginResponse",
     "ChangePasswordRequest",
@@ -49,15 +55,19 @@ __all__ = [
     "DocumentTypeUpdate",
     "DocumentTypeResponse",
     "DocumentTypeListResponse",
+    "DocumentTypeRow",
     # Sequence models
     "SequenceEntity",
     "SequenceResponse",
     "SequenceListResponse",
     "GenerateNumberRequest",
     "GenerateNumberResponse",
+    "GenerateBatchRequest",
+    "GenerateBatchResponse",
     # Number log models
     "NumberLogEntity",
     "NumberLogResponse",
+    "NumberLogRow",
     "HistoryFilter",
     "HistoryResponse",
     "CorrectionRequest",
@@ -2,12 +2,20 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 from datetime import datetime
+from typing import Any, ClassVar, NamedTuple
 
 from pydantic import BaseModel, Field, field_validator
 
 from core.security import sanitize_html
 
+# Code index rows live in the DOCTYPE partition, so they can be written in the
+# same entity-group transaction as the document type. Their RowKeys start with
+# "~", which sorts after every UUID RowKey: "RowKey lt '~'" selects only types.
+CODE_INDEX_PREFIX = "~CODE_"
+INDEX_ROW_KEY_BOUNDARY = "~"
+
 
 class DocumentTypeEntity(BaseModel):
     """Document type entity as stored in Azure Tables."""
@@ -25,6 +33,18 @@ class DocumentTypeEntity(BaseModel):
 
     model_config = {"from_attributes": True, "extra": "ignore"}
 
+    def to_code_index_row(self) -> dict:
+        """Build the code index row: a copy of this type keyed by its code."""
+        row = self.model_dump()
+        row["RowKey"] = f"{CODE_INDEX_PREFIX}{self.Code}"
+        row["DocumentTypeId"] = self.RowKey
+        return row
+
+    @classmethod
+    def from_code_index_row(cls, row: dict) -> DocumentTypeEntity:
+        """Rebuild a document type from its code index row."""
+        return cls(**{**row, "RowKey": row["DocumentTypeId"]})
+
 
 class DocumentTypeCreate(BaseModel):
     """Request body for creating a document type."""
@@ -64,16 +84,57 @@ class DocumentTypeResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+    # DocumentTypes columns read to build a response (select= projection)
+    ENTITY_COLUMNS: ClassVar[list[str]] = [
+        "RowKey",
+        "Code",
+        "Name",
+        "IsActive",
+        "CreatedAt",
+        "UpdatedAt",
+    ]
+
     @classmethod
     def from_entity(cls, entity: DocumentTypeEntity) -> DocumentTypeResponse:
         """Create response from entity."""
+        return cls.from_row(entity.model_dump())
+
+    @classmethod
+    def from_row(cls, row: dict) -> DocumentTypeResponse:
+        """Create response from a DocumentTypes row projected to ENTITY_COLUMNS."""
+        return cls(
+            id=row["RowKey"],
+            code=row["Code"],
+            name=row["Name"],
+            is_active=row["IsActive"],
+            created_at=row["CreatedAt"],
+            updated_at=row["UpdatedAt"],
+        )
+
+
+class DocumentTypeRow(NamedTuple):
+    """Document type read from the DocumentTypes table."""
+
+    id: str
+    code: str
+    name: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    # Fields converted by models.rows.row_to_json
+    DATETIME_FIELDS = ("created_at", "updated_at")
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> DocumentTypeRow:
+        """Build from a table row projected to DocumentTypeResponse.ENTITY_COLUMNS."""
         return cls(
-            id=entity.RowKey,
-            code=entity.Code,
-            name=entity.Name,
-            is_active=entity.IsActive,
-            created_at=entity.CreatedAt,
-            updated_at=entity.UpdatedAt,
+            row["RowKey"],
+            row["Code"],
+            row["Name"],
+            row.get("IsActive", True),
+            row["CreatedAt"],
+            row["UpdatedAt"],
         )
 
 
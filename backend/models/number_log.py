@@ -2,10 +2,22 @@
 
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Literal
+import base64
+import binascii
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, ClassVar, Literal, NamedTuple
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+# HistoryIndex partition prefix for the logs of a year ("YEAR_2025")
+YEAR_INDEX_PREFIX = "YEAR_"
+USER_INDEX_PREFIX = "USER_"
+
+# Prefix of history item ids that encode the log's keys; bump the version if
+# the payload layout changes (ids without a known prefix are legacy RowKeys)
+LOG_ID_PREFIX = "l1."
 
 
 class NumberLogEntity(BaseModel):
@@ -33,6 +45,72 @@ class NumberLogEntity(BaseModel):
 
     model_config = {"from_attributes": True, "extra": "ignore"}
 
+    @model_validator(mode="before")
+    @classmethod
+    def _from_index_row(cls, data: Any) -> Any:
+        """Read a HistoryIndex copy back as the log it copies."""
+        if isinstance(data, dict) and data.get("LogPartitionKey"):
+            return {**data, "PartitionKey": data["LogPartitionKey"]}
+        return data
+
+    def to_index_rows(self) -> list[dict]:
+        """Build the HistoryIndex copies of this log, one per index partition.
+
+        Copies keep the log's RowKey, so an index partition lists logs newest
+        first across every document type (and, for user partitions, every year).
+        """
+        row = self.model_dump()
+        row["LogPartitionKey"] = self.PartitionKey
+        return [
+            {**row, "PartitionKey": year_index_partition(self.Year)},
+            {**row, "PartitionKey": user_index_partition(self.UserId)},
+        ]
+
+
+def year_index_partition(year: int) -> str:
+    """Build the HistoryIndex partition holding every log of a year."""
+    return f"{YEAR_INDEX_PREFIX}{year}"
+
+
+def user_index_partition(user_id: str) -> str:
+    """Build the HistoryIndex partition holding every log of a user."""
+    # User ids are Users RowKeys, so they are already valid key characters
+    return f"{USER_INDEX_PREFIX}{user_id}"
+
+
+def _json_key(value: str) -> str:
+    """JSON-encode a key; plain ASCII keys (all real ones) skip the encoder."""
+    if value.isascii() and value.isprintable() and '"' not in value and "\\" not in value:
+        return f'"{value}"'
+    return json.dumps(value)
+
+
+def encode_log_id(partition_key: str, row_key: str) -> str:
+    """Build the opaque, URL-safe history item id of a log row."""
+    # Same bytes as json.dumps([partition_key, row_key], separators=(",", ":"))
+    raw = f"[{_json_key(partition_key)},{_json_key(row_key)}]".encode()
+    return LOG_ID_PREFIX + base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_log_id(log_id: str) -> tuple[str, str] | None:
+    """Get the (PartitionKey, RowKey) encoded in a history item id.
+
+    Returns:
+        The log's keys, or None for legacy ids (a bare RowKey) and malformed ids.
+    """
+    if not log_id.startswith(LOG_ID_PREFIX):
+        return None
+
+    payload = log_id[len(LOG_ID_PREFIX) :]
+    try:
+        keys = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+
+    if not (isinstance(keys, list) and len(keys) == 2 and all(isinstance(k, str) for k in keys)):
+        return None
+    return keys[0], keys[1]
+
 
 class NumberLogResponse(BaseModel):
     """Number log data returned in API responses."""
@@ -48,11 +126,27 @@ class NumberLogResponse(BaseModel):
     notes: str | None
     created_at: datetime
 
+    # NumberLogs / HistoryIndex columns read to build a response (select= projection)
+    ENTITY_COLUMNS: ClassVar[list[str]] = [
+        "PartitionKey",
+        "RowKey",
+        "LogPartitionKey",  # HistoryIndex copies only
+        "DocumentTypeCode",
+        "Year",
+        "Number",
+        "Action",
+        "UserId",
+        "UserName",
+        "PreviousNumber",
+        "Notes",
+        "CreatedAt",
+    ]
+
     @classmethod
     def from_entity(cls, entity: NumberLogEntity) -> NumberLogResponse:
         """Create response from entity."""
         return cls(
-            id=entity.RowKey,
+            id=encode_log_id(entity.PartitionKey, entity.RowKey),
             document_type_code=entity.DocumentTypeCode,
             year=entity.Year,
             number=entity.Number,
@@ -65,6 +159,42 @@ class NumberLogResponse(BaseModel):
         )
 
 
+class NumberLogRow(NamedTuple):
+    """History item read from NumberLogs or HistoryIndex."""
+
+    id: str
+    document_type_code: str
+    year: int
+    number: int
+    action: str
+    user_id: str
+    user_name: str
+    previous_number: int | None
+    notes: str | None
+    created_at: datetime
+
+    # Fields converted by models.rows.row_to_json
+    DATETIME_FIELDS = ("created_at",)
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> NumberLogRow:
+        """Build from a table row projected to NumberLogResponse.ENTITY_COLUMNS."""
+        # HistoryIndex copies carry the log's own partition in LogPartitionKey
+        partition_key = row.get("LogPartitionKey") or row["PartitionKey"]
+        return cls(
+            encode_log_id(partition_key, row["RowKey"]),
+            row["DocumentTypeCode"],
+            row["Year"],
+            row["Number"],
+            row["Action"],
+            row["UserId"],
+            row["UserName"],
+            row.get("PreviousNumber"),
+            row.get("Notes"),
+            row["CreatedAt"],
+        )
+
+
 class HistoryFilter(BaseModel):
     """Filter parameters for history queries."""
 
@@ -72,18 +202,43 @@ class HistoryFilter(BaseModel):
     year: int | None = Field(None, ge=2020, le=2100)
     user_id: str | None = None
     action: Literal["generated", "corrected"] | None = None
+    date_from: date | None = None  # First day (Brazil time), inclusive
+    date_to: date | None = None  # Last day (Brazil time), inclusive
     page: int = Field(1, ge=1)
     page_size: int = Field(50, ge=1, le=10000)
 
 
 class HistoryResponse(BaseModel):
-    """Response for history listing."""
+    """Response for history listing.
+
+    Page-number listings fill total, page and total_pages. Cursor listings fill
+    next_cursor (None on the last page) and only count total when asked to.
+    Built by the read path with model_construct: items are unvalidated rows.
+    """
 
-    items: list[NumberLogResponse]
-    total: int
-    page: int
+    items: list[NumberLogRow]
+    total: int | None
+    page: int | None = None
     page_size: int
-    total_pages: int
+    total_pages: int | None = None
+    next_cursor: str | None = None
+
+
+class HistogramBucket(BaseModel):
+    """Numbers generated and corrected in one day or month."""
+
+    period: str  # "2025-03-14" (day) or "2025-03" (month)
+    generated: int
+    corrected: int
+
+
+class HistogramResponse(BaseModel):
+    """Response for a generation histogram."""
+
+    document_type_code: str
+    year: int
+    granularity: Literal["day", "month"]
+    buckets: list[HistogramBucket]
 
 
 class CorrectionRequest(BaseModel):
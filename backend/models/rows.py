@@ -0,0 +1,39 @@
+"""JSON encoding of lightweight read-path rows for Controle PGM.
+
+List endpoints return many rows that come straight from Azure Tables and are
+never written back. Validating each one into an entity model and again into a
+response model costs more than the query itself on large pages, so read paths
+build NamedTuple rows instead (NumberLogRow, UserRow, DocumentTypeRow, next to
+their models): one pass from the table row, one pass to JSON.
+
+Each row has the same field names and JSON shape as its response model. Write
+paths keep the Pydantic models and their validation.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection
+from datetime import datetime
+from typing import Any, NamedTuple
+
+
+def json_value(value: Any) -> Any:
+    """Convert a row value to its JSON form, as Pydantic's mode="json" would."""
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return value
+
+
+def row_to_json(row: NamedTuple, fields: Collection[str] | None = None) -> dict[str, Any]:
+    """Encode a row as a JSON-ready dict (only `fields` when given).
+
+    Only the row type's DATETIME_FIELDS need converting; every other value is
+    already a JSON type.
+    """
+    data = row._asdict()
+    for name in row.DATETIME_FIELDS:
+        data[name] = json_value(data[name])
+    if fields is None:
+        return data
+    return {name: value for name, value in data.items() if name in fields}
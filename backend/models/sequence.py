@@ -70,6 +70,12 @@ class GenerateNumberRequest(BaseModel):
         return v
 
 
+class GenerateBatchRequest(GenerateNumberRequest):
+    """Request body for reserving several contiguous document numbers."""
+
+    count: int = Field(..., ge=1, le=100)
+
+
 class GenerateNumberResponse(BaseModel):
     """Response for generated document number."""
 
@@ -80,6 +86,18 @@ class GenerateNumberResponse(BaseModel):
     formatted: str  # e.g., "OF 0042/2025"
 
 
+class GenerateBatchResponse(BaseModel):
+    """Response for a reserved range of document numbers."""
+
+    first_number: int
+    last_number: int
+    count: int
+    document_type_code: str
+    document_type_name: str
+    year: int
+    formatted: list[str]  # e.g., ["OF 0042/2025", "OF 0043/2025"]
+
+
 class SequenceListResponse(BaseModel):
     """Response for listing sequences."""
 
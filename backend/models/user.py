@@ -2,13 +2,26 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Literal, TypedDict
+from typing import Any, ClassVar, Literal, NamedTuple, TypedDict
+from urllib.parse import quote
 
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
 from core.security import sanitize_html
 
+# Email index rows live in the USER partition, so they can be written in the same
+# entity-group transaction as the user. Their RowKeys start with "~", which sorts
+# after every UUID RowKey: "RowKey lt '~'" selects only users.
+EMAIL_INDEX_PREFIX = "~EMAIL_"
+INDEX_ROW_KEY_BOUNDARY = "~"
+
+
+def email_index_row_key(email: str) -> str:
+    """Build the index RowKey for an email (normalized, with "/", "#" and "?" escaped)."""
+    return EMAIL_INDEX_PREFIX + quote(email.strip().lower(), safe="@.+-_")
+
 
 class UserEntity(BaseModel):
     """User entity as stored in Azure Tables."""
@@ -29,6 +42,18 @@ class UserEntity(BaseModel):
 
     model_config = {"from_attributes": True, "extra": "ignore"}
 
+    def to_email_index_row(self) -> dict:
+        """Build the email index row: a copy of this user keyed by email."""
+        row = self.model_dump()
+        row["RowKey"] = email_index_row_key(self.Email)
+        row["UserId"] = self.RowKey
+        return row
+
+    @classmethod
+    def from_email_index_row(cls, row: dict) -> UserEntity:
+        """Rebuild a user from its email index row."""
+        return cls(**{**row, "RowKey": row["UserId"]})
+
 
 class LoginRequest(BaseModel):
     """Request body for login endpoint."""
@@ -90,18 +115,65 @@ class UserResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+    # Users columns read to build a response (select= projection; never PasswordHash)
+    ENTITY_COLUMNS: ClassVar[list[str]] = [
+        "RowKey",
+        "Email",
+        "Name",
+        "Role",
+        "IsActive",
+        "MustChangePassword",
+        "CreatedAt",
+        "UpdatedAt",
+    ]
+
     @classmethod
     def from_entity(cls, entity: UserEntity) -> UserResponse:
         """Create response from entity."""
+        return cls.from_row(entity.model_dump())
+
+    @classmethod
+    def from_row(cls, row: dict) -> UserResponse:
+        """Create response from a Users row projected to ENTITY_COLUMNS."""
+        return cls(
+            id=row["RowKey"],
+            email=row["Email"],
+            name=row["Name"],
+            role=row["Role"],
+            is_active=row["IsActive"],
+            must_change_password=row["MustChangePassword"],
+            created_at=row["CreatedAt"],
+            updated_at=row["UpdatedAt"],
+        )
+
+
+class UserRow(NamedTuple):
+    """User read from the Users table (never holds the password hash)."""
+
+    id: str
+    email: str
+    name: str
+    role: str
+    is_active: bool
+    must_change_password: bool
+    created_at: datetime
+    updated_at: datetime
+
+    # Fields converted by models.rows.row_to_json
+    DATETIME_FIELDS = ("created_at", "updated_at")
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> UserRow:
+        """Build from a table row projected to UserResponse.ENTITY_COLUMNS."""
         return cls(
-            id=entity.RowKey,
-            email=entity.Email,
-            name=entity.Name,
-            role=entity.Role,
-            is_active=entity.IsActive,
-            must_change_password=entity.MustChangePassword,
-            created_at=entity.CreatedAt,
-            updated_at=entity.UpdatedAt,
+            row["RowKey"],
+            row["Email"],
+            row["Name"],
+            row.get("Role", "user"),
+            row.get("IsActive", True),
+            row.get("MustChangePassword", False),
+            row["CreatedAt"],
+            row["UpdatedAt"],
         )
 
 
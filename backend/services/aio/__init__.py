@@ -0,0 +1,23 @@
+"""Async services for Controle PGM, built on azure.data.tables.aio.
+
+Used by the HTTP handlers. The sync services in the parent package remain
+available for scripts and other non-async callers.
+"""
+
+from .audit_service import AuditService
+from .document_type_service import DocumentTypeService
+from .export_snapshot_service import ExportSnapshotService
+from .history_service import HistoryService
+from .history_stats_service import HistoryStatsService
+from .number_service import NumberService
+from .user_service import UserService
+
+__all__ = [
+    "AuditService",
+    "UserService",
+    "DocumentTypeService",
+    "NumberService",
+    "HistoryService",
+    "HistoryStatsService",
+    "ExportSnapshotService",
+]
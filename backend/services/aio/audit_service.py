@@ -0,0 +1,120 @@
+"""Async audit logging service for Controle PGM."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from core.tables_aio import get_audit_logs_table
+from services.audit_service import AuditAction, AuditService as SyncAuditService
+
+logger = logging.getLogger("services.audit_service")
+
+
+class AuditService:
+    """Async service for logging audit events."""
+
+    _build_entity = staticmethod(SyncAuditService._build_entity)
+    _user_action_fields = staticmethod(SyncAuditService._user_action_fields)
+    _build_filter_query = staticmethod(SyncAuditService._build_filter_query)
+
+    @staticmethod
+    async def log(
+        action: AuditAction,
+        actor_id: str | None,
+        actor_email: str | None,
+        target_type: str | None = None,
+        target_id: str | None = None,
+        details: dict[str, Any] | None = None,
+        ip_address: str | None = None,
+    ) -> None:
+        """
+        Log an audit event.
+
+        Args:
+            action: The action being performed.
+            actor_id: ID of the user performing the action.
+            actor_email: Email of the user performing the action.
+            target_type: Type of the target entity (e.g., "user", "document_type").
+            target_id: ID of the target entity.
+            details: Additional details about the action.
+            ip_address: IP address of the request.
+        """
+        try:
+            table = await get_audit_logs_table()
+            entity = AuditService._build_entity(
+                action, actor_id, actor_email, target_type, target_id, details, ip_address
+            )
+
+            await table.create_entity(entity)
+
+            # Also log to application logs for real-time monitoring
+            logger.info(
+                f"AUDIT: {action.value} by {actor_email or 'system'} "
+                f"on {target_type}:{target_id} - {details}"
+            )
+
+        except Exception as e:
+            # Never let audit logging break the main flow
+            logger.error(f"Failed to write audit log: {e}")
+
+    @staticmethod
+    async def log_user_action(
+        action: AuditAction,
+        actor: dict[str, Any],
+        target_user_id: str | None = None,
+        target_user_email: str | None = None,
+        details: dict[str, Any] | None = None,
+        ip_address: str | None = None,
+    ) -> None:
+        """
+        Convenience method for logging user-related actions.
+
+        Args:
+            action: The action being performed.
+            actor: The current_user dict from authentication.
+            target_user_id: ID of the target user.
+            target_user_email: Email of the target user (for details).
+            details: Additional details.
+            ip_address: IP address of the request.
+        """
+        await AuditService.log(
+            **AuditService._user_action_fields(
+                action, actor, target_user_id, target_user_email, details, ip_address
+            )
+        )
+
+    @staticmethod
+    async def get_recent_logs(
+        limit: int = 100,
+        action_filter: AuditAction | None = None,
+        actor_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Get recent audit logs.
+
+        Args:
+            limit: Maximum number of logs to return.
+            action_filter: Filter by specific action.
+            actor_id: Filter by actor ID.
+
+        Returns:
+            List of audit log entries.
+        """
+        try:
+            table = await get_audit_logs_table()
+            filter_query = AuditService._build_filter_query(action_filter, actor_id)
+
+            if filter_query:
+                entities = [e async for e in table.query_entities(query_filter=filter_query)]
+            else:
+                entities = [e async for e in table.list_entities()]
+
+            # Sort by RowKey (inverse timestamp means newest first)
+            entities.sort(key=lambda x: x.get("RowKey", ""))
+
+            return entities[:limit]
+
+        except Exception as e:
+            logger.error(f"Failed to read audit logs: {e}")
+            return []
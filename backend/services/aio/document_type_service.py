@@ -0,0 +1,296 @@
+"""Async Document Type service for Controle PGM."""
+
+from datetime import datetime
+from uuid import uuid4
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableErrorCode, TableTransactionError, UpdateMode
+
+from core.config import settings
+from core.exceptions import ConflictError, NotFoundError
+from core.security import sanitize_odata_string
+from core.tables_aio import get_document_types_table, get_number_logs_table
+from models.document_type import (
+    CODE_INDEX_PREFIX,
+    INDEX_ROW_KEY_BOUNDARY,
+    DocumentTypeCreate,
+    DocumentTypeEntity,
+    DocumentTypeResponse,
+    DocumentTypeRow,
+    DocumentTypeUpdate,
+)
+from services.document_type_service import (
+    DocumentTypeService as SyncDocumentTypeService,
+    _code_cache,
+)
+
+
+class DocumentTypeService:
+    """Async service for document type operations.
+
+    Shares the per-worker code cache with the sync DocumentTypeService.
+    """
+
+    invalidate_cache = staticmethod(SyncDocumentTypeService.invalidate_cache)
+    _list_filter = staticmethod(SyncDocumentTypeService._list_filter)
+
+    @staticmethod
+    async def list_all() -> list[DocumentTypeEntity]:
+        """List all document types.
+
+        Returns:
+            List of all DocumentTypeEntity objects.
+        """
+        table = await get_document_types_table()
+        return [
+            DocumentTypeEntity(**entity)
+            async for entity in table.query_entities(
+                query_filter=f"PartitionKey eq 'DOCTYPE' and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+            )
+        ]
+
+    @staticmethod
+    async def list_active() -> list[DocumentTypeEntity]:
+        """List all active document types.
+
+        Returns:
+            List of active DocumentTypeEntity objects, sorted by code.
+        """
+        table = await get_document_types_table()
+        doc_types = [
+            DocumentTypeEntity(**entity)
+            async for entity in table.query_entities(
+                query_filter="PartitionKey eq 'DOCTYPE' and IsActive eq true "
+                f"and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+            )
+        ]
+        return sorted(doc_types, key=lambda x: x.Code)
+
+    @staticmethod
+    async def list_rows(include_inactive: bool = False) -> list[DocumentTypeRow]:
+        """List document types, as lightweight rows.
+
+        Args:
+            include_inactive: Also list inactive types.
+
+        Returns:
+            List of DocumentTypeRow tuples, sorted by code.
+        """
+        table = await get_document_types_table()
+        doc_types = [
+            DocumentTypeRow.from_row(entity)
+            async for entity in table.query_entities(
+                query_filter=DocumentTypeService._list_filter(include_inactive),
+                select=DocumentTypeResponse.ENTITY_COLUMNS,
+            )
+        ]
+        return sorted(doc_types, key=lambda x: x.code)
+
+    @staticmethod
+    async def get_by_id(doc_type_id: str) -> DocumentTypeEntity | None:
+        """Get a document type by ID.
+
+        Args:
+            doc_type_id: Document type's unique ID (RowKey).
+
+        Returns:
+            DocumentTypeEntity if found, None otherwise.
+        """
+        if doc_type_id.startswith(INDEX_ROW_KEY_BOUNDARY):
+            return None  # Index rows are not document types
+
+        table = await get_document_types_table()
+
+        try:
+            entity = await table.get_entity(partition_key="DOCTYPE", row_key=doc_type_id)
+            return DocumentTypeEntity(**entity)
+        except ResourceNotFoundError:
+            return None
+
+    @staticmethod
+    async def get_by_code(code: str, use_cache: bool = True) -> DocumentTypeEntity | None:
+        """Get a document type by code.
+
+        Served from the per-worker cache when possible.
+
+        Args:
+            code: Document type code (e.g., "OF").
+            use_cache: Set to False to always read from Azure Tables.
+
+        Returns:
+            DocumentTypeEntity if found, None otherwise.
+        """
+        code = code.upper()
+        if use_cache:
+            hit, cached = _code_cache.get(code)
+            if hit:
+                return cached
+
+        table = await get_document_types_table()
+
+        try:
+            # Point read of the code index row
+            row = await table.get_entity(
+                partition_key="DOCTYPE", row_key=f"{CODE_INDEX_PREFIX}{code}"
+            )
+            doc_type = DocumentTypeEntity.from_code_index_row(row)
+        except ResourceNotFoundError:
+            doc_type = None
+            if settings.doctype_code_index_fallback:
+                # Types created before the index was backfilled
+                safe_code = sanitize_odata_string(code)
+                query_filter = (
+                    f"PartitionKey eq 'DOCTYPE' and Code eq '{safe_code}' "
+                    f"and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+                )
+                async for entity in table.query_entities(query_filter=query_filter):
+                    doc_type = DocumentTypeEntity(**entity)
+                    break
+
+        _code_cache.set(code, doc_type)
+        return doc_type
+
+    @staticmethod
+    async def create(data: DocumentTypeCreate) -> DocumentTypeEntity:
+        """Create a new document type.
+
+        Args:
+            data: Document type creation data.
+
+        Returns:
+            Created DocumentTypeEntity.
+
+        Raises:
+            ConflictError: If code already exists.
+        """
+        # Check if code already exists (not from cache: another instance may have created it)
+        existing = await DocumentTypeService.get_by_code(data.code, use_cache=False)
+        if existing:
+            raise ConflictError(f"Tipo de documento com código '{data.code}' já existe")
+
+        table = await get_document_types_table()
+        now = datetime.utcnow()
+
+        entity = DocumentTypeEntity(
+            PartitionKey="DOCTYPE",
+            RowKey=str(uuid4()),
+            Code=data.code.upper(),
+            Name=data.name,
+            IsActive=True,
+            CreatedAt=now,
+            UpdatedAt=now,
+        )
+
+        # The index row insert fails if the code is taken, so uniqueness is race-free
+        try:
+            await table.submit_transaction(
+                [
+                    ("create", entity.model_dump()),
+                    ("create", entity.to_code_index_row()),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code == TableErrorCode.ENTITY_ALREADY_EXISTS:
+                raise ConflictError(f"Tipo de documento com código '{data.code}' já existe")
+            raise
+        DocumentTypeService.invalidate_cache(entity.Code)
+
+        return entity
+
+    @staticmethod
+    async def update(doc_type_id: str, data: DocumentTypeUpdate) -> DocumentTypeEntity:
+        """Update a document type.
+
+        Args:
+            doc_type_id: Document type's unique ID.
+            data: Update data.
+
+        Returns:
+            Updated DocumentTypeEntity.
+
+        Raises:
+            NotFoundError: If document type not found.
+        """
+        doc_type = await DocumentTypeService.get_by_id(doc_type_id)
+        if not doc_type:
+            raise NotFoundError("Tipo de documento não encontrado")
+
+        table = await get_document_types_table()
+
+        # Update only provided fields
+        updates = data.model_dump(exclude_unset=True)
+
+        # Map snake_case to PascalCase for Azure Tables
+        mapped_updates = {}
+        if "name" in updates:
+            mapped_updates["Name"] = updates["name"]
+        if "is_active" in updates:
+            mapped_updates["IsActive"] = updates["is_active"]
+
+        entity_dict = doc_type.model_dump()
+        entity_dict.update(mapped_updates)
+        entity_dict["UpdatedAt"] = datetime.utcnow()
+
+        updated = DocumentTypeEntity(**entity_dict)
+
+        # Upsert also creates the index row for types that predate it
+        await table.submit_transaction(
+            [
+                ("update", entity_dict, {"mode": UpdateMode.REPLACE}),
+                ("upsert", updated.to_code_index_row(), {"mode": UpdateMode.REPLACE}),
+            ]
+        )
+        DocumentTypeService.invalidate_cache(doc_type.Code)
+
+        return updated
+
+    @staticmethod
+    async def delete_permanently(doc_type_id: str) -> None:
+        """Delete a document type permanently (Hard Delete).
+
+        Args:
+            doc_type_id: Document type's unique ID.
+
+        Raises:
+            NotFoundError: If document type not found.
+            ConflictError: If document type has generated numbers.
+        """
+        doc_type = await DocumentTypeService.get_by_id(doc_type_id)
+        if not doc_type:
+            raise NotFoundError("Tipo de documento não encontrado")
+
+        # NumberLog PartitionKey is {code}_{year}: range query over the code's partitions
+        logs_table = await get_number_logs_table()
+        start_pk = f"{doc_type.Code}_"
+        end_pk = f"{doc_type.Code}_\uffff"
+
+        query = f"PartitionKey ge '{start_pk}' and PartitionKey lt '{end_pk}'"
+        # We only need to know if ONE exists
+        async for _ in logs_table.query_entities(query_filter=query, results_per_page=1):
+            raise ConflictError(
+                f"Não é possível excluir o tipo de documento '{doc_type.Name}' pois existem números gerados para ele."
+            )
+
+        table = await get_document_types_table()
+        try:
+            await table.submit_transaction(
+                [
+                    ("delete", {"PartitionKey": "DOCTYPE", "RowKey": doc_type_id}),
+                    (
+                        "delete",
+                        {
+                            "PartitionKey": "DOCTYPE",
+                            "RowKey": f"{CODE_INDEX_PREFIX}{doc_type.Code}",
+                        },
+                    ),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code not in (
+                TableErrorCode.RESOURCE_NOT_FOUND,
+                TableErrorCode.ENTITY_NOT_FOUND,
+            ):
+                raise
+            # Type predates the code index
+            await table.delete_entity(partition_key="DOCTYPE", row_key=doc_type_id)
+        DocumentTypeService.invalidate_cache(doc_type.Code)
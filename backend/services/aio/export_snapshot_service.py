@@ -0,0 +1,61 @@
+"""Async export snapshot lookup for Controle PGM."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+
+from core import metrics
+from services.export_snapshot_service import (
+    ExportSnapshotService as SyncExportSnapshotService,
+    get_snapshot_store,
+)
+
+from .history_service import HistoryService
+
+
+class ExportSnapshotService:
+    """Async lookup of export snapshots.
+
+    Names and freshness are shared with the sync ExportSnapshotService, which
+    also writes the snapshots. Stores are blocking (files, blob SDK), so they
+    are read in a thread.
+    """
+
+    snapshot_name = staticmethod(SyncExportSnapshotService.snapshot_name)
+    _lookup_name = staticmethod(SyncExportSnapshotService._lookup_name)
+    _is_fresh = staticmethod(SyncExportSnapshotService._is_fresh)
+
+    @staticmethod
+    async def find(
+        document_type_code: str | None = None,
+        year: int | None = None,
+        user_id: str | None = None,
+        action: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> bytes | None:
+        """Get the gzip CSV of an export from its snapshot, if one is fresh.
+
+        Takes the same filters as HistoryService.iter_export_csv.
+
+        Returns:
+            The gzip-compressed CSV, or None to export from Azure Tables.
+        """
+        name = ExportSnapshotService._lookup_name(
+            document_type_code, year, user_id, action, date_from, date_to
+        )
+        if name is None:
+            return None
+
+        store = get_snapshot_store()
+        metadata, newest = await asyncio.gather(
+            asyncio.to_thread(store.metadata, name),
+            HistoryService.newest_row_keys(document_type_code, year),
+        )
+        if not ExportSnapshotService._is_fresh(metadata, newest):
+            metrics.increment("export_snapshots.misses", reason="stale" if metadata else "missing")
+            return None
+
+        metrics.increment("export_snapshots.hits")
+        return await asyncio.to_thread(store.read, name)
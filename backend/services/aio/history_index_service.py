@@ -0,0 +1,92 @@
+"""Async history index service for Controle PGM - maintains secondary partitions of number logs."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from core.config import settings
+from core.tables_aio import get_history_index_table
+from models.number_log import NumberLogEntity
+from services.history_index_service import (
+    REPAIR_FILTER,
+    HistoryIndexService as SyncHistoryIndexService,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryIndexService:
+    """Async service for the HistoryIndex table.
+
+    Row layout, batching and the per-worker repair state are shared with the
+    sync HistoryIndexService, which also owns the backfill and the repair.
+    """
+
+    _group_operations = staticmethod(SyncHistoryIndexService._group_operations)
+    _get_retry_policy = staticmethod(SyncHistoryIndexService._get_retry_policy)
+    _on_index_failure = staticmethod(SyncHistoryIndexService._on_index_failure)
+    _on_marker_failure = staticmethod(SyncHistoryIndexService._on_marker_failure)
+    _repair_check_due = staticmethod(SyncHistoryIndexService._repair_check_due)
+    _set_repairs_pending = staticmethod(SyncHistoryIndexService._set_repairs_pending)
+    repairs_pending = staticmethod(SyncHistoryIndexService.repairs_pending)
+
+    @staticmethod
+    async def _write_rows(rows: list[dict]) -> None:
+        """Upsert index rows, batched per partition."""
+        table = await get_history_index_table()
+        for operations in HistoryIndexService._group_operations(rows):
+            await table.submit_transaction(operations)
+
+    @staticmethod
+    async def index_logs(logs: list[NumberLogEntity]) -> None:
+        """Copy committed log rows into their index partitions (never raises).
+
+        See HistoryIndexService.index_logs: failures are retried, then the logs
+        are marked for repair.
+
+        Args:
+            logs: Log rows that were just written to NumberLogs.
+        """
+        if not logs:
+            return
+
+        rows = [row for log in logs for row in log.to_index_rows()]
+        retry = HistoryIndexService._get_retry_policy().start()
+        while True:
+            retry.attempts += 1
+            try:
+                await HistoryIndexService._write_rows(rows)
+                return
+            except Exception as e:
+                error = e
+            delay = retry.next_delay()
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+        markers = HistoryIndexService._on_index_failure(logs, error)
+        try:
+            await HistoryIndexService._write_rows(markers)
+        except Exception as e:
+            HistoryIndexService._on_marker_failure(markers, e)
+
+    @staticmethod
+    async def check_repairs() -> None:
+        """Refresh repairs_pending from the REPAIR partition (see the sync service)."""
+        if settings.history_index_fallback or not HistoryIndexService._repair_check_due():
+            return
+
+        try:
+            table = await get_history_index_table()
+            markers = table.query_entities(
+                query_filter=REPAIR_FILTER, select=["RowKey"], results_per_page=1
+            )
+            pending = False
+            async for _ in markers:
+                pending = True
+                break
+        except Exception as e:
+            logger.warning(f"History index repairs not checked: {e}")
+            pending = True
+        HistoryIndexService._set_repairs_pending(pending)
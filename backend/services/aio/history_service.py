@@ -0,0 +1,549 @@
+"""Async history service for Controle PGM - handles number log queries and exports."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from collections.abc import AsyncIterator
+from datetime import date
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables.aio import TableClient
+
+from core.fanout import PartitionTimings, concurrency_limit, gather_partitions
+from core.pagination import decode_cursor
+from core.security import sanitize_odata_string
+from core.tables_aio import get_number_logs_table, get_table_client
+from models.number_log import (
+    HistoryFilter,
+    HistoryResponse,
+    NumberLogEntity,
+    NumberLogResponse,
+    NumberLogRow,
+    decode_log_id,
+)
+from services.history_cache import HistoryCache
+from services.history_query_planner import HistoryQueryPlanner, QueryPlan
+from services.history_service import (
+    EXPORT_PAGE_SIZE,
+    LOG_COLUMNS,
+    HistoryService as SyncHistoryService,
+    _row_key,
+)
+
+from .history_index_service import HistoryIndexService
+from .history_stats_service import HistoryStatsService
+from .number_service import NumberService
+
+
+class AsyncPartitionMerge:
+    """Async newest-first k-way merge of single-partition queries.
+
+    Same merge and page fetching as PartitionMerge, with tasks bounded by a
+    semaphore instead of a thread pool; heapq.merge only takes sync iterables,
+    so the heap of partition heads is kept here. Use with `async with`.
+    """
+
+    def __init__(
+        self,
+        table: TableClient,
+        plans: list[QueryPlan],
+        per_page: int | None = None,
+        read_ahead: bool = False,
+    ):
+        """
+        Args:
+            table: Table the plans read.
+            plans: One single-partition plan per partition.
+            per_page: Rows asked for per service page of each partition.
+            read_ahead: Fetch each partition's next page before it is needed.
+        """
+        self.read = 0  # Rows received from Azure Tables so far
+        self._read_ahead = read_ahead
+        self._timings = PartitionTimings("History merge")
+        self._limit = asyncio.Semaphore(concurrency_limit(len(plans)))
+        self._tasks: list[asyncio.Task] = []
+        self._partitions = [
+            (
+                plan.target,
+                table.query_entities(
+                    query_filter=plan.filter, select=LOG_COLUMNS, results_per_page=per_page
+                ).by_page(),
+            )
+            for plan in plans
+        ]
+
+    async def _fetch(self, partition: str, pages: AsyncIterator) -> list[dict] | None:
+        """Read the next page of a partition (None once it is exhausted)."""
+        async with self._limit:
+            start = time.perf_counter()
+            page = await anext(pages, None)
+            rows = None if page is None else [e async for e in page]
+        self._timings.add(partition, time.perf_counter() - start, len(rows or ()))
+        return rows
+
+    def _request(self, partition: str, pages: AsyncIterator) -> asyncio.Task:
+        """Start fetching the next page of a partition."""
+        task = asyncio.create_task(self._fetch(partition, pages))
+        self._tasks.append(task)
+        return task
+
+    async def _partition_rows(
+        self, partition: str, pages: AsyncIterator, pending: asyncio.Task
+    ) -> AsyncIterator[dict]:
+        """Stream one partition page by page."""
+        while True:
+            rows = await pending
+            if rows is None:
+                return
+            self.read += len(rows)
+            if self._read_ahead:
+                pending = self._request(partition, pages)
+                for row in rows:
+                    yield row
+            else:
+                for row in rows:
+                    yield row
+                pending = self._request(partition, pages)
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        # The first page of every partition is requested before any is awaited
+        streams = [
+            self._partition_rows(partition, pages, self._request(partition, pages))
+            for partition, pages in self._partitions
+        ]
+
+        # (RowKey, stream index, row): the index breaks ties without comparing rows
+        heads = []
+        for index, stream in enumerate(streams):
+            row = await anext(stream, None)
+            if row is not None:
+                heads.append((row["RowKey"], index, row))
+        heapq.heapify(heads)
+
+        while heads:
+            _, index, row = heads[0]
+            yield row
+            following = await anext(streams[index], None)
+            if following is None:
+                heapq.heappop(heads)
+            else:
+                heapq.heapreplace(heads, (following["RowKey"], index, following))
+
+    async def __aenter__(self) -> AsyncPartitionMerge:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Stop reading and log the time spent on each partition."""
+        for task in self._tasks:
+            task.cancel()
+        # Let the cancelled page requests unwind before the pagers are dropped
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._timings.log()
+
+
+class HistoryService:
+    """Async service for querying number generation history.
+
+    Query building, pagination and CSV rendering are shared with the sync
+    HistoryService.
+    """
+
+    _build_response = staticmethod(SyncHistoryService._build_response)
+    _build_page_response = staticmethod(SyncHistoryService._build_page_response)
+    _merge_query_id = staticmethod(SyncHistoryService._merge_query_id)
+    _resume_after = staticmethod(SyncHistoryService._resume_after)
+    _cut_merged_page = staticmethod(SyncHistoryService._cut_merged_page)
+    _build_cursor_response = staticmethod(SyncHistoryService._build_cursor_response)
+    _export_filters = staticmethod(SyncHistoryService._export_filters)
+    _legacy_id_filter = staticmethod(SyncHistoryService._legacy_id_filter)
+    _csv_chunk = staticmethod(SyncHistoryService._csv_chunk)
+
+    @staticmethod
+    async def list_history(filters: HistoryFilter) -> HistoryResponse:
+        """List number logs with optional filters and pagination.
+
+        Args:
+            filters: Filter parameters including document type, year, user, action, pagination.
+
+        Returns:
+            HistoryResponse with paginated items and metadata.
+        """
+        cache_key = HistoryCache.key("list", filters)
+        cached = HistoryCache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await HistoryService._list_history(filters)
+        HistoryCache.set(cache_key, filters, response)
+        return response
+
+    @staticmethod
+    async def _list_history(filters: HistoryFilter) -> HistoryResponse:
+        """Read a page-number listing from Azure Tables."""
+        plan = await HistoryService._plan(filters)
+        table = await get_table_client(plan.table)
+
+        partitions = await HistoryService._merge_partitions(plan, filters)
+        if partitions:
+            start_idx = (filters.page - 1) * filters.page_size
+            total = 0
+            page_entities = []
+            async with AsyncPartitionMerge(
+                table,
+                [HistoryQueryPlanner.partition_plan(plan, p) for p in partitions],
+                read_ahead=True,
+            ) as merged:
+                async for entity in merged:
+                    total += 1
+                    if start_idx < total <= start_idx + filters.page_size:
+                        page_entities.append(entity)
+
+            response = HistoryService._build_page_response(page_entities, total, filters)
+            HistoryQueryPlanner.record(
+                HistoryQueryPlanner.merged_plan(plan, partitions),
+                read=merged.read,
+                returned=len(response.items),
+            )
+            return response
+
+        # Query Azure Tables
+        if plan.filter:
+            entities = [
+                e async for e in table.query_entities(query_filter=plan.filter, select=LOG_COLUMNS)
+            ]
+        else:
+            entities = [e async for e in table.list_entities(select=LOG_COLUMNS)]
+
+        # Sort by RowKey (inverse timestamp - newest first)
+        entities.sort(key=_row_key)
+        response = HistoryService._build_response(entities, filters)
+        HistoryQueryPlanner.record(plan, read=len(entities), returned=len(response.items))
+        return response
+
+    @staticmethod
+    async def list_history_page(
+        filters: HistoryFilter,
+        cursor: str | None = None,
+        include_total: bool = False,
+    ) -> HistoryResponse:
+        """List one page of number logs, resuming from a cursor.
+
+        Rows come newest first. A single partition is read in storage order, at
+        most filters.page_size rows; queries spanning several partitions merge
+        them (see AsyncPartitionMerge), reading up to page_size + 1 rows of each.
+
+        Args:
+            filters: Filter parameters; page is ignored.
+            cursor: next_cursor of the previous page, or None for the first page.
+            include_total: Also count every matching row (scans the whole range).
+
+        Returns:
+            HistoryResponse with the page items and the cursor for the next page.
+
+        Raises:
+            BadRequestError: If the cursor is invalid or belongs to other filters.
+        """
+        cache_key = HistoryCache.key(
+            "page", filters.model_copy(update={"page": 1}), cursor, include_total
+        )
+        cached = HistoryCache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await HistoryService._list_history_page(filters, cursor, include_total)
+        HistoryCache.set(cache_key, filters, response)
+        return response
+
+    @staticmethod
+    async def _list_history_page(
+        filters: HistoryFilter, cursor: str | None, include_total: bool
+    ) -> HistoryResponse:
+        """Read one cursor page from Azure Tables."""
+        plan = await HistoryService._plan(filters)
+        filter_query = plan.filter
+        table = await get_table_client(plan.table)
+
+        partitions = await HistoryService._merge_partitions(plan, filters)
+        if partitions:
+            return await HistoryService._list_merged_page(
+                table, plan, partitions, filters, cursor, include_total
+            )
+
+        # The cursor is only valid for the same table and filter
+        token = decode_cursor(cursor, plan.query_id) if cursor else None
+
+        entities: list[dict] = []
+        while len(entities) < filters.page_size:
+            # A service page can come back short (partition boundaries, server
+            # timeouts): ask only for what is still missing so the token stays exact
+            remaining = filters.page_size - len(entities)
+            if filter_query:
+                pager = table.query_entities(
+                    query_filter=filter_query, select=LOG_COLUMNS, results_per_page=remaining
+                ).by_page(continuation_token=token)
+            else:
+                pager = table.list_entities(select=LOG_COLUMNS, results_per_page=remaining).by_page(
+                    continuation_token=token
+                )
+            entities.extend([e async for e in await anext(pager)])
+            token = pager.continuation_token
+            if not token:
+                break
+
+        total = None
+        if include_total:
+            if filter_query:
+                rows = table.query_entities(query_filter=filter_query, select=["RowKey"])
+            else:
+                rows = table.list_entities(select=["RowKey"])
+            total = sum([1 async for _ in rows])
+
+        HistoryQueryPlanner.record(plan, read=len(entities) + (total or 0), returned=len(entities))
+        return HistoryService._build_cursor_response(entities, filters, token, plan.query_id, total)
+
+    @staticmethod
+    async def recent_activity(
+        limit: int = 20,
+        document_type_code: str | None = None,
+        year: int | None = None,
+    ) -> list[NumberLogRow]:
+        """Get the newest log rows across every matching partition.
+
+        Args:
+            limit: Number of rows to return.
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Log rows, newest first.
+        """
+        filters = HistoryFilter(document_type_code=document_type_code, year=year, page_size=limit)
+        return (await HistoryService.list_history_page(filters)).items
+
+    @staticmethod
+    async def _plan(filters: HistoryFilter) -> QueryPlan:
+        """Plan a history query, once the HistoryIndex repair state is current."""
+        await HistoryIndexService.check_repairs()
+        return HistoryQueryPlanner.plan(filters)
+
+    @staticmethod
+    async def _merge_partitions(plan: QueryPlan, filters: HistoryFilter) -> list[str]:
+        """Get the partitions to merge for a plan, or [] to run it as one query."""
+        if not plan.spans_partitions:
+            return []
+        return await NumberService.list_partitions(filters.document_type_code, filters.year)
+
+    @staticmethod
+    async def _list_merged_page(
+        table: TableClient,
+        plan: QueryPlan,
+        partitions: list[str],
+        filters: HistoryFilter,
+        cursor: str | None,
+        include_total: bool,
+    ) -> HistoryResponse:
+        """Read one page of the newest-first merge of several partitions."""
+        after = HistoryService._resume_after(cursor, plan)
+        partition_plans = [HistoryQueryPlanner.partition_plan(plan, p, after) for p in partitions]
+
+        rows: list[dict] = []
+        async with AsyncPartitionMerge(
+            table, partition_plans, per_page=filters.page_size + 1
+        ) as merged:
+            async for row in merged:
+                rows.append(row)
+                if len(rows) > filters.page_size:
+                    break
+        entities, token = HistoryService._cut_merged_page(rows, filters)
+
+        read = merged.read
+        total = None
+        if include_total:
+            # Counted per partition too: plan.filter alone may be a table scan
+            async def count(partition_key: str) -> list[dict]:
+                query_filter = HistoryQueryPlanner.partition_plan(plan, partition_key).filter
+                return [
+                    row
+                    async for row in table.query_entities(
+                        query_filter=query_filter, select=["RowKey"]
+                    )
+                ]
+
+            counted = await gather_partitions(count, partitions, "History merge total")
+            total = sum(map(len, counted))
+            read += total
+
+        HistoryQueryPlanner.record(
+            HistoryQueryPlanner.merged_plan(plan, partitions), read=read, returned=len(entities)
+        )
+        return HistoryService._build_cursor_response(
+            entities, filters, token, HistoryService._merge_query_id(plan), total
+        )
+
+    @staticmethod
+    async def iter_export_csv(
+        document_type_code: str | None = None,
+        year: int | None = None,
+        user_id: str | None = None,
+        action: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Stream history as UTF-8 CSV, one chunk per Azure Tables page.
+
+        Only a page of rows per partition is held at a time and there is no
+        row limit. Exports spanning several partitions read them concurrently
+        and come newest first; otherwise rows come in storage order.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+            user_id: Optional filter by user.
+            action: Optional filter by action type.
+            date_from: Optional first day, inclusive.
+            date_to: Optional last day, inclusive.
+
+        Yields:
+            CSV chunks; the first one holds the BOM and the header row.
+        """
+        filters = HistoryService._export_filters(
+            document_type_code, year, user_id, action, date_from, date_to
+        )
+        plan = await HistoryService._plan(filters)
+        table = await get_table_client(plan.table)
+        partitions = await HistoryService._merge_partitions(plan, filters)
+        pages = HistoryService._export_pages(table, plan, partitions)
+
+        exported = 0
+        try:
+            yield HistoryService._csv_chunk([], header=True)
+            async for entities in pages:
+                exported += len(entities)
+                yield HistoryService._csv_chunk(entities)
+        finally:
+            # Also when the client disconnects mid-download
+            await pages.aclose()
+            HistoryQueryPlanner.record(
+                HistoryQueryPlanner.merged_plan(plan, partitions), read=exported, returned=exported
+            )
+
+    @staticmethod
+    async def _export_pages(
+        table: TableClient, plan: QueryPlan, partitions: list[str]
+    ) -> AsyncIterator[list[dict]]:
+        """Read the rows of an export, EXPORT_PAGE_SIZE at a time.
+
+        Several partitions are read concurrently and merged newest first.
+        """
+        if not partitions:
+            if plan.filter:
+                rows = table.query_entities(
+                    query_filter=plan.filter, select=LOG_COLUMNS, results_per_page=EXPORT_PAGE_SIZE
+                )
+            else:
+                rows = table.list_entities(select=LOG_COLUMNS, results_per_page=EXPORT_PAGE_SIZE)
+            async for page in rows.by_page():
+                yield [e async for e in page]
+            return
+
+        async with AsyncPartitionMerge(
+            table,
+            [HistoryQueryPlanner.partition_plan(plan, p) for p in partitions],
+            per_page=EXPORT_PAGE_SIZE,
+            read_ahead=True,
+        ) as merged:
+            page: list[dict] = []
+            async for row in merged:
+                page.append(row)
+                if len(page) == EXPORT_PAGE_SIZE:
+                    yield page
+                    page = []
+            if page:
+                yield page
+
+    @staticmethod
+    async def newest_row_keys(
+        document_type_code: str | None = None, year: int | None = None
+    ) -> dict[str, str]:
+        """Get the RowKey of the newest log of each matching partition.
+
+        See the sync HistoryService.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Newest log RowKey per partition key; partitions without logs are left out.
+        """
+        table = await get_number_logs_table()
+        partitions = await NumberService.list_partitions(document_type_code, year)
+
+        async def read(partition_key: str) -> list[dict]:
+            # SEQUENCE rows share the partitions in the colocated layout
+            safe_pk = sanitize_odata_string(partition_key)
+            rows = table.query_entities(
+                query_filter=f"PartitionKey eq '{safe_pk}' and RowKey ne 'SEQUENCE'",
+                select=["RowKey"],
+                results_per_page=1,
+            )
+            async for row in rows:
+                return [row]
+            return []
+
+        newest = await gather_partitions(read, partitions, "Newest logs")
+        return {
+            partition_key: rows[0]["RowKey"]
+            for partition_key, rows in zip(partitions, newest, strict=True)
+            if rows
+        }
+
+    @staticmethod
+    async def get_by_id(log_id: str) -> NumberLogResponse | None:
+        """Get a specific log entry by ID.
+
+        Args:
+            log_id: The id of the log entry (legacy bare RowKeys are still accepted).
+
+        Returns:
+            NumberLogResponse if found, None otherwise.
+        """
+        table = await get_number_logs_table()
+
+        keys = decode_log_id(log_id)
+        if keys is None:
+            query_filter = HistoryService._legacy_id_filter(log_id)
+            async for entity in table.query_entities(query_filter=query_filter):
+                return NumberLogResponse.from_entity(NumberLogEntity(**entity))
+            return None
+
+        partition_key, row_key = keys
+        if row_key == "SEQUENCE":
+            return None  # Sequence rows share partitions with logs in the colocated layout
+
+        try:
+            entity = await table.get_entity(partition_key=partition_key, row_key=row_key)
+        except ResourceNotFoundError:
+            return None
+        return NumberLogResponse.from_entity(NumberLogEntity(**entity))
+
+    @staticmethod
+    async def get_statistics(
+        document_type_code: str | None = None,
+        year: int | None = None,
+    ) -> dict:
+        """Get statistics for number generation from the HistoryStats counters.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Dictionary with statistics.
+        """
+        return await HistoryStatsService.get_statistics(document_type_code, year)
@@ -0,0 +1,194 @@
+"""Async history statistics service for Controle PGM - maintains rollup counters of number logs."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date
+from itertools import chain
+
+from azure.data.tables import UpdateMode
+from azure.data.tables.aio import TableClient
+
+from core import metrics
+from core.fanout import gather_partitions
+from core.retry import is_conflict_error
+from core.security import sanitize_odata_string
+from core.tables import TRANSACTION_LIMIT
+from core.tables_aio import get_history_stats_table
+from models.number_log import HistogramBucket, NumberLogEntity
+from services.history_stats_service import (
+    STATS_ROWS_FILTER,
+    HistoryStatsService as SyncHistoryStatsService,
+)
+
+from .document_type_service import DocumentTypeService
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryStatsService:
+    """Async service for the HistoryStats rollup table.
+
+    Row layout, counting, retry policy and rebuild markers are shared with
+    the sync HistoryStatsService, which also owns the rebuild.
+    """
+
+    _collect_deltas = staticmethod(SyncHistoryStatsService._collect_deltas)
+    _rows_filter = staticmethod(SyncHistoryStatsService._rows_filter)
+    _build_operations = staticmethod(SyncHistoryStatsService._build_operations)
+    _get_retry_policy = staticmethod(SyncHistoryStatsService._get_retry_policy)
+    _on_partition_failure = staticmethod(SyncHistoryStatsService._on_partition_failure)
+    _on_marker_failure = staticmethod(SyncHistoryStatsService._on_marker_failure)
+
+    _build_stats_filter = staticmethod(SyncHistoryStatsService._build_stats_filter)
+    _summarize = staticmethod(SyncHistoryStatsService._summarize)
+    _build_histogram_filter = staticmethod(SyncHistoryStatsService._build_histogram_filter)
+    _build_buckets = staticmethod(SyncHistoryStatsService._build_buckets)
+
+    @staticmethod
+    async def _apply_partition(
+        table: TableClient, partition_key: str, deltas: dict[str, dict]
+    ) -> bool:
+        """Add counter deltas to one partition, retrying ETag conflicts.
+
+        Returns:
+            True if every row was updated, False if the retry deadline ran out.
+        """
+        pending = deltas
+        retry = HistoryStatsService._get_retry_policy().start()
+
+        while True:
+            retry.attempts += 1
+            current = {
+                e["RowKey"]: e
+                async for e in table.query_entities(
+                    query_filter=HistoryStatsService._rows_filter(partition_key, pending)
+                )
+            }
+            operations = HistoryStatsService._build_operations(pending, current)
+
+            try:
+                for start in range(0, len(operations), TRANSACTION_LIMIT):
+                    chunk = operations[start : start + TRANSACTION_LIMIT]
+                    await table.submit_transaction(chunk)
+                    # Applied: a retry must not add these rows again
+                    for operation in chunk:
+                        pending.pop(operation[1]["RowKey"])
+                return True
+            except Exception as e:
+                if not is_conflict_error(e):
+                    raise
+
+            metrics.increment("history_stats.conflicts", partition=partition_key)
+            delay = retry.next_delay()
+            if delay is None:
+                return False
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def record_logs(logs: list[NumberLogEntity]) -> None:
+        """Add committed log rows to the counters (never raises).
+
+        See HistoryStatsService.record_logs: a partition that can't be updated
+        is marked for rebuild.
+
+        Args:
+            logs: Log rows that were just written to NumberLogs.
+        """
+        if not logs:
+            return
+
+        deltas = HistoryStatsService._collect_deltas(log.model_dump() for log in logs)
+        for partition_key, partition_deltas in deltas.items():
+            try:
+                table = await get_history_stats_table()
+                if await HistoryStatsService._apply_partition(
+                    table, partition_key, partition_deltas
+                ):
+                    continue
+                error = "too many conflicts"
+            except Exception as e:
+                error = str(e)
+
+            marker = HistoryStatsService._on_partition_failure(partition_key, error)
+            try:
+                # Blind upsert: it can't conflict with the counter updates
+                table = await get_history_stats_table()
+                await table.upsert_entity(marker, mode=UpdateMode.REPLACE)
+            except Exception as e:
+                HistoryStatsService._on_marker_failure(partition_key, e)
+
+    @staticmethod
+    async def get_statistics(
+        document_type_code: str | None = None,
+        year: int | None = None,
+    ) -> dict:
+        """Get statistics for number generation from the counters.
+
+        A type reads its partitions as one key range; a year alone reads that
+        year's partition of every document type, concurrently.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Dictionary with totals by action, document type and user.
+        """
+        table = await get_history_stats_table()
+
+        if year and not document_type_code:
+            # One partition per document type, read concurrently instead of a table scan
+            async def read(partition_key: str) -> list[dict]:
+                safe_pk = sanitize_odata_string(partition_key)
+                query_filter = f"PartitionKey eq '{safe_pk}' and {STATS_ROWS_FILTER}"
+                return [row async for row in table.query_entities(query_filter=query_filter)]
+
+            partitions = await gather_partitions(
+                read, await HistoryStatsService._year_partitions(year), "History statistics"
+            )
+            return HistoryStatsService._summarize(chain.from_iterable(partitions))
+
+        stats_filter = HistoryStatsService._build_stats_filter(document_type_code, year)
+        return HistoryStatsService._summarize(
+            [row async for row in table.query_entities(query_filter=stats_filter)]
+        )
+
+    @staticmethod
+    async def _year_partitions(year: int) -> list[str]:
+        """Get the "{code}_{year}" partition of every document type, active or not."""
+        return [
+            f"{doc_type.code}_{year}"
+            for doc_type in await DocumentTypeService.list_rows(include_inactive=True)
+        ]
+
+    @staticmethod
+    async def get_histogram(
+        document_type_code: str,
+        year: int,
+        granularity: str = "month",
+        start: date | None = None,
+        end: date | None = None,
+    ) -> list[HistogramBucket]:
+        """Get generation counts per day or month for one document type and year.
+
+        One partition query over a RowKey range. Periods without logs are omitted.
+
+        Args:
+            document_type_code: Document type code.
+            year: Year of the numbers.
+            granularity: "day" or "month".
+            start: Optional first period (its day or month), inclusive.
+            end: Optional last period (its day or month), inclusive.
+
+        Returns:
+            Buckets in chronological order.
+        """
+        table = await get_history_stats_table()
+        query_filter = HistoryStatsService._build_histogram_filter(
+            document_type_code, year, granularity, start, end
+        )
+        return HistoryStatsService._build_buckets(
+            [row async for row in table.query_entities(query_filter=query_filter)]
+        )
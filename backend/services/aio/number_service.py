@@ -0,0 +1,623 @@
+"""Async number service for Controle PGM - handles document number generation."""
+
+import asyncio
+import logging
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.data.tables import UpdateMode
+from azure.data.tables.aio import TableClient
+
+from core import metrics
+from core.config import get_brazil_now, settings
+from core.exceptions import NotFoundError, SequenceGenerationError
+from core.fanout import gather_partitions
+from core.retry import is_conflict_error
+from core.tables import TRANSACTION_LIMIT
+from core.tables_aio import get_number_logs_table, get_sequences_table
+from models.document_type import DocumentTypeEntity
+from models.number_log import NumberLogEntity
+from models.sequence import SequenceEntity
+from models.user import CurrentUser
+from services.history_cache import HistoryCache
+from services.number_service import (
+    NumberService as SyncNumberService,
+    _extract_etag,
+    _sequence_cache,
+    _sequence_cache_lock,
+)
+from services.sequence_combiner import AsyncSequenceCombiner
+
+from .document_type_service import DocumentTypeService
+from .history_index_service import HistoryIndexService
+from .history_stats_service import HistoryStatsService
+
+logger = logging.getLogger(__name__)
+
+# Combines concurrent generates on the same partition into one increment
+_combiner = AsyncSequenceCombiner(max_numbers_per_round=100)
+
+
+class NumberService:
+    """Async service for document number generation with atomic increments.
+
+    Shares the per-worker sequence cache, row builders and retry policy with the
+    sync NumberService; only the Azure Tables calls differ.
+    """
+
+    _get_partition_key = staticmethod(SyncNumberService._get_partition_key)
+    _cache_sequence = staticmethod(SyncNumberService._cache_sequence)
+    _forget_sequence = staticmethod(SyncNumberService._forget_sequence)
+    _uses_colocated_layout = staticmethod(SyncNumberService._uses_colocated_layout)
+    _build_sequence_entity = staticmethod(SyncNumberService._build_sequence_entity)
+    _build_log_entity = staticmethod(SyncNumberService._build_log_entity)
+    _get_retry_policy = staticmethod(SyncNumberService._get_retry_policy)
+    _record_contention = staticmethod(SyncNumberService._record_contention)
+    clear_sequence_cache = staticmethod(SyncNumberService.clear_sequence_cache)
+    get_contention_stats = staticmethod(SyncNumberService.get_contention_stats)
+    format_number = staticmethod(SyncNumberService.format_number)
+    _sequences_filter = staticmethod(SyncNumberService._sequences_filter)
+
+    @staticmethod
+    async def _get_sequence_table() -> TableClient:
+        """Get the table holding SEQUENCE rows for the configured layout."""
+        if NumberService._uses_colocated_layout():
+            return await get_number_logs_table()
+        return await get_sequences_table()
+
+    @staticmethod
+    async def _freeze_legacy_sequence(document_type_code: str, year: int) -> int:
+        """Stop a partition from being numbered through the Sequences table.
+
+        See the sync NumberService.
+
+        Returns:
+            The row's final CurrentNumber.
+        """
+        table = await get_sequences_table()
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        while True:
+            now = get_brazil_now()
+            try:
+                legacy = await table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
+            except ResourceNotFoundError:
+                try:
+                    await table.create_entity(
+                        {
+                            "PartitionKey": partition_key,
+                            "RowKey": "SEQUENCE",
+                            "DocumentTypeCode": document_type_code,
+                            "Year": year,
+                            "CurrentNumber": 0,
+                            "UpdatedAt": now,
+                            "MigratedAt": now,
+                        }
+                    )
+                    return 0
+                except ResourceExistsError:
+                    continue
+
+            if legacy.get("MigratedAt"):
+                return int(legacy["CurrentNumber"])
+
+            try:
+                await table.update_entity(
+                    {"PartitionKey": partition_key, "RowKey": "SEQUENCE", "MigratedAt": now},
+                    mode=UpdateMode.MERGE,
+                    etag=_extract_etag(legacy),
+                    match_condition=MatchConditions.IfNotModified,
+                )
+                return int(legacy["CurrentNumber"])
+            except Exception as e:
+                # A number was issued through the split layout meanwhile
+                if not is_conflict_error(e):
+                    raise
+
+    @staticmethod
+    async def _reconcile_sequence(document_type_code: str, year: int) -> bool:
+        """Carry a partition's Sequences row into its NumberLogs SEQUENCE row.
+
+        See the sync NumberService.
+
+        Returns:
+            True if the colocated row was written, False if already reconciled.
+        """
+        frozen_number = await NumberService._freeze_legacy_sequence(document_type_code, year)
+        table = await get_number_logs_table()
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        while True:
+            seq = NumberService._build_sequence_entity(document_type_code, year, frozen_number)
+            seq["LegacyReconciled"] = True
+            try:
+                await table.create_entity(seq)
+                return True
+            except ResourceExistsError:
+                pass
+
+            try:
+                current = await table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
+            except ResourceNotFoundError:
+                continue
+            if current.get("LegacyReconciled"):
+                return False
+
+            # Copied earlier without the freeze: numbers may have been issued on both sides
+            seq["CurrentNumber"] = max(int(current["CurrentNumber"]), frozen_number)
+            try:
+                await table.update_entity(
+                    seq,
+                    mode=UpdateMode.REPLACE,
+                    etag=_extract_etag(current),
+                    match_condition=MatchConditions.IfNotModified,
+                )
+                return True
+            except Exception as e:
+                if not is_conflict_error(e):
+                    raise
+
+    @staticmethod
+    async def _ensure_usable(document_type_code: str, year: int, entity: dict | None) -> bool:
+        """Check a SEQUENCE row just read (None if missing) can be numbered from.
+
+        See the sync NumberService.
+
+        Returns:
+            True if the row can be used, False if it must be read again.
+
+        Raises:
+            SequenceGenerationError: If the split layout reads a frozen row.
+        """
+        if NumberService._uses_colocated_layout():
+            if entity is not None and entity.get("LegacyReconciled"):
+                return True
+            await NumberService._reconcile_sequence(document_type_code, year)
+            return False
+        return SyncNumberService._ensure_usable(document_type_code, year, entity)
+
+    @staticmethod
+    async def get_current_sequence(document_type_code: str, year: int) -> SequenceEntity:
+        """Get current sequence for a document type and year.
+
+        Creates sequence if it doesn't exist.
+
+        Args:
+            document_type_code: Document type code (e.g., "OF").
+            year: Year for the sequence.
+
+        Returns:
+            SequenceEntity with current number.
+        """
+        table = await NumberService._get_sequence_table()
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        try:
+            entity = await table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
+        except ResourceNotFoundError:
+            entity = None
+        if not await NumberService._ensure_usable(document_type_code, year, entity):
+            return await NumberService.get_current_sequence(document_type_code, year)
+
+        if entity is not None:
+            seq = SequenceEntity(**entity)
+            seq._etag = _extract_etag(entity)
+        else:
+            # Create new sequence starting at 0
+            seq = SequenceEntity(
+                **NumberService._build_sequence_entity(document_type_code, year, 0)
+            )
+            try:
+                metadata = await table.create_entity(seq.model_dump(exclude={"_etag"}))
+                seq._etag = _extract_etag(metadata)
+            except ResourceExistsError:
+                # Created concurrently by another request
+                return await NumberService.get_current_sequence(document_type_code, year)
+
+        NumberService._cache_sequence(partition_key, seq.CurrentNumber, seq._etag)
+        return seq
+
+    @staticmethod
+    async def _read_sequence_state(
+        document_type_code: str, year: int
+    ) -> tuple[int, str | None] | None:
+        """Read a sequence's CurrentNumber and ETag, or None if it doesn't exist."""
+        table = await NumberService._get_sequence_table()
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        try:
+            entity = await table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
+        except ResourceNotFoundError:
+            entity = None
+        if not await NumberService._ensure_usable(document_type_code, year, entity):
+            return await NumberService._read_sequence_state(document_type_code, year)
+        if entity is None:
+            return None
+
+        state = (int(entity["CurrentNumber"]), _extract_etag(entity))
+        NumberService._cache_sequence(partition_key, *state)
+        return state
+
+    @staticmethod
+    async def _commit_sequence(
+        document_type_code: str,
+        year: int,
+        new_number: int,
+        etag: str | None,
+        logs: list[NumberLogEntity],
+    ) -> bool:
+        """Write a new CurrentNumber and its log rows (see the sync NumberService).
+
+        Returns:
+            True if committed, False on an ETag conflict or concurrent creation.
+        """
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+        seq = NumberService._build_sequence_entity(document_type_code, year, new_number)
+
+        if etag is None:
+            seq_operation = ("create", seq)
+        else:
+            seq_operation = (
+                "update",
+                seq,
+                {
+                    "mode": UpdateMode.REPLACE,
+                    "etag": etag,
+                    "match_condition": MatchConditions.IfNotModified,
+                },
+            )
+
+        try:
+            if NumberService._uses_colocated_layout():
+                first_batch = logs[: TRANSACTION_LIMIT - 1]
+                results = await (await get_number_logs_table()).submit_transaction(
+                    [seq_operation] + [("create", log.model_dump()) for log in first_batch]
+                )
+                metadata = results[0]
+                remaining_logs = logs[len(first_batch) :]
+            else:
+                table = await get_sequences_table()
+                if etag is None:
+                    metadata = await table.create_entity(seq)
+                else:
+                    metadata = await table.update_entity(seq, **seq_operation[2])
+                remaining_logs = logs
+        except Exception as e:
+            if is_conflict_error(e):
+                # ETag conflict or concurrent creation - caller re-reads and retries
+                NumberService._forget_sequence(partition_key)
+                return False
+            raise
+
+        NumberService._cache_sequence(partition_key, new_number, _extract_etag(metadata))
+        await NumberService._write_logs(remaining_logs)
+        await NumberService._on_logs_committed(logs)
+        return True
+
+    @staticmethod
+    async def _get_active_document_type(document_type_code: str) -> DocumentTypeEntity:
+        """Get a document type that numbers can be generated for.
+
+        Raises:
+            NotFoundError: If document type doesn't exist or is inactive.
+        """
+        doc_type = await DocumentTypeService.get_by_code(document_type_code)
+        if not doc_type:
+            raise NotFoundError(f"Tipo de documento '{document_type_code}' não encontrado")
+        if not doc_type.IsActive:
+            raise NotFoundError(f"Tipo de documento '{document_type_code}' está inativo")
+        return doc_type
+
+    @staticmethod
+    async def _reserve_numbers(
+        document_type_code: str, year: int, count: int, user: CurrentUser
+    ) -> int:
+        """Advance a sequence by count numbers and log each of them.
+
+        Concurrent callers on the same partition are combined into a single
+        increment, unless disabled with SEQUENCE_COMBINING_ENABLED=false.
+
+        Returns:
+            The first reserved number; the range is [first, first + count - 1].
+        """
+        if not settings.sequence_combining_enabled:
+            return await NumberService._commit_reservations(
+                document_type_code, year, [(user, count)]
+            )
+
+        async def commit(round_) -> int:
+            return await NumberService._commit_reservations(
+                document_type_code, year, [(r.payload, r.count) for r in round_]
+            )
+
+        return await _combiner.reserve(
+            NumberService._get_partition_key(document_type_code, year), count, user, commit
+        )
+
+    @staticmethod
+    async def _commit_reservations(
+        document_type_code: str, year: int, reservations: list[tuple[CurrentUser, int]]
+    ) -> int:
+        """Reserve numbers for one or more callers with a single increment.
+
+        Same algorithm as the sync NumberService; retry delays are awaited
+        instead of blocking the worker thread.
+
+        Returns:
+            The first number of the whole range.
+
+        Raises:
+            SequenceGenerationError: If unable to reserve numbers before the deadline.
+        """
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+        total = sum(count for _, count in reservations)
+        retry = NumberService._get_retry_policy().start()
+
+        while True:
+            retry.attempts += 1
+
+            # Use the state left by our last write; read only when unknown
+            with _sequence_cache_lock:
+                state = _sequence_cache.get(partition_key)
+            if state is None:
+                state = await NumberService._read_sequence_state(document_type_code, year)
+
+            current_number, etag = state if state else (0, None)
+            first_number = current_number + 1
+
+            # Rows of a batch share one timestamp (see _build_log_entity)
+            now = get_brazil_now() if total > 1 else None
+            logs = []
+            number = first_number
+            for user, count in reservations:
+                for _ in range(count):
+                    logs.append(
+                        NumberService._build_log_entity(
+                            document_type_code=document_type_code,
+                            year=year,
+                            number=number,
+                            action="generated",
+                            user=user,
+                            now=now,
+                        )
+                    )
+                    number += 1
+
+            if await NumberService._commit_sequence(
+                document_type_code, year, current_number + total, etag, logs
+            ):
+                NumberService._record_contention(partition_key, retry.attempts, retry.elapsed)
+                return first_number
+
+            metrics.increment("sequence.conflicts", partition=partition_key)
+            delay = retry.next_delay()
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+        NumberService._record_contention(partition_key, retry.attempts, retry.elapsed, False)
+        logger.warning(
+            f"Sequence {partition_key} gave up after {retry.attempts} attempts "
+            f"in {retry.elapsed:.2f}s"
+        )
+        raise SequenceGenerationError(
+            f"Não foi possível gerar número após {retry.attempts} tentativas. Tente novamente."
+        )
+
+    @staticmethod
+    async def generate_number(
+        document_type_code: str, year: int, user: CurrentUser
+    ) -> tuple[int, str, str]:
+        """Generate next document number atomically.
+
+        Args:
+            document_type_code: Document type code (e.g., "OF").
+            year: Year for the sequence.
+            user: Current authenticated user.
+
+        Returns:
+            Tuple of (number, formatted_string, document_type_name).
+
+        Raises:
+            NotFoundError: If document type doesn't exist or is inactive.
+            SequenceGenerationError: If unable to generate number after retries.
+        """
+        doc_type = await NumberService._get_active_document_type(document_type_code)
+
+        new_number = await NumberService._reserve_numbers(document_type_code, year, 1, user)
+
+        formatted = NumberService.format_number(document_type_code, new_number, year)
+
+        return new_number, formatted, doc_type.Name
+
+    @staticmethod
+    async def generate_batch(
+        document_type_code: str, year: int, count: int, user: CurrentUser
+    ) -> tuple[int, int, str]:
+        """Reserve count contiguous document numbers with a single increment.
+
+        Args:
+            document_type_code: Document type code (e.g., "OF").
+            year: Year for the sequence.
+            count: How many numbers to reserve.
+            user: Current authenticated user.
+
+        Returns:
+            Tuple of (first_number, last_number, document_type_name).
+
+        Raises:
+            NotFoundError: If document type doesn't exist or is inactive.
+            SequenceGenerationError: If unable to reserve numbers after retries.
+        """
+        doc_type = await NumberService._get_active_document_type(document_type_code)
+
+        first_number = await NumberService._reserve_numbers(document_type_code, year, count, user)
+
+        return first_number, first_number + count - 1, doc_type.Name
+
+    @staticmethod
+    async def correct_sequence(
+        document_type_code: str,
+        year: int,
+        new_number: int,
+        notes: str,
+        user: CurrentUser,
+    ) -> tuple[int, int]:
+        """Correct a sequence number (admin only).
+
+        Args:
+            document_type_code: Document type code.
+            year: Year for the sequence.
+            new_number: New sequence number to set.
+            notes: Justification for the correction.
+            user: Current authenticated user (must be admin).
+
+        Returns:
+            Tuple of (previous_number, new_number).
+
+        Raises:
+            NotFoundError: If document type doesn't exist.
+            SequenceGenerationError: If the sequence changed while correcting it.
+        """
+        doc_type = await DocumentTypeService.get_by_code(document_type_code)
+        if not doc_type:
+            raise NotFoundError(f"Tipo de documento '{document_type_code}' não encontrado")
+
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        seq = await NumberService.get_current_sequence(document_type_code, year)
+        previous_number = seq.CurrentNumber
+
+        updated_entity = NumberService._build_sequence_entity(document_type_code, year, new_number)
+        log = NumberService._build_log_entity(
+            document_type_code=document_type_code,
+            year=year,
+            number=new_number,
+            action="corrected",
+            user=user,
+            previous_number=previous_number,
+            notes=notes,
+        )
+
+        # Conditional: a blind write could undo a concurrent generate or a freeze
+        update = {
+            "mode": UpdateMode.REPLACE,
+            "etag": seq._etag,
+            "match_condition": MatchConditions.IfNotModified,
+        }
+        try:
+            if NumberService._uses_colocated_layout():
+                # Sequence and correction log are written atomically
+                results = await (await get_number_logs_table()).submit_transaction(
+                    [("update", updated_entity, update), ("create", log.model_dump())]
+                )
+                metadata = results[0]
+            else:
+                metadata = await (await get_sequences_table()).update_entity(
+                    updated_entity, **update
+                )
+        except Exception as e:
+            if is_conflict_error(e):
+                NumberService._forget_sequence(partition_key)
+                raise SequenceGenerationError(
+                    "A sequência foi alterada durante a correção. Tente novamente."
+                ) from e
+            raise
+        if not NumberService._uses_colocated_layout():
+            await NumberService._write_logs([log])
+
+        NumberService._cache_sequence(partition_key, new_number, _extract_etag(metadata))
+        await NumberService._on_logs_committed([log])
+
+        return previous_number, new_number
+
+    @staticmethod
+    async def _on_logs_committed(logs: list[NumberLogEntity]) -> None:
+        """Update the history index, statistics and page cache for logs just written."""
+        await HistoryIndexService.index_logs(logs)
+        await HistoryStatsService.record_logs(logs)
+        # Last: a page read before the index was updated is cached under the old version
+        HistoryCache.bump(log.PartitionKey for log in logs)
+
+    @staticmethod
+    async def _write_logs(logs: list[NumberLogEntity]) -> None:
+        """Insert log rows, batching rows of the same partition into transactions."""
+        if not logs:
+            return
+
+        table = await get_number_logs_table()
+        if len(logs) == 1:
+            await table.create_entity(logs[0].model_dump())
+            return
+
+        by_partition: dict[str, list[NumberLogEntity]] = {}
+        for log in logs:
+            by_partition.setdefault(log.PartitionKey, []).append(log)
+
+        limit = TRANSACTION_LIMIT
+        for partition_logs in by_partition.values():
+            for start in range(0, len(partition_logs), limit):
+                await table.submit_transaction(
+                    [("create", log.model_dump()) for log in partition_logs[start : start + limit]]
+                )
+
+    @staticmethod
+    async def list_sequences(
+        document_type_code: str | None = None, year: int | None = None
+    ) -> list[SequenceEntity]:
+        """List sequences, optionally only those of a document type and/or year.
+
+        See the sync NumberService: NumberLogs is read per document type, not scanned.
+
+        Args:
+            document_type_code: Optional document type code.
+            year: Optional year.
+
+        Returns:
+            List of SequenceEntity objects, sorted by partition key.
+        """
+        query_filter = NumberService._sequences_filter(document_type_code, year)
+        sequences = {
+            entity["PartitionKey"]: entity
+            async for entity in (await get_sequences_table()).query_entities(
+                query_filter=query_filter
+            )
+        }
+
+        if NumberService._uses_colocated_layout():
+            table = await get_number_logs_table()
+            codes = (
+                [document_type_code]
+                if document_type_code
+                else [
+                    row.code for row in await DocumentTypeService.list_rows(include_inactive=True)
+                ]
+            )
+
+            async def read_type(code: str) -> list[dict]:
+                query_filter = NumberService._sequences_filter(code, year)
+                return [entity async for entity in table.query_entities(query_filter=query_filter)]
+
+            for rows in await gather_partitions(read_type, codes, "list_sequences"):
+                sequences.update((entity["PartitionKey"], entity) for entity in rows)
+
+        return [SequenceEntity(**entity) for _, entity in sorted(sequences.items())]
+
+    @staticmethod
+    async def list_partitions(
+        document_type_code: str | None = None, year: int | None = None
+    ) -> list[str]:
+        """List the "{code}_{year}" NumberLogs partitions that can hold logs.
+
+        See the sync NumberService.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Partition keys in key order.
+        """
+        return [
+            seq.PartitionKey for seq in await NumberService.list_sequences(document_type_code, year)
+        ]
@@ -0,0 +1,396 @@
+"""Async user service for Controle PGM."""
+
+import asyncio
+from datetime import datetime
+from uuid import uuid4
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableErrorCode, TableTransactionError
+
+from core.auth import hash_password, verify_password
+from core.config import settings
+from core.exceptions import (
+    ConflictError,
+    ForbiddenError,
+    InvalidCredentialsError,
+    NotFoundError,
+)
+from core.security import add_random_delay_async, sanitize_odata_string
+from core.tables_aio import get_users_table
+from models.user import (
+    INDEX_ROW_KEY_BOUNDARY,
+    UserCreate,
+    UserEntity,
+    UserResponse,
+    UserRow,
+    email_index_row_key,
+)
+from services.user_service import UserService as SyncUserService
+
+
+class UserService:
+    """Async service for user operations.
+
+    bcrypt hashing runs in a worker thread so it does not stall the event loop.
+    """
+
+    _has_other_active_admin = staticmethod(SyncUserService._has_other_active_admin)
+    _update_operations = staticmethod(SyncUserService._update_operations)
+    _generate_temporary_password = staticmethod(SyncUserService._generate_temporary_password)
+
+    @staticmethod
+    async def get_by_email(email: str) -> UserEntity | None:
+        """Get a user by email address.
+
+        Args:
+            email: User's email address.
+
+        Returns:
+            UserEntity if found, None otherwise.
+        """
+        table = await get_users_table()
+
+        try:
+            # Point read of the email index row
+            row = await table.get_entity(partition_key="USER", row_key=email_index_row_key(email))
+            return UserEntity.from_email_index_row(row)
+        except ResourceNotFoundError:
+            if not settings.user_email_index_fallback:
+                return None
+
+        # Users created before the index was backfilled (case-insensitive, sanitized)
+        safe_email = sanitize_odata_string(email.lower())
+        query_filter = (
+            f"PartitionKey eq 'USER' and Email eq '{safe_email}' "
+            f"and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+        )
+        async for entity in table.query_entities(query_filter=query_filter):
+            return UserEntity(**entity)
+        return None
+
+    @staticmethod
+    async def get_by_id(user_id: str) -> UserEntity | None:
+        """Get a user by ID.
+
+        Args:
+            user_id: User's unique ID (RowKey).
+
+        Returns:
+            UserEntity if found, None otherwise.
+        """
+        if user_id.startswith(INDEX_ROW_KEY_BOUNDARY):
+            return None  # Index rows are not users
+
+        table = await get_users_table()
+
+        try:
+            entity = await table.get_entity(partition_key="USER", row_key=user_id)
+            return UserEntity(**entity)
+        except ResourceNotFoundError:
+            return None
+
+    @staticmethod
+    async def verify_credentials(email: str, password: str) -> UserEntity:
+        """Verify user credentials for login.
+
+        Args:
+            email: User's email address.
+            password: User's password.
+
+        Returns:
+            UserEntity if credentials are valid.
+
+        Raises:
+            InvalidCredentialsError: If credentials are invalid.
+            ForbiddenError: If user is inactive.
+        """
+        user = await UserService.get_by_email(email)
+
+        # Add random delay to prevent timing attacks
+        await add_random_delay_async(min_ms=50, max_ms=150)
+
+        if not user:
+            # Perform dummy hash to maintain consistent timing
+            await asyncio.to_thread(
+                verify_password, password, "$2b$12$dummy.hash.to.prevent.timing.attacks"
+            )
+            raise InvalidCredentialsError("E-mail ou senha inválidos")
+
+        if not await asyncio.to_thread(verify_password, password, user.PasswordHash):
+            raise InvalidCredentialsError("E-mail ou senha inválidos")
+
+        if not user.IsActive:
+            raise ForbiddenError("Usuário inativo")
+
+        return user
+
+    @staticmethod
+    async def create(data: UserCreate) -> UserEntity:
+        """Create a new user.
+
+        Args:
+            data: User creation data.
+
+        Returns:
+            Created UserEntity.
+
+        Raises:
+            ConflictError: If email already exists.
+        """
+        # Check if email already exists (users that predate the email index)
+        if settings.user_email_index_fallback and await UserService.get_by_email(data.email):
+            raise ConflictError("E-mail já cadastrado")
+
+        table = await get_users_table()
+        now = datetime.utcnow()
+
+        entity = UserEntity(
+            PartitionKey="USER",
+            RowKey=str(uuid4()),
+            Email=data.email.lower(),
+            Name=data.name,
+            PasswordHash=await asyncio.to_thread(hash_password, data.password),
+            Role=data.role,
+            IsActive=True,
+            MustChangePassword=True,  # Force password change on first login
+            CreatedAt=now,
+            UpdatedAt=now,
+        )
+
+        # The index row insert fails if the email is taken, so uniqueness is race-free
+        try:
+            await table.submit_transaction(
+                [
+                    ("create", entity.model_dump()),
+                    ("create", entity.to_email_index_row()),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code == TableErrorCode.ENTITY_ALREADY_EXISTS:
+                raise ConflictError("E-mail já cadastrado")
+            raise
+
+        return entity
+
+    @staticmethod
+    async def update(user_id: str, updates: dict) -> UserEntity:
+        """Update a user.
+
+        Args:
+            user_id: User's unique ID.
+            updates: Dictionary of fields to update.
+
+        Returns:
+            Updated UserEntity.
+
+        Raises:
+            NotFoundError: If user not found.
+        """
+        user = await UserService.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("Usuário não encontrado")
+
+        table = await get_users_table()
+
+        # Update fields
+        entity_dict = user.model_dump()
+        entity_dict.update(updates)
+        entity_dict["UpdatedAt"] = datetime.utcnow()
+
+        updated = UserEntity(**entity_dict)
+        await table.submit_transaction(UserService._update_operations(user, updated))
+
+        return updated
+
+    @staticmethod
+    async def change_password(user_id: str, current_password: str, new_password: str) -> None:
+        """Change a user's password.
+
+        Args:
+            user_id: User's unique ID.
+            current_password: Current password for verification.
+            new_password: New password to set.
+
+        Raises:
+            NotFoundError: If user not found.
+            InvalidCredentialsError: If current password is incorrect.
+        """
+        user = await UserService.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("Usuário não encontrado")
+
+        if not await asyncio.to_thread(verify_password, current_password, user.PasswordHash):
+            raise InvalidCredentialsError("Senha atual incorreta")
+
+        await UserService.update(
+            user_id,
+            {
+                "PasswordHash": await asyncio.to_thread(hash_password, new_password),
+                "MustChangePassword": False,
+            },
+        )
+
+    @staticmethod
+    async def reset_password(user_id: str) -> str:
+        """Reset a user's password to a temporary value.
+
+        Args:
+            user_id: User's unique ID.
+
+        Returns:
+            Temporary password.
+
+        Raises:
+            NotFoundError: If user not found.
+        """
+        user = await UserService.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("Usuário não encontrado")
+
+        temp_password = UserService._generate_temporary_password()
+
+        await UserService.update(
+            user_id,
+            {
+                "PasswordHash": await asyncio.to_thread(hash_password, temp_password),
+                "MustChangePassword": True,
+            },
+        )
+
+        return temp_password
+
+    @staticmethod
+    async def list_all() -> list[UserEntity]:
+        """List all users.
+
+        Returns:
+            List of all UserEntity objects.
+        """
+        table = await get_users_table()
+        return [
+            UserEntity(**entity)
+            async for entity in table.query_entities(
+                query_filter=f"PartitionKey eq 'USER' and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+            )
+        ]
+
+    @staticmethod
+    async def list_rows() -> list[UserRow]:
+        """List all users, as lightweight rows.
+
+        Returns:
+            List of UserRow tuples (password hashes are never read).
+        """
+        table = await get_users_table()
+        return [
+            UserRow.from_row(entity)
+            async for entity in table.query_entities(
+                query_filter=f"PartitionKey eq 'USER' and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'",
+                select=UserResponse.ENTITY_COLUMNS,
+            )
+        ]
+
+    @staticmethod
+    async def deactivate(user_id: str, current_admin_id: str) -> UserEntity:
+        """Deactivate a user.
+
+        Args:
+            user_id: User's unique ID.
+            current_admin_id: ID of the admin performing the action.
+
+        Returns:
+            Updated UserEntity.
+
+        Raises:
+            NotFoundError: If user not found.
+            ForbiddenError: If trying to deactivate self or last admin.
+        """
+        if user_id == current_admin_id:
+            raise ForbiddenError("Não é possível desativar a si mesmo")
+
+        user = await UserService.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("Usuário não encontrado")
+
+        # Check if this is the last active admin
+        if user.Role == "admin" and not UserService._has_other_active_admin(
+            await UserService.list_rows(), user_id
+        ):
+            raise ForbiddenError("Não é possível desativar o último administrador ativo")
+
+        return await UserService.update(user_id, {"IsActive": False})
+
+    @staticmethod
+    async def remove_admin_role(user_id: str, current_admin_id: str) -> UserEntity:
+        """Remove admin role from a user.
+
+        Args:
+            user_id: User's unique ID.
+            current_admin_id: ID of the admin performing the action.
+
+        Returns:
+            Updated UserEntity.
+
+        Raises:
+            NotFoundError: If user not found.
+            ForbiddenError: If trying to remove own admin role or last admin.
+        """
+        if user_id == current_admin_id:
+            raise ForbiddenError("Não é possível remover o próprio papel de administrador")
+
+        user = await UserService.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("Usuário não encontrado")
+
+        if user.Role != "admin":
+            return user  # Already not an admin
+
+        # Check if this is the last active admin
+        if not UserService._has_other_active_admin(await UserService.list_rows(), user_id):
+            raise ForbiddenError(
+                "Não é possível remover o papel de administrador do último administrador ativo"
+            )
+
+        return await UserService.update(user_id, {"Role": "user"})
+
+    @staticmethod
+    async def delete_permanently(user_id: str, current_admin_id: str) -> None:
+        """Delete a user permanently (Hard Delete).
+
+        Args:
+            user_id: User's unique ID.
+            current_admin_id: ID of the admin performing the action.
+
+        Raises:
+            NotFoundError: If user not found.
+            ForbiddenError: If trying to delete self or last admin.
+        """
+        if user_id == current_admin_id:
+            raise ForbiddenError("Não é possível excluir a si mesmo")
+
+        user = await UserService.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("Usuário não encontrado")
+
+        # Check if this is the last active admin
+        if user.Role == "admin" and not UserService._has_other_active_admin(
+            await UserService.list_rows(), user_id
+        ):
+            raise ForbiddenError("Não é possível excluir o último administrador ativo")
+
+        table = await get_users_table()
+        try:
+            await table.submit_transaction(
+                [
+                    ("delete", {"PartitionKey": "USER", "RowKey": user_id}),
+                    ("delete", {"PartitionKey": "USER", "RowKey": email_index_row_key(user.Email)}),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code not in (
+                TableErrorCode.RESOURCE_NOT_FOUND,
+                TableErrorCode.ENTITY_NOT_FOUND,
+            ):
+                raise
+            # User predates the email index
+            await table.delete_entity(partition_key="USER", row_key=user_id)
@@ -8,7 +8,7 @@ from typing import Any
 from uuid import uuid4
 
 from core.config import get_brazil_now, settings
-from core.tables import get_table_client
+from core.tables import get_audit_logs_table
 
 logger = logging.getLogger(__name__)
 
@@ -40,11 +40,6 @@ class AuditAction(str, Enum):
     NUMBER_CORRECTED = "number_corrected"
 
 
-def get_audit_logs_table():
-    """Get the audit logs table client."""
-    return get_table_client("AuditLogs")
-
-
 class AuditService:
     """Service for logging audit events."""
 
@@ -72,28 +67,9 @@ class AuditService:
         """
         try:
             table = get_audit_logs_table()
-            now = get_brazil_now()
-
-            # Create partition key based on date for efficient querying
-            partition_key = now.strftime("%Y-%m")
-
-            # Create row key with inverse timestamp for newest-first ordering
-            inverse_timestamp = str(9999999999 - int(now.timestamp()))
-            row_key = f"{inverse_timestamp}_{uuid4().hex[:8]}"
-
-            entity = {
-                "PartitionKey": partition_key,
-                "RowKey": row_key,
-                "Action": action.value,
-                "ActorId": actor_id or "system",
-                "ActorEmail": actor_email or "system",
-                "TargetType": target_type,
-                "TargetId": target_id,
-                "Details": str(details) if details else None,
-                "IpAddress": ip_address,
-                "Timestamp": now.isoformat(),
-                "Environment": settings.environment,
-            }
+            entity = AuditService._build_entity(
+                action, actor_id, actor_email, target_type, target_id, details, ip_address
+            )
 
             table.create_entity(entity)
 
@@ -107,6 +83,40 @@ class AuditService:
             # Never let audit logging break the main flow
             logger.error(f"Failed to write audit log: {e}")
 
+    @staticmethod
+    def _build_entity(
+        action: AuditAction,
+        actor_id: str | None,
+        actor_email: str | None,
+        target_type: str | None = None,
+        target_id: str | None = None,
+        details: dict[str, Any] | None = None,
+        ip_address: str | None = None,
+    ) -> dict[str, Any]:
+        """Build the AuditLogs row for an event."""
+        now = get_brazil_now()
+
+        # Create partition key based on date for efficient querying
+        partition_key = now.strftime("%Y-%m")
+
+        # Create row key with inverse timestamp for newest-first ordering
+        inverse_timestamp = str(9999999999 - int(now.timestamp()))
+        row_key = f"{inverse_timestamp}_{uuid4().hex[:8]}"
+
+        return {
+            "PartitionKey": partition_key,
+            "RowKey": row_key,
+            "Action": action.value,
+            "ActorId": actor_id or "system",
+            "ActorEmail": actor_email or "system",
+            "TargetType": target_type,
+            "TargetId": target_id,
+            "Details": str(details) if details else None,
+            "IpAddress": ip_address,
+            "Timestamp": now.isoformat(),
+            "Environment": settings.environment,
+        }
+
     @staticmethod
     def log_user_action(
         action: AuditAction,
@@ -127,19 +137,35 @@ class AuditService:
             details: Additional details.
             ip_address: IP address of the request.
         """
+        AuditService.log(
+            **AuditService._user_action_fields(
+                action, actor, target_user_id, target_user_email, details, ip_address
+            )
+        )
+
+    @staticmethod
+    def _user_action_fields(
+        action: AuditAction,
+        actor: dict[str, Any],
+        target_user_id: str | None = None,
+        target_user_email: str | None = None,
+        details: dict[str, Any] | None = None,
+        ip_address: str | None = None,
+    ) -> dict[str, Any]:
+        """Map a user-related action to log() arguments."""
         full_details = details or {}
         if target_user_email:
             full_details["target_email"] = target_user_email
 
-        AuditService.log(
-            action=action,
-            actor_id=actor.get("user_id"),
-            actor_email=actor.get("email"),
-            target_type="user",
-            target_id=target_user_id,
-            details=full_details,
-            ip_address=ip_address,
-        )
+        return {
+            "action": action,
+            "actor_id": actor.get("user_id"),
+            "actor_email": actor.get("email"),
+            "target_type": "user",
+            "target_id": target_user_id,
+            "details": full_details,
+            "ip_address": ip_address,
+        }
 
     @staticmethod
     def get_recent_logs(
@@ -160,15 +186,7 @@ class AuditService:
         """
         try:
             table = get_audit_logs_table()
-
-            # Build filter
-            filters = []
-            if action_filter:
-                filters.append(f"Action eq '{action_filter.value}'")
-            if actor_id:
-                filters.append(f"ActorId eq '{actor_id}'")
-
-            filter_query = " and ".join(filters) if filters else None
+            filter_query = AuditService._build_filter_query(action_filter, actor_id)
 
             if filter_query:
                 entities = list(table.query_entities(query_filter=filter_query))
@@ -183,3 +201,16 @@ class AuditService:
         except Exception as e:
             logger.error(f"Failed to read audit logs: {e}")
             return []
+
+    @staticmethod
+    def _build_filter_query(
+        action_filter: AuditAction | None = None, actor_id: str | None = None
+    ) -> str | None:
+        """Build the OData filter for an audit log query (None means no filter)."""
+        filters = []
+        if action_filter:
+            filters.append(f"Action eq '{action_filter.value}'")
+        if actor_id:
+            filters.append(f"ActorId eq '{actor_id}'")
+
+        return " and ".join(filters) if filters else None
@@ -4,21 +4,41 @@ from datetime import datetime
 from uuid import uuid4
 
 from azure.core.exceptions import ResourceNotFoundError
-from azure.data.tables import UpdateMode
+from azure.data.tables import TableErrorCode, TableTransactionError, UpdateMode
 
+from core.cache import TTLCache
+from core.config import settings
 from core.exceptions import ConflictError, NotFoundError
 from core.security import sanitize_odata_string
-from core.tables import get_document_types_table
+from core.tables import TRANSACTION_LIMIT, get_document_types_table
 from models.document_type import (
+    CODE_INDEX_PREFIX,
+    INDEX_ROW_KEY_BOUNDARY,
     DocumentTypeCreate,
     DocumentTypeEntity,
+    DocumentTypeResponse,
+    DocumentTypeRow,
     DocumentTypeUpdate,
 )
 
+# Per-worker cache of document types by code, including "not found" results,
+# so the generate hot path does no DocumentTypes I/O. Writes through this service
+# invalidate it; changes made by other instances show up after the TTL.
+_code_cache: TTLCache[DocumentTypeEntity] = TTLCache(
+    "document_types_by_code",
+    ttl_seconds=settings.document_type_cache_ttl_seconds,
+    max_entries=256,
+)
+
 
 class DocumentTypeService:
     """Service for document type operations."""
 
+    @staticmethod
+    def invalidate_cache(code: str | None = None) -> None:
+        """Drop a cached document type (or all of them when code is None)."""
+        _code_cache.invalidate(code.upper() if code else None)
+
     @staticmethod
     def list_all() -> list[DocumentTypeEntity]:
         """List all document types.
@@ -27,7 +47,11 @@ class DocumentTypeService:
             List of all DocumentTypeEntity objects.
         """
         table = get_document_types_table()
-        entities = list(table.query_entities(query_filter="PartitionKey eq 'DOCTYPE'"))
+        entities = list(
+            table.query_entities(
+                query_filter=f"PartitionKey eq 'DOCTYPE' and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+            )
+        )
         return [DocumentTypeEntity(**entity) for entity in entities]
 
     @staticmethod
@@ -39,11 +63,38 @@ class DocumentTypeService:
         """
         table = get_document_types_table()
         entities = list(
-            table.query_entities(query_filter="PartitionKey eq 'DOCTYPE' and IsActive eq true")
+            table.query_entities(
+                query_filter="PartitionKey eq 'DOCTYPE' and IsActive eq true "
+                f"and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+            )
         )
         doc_types = [DocumentTypeEntity(**entity) for entity in entities]
         return sorted(doc_types, key=lambda x: x.Code)
 
+    @staticmethod
+    def list_rows(include_inactive: bool = False) -> list[DocumentTypeRow]:
+        """List document types, as lightweight rows.
+
+        Args:
+            include_inactive: Also list inactive types.
+
+        Returns:
+            List of DocumentTypeRow tuples, sorted by code.
+        """
+        table = get_document_types_table()
+        entities = table.query_entities(
+            query_filter=DocumentTypeService._list_filter(include_inactive),
+            select=DocumentTypeResponse.ENTITY_COLUMNS,
+        )
+        doc_types = [DocumentTypeRow.from_row(entity) for entity in entities]
+        return sorted(doc_types, key=lambda x: x.code)
+
+    @staticmethod
+    def _list_filter(include_inactive: bool) -> str:
+        """Build the filter selecting document type rows (not index rows)."""
+        active = "" if include_inactive else "IsActive eq true and "
+        return f"PartitionKey eq 'DOCTYPE' and {active}RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+
     @staticmethod
     def get_by_id(doc_type_id: str) -> DocumentTypeEntity | None:
         """Get a document type by ID.
@@ -54,6 +105,9 @@ class DocumentTypeService:
         Returns:
             DocumentTypeEntity if found, None otherwise.
         """
+        if doc_type_id.startswith(INDEX_ROW_KEY_BOUNDARY):
+            return None  # Index rows are not document types
+
         table = get_document_types_table()
 
         try:
@@ -63,25 +117,44 @@ class DocumentTypeService:
             return None
 
     @staticmethod
-    def get_by_code(code: str) -> DocumentTypeEntity | None:
+    def get_by_code(code: str, use_cache: bool = True) -> DocumentTypeEntity | None:
         """Get a document type by code.
 
+        Served from the per-worker cache when possible.
+
         Args:
             code: Document type code (e.g., "OF").
+            use_cache: Set to False to always read from Azure Tables.
 
         Returns:
             DocumentTypeEntity if found, None otherwise.
         """
-        table = get_document_types_table()
-
-        safe_code = sanitize_odata_string(code.upper())
-        query_filter = f"Code eq '{safe_code}'"
-        entities = list(table.query_entities(query_filter=query_filter))
+        code = code.upper()
+        if use_cache:
+            hit, cached = _code_cache.get(code)
+            if hit:
+                return cached
 
-        if not entities:
-            return None
+        table = get_document_types_table()
 
-        return DocumentTypeEntity(**entities[0])
+        try:
+            # Point read of the code index row
+            row = table.get_entity(partition_key="DOCTYPE", row_key=f"{CODE_INDEX_PREFIX}{code}")
+            doc_type = DocumentTypeEntity.from_code_index_row(row)
+        except ResourceNotFoundError:
+            doc_type = None
+            if settings.doctype_code_index_fallback:
+                # Types created before the index was backfilled
+                safe_code = sanitize_odata_string(code)
+                query_filter = (
+                    f"PartitionKey eq 'DOCTYPE' and Code eq '{safe_code}' "
+                    f"and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+                )
+                entities = list(table.query_entities(query_filter=query_filter))
+                doc_type = DocumentTypeEntity(**entities[0]) if entities else None
+
+        _code_cache.set(code, doc_type)
+        return doc_type
 
     @staticmethod
     def create(data: DocumentTypeCreate) -> DocumentTypeEntity:
@@ -96,8 +169,8 @@ class DocumentTypeService:
         Raises:
             ConflictError: If code already exists.
         """
-        # Check if code already exists
-        existing = DocumentTypeService.get_by_code(data.code)
+        # Check if code already exists (not from cache: another instance may have created it)
+        existing = DocumentTypeService.get_by_code(data.code, use_cache=False)
         if existing:
             raise ConflictError(f"Tipo de documento com código '{data.code}' já existe")
 
@@ -114,7 +187,19 @@ class DocumentTypeService:
             UpdatedAt=now,
         )
 
-        table.create_entity(entity.model_dump())
+        # The index row insert fails if the code is taken, so uniqueness is race-free
+        try:
+            table.submit_transaction(
+                [
+                    ("create", entity.model_dump()),
+                    ("create", entity.to_code_index_row()),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code == TableErrorCode.ENTITY_ALREADY_EXISTS:
+                raise ConflictError(f"Tipo de documento com código '{data.code}' já existe")
+            raise
+        DocumentTypeService.invalidate_cache(entity.Code)
 
         return entity
 
@@ -152,9 +237,18 @@ class DocumentTypeService:
         entity_dict.update(mapped_updates)
         entity_dict["UpdatedAt"] = datetime.utcnow()
 
-        table.update_entity(entity_dict, mode=UpdateMode.REPLACE)
+        updated = DocumentTypeEntity(**entity_dict)
 
-        return DocumentTypeEntity(**entity_dict)
+        # Upsert also creates the index row for types that predate it
+        table.submit_transaction(
+            [
+                ("update", entity_dict, {"mode": UpdateMode.REPLACE}),
+                ("upsert", updated.to_code_index_row(), {"mode": UpdateMode.REPLACE}),
+            ]
+        )
+        DocumentTypeService.invalidate_cache(doc_type.Code)
+
+        return updated
 
     @staticmethod
     def deactivate(doc_type_id: str) -> DocumentTypeEntity:
@@ -169,6 +263,7 @@ class DocumentTypeService:
         Raises:
             NotFoundError: If document type not found.
         """
+        # update() invalidates the cached entry
         return DocumentTypeService.update(doc_type_id, DocumentTypeUpdate(is_active=False))
 
     @staticmethod
@@ -184,6 +279,7 @@ class DocumentTypeService:
         Raises:
             NotFoundError: If document type not found.
         """
+        # update() invalidates the cached entry
         return DocumentTypeService.update(doc_type_id, DocumentTypeUpdate(is_active=True))
 
     @staticmethod
@@ -224,4 +320,50 @@ class DocumentTypeService:
             )
 
         table = get_document_types_table()
-        table.delete_entity(partition_key="DOCTYPE", row_key=doc_type_id)
+        try:
+            table.submit_transaction(
+                [
+                    ("delete", {"PartitionKey": "DOCTYPE", "RowKey": doc_type_id}),
+                    (
+                        "delete",
+                        {
+                            "PartitionKey": "DOCTYPE",
+                            "RowKey": f"{CODE_INDEX_PREFIX}{doc_type.Code}",
+                        },
+                    ),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code not in (
+                TableErrorCode.RESOURCE_NOT_FOUND,
+                TableErrorCode.ENTITY_NOT_FOUND,
+            ):
+                raise
+            # Type predates the code index
+            table.delete_entity(partition_key="DOCTYPE", row_key=doc_type_id)
+        DocumentTypeService.invalidate_cache(doc_type.Code)
+
+    @staticmethod
+    def backfill_code_index() -> int:
+        """Create missing code index rows for existing document types.
+
+        One-off migration for types created before the index existed. Safe to
+        run more than once.
+
+        Returns:
+            Number of index rows written.
+        """
+        table = get_document_types_table()
+        rows = [doc_type.to_code_index_row() for doc_type in DocumentTypeService.list_all()]
+
+        # All rows share the DOCTYPE partition: one transaction per TRANSACTION_LIMIT rows
+        for start in range(0, len(rows), TRANSACTION_LIMIT):
+            table.submit_transaction(
+                [
+                    ("upsert", row, {"mode": UpdateMode.REPLACE})
+                    for row in rows[start : start + TRANSACTION_LIMIT]
+                ]
+            )
+
+        DocumentTypeService.invalidate_cache()
+        return len(rows)
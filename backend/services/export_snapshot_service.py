@@ -0,0 +1,282 @@
+"""Export snapshot service for Controle PGM - gzip CSV exports of closed years."""
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Protocol
+
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+
+from core import metrics
+from core.config import get_brazil_now, is_closed_year, settings
+
+from .history_service import HistoryService
+from .number_service import NumberService
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".csv.gz"
+
+# Compressed exports up to this size are built in memory, larger ones in a temp file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+class SnapshotStore(Protocol):
+    """Where snapshots are kept: a gzip CSV body and its metadata per name."""
+
+    def metadata(self, name: str) -> dict | None:
+        """Get a snapshot's metadata, or None if there is no snapshot."""
+        ...
+
+    def read(self, name: str) -> bytes:
+        """Get a snapshot's gzip body."""
+        ...
+
+    def write(self, name: str, body: BinaryIO, metadata: dict) -> None:
+        """Replace a snapshot."""
+        ...
+
+
+class FilesystemSnapshotStore:
+    """Snapshots as "{name}.csv.gz" files next to a "{name}.json" metadata file."""
+
+    def __init__(self, directory: str):
+        self._directory = Path(directory)
+
+    def metadata(self, name: str) -> dict | None:
+        try:
+            return json.loads((self._directory / f"{name}.json").read_text("utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def read(self, name: str) -> bytes:
+        return (self._directory / f"{name}{SNAPSHOT_SUFFIX}").read_bytes()
+
+    def write(self, name: str, body: BinaryIO, metadata: dict) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        # Body first: metadata never describes a body that isn't there yet
+        self._replace(f"{name}{SNAPSHOT_SUFFIX}", body)
+        self._replace(f"{name}.json", io.BytesIO(json.dumps(metadata).encode("utf-8")))
+
+    def _replace(self, filename: str, source: BinaryIO) -> None:
+        """Write a file atomically, so readers see the old or the new one."""
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, prefix=f".{filename}.")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                shutil.copyfileobj(source, file)
+            os.replace(temp_path, self._directory / filename)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_path)
+            raise
+
+
+class BlobSnapshotStore:
+    """Snapshots as "{name}.csv.gz" blobs, metadata in the blob's metadata."""
+
+    def __init__(self, connection_string: str, container: str):
+        # Optional dependency, only needed with EXPORT_SNAPSHOT_STORAGE=blob
+        from azure.storage.blob import BlobServiceClient
+
+        service = BlobServiceClient.from_connection_string(connection_string)
+        self._container = service.get_container_client(container)
+
+    def metadata(self, name: str) -> dict | None:
+        blob = self._container.get_blob_client(f"{name}{SNAPSHOT_SUFFIX}")
+        try:
+            properties = blob.get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+        return json.loads(properties.metadata["snapshot"])
+
+    def read(self, name: str) -> bytes:
+        return self._container.download_blob(f"{name}{SNAPSHOT_SUFFIX}").readall()
+
+    def write(self, name: str, body: BinaryIO, metadata: dict) -> None:
+        from azure.storage.blob import ContentSettings
+
+        with contextlib.suppress(ResourceExistsError):
+            self._container.create_container()
+        self._container.upload_blob(
+            f"{name}{SNAPSHOT_SUFFIX}",
+            body,
+            overwrite=True,
+            metadata={"snapshot": json.dumps(metadata)},
+            content_settings=ContentSettings(content_type="text/csv; charset=utf-8"),
+        )
+
+
+@lru_cache
+def get_snapshot_store() -> SnapshotStore | None:
+    """Get the configured snapshot store (None when snapshots are off)."""
+    if settings.export_snapshot_storage == "blob":
+        return BlobSnapshotStore(
+            settings.azure_tables_connection_string, settings.export_snapshot_container
+        )
+    if settings.export_snapshot_storage == "filesystem":
+        return FilesystemSnapshotStore(settings.export_snapshot_dir)
+    return None
+
+
+class ExportSnapshotService:
+    """Gzip CSV snapshots of the exports of closed years.
+
+    An export of a whole closed year, or of one document type in it, is the
+    same CSV every time it is asked for, so the snapshot job writes it once
+    and GET /history/export serves the stored file. Each snapshot records the
+    RowKey of the newest log of each partition it covers (read from NumberLogs
+    before the export): it is only served while those are unchanged, so a late
+    correction makes it stale until the job runs again, and the export falls
+    back to reading Azure Tables.
+    """
+
+    @staticmethod
+    def snapshot_name(document_type_code: str | None, year: int) -> str:
+        """Name the snapshot of a year, or of a document type in a year."""
+        if document_type_code:
+            return f"historico_{document_type_code.upper()}_{year}"
+        return f"historico_{year}"
+
+    @staticmethod
+    def _lookup_name(
+        document_type_code: str | None = None,
+        year: int | None = None,
+        user_id: str | None = None,
+        action: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> str | None:
+        """Get the snapshot an export could be served from, or None."""
+        if get_snapshot_store() is None or not is_closed_year(year):
+            return None
+        if user_id or action or date_from or date_to:
+            return None
+        return ExportSnapshotService.snapshot_name(document_type_code, year)
+
+    @staticmethod
+    def _is_fresh(metadata: dict | None, newest: dict[str, str]) -> bool:
+        """Check a snapshot still covers every log of its partitions."""
+        return metadata is not None and bool(newest) and metadata.get("partitions") == newest
+
+    @staticmethod
+    def find(
+        document_type_code: str | None = None,
+        year: int | None = None,
+        user_id: str | None = None,
+        action: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> bytes | None:
+        """Get the gzip CSV of an export from its snapshot, if one is fresh.
+
+        Takes the same filters as HistoryService.iter_export_csv.
+
+        Returns:
+            The gzip-compressed CSV, or None to export from Azure Tables.
+        """
+        name = ExportSnapshotService._lookup_name(
+            document_type_code, year, user_id, action, date_from, date_to
+        )
+        if name is None:
+            return None
+
+        store = get_snapshot_store()
+        metadata = store.metadata(name)
+        newest = HistoryService.newest_row_keys(document_type_code, year)
+        if not ExportSnapshotService._is_fresh(metadata, newest):
+            metrics.increment("export_snapshots.misses", reason="stale" if metadata else "missing")
+            return None
+
+        metrics.increment("export_snapshots.hits")
+        return store.read(name)
+
+    @staticmethod
+    def write(document_type_code: str | None, year: int, force: bool = False) -> bool:
+        """Write the snapshot of a closed year, or of a document type in it.
+
+        Args:
+            document_type_code: Document type, or None for the whole year.
+            year: A closed year.
+            force: Rewrite the snapshot even if it is fresh.
+
+        Returns:
+            True if a snapshot was written, False if it was fresh or the
+            partitions have no logs.
+
+        Raises:
+            ValueError: If the year is not closed.
+        """
+        if not is_closed_year(year):
+            raise ValueError(f"{year} is not a closed year")
+
+        store = get_snapshot_store()
+        name = ExportSnapshotService.snapshot_name(document_type_code, year)
+        # Read before the export: a log written meanwhile makes the snapshot stale
+        newest = HistoryService.newest_row_keys(document_type_code, year)
+        if not newest:
+            return False
+        if not force and ExportSnapshotService._is_fresh(store.metadata(name), newest):
+            return False
+
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as body:
+            # mtime=0: the same history always compresses to the same bytes
+            with gzip.GzipFile(fileobj=body, mode="wb", mtime=0) as compressed:
+                for chunk in HistoryService.iter_export_csv(document_type_code, year):
+                    compressed.write(chunk)
+            body.seek(0)
+            store.write(
+                name,
+                body,
+                {
+                    "document_type_code": document_type_code,
+                    "year": year,
+                    "partitions": newest,
+                    "created_at": get_brazil_now().isoformat(),
+                },
+            )
+
+        logger.info(f"Export snapshot {name} written ({len(newest)} partitions)")
+        return True
+
+    @staticmethod
+    def snapshot_closed_years(years: list[int] | None = None, force: bool = False) -> list[str]:
+        """Write the snapshots of closed years: the whole year and each document type.
+
+        Args:
+            years: Years to snapshot (default: every closed year with a sequence).
+            force: Rewrite snapshots that are fresh.
+
+        Returns:
+            Names of the snapshots written.
+
+        Raises:
+            RuntimeError: If snapshots are off (EXPORT_SNAPSHOT_STORAGE).
+        """
+        if get_snapshot_store() is None:
+            raise RuntimeError("Export snapshots are off (EXPORT_SNAPSHOT_STORAGE)")
+
+        partitions = NumberService.list_partitions()
+        codes_by_year: dict[int, set[str]] = {}
+        for partition_key in partitions:
+            code, year = partition_key.rsplit("_", 1)
+            codes_by_year.setdefault(int(year), set()).add(code)
+
+        written = []
+        for year in sorted(years or codes_by_year):
+            if not is_closed_year(year):
+                logger.warning(f"Skipping export snapshots of {year}: not a closed year")
+                continue
+            for code in [None, *sorted(codes_by_year.get(year, ()))]:
+                if ExportSnapshotService.write(code, year, force):
+                    written.append(ExportSnapshotService.snapshot_name(code, year))
+        return written
@@ -0,0 +1,100 @@
+"""History page cache for Controle PGM - per-worker results invalidated by partition versions."""
+
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable
+from threading import Lock
+
+from core.cache import TTLCache
+from core.config import is_closed_year, settings
+from models.number_log import HistoryFilter, HistoryResponse
+
+# Version of each "{code}_{year}" partition written by this worker
+_partition_versions: dict[str, int] = {}
+_versions_lock = Lock()
+
+# No default TTL: only pages that may include an open year expire
+_page_cache: TTLCache[HistoryResponse] = TTLCache(
+    "history_pages",
+    ttl_seconds=None,
+    max_entries=4096,
+    max_weight=settings.history_cache_max_rows,
+    # One for the entry itself, so empty pages count too
+    weigh=lambda response: len(response.items) + 1,
+)
+
+
+class HistoryCache:
+    """Per-worker cache of history listings.
+
+    Keys hold the normalized filters and the version of every partition the
+    filters can read, so a log written by this worker (NumberService bumps its
+    partition) makes the cached pages of that partition unreachable at once,
+    while pages of other partitions stay cached. Writes from other instances
+    are only seen once the TTL runs out, except for closed years: they never
+    change after January, so their pages stay until evicted.
+    """
+
+    @staticmethod
+    def bump(partition_keys: Iterable[str]) -> None:
+        """Invalidate the cached pages of partitions that were just written."""
+        with _versions_lock:
+            for partition_key in set(partition_keys):
+                _partition_versions[partition_key] = _partition_versions.get(partition_key, 0) + 1
+
+    @staticmethod
+    def _versions(filters: HistoryFilter) -> tuple[tuple[str, int], ...]:
+        """Get the versions of the written partitions the filters can read."""
+        code = filters.document_type_code
+        year = str(filters.year) if filters.year else None
+        with _versions_lock:
+            return tuple(
+                sorted(
+                    (partition_key, version)
+                    for partition_key, version in _partition_versions.items()
+                    if (not code or partition_key.rsplit("_", 1)[0] == code)
+                    and (not year or partition_key.rsplit("_", 1)[1] == year)
+                )
+            )
+
+    @staticmethod
+    def key(kind: str, filters: HistoryFilter, *args: Hashable) -> Hashable:
+        """Build the cache key of a listing.
+
+        Args:
+            kind: Listing method, so page-number and cursor pages don't mix.
+            filters: The listing's filters.
+            *args: Other arguments of the listing (cursor, include_total).
+        """
+        normalized = filters.model_copy(
+            update={
+                "document_type_code": (
+                    filters.document_type_code.upper() if filters.document_type_code else None
+                )
+            }
+        )
+        return (
+            kind,
+            tuple(sorted(normalized.model_dump().items())),
+            args,
+            HistoryCache._versions(normalized),
+        )
+
+    @staticmethod
+    def get(key: Hashable) -> HistoryResponse | None:
+        """Get a cached listing (None on a miss)."""
+        _, response = _page_cache.get(key)
+        return response
+
+    @staticmethod
+    def set(key: Hashable, filters: HistoryFilter, response: HistoryResponse) -> None:
+        """Cache a listing, until evicted if it only covers closed years."""
+        if is_closed_year(filters.year):
+            _page_cache.set(key, response)
+        else:
+            _page_cache.set(key, response, ttl_seconds=settings.history_cache_ttl_seconds)
+
+    @staticmethod
+    def clear() -> None:
+        """Drop every cached listing (tests, maintenance scripts)."""
+        _page_cache.invalidate()
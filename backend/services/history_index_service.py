@@ -0,0 +1,249 @@
+"""History index service for Controle PGM - maintains secondary partitions of number logs."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable
+from threading import Lock
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableClient, UpdateMode
+
+from core import metrics
+from core.config import settings
+from core.retry import RetryPolicy
+from core.tables import TRANSACTION_LIMIT, get_history_index_table, get_number_logs_table
+from models.number_log import NumberLogEntity
+
+logger = logging.getLogger(__name__)
+
+# NumberLogs rows read per page while backfilling (1000 is the service maximum)
+BACKFILL_PAGE_SIZE = 1000
+
+# HistoryIndex partition of the logs whose index rows could not be written; each
+# marker row names one log ("{PartitionKey}|{RowKey}" of the log)
+REPAIR_PARTITION = "REPAIR"
+REPAIR_FILTER = f"PartitionKey eq '{REPAIR_PARTITION}'"
+
+# Backoff of the index writes; the deadline is HISTORY_INDEX_RETRY_DEADLINE_MS
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 1.0
+
+# Per-worker view of the REPAIR partition: HistoryIndex only serves reads while
+# it is known to hold every log, so it starts as "pending" until first checked
+_repair_lock = Lock()
+_repairs_pending = True
+_repairs_checked_at: float | None = None
+
+
+class HistoryIndexService:
+    """Service for the HistoryIndex table.
+
+    Every log row is copied into index partitions (see
+    NumberLogEntity.to_index_rows) so history queries that don't name a
+    "{code}_{year}" partition can still read a single partition.
+
+    Index writes are retried until HISTORY_INDEX_RETRY_DEADLINE_MS; logs still
+    not indexed get a marker in the REPAIR partition, and HistoryQueryPlanner
+    keeps reading NumberLogs while any marker exists (repairs_pending) until
+    repair() or backfill() replays them.
+    """
+
+    @staticmethod
+    def _group_operations(rows: Iterable[dict]) -> list[list[tuple]]:
+        """Group index rows into upsert transactions of one partition each."""
+        by_partition: dict[str, list[dict]] = {}
+        for row in rows:
+            by_partition.setdefault(row["PartitionKey"], []).append(row)
+
+        transactions = []
+        for partition_rows in by_partition.values():
+            for start in range(0, len(partition_rows), TRANSACTION_LIMIT):
+                # Upsert: indexing the same log twice (retries, backfill) is harmless
+                transactions.append(
+                    [
+                        ("upsert", row, {"mode": UpdateMode.REPLACE})
+                        for row in partition_rows[start : start + TRANSACTION_LIMIT]
+                    ]
+                )
+        return transactions
+
+    @staticmethod
+    def _write_rows(table: TableClient, rows: Iterable[dict]) -> None:
+        """Upsert index rows, batched per partition."""
+        for operations in HistoryIndexService._group_operations(rows):
+            table.submit_transaction(operations)
+
+    @staticmethod
+    def _get_retry_policy() -> RetryPolicy:
+        """Build the retry policy of the index writes."""
+        return RetryPolicy(
+            base_delay=RETRY_BASE_DELAY,
+            max_delay=RETRY_MAX_DELAY,
+            deadline=settings.history_index_retry_deadline_ms / 1000,
+        )
+
+    @staticmethod
+    def _repair_markers(logs: Iterable[NumberLogEntity]) -> list[dict]:
+        """Build the REPAIR rows naming logs that are missing from the index."""
+        return [
+            {
+                "PartitionKey": REPAIR_PARTITION,
+                "RowKey": f"{log.PartitionKey}|{log.RowKey}",
+                "LogPartitionKey": log.PartitionKey,
+                "LogRowKey": log.RowKey,
+            }
+            for log in logs
+        ]
+
+    @staticmethod
+    def _on_index_failure(logs: list[NumberLogEntity], error: Exception) -> list[dict]:
+        """Stop trusting the index in this worker and build the repair markers."""
+        metrics.increment("history_index.failures")
+        logger.warning(f"History index not updated, marking {len(logs)} log(s) for repair: {error}")
+        HistoryIndexService._set_repairs_pending(True)
+        return HistoryIndexService._repair_markers(logs)
+
+    @staticmethod
+    def _on_marker_failure(markers: list[dict], error: Exception) -> None:
+        """Report logs that are neither indexed nor marked for repair."""
+        metrics.increment("history_index.unrepaired", len(markers))
+        logger.error(
+            "History index repair markers not written, run "
+            f"scripts/backfill_indexes.py history ({', '.join(m['RowKey'] for m in markers)}): "
+            f"{error}"
+        )
+
+    @staticmethod
+    def index_logs(logs: list[NumberLogEntity]) -> None:
+        """Copy committed log rows into their index partitions.
+
+        Never raises: the logs are already written. Failures are retried until
+        HISTORY_INDEX_RETRY_DEADLINE_MS, then the logs are marked for repair.
+
+        Args:
+            logs: Log rows that were just written to NumberLogs.
+        """
+        if not logs:
+            return
+
+        rows = [row for log in logs for row in log.to_index_rows()]
+        retry = HistoryIndexService._get_retry_policy().start()
+        while True:
+            retry.attempts += 1
+            try:
+                # Upserts: rewriting rows of a failed attempt is harmless
+                HistoryIndexService._write_rows(get_history_index_table(), rows)
+                return
+            except Exception as e:
+                error = e
+            delay = retry.next_delay()
+            if delay is None:
+                break
+            time.sleep(delay)
+
+        markers = HistoryIndexService._on_index_failure(logs, error)
+        try:
+            HistoryIndexService._write_rows(get_history_index_table(), markers)
+        except Exception as e:
+            HistoryIndexService._on_marker_failure(markers, e)
+
+    @staticmethod
+    def _repair_check_due() -> bool:
+        """Whether this worker's view of the REPAIR partition has expired."""
+        return (
+            _repairs_checked_at is None
+            or time.monotonic() - _repairs_checked_at >= settings.history_index_repair_check_seconds
+        )
+
+    @staticmethod
+    def _set_repairs_pending(pending: bool) -> None:
+        """Record whether the REPAIR partition holds markers, as of now."""
+        global _repairs_pending, _repairs_checked_at
+        with _repair_lock:
+            _repairs_pending = pending
+            _repairs_checked_at = time.monotonic()
+
+    @staticmethod
+    def repairs_pending() -> bool:
+        """Whether HistoryIndex may be missing logs (no I/O, see check_repairs)."""
+        return _repairs_pending or HistoryIndexService._repair_check_due()
+
+    @staticmethod
+    def check_repairs() -> None:
+        """Refresh repairs_pending from the REPAIR partition.
+
+        Reads at most one row, once per HISTORY_INDEX_REPAIR_CHECK_SECONDS, and
+        only when the index may serve reads (HISTORY_INDEX_FALLBACK=false).
+        """
+        if settings.history_index_fallback or not HistoryIndexService._repair_check_due():
+            return
+
+        try:
+            markers = get_history_index_table().query_entities(
+                query_filter=REPAIR_FILTER, select=["RowKey"], results_per_page=1
+            )
+            pending = next(iter(markers), None) is not None
+        except Exception as e:
+            logger.warning(f"History index repairs not checked: {e}")
+            pending = True
+        HistoryIndexService._set_repairs_pending(pending)
+
+    @staticmethod
+    def repair() -> int:
+        """Index the logs marked for repair and remove their markers.
+
+        Safe to run repeatedly and while the API is live.
+
+        Returns:
+            Number of logs indexed.
+        """
+        index_table = get_history_index_table()
+        logs_table = get_number_logs_table()
+
+        repaired = 0
+        for marker in list(index_table.query_entities(query_filter=REPAIR_FILTER)):
+            try:
+                entity = logs_table.get_entity(marker["LogPartitionKey"], marker["LogRowKey"])
+            except ResourceNotFoundError:
+                entity = None
+            if entity is not None:
+                HistoryIndexService._write_rows(
+                    index_table, NumberLogEntity(**entity).to_index_rows()
+                )
+                repaired += 1
+            # After the index rows: if they fail, the marker stays for the next run
+            index_table.delete_entity(REPAIR_PARTITION, marker["RowKey"])
+        return repaired
+
+    @staticmethod
+    def backfill() -> int:
+        """Index every existing log row.
+
+        One-off migration for logs written before the index existed; also
+        clears the repair markers written before it started. Safe to run
+        repeatedly and while the API is live.
+
+        Returns:
+            Number of log rows indexed.
+        """
+        table = get_history_index_table()
+        # Markers written before the scan: the scan indexes their logs too
+        markers = [marker["RowKey"] for marker in table.query_entities(query_filter=REPAIR_FILTER)]
+        # SEQUENCE rows share the partitions in the colocated layout
+        logs = get_number_logs_table().query_entities(
+            query_filter="RowKey ne 'SEQUENCE'", results_per_page=BACKFILL_PAGE_SIZE
+        )
+
+        indexed = 0
+        for page in logs.by_page():
+            entities = [NumberLogEntity(**e) for e in page]
+            HistoryIndexService._write_rows(
+                table, (row for log in entities for row in log.to_index_rows())
+            )
+            indexed += len(entities)
+
+        for row_key in markers:
+            table.delete_entity(REPAIR_PARTITION, row_key)
+        return indexed
@@ -0,0 +1,257 @@
+"""History query planner for Controle PGM - picks the cheapest scan for a history filter."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time, timedelta
+from typing import Literal
+
+from core import metrics
+from core.config import BRAZIL_TZ, settings
+from core.security import sanitize_odata_string
+from core.tables import TABLE_HISTORY_INDEX, TABLE_NUMBER_LOGS
+from models.number_log import HistoryFilter, user_index_partition, year_index_partition
+from services.history_index_service import HistoryIndexService
+
+logger = logging.getLogger(__name__)
+
+# Cheapest first: one partition, a contiguous range of partitions, one query per
+# partition (a merge), every partition
+ScanKind = Literal["partition", "partition_range", "partitions", "table"]
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """How a history query is read from Azure Tables."""
+
+    table: str
+    filter: str | None  # None reads the whole table
+    scan: ScanKind
+    target: str  # Partition, partition range or table the scan covers
+    row_filter: str | None = None  # The conditions on rows, without the partition selection
+    partition_count: int | None = None  # Partitions queried by a "partitions" scan
+
+    @property
+    def is_full_scan(self) -> bool:
+        """Whether every partition of the table is read."""
+        return self.scan == "table"
+
+    @property
+    def spans_partitions(self) -> bool:
+        """Whether the rows come from more than one partition."""
+        return self.scan != "partition"
+
+    @property
+    def query_id(self) -> str:
+        """Identify the query, so a cursor is only reused for the same plan."""
+        return f"{self.table}:{self.filter}"
+
+    def explain(self) -> str:
+        """Describe the plan for logs."""
+        return f"{self.scan} scan of {self.table} ({self.target}): {self.filter or 'no filter'}"
+
+
+class HistoryQueryPlanner:
+    """Turns a HistoryFilter into the cheapest QueryPlan.
+
+    In order of preference:
+    - document type and year: the "{code}_{year}" NumberLogs partition;
+    - user or year, once HistoryIndex is backfilled (HISTORY_INDEX_FALLBACK=false)
+      and no log is waiting for an index repair: the user's or the year's
+      HistoryIndex partition;
+    - document type only: the "{code}_*" NumberLogs partition range (codes
+      are [A-Z0-9]+, so "{code}_" to "{code}_~" holds exactly its years);
+    - anything else: a NumberLogs table scan.
+
+    Date filters become RowKey bounds on every plan. A plan spanning several
+    partitions can be narrowed to each of them (partition_plan) so their
+    newest-first streams are merged instead of read in partition order.
+    """
+
+    @staticmethod
+    def plan(filters: HistoryFilter) -> QueryPlan:
+        """Choose the table, filter and scan for a history query."""
+        plan = HistoryQueryPlanner._index_plan(filters) or HistoryQueryPlanner._log_plan(filters)
+        logger.debug(f"History query plan: {plan.explain()}")
+        return plan
+
+    @staticmethod
+    def record(plan: QueryPlan, read: int, returned: int) -> None:
+        """Report what a planned query cost.
+
+        Args:
+            plan: The plan that was executed.
+            read: Entities received from Azure Tables (count queries included).
+            returned: Entities returned to the caller.
+        """
+        metrics.increment("history.queries", scan=plan.scan, table=plan.table)
+        metrics.increment("history.entities_read", read, scan=plan.scan)
+        metrics.increment("history.entities_returned", returned, scan=plan.scan)
+        if plan.partition_count:
+            metrics.increment("history.partitions_read", plan.partition_count, table=plan.table)
+        logger.debug(f"History query {plan.explain()}: {read} entities read, {returned} returned")
+
+    @staticmethod
+    def _index_plan(filters: HistoryFilter) -> QueryPlan | None:
+        """Plan a HistoryIndex read, or None if the query isn't served by the index."""
+        if settings.history_index_fallback or HistoryIndexService.repairs_pending():
+            return None
+        if filters.document_type_code and filters.year:
+            # Already a single NumberLogs partition
+            return None
+
+        filter_parts = []
+
+        if filters.user_id:
+            safe_user_id = sanitize_odata_string(filters.user_id)
+            partition_key = user_index_partition(safe_user_id)
+            filter_parts.append(f"PartitionKey eq '{partition_key}'")
+            if filters.year:
+                filter_parts.append(f"Year eq {filters.year}")
+        elif filters.year:
+            partition_key = year_index_partition(filters.year)
+            filter_parts.append(f"PartitionKey eq '{partition_key}'")
+        else:
+            return None
+
+        filter_parts.extend(HistoryQueryPlanner._row_key_bounds(filters.date_from, filters.date_to))
+
+        if filters.document_type_code:
+            safe_code = sanitize_odata_string(filters.document_type_code)
+            filter_parts.append(f"DocumentTypeCode eq '{safe_code}'")
+
+        if filters.action:
+            safe_action = sanitize_odata_string(filters.action)
+            filter_parts.append(f"Action eq '{safe_action}'")
+
+        return QueryPlan(
+            table=TABLE_HISTORY_INDEX,
+            filter=" and ".join(filter_parts),
+            scan="partition",
+            target=partition_key,
+        )
+
+    @staticmethod
+    def _log_plan(filters: HistoryFilter) -> QueryPlan:
+        """Plan a NumberLogs read."""
+        # Build OData filter query with sanitized inputs
+        partition_parts = []
+
+        if filters.document_type_code and filters.year:
+            # Query specific partition
+            safe_code = sanitize_odata_string(filters.document_type_code)
+            partition_key = f"{safe_code}_{filters.year}"
+            partition_parts.append(f"PartitionKey eq '{partition_key}'")
+            scan, target = "partition", partition_key
+        elif filters.document_type_code:
+            # Every year of the type: a contiguous range of partitions
+            safe_code = sanitize_odata_string(filters.document_type_code)
+            partition_parts.append(
+                f"PartitionKey ge '{safe_code}_' and PartitionKey lt '{safe_code}_~'"
+            )
+            scan, target = "partition_range", f"{safe_code}_*"
+        elif filters.year:
+            # Query by year (integer, no sanitization needed)
+            partition_parts.append(f"Year eq {filters.year}")
+            scan, target = "table", TABLE_NUMBER_LOGS
+        else:
+            scan, target = "table", TABLE_NUMBER_LOGS
+
+        row_parts = HistoryQueryPlanner._row_key_bounds(filters.date_from, filters.date_to)
+
+        if filters.user_id:
+            safe_user_id = sanitize_odata_string(filters.user_id)
+            row_parts.append(f"UserId eq '{safe_user_id}'")
+
+        if filters.action:
+            safe_action = sanitize_odata_string(filters.action)
+            row_parts.append(f"Action eq '{safe_action}'")
+
+        if settings.sequence_storage_layout == "colocated":
+            # SEQUENCE rows share the NumberLogs partitions with the log rows
+            row_parts.append("RowKey ne 'SEQUENCE'")
+
+        filter_parts = partition_parts + row_parts
+        return QueryPlan(
+            table=TABLE_NUMBER_LOGS,
+            filter=" and ".join(filter_parts) if filter_parts else None,
+            scan=scan,
+            target=target,
+            row_filter=" and ".join(row_parts) if row_parts else None,
+        )
+
+    @staticmethod
+    def partition_plan(
+        plan: QueryPlan, partition_key: str, after_row_key: str | None = None
+    ) -> QueryPlan:
+        """Narrow a multi-partition plan to one of its partitions.
+
+        Args:
+            plan: A plan that spans partitions.
+            partition_key: One of the partitions it covers.
+            after_row_key: Only read rows older than this RowKey (resuming a merge).
+
+        Returns:
+            A single-partition plan with the same row conditions.
+        """
+        filter_parts = [f"PartitionKey eq '{sanitize_odata_string(partition_key)}'"]
+        if after_row_key is not None:
+            filter_parts.append(f"RowKey gt '{sanitize_odata_string(after_row_key)}'")
+        if plan.row_filter:
+            filter_parts.append(plan.row_filter)
+
+        return QueryPlan(
+            table=plan.table,
+            filter=" and ".join(filter_parts),
+            scan="partition",
+            target=partition_key,
+            row_filter=plan.row_filter,
+        )
+
+    @staticmethod
+    def merged_plan(plan: QueryPlan, partitions: list[str]) -> QueryPlan:
+        """Describe how a plan was run, for record.
+
+        Args:
+            plan: The planned query.
+            partitions: Partitions it was merged from (one partition_plan
+                        query each), or [] if it ran as planned.
+
+        Returns:
+            A "partitions" scan of that many partitions, or the plan itself.
+        """
+        if not partitions:
+            return plan
+        return replace(
+            plan,
+            scan="partitions",
+            target=f"{len(partitions)} partitions of {plan.target}",
+            partition_count=len(partitions),
+        )
+
+    @staticmethod
+    def _row_key_bounds(date_from: date | None, date_to: date | None) -> list[str]:
+        """Build RowKey bounds selecting the logs created between two days.
+
+        Log RowKeys start with the inverse creation timestamp, so a date range
+        is a contiguous RowKey range: the server reads only that slice of each
+        partition instead of the client filtering on CreatedAt.
+
+        Args:
+            date_from: First day (Brazil time), inclusive.
+            date_to: Last day (Brazil time), inclusive.
+
+        Returns:
+            Filter parts to AND into the query (empty without dates).
+        """
+        bounds = []
+        if date_to:
+            # Created before the next day: ts <= end - 1, inverse >= 9999999999 - end + 1
+            end = datetime.combine(date_to + timedelta(days=1), time(), tzinfo=BRAZIL_TZ)
+            bounds.append(f"RowKey ge '{9999999999 - int(end.timestamp()) + 1}'")
+        if date_from:
+            # Created at or after start: inverse <= 9999999999 - start, so below the next inverse
+            start = datetime.combine(date_from, time(), tzinfo=BRAZIL_TZ)
+            bounds.append(f"RowKey lt '{9999999999 - int(start.timestamp()) + 1}'")
+        return bounds
@@ -3,16 +3,135 @@
 from __future__ import annotations
 
 import csv
+import heapq
 import io
-
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from itertools import islice
+from operator import itemgetter
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableClient
+
+from core.exceptions import BadRequestError
+from core.fanout import PartitionTimings, concurrency_limit, map_partitions
+from core.pagination import decode_cursor, encode_cursor
 from core.security import sanitize_odata_string
-from core.tables import get_number_logs_table
+from core.tables import get_number_logs_table, get_table_client
 from models.number_log import (
     HistoryFilter,
     HistoryResponse,
     NumberLogEntity,
     NumberLogResponse,
+    NumberLogRow,
+    decode_log_id,
 )
+from services.history_cache import HistoryCache
+from services.history_index_service import HistoryIndexService
+from services.history_query_planner import HistoryQueryPlanner, QueryPlan
+from services.history_stats_service import HistoryStatsService
+from services.number_service import NumberService
+
+# Columns read from NumberLogs / HistoryIndex: only what a response uses
+LOG_COLUMNS = NumberLogResponse.ENTITY_COLUMNS
+
+# Rows requested per Azure Tables page while exporting (1000 is the service maximum)
+EXPORT_PAGE_SIZE = 1000
+
+# Log RowKeys start with the inverse timestamp: ascending RowKey is newest first
+_row_key = itemgetter("RowKey")
+
+CSV_HEADER = [
+    "Data/Hora",
+    "Tipo Documento",
+    "Ano",
+    "Número",
+    "Ação",
+    "Usuário",
+    "Número Anterior",
+    "Observações",
+]
+
+
+class PartitionMerge:
+    """Newest-first k-way merge of single-partition queries.
+
+    Each partition returns its rows in RowKey order, which is newest first, so
+    heapq.merge of the partition streams yields the N newest rows overall after
+    reading about N rows of each partition, without sorting anything.
+
+    The first page of every partition is requested at once on a bounded thread
+    pool (see core.fanout). With read_ahead, each partition's next page is
+    fetched while the current one is merged; use it when the whole result is
+    read. Use as a context manager: closing drops pending page requests and
+    logs the time spent on each partition.
+    """
+
+    def __init__(
+        self,
+        table: TableClient,
+        plans: list[QueryPlan],
+        per_page: int | None = None,
+        read_ahead: bool = False,
+    ):
+        """
+        Args:
+            table: Table the plans read.
+            plans: One single-partition plan per partition.
+            per_page: Rows asked for per service page of each partition.
+            read_ahead: Fetch each partition's next page before it is needed.
+        """
+        self.read = 0  # Rows received from Azure Tables so far
+        self._read_ahead = read_ahead
+        self._timings = PartitionTimings("History merge")
+        self._pool = ThreadPoolExecutor(max_workers=concurrency_limit(len(plans)))
+
+        streams = []
+        for plan in plans:
+            pages = table.query_entities(
+                query_filter=plan.filter, select=LOG_COLUMNS, results_per_page=per_page
+            ).by_page()
+            first = self._pool.submit(self._fetch, plan.target, pages)
+            streams.append(self._partition_rows(plan.target, pages, first))
+        self._rows = heapq.merge(*streams, key=_row_key)
+
+    def _fetch(self, partition: str, pages: Iterator) -> list[dict] | None:
+        """Read the next page of a partition (None once it is exhausted)."""
+        start = time.perf_counter()
+        page = next(pages, None)
+        rows = None if page is None else list(page)
+        self._timings.add(partition, time.perf_counter() - start, len(rows or ()))
+        return rows
+
+    def _partition_rows(self, partition: str, pages: Iterator, pending: Future) -> Iterator[dict]:
+        """Stream one partition page by page."""
+        while True:
+            rows = pending.result()
+            if rows is None:
+                return
+            self.read += len(rows)
+            if self._read_ahead:
+                pending = self._pool.submit(self._fetch, partition, pages)
+                yield from rows
+            else:
+                yield from rows
+                pending = self._pool.submit(self._fetch, partition, pages)
+
+    def __iter__(self) -> Iterator[dict]:
+        return self._rows
+
+    def __enter__(self) -> PartitionMerge:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop reading and log the time spent on each partition."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._timings.log()
 
 
 class HistoryService:
@@ -28,59 +147,269 @@ class HistoryService:
         Returns:
             HistoryResponse with paginated items and metadata.
         """
-        table = get_number_logs_table()
+        cache_key = HistoryCache.key("list", filters)
+        cached = HistoryCache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        # Build OData filter query with sanitized inputs
-        filter_parts = []
-
-        if filters.document_type_code and filters.year:
-            # Query specific partition
-            safe_code = sanitize_odata_string(filters.document_type_code)
-            partition_key = f"{safe_code}_{filters.year}"
-            filter_parts.append(f"PartitionKey eq '{partition_key}'")
-        elif filters.document_type_code:
-            # Query by document type prefix
-            safe_code = sanitize_odata_string(filters.document_type_code)
-            filter_parts.append(f"DocumentTypeCode eq '{safe_code}'")
-        elif filters.year:
-            # Query by year (integer, no sanitization needed)
-            filter_parts.append(f"Year eq {filters.year}")
-
-        if filters.user_id:
-            safe_user_id = sanitize_odata_string(filters.user_id)
-            filter_parts.append(f"UserId eq '{safe_user_id}'")
-
-        if filters.action:
-            safe_action = sanitize_odata_string(filters.action)
-            filter_parts.append(f"Action eq '{safe_action}'")
-
-        # Combine filters
-        filter_query = " and ".join(filter_parts) if filter_parts else None
+        response = HistoryService._list_history(filters)
+        HistoryCache.set(cache_key, filters, response)
+        return response
+
+    @staticmethod
+    def _list_history(filters: HistoryFilter) -> HistoryResponse:
+        """Read a page-number listing from Azure Tables."""
+        plan = HistoryService._plan(filters)
+        table = get_table_client(plan.table)
+
+        partitions = HistoryService._merge_partitions(plan, filters)
+        if partitions:
+            with PartitionMerge(
+                table,
+                [HistoryQueryPlanner.partition_plan(plan, p) for p in partitions],
+                read_ahead=True,
+            ) as merged:
+                response = HistoryService._build_response(merged, filters)
+            HistoryQueryPlanner.record(
+                HistoryQueryPlanner.merged_plan(plan, partitions),
+                read=merged.read,
+                returned=len(response.items),
+            )
+            return response
 
         # Query Azure Tables
-        if filter_query:
-            entities = list(table.query_entities(query_filter=filter_query))
+        if plan.filter:
+            entities = list(table.query_entities(query_filter=plan.filter, select=LOG_COLUMNS))
         else:
-            entities = list(table.list_entities())
+            entities = list(table.list_entities(select=LOG_COLUMNS))
 
         # Sort by RowKey (inverse timestamp - newest first)
-        entities.sort(key=lambda e: e.get("RowKey", ""), reverse=False)
+        entities.sort(key=_row_key)
+        response = HistoryService._build_response(entities, filters)
+        HistoryQueryPlanner.record(plan, read=len(entities), returned=len(response.items))
+        return response
 
-        # Convert to response models
-        all_items = [
-            NumberLogResponse.from_entity(NumberLogEntity(**entity)) for entity in entities
-        ]
+    @staticmethod
+    def list_history_page(
+        filters: HistoryFilter,
+        cursor: str | None = None,
+        include_total: bool = False,
+    ) -> HistoryResponse:
+        """List one page of number logs, resuming from a cursor.
 
-        # Apply pagination
-        total = len(all_items)
-        total_pages = (total + filters.page_size - 1) // filters.page_size if total > 0 else 1
+        Rows come newest first. A single partition is read in storage order, at
+        most filters.page_size rows; queries spanning several partitions merge
+        them (see PartitionMerge), reading up to page_size + 1 rows of each.
+
+        Args:
+            filters: Filter parameters; page is ignored.
+            cursor: next_cursor of the previous page, or None for the first page.
+            include_total: Also count every matching row (scans the whole range).
+
+        Returns:
+            HistoryResponse with the page items and the cursor for the next page.
+
+        Raises:
+            BadRequestError: If the cursor is invalid or belongs to other filters.
+        """
+        cache_key = HistoryCache.key(
+            "page", filters.model_copy(update={"page": 1}), cursor, include_total
+        )
+        cached = HistoryCache.get(cache_key)
+        if cached is not None:
+            return cached
 
+        response = HistoryService._list_history_page(filters, cursor, include_total)
+        HistoryCache.set(cache_key, filters, response)
+        return response
+
+    @staticmethod
+    def _list_history_page(
+        filters: HistoryFilter, cursor: str | None, include_total: bool
+    ) -> HistoryResponse:
+        """Read one cursor page from Azure Tables."""
+        plan = HistoryService._plan(filters)
+        filter_query = plan.filter
+        table = get_table_client(plan.table)
+
+        partitions = HistoryService._merge_partitions(plan, filters)
+        if partitions:
+            return HistoryService._list_merged_page(
+                table, plan, partitions, filters, cursor, include_total
+            )
+
+        # The cursor is only valid for the same table and filter
+        token = decode_cursor(cursor, plan.query_id) if cursor else None
+
+        entities: list[dict] = []
+        while len(entities) < filters.page_size:
+            # A service page can come back short (partition boundaries, server
+            # timeouts): ask only for what is still missing so the token stays exact
+            remaining = filters.page_size - len(entities)
+            if filter_query:
+                pager = table.query_entities(
+                    query_filter=filter_query, select=LOG_COLUMNS, results_per_page=remaining
+                ).by_page(continuation_token=token)
+            else:
+                pager = table.list_entities(select=LOG_COLUMNS, results_per_page=remaining).by_page(
+                    continuation_token=token
+                )
+            entities.extend(next(pager))
+            token = pager.continuation_token
+            if not token:
+                break
+
+        total = None
+        if include_total:
+            if filter_query:
+                rows = table.query_entities(query_filter=filter_query, select=["RowKey"])
+            else:
+                rows = table.list_entities(select=["RowKey"])
+            total = sum(1 for _ in rows)
+
+        HistoryQueryPlanner.record(plan, read=len(entities) + (total or 0), returned=len(entities))
+        return HistoryService._build_cursor_response(entities, filters, token, plan.query_id, total)
+
+    @staticmethod
+    def recent_activity(
+        limit: int = 20,
+        document_type_code: str | None = None,
+        year: int | None = None,
+    ) -> list[NumberLogRow]:
+        """Get the newest log rows across every matching partition.
+
+        The first page of the newest-first merge, so about `limit` rows are
+        read from each partition however large the history is.
+
+        Args:
+            limit: Number of rows to return.
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Log rows, newest first.
+        """
+        filters = HistoryFilter(document_type_code=document_type_code, year=year, page_size=limit)
+        return HistoryService.list_history_page(filters).items
+
+    @staticmethod
+    def _plan(filters: HistoryFilter) -> QueryPlan:
+        """Plan a history query, once the HistoryIndex repair state is current."""
+        HistoryIndexService.check_repairs()
+        return HistoryQueryPlanner.plan(filters)
+
+    @staticmethod
+    def _merge_partitions(plan: QueryPlan, filters: HistoryFilter) -> list[str]:
+        """Get the partitions to merge for a plan, or [] to run it as one query."""
+        if not plan.spans_partitions:
+            return []
+        return NumberService.list_partitions(filters.document_type_code, filters.year)
+
+    @staticmethod
+    def _merge_query_id(plan: QueryPlan) -> str:
+        """Identify a merged query: its cursors hold a RowKey, not a continuation token."""
+        return f"{plan.query_id}:merge"
+
+    @staticmethod
+    def _resume_after(cursor: str | None, plan: QueryPlan) -> str | None:
+        """Get the last RowKey returned before a merged-page cursor."""
+        if not cursor:
+            return None
+        row_key = decode_cursor(cursor, HistoryService._merge_query_id(plan)).get("rk")
+        if not isinstance(row_key, str):
+            raise BadRequestError("Cursor de paginação inválido")
+        return row_key
+
+    @staticmethod
+    def _cut_merged_page(
+        rows: list[dict], filters: HistoryFilter
+    ) -> tuple[list[dict], dict | None]:
+        """Keep page_size of the page_size + 1 rows read, and the token past them."""
+        entities = rows[: filters.page_size]
+        # RowKeys are unique across partitions, so the last one is a position in the merge
+        more = len(rows) > filters.page_size
+        return entities, {"rk": entities[-1]["RowKey"]} if more else None
+
+    @staticmethod
+    def _list_merged_page(
+        table: TableClient,
+        plan: QueryPlan,
+        partitions: list[str],
+        filters: HistoryFilter,
+        cursor: str | None,
+        include_total: bool,
+    ) -> HistoryResponse:
+        """Read one page of the newest-first merge of several partitions."""
+        after = HistoryService._resume_after(cursor, plan)
+        partition_plans = [HistoryQueryPlanner.partition_plan(plan, p, after) for p in partitions]
+
+        with PartitionMerge(table, partition_plans, per_page=filters.page_size + 1) as merged:
+            entities, token = HistoryService._cut_merged_page(
+                list(islice(merged, filters.page_size + 1)), filters
+            )
+
+        read = merged.read
+        total = None
+        if include_total:
+            # Counted per partition too: plan.filter alone may be a table scan
+            def count(partition_key: str) -> list[dict]:
+                query_filter = HistoryQueryPlanner.partition_plan(plan, partition_key).filter
+                return list(table.query_entities(query_filter=query_filter, select=["RowKey"]))
+
+            total = sum(map(len, map_partitions(count, partitions, "History merge total")))
+            read += total
+
+        HistoryQueryPlanner.record(
+            HistoryQueryPlanner.merged_plan(plan, partitions), read=read, returned=len(entities)
+        )
+        return HistoryService._build_cursor_response(
+            entities, filters, token, HistoryService._merge_query_id(plan), total
+        )
+
+    @staticmethod
+    def _build_cursor_response(
+        entities: list[dict],
+        filters: HistoryFilter,
+        token: dict | None,
+        query_id: str,
+        total: int | None,
+    ) -> HistoryResponse:
+        """Build a cursor page from the rows read and the pager's next token."""
+        return HistoryResponse.model_construct(
+            items=[NumberLogRow.from_row(e) for e in entities],
+            total=total,
+            page=None,
+            total_pages=None,
+            page_size=filters.page_size,
+            next_cursor=encode_cursor(token, query_id) if token else None,
+        )
+
+    @staticmethod
+    def _build_response(rows: Iterable[dict], filters: HistoryFilter) -> HistoryResponse:
+        """Count newest-first log rows and cut the requested page.
+
+        Only the page's rows are kept; the others are just counted.
+        """
         start_idx = (filters.page - 1) * filters.page_size
         end_idx = start_idx + filters.page_size
-        page_items = all_items[start_idx:end_idx]
 
-        return HistoryResponse(
-            items=page_items,
+        total = 0
+        page_entities = []
+        for total, entity in enumerate(rows, 1):
+            if start_idx < total <= end_idx:
+                page_entities.append(entity)
+
+        return HistoryService._build_page_response(page_entities, total, filters)
+
+    @staticmethod
+    def _build_page_response(
+        page_entities: list[dict], total: int, filters: HistoryFilter
+    ) -> HistoryResponse:
+        """Build a page-number response from the page's rows and the row count."""
+        total_pages = (total + filters.page_size - 1) // filters.page_size if total > 0 else 1
+
+        return HistoryResponse.model_construct(
+            items=[NumberLogRow.from_row(entity) for entity in page_entities],
             total=total,
             page=filters.page,
             page_size=filters.page_size,
@@ -93,6 +422,8 @@ class HistoryService:
         year: int | None = None,
         user_id: str | None = None,
         action: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
     ) -> str:
         """Export history to CSV format.
 
@@ -101,42 +432,160 @@ class HistoryService:
             year: Optional filter by year.
             user_id: Optional filter by user.
             action: Optional filter by action type.
+            date_from: Optional first day, inclusive.
+            date_to: Optional last day, inclusive.
 
         Returns:
             CSV string with all matching records.
         """
-        # Get all records matching filters (no pagination for export)
-        filters = HistoryFilter(
+        chunks = HistoryService.iter_export_csv(
+            document_type_code, year, user_id, action, date_from, date_to
+        )
+        return b"".join(chunks).decode("utf-8-sig")
+
+    @staticmethod
+    def iter_export_csv(
+        document_type_code: str | None = None,
+        year: int | None = None,
+        user_id: str | None = None,
+        action: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> Iterator[bytes]:
+        """Stream history as UTF-8 CSV, one chunk per Azure Tables page.
+
+        Only a page of rows per partition is held at a time and there is no
+        row limit. Exports spanning several partitions read them concurrently
+        and come newest first; otherwise rows come in storage order.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+            user_id: Optional filter by user.
+            action: Optional filter by action type.
+            date_from: Optional first day, inclusive.
+            date_to: Optional last day, inclusive.
+
+        Yields:
+            CSV chunks; the first one holds the BOM and the header row.
+        """
+        filters = HistoryService._export_filters(
+            document_type_code, year, user_id, action, date_from, date_to
+        )
+        plan = HistoryService._plan(filters)
+        table = get_table_client(plan.table)
+        partitions = HistoryService._merge_partitions(plan, filters)
+        pages = HistoryService._export_pages(table, plan, partitions)
+
+        exported = 0
+        try:
+            yield HistoryService._csv_chunk([], header=True)
+            for entities in pages:
+                exported += len(entities)
+                yield HistoryService._csv_chunk(entities)
+        finally:
+            # Also when the client disconnects mid-download
+            pages.close()
+            HistoryQueryPlanner.record(
+                HistoryQueryPlanner.merged_plan(plan, partitions), read=exported, returned=exported
+            )
+
+    @staticmethod
+    def newest_row_keys(
+        document_type_code: str | None = None, year: int | None = None
+    ) -> dict[str, str]:
+        """Get the RowKey of the newest log of each matching partition.
+
+        A log written now sorts first in its partition, so these change
+        whenever any of the partitions gets a log. One row is read per
+        partition, concurrently.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Newest log RowKey per partition key; partitions without logs are left out.
+        """
+        table = get_number_logs_table()
+        partitions = NumberService.list_partitions(document_type_code, year)
+
+        def read(partition_key: str) -> list[dict]:
+            # SEQUENCE rows share the partitions in the colocated layout
+            safe_pk = sanitize_odata_string(partition_key)
+            rows = table.query_entities(
+                query_filter=f"PartitionKey eq '{safe_pk}' and RowKey ne 'SEQUENCE'",
+                select=["RowKey"],
+                results_per_page=1,
+            )
+            return list(islice(rows, 1))
+
+        newest = map_partitions(read, partitions, "Newest logs")
+        return {
+            partition_key: rows[0]["RowKey"]
+            for partition_key, rows in zip(partitions, newest, strict=True)
+            if rows
+        }
+
+    @staticmethod
+    def _export_pages(
+        table: TableClient, plan: QueryPlan, partitions: list[str]
+    ) -> Iterator[list[dict]]:
+        """Read the rows of an export, EXPORT_PAGE_SIZE at a time.
+
+        Several partitions are read concurrently and merged newest first.
+        """
+        if not partitions:
+            if plan.filter:
+                rows = table.query_entities(
+                    query_filter=plan.filter, select=LOG_COLUMNS, results_per_page=EXPORT_PAGE_SIZE
+                )
+            else:
+                rows = table.list_entities(select=LOG_COLUMNS, results_per_page=EXPORT_PAGE_SIZE)
+            for page in rows.by_page():
+                yield list(page)
+            return
+
+        with PartitionMerge(
+            table,
+            [HistoryQueryPlanner.partition_plan(plan, p) for p in partitions],
+            per_page=EXPORT_PAGE_SIZE,
+            read_ahead=True,
+        ) as merged:
+            rows = iter(merged)
+            while page := list(islice(rows, EXPORT_PAGE_SIZE)):
+                yield page
+
+    @staticmethod
+    def _export_filters(
+        document_type_code: str | None = None,
+        year: int | None = None,
+        user_id: str | None = None,
+        action: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> HistoryFilter:
+        """Build the filters of an export (pagination fields are unused)."""
+        return HistoryFilter(
             document_type_code=document_type_code,
             year=year,
             user_id=user_id,
             action=action,  # type: ignore
-            page=1,
-            page_size=10000,  # Large enough to get all records
+            date_from=date_from,
+            date_to=date_to,
         )
 
-        result = HistoryService.list_history(filters)
-
-        # Create CSV in memory
+    @staticmethod
+    def _csv_chunk(entities: Iterable[dict], header: bool = False) -> bytes:
+        """Render log entities as encoded CSV rows (BOM and header first if asked)."""
         output = io.StringIO()
         writer = csv.writer(output, delimiter=";", quoting=csv.QUOTE_MINIMAL)
 
-        # Write header
-        writer.writerow(
-            [
-                "Data/Hora",
-                "Tipo Documento",
-                "Ano",
-                "Número",
-                "Ação",
-                "Usuário",
-                "Número Anterior",
-                "Observações",
-            ]
-        )
+        if header:
+            writer.writerow(CSV_HEADER)
 
-        # Write data rows
-        for item in result.items:
+        for entity in entities:
+            item = NumberLogRow.from_row(entity)
             created_at_str = item.created_at.strftime("%d/%m/%Y %H:%M:%S")
             action_label = "Gerado" if item.action == "generated" else "Corrigido"
 
@@ -153,29 +602,49 @@ class HistoryService:
                 ]
             )
 
-        return output.getvalue()
+        # BOM for Excel compatibility
+        return output.getvalue().encode("utf-8-sig" if header else "utf-8")
 
     @staticmethod
     def get_by_id(log_id: str) -> NumberLogResponse | None:
         """Get a specific log entry by ID.
 
+        Ids from NumberLogResponse.id are a single point read; legacy ids (a
+        bare RowKey) fall back to a query across every partition.
+
         Args:
-            log_id: The RowKey of the log entry.
+            log_id: The id of the log entry.
 
         Returns:
             NumberLogResponse if found, None otherwise.
         """
         table = get_number_logs_table()
 
-        # Search across all partitions (log_id is the RowKey)
-        entities = list(table.query_entities(query_filter=f"RowKey eq '{log_id}'"))
+        keys = decode_log_id(log_id)
+        if keys is None:
+            entities = list(
+                table.query_entities(query_filter=HistoryService._legacy_id_filter(log_id))
+            )
+            if not entities:
+                return None
+            return NumberLogResponse.from_entity(NumberLogEntity(**entities[0]))
 
-        if not entities:
-            return None
+        partition_key, row_key = keys
+        if row_key == "SEQUENCE":
+            return None  # Sequence rows share partitions with logs in the colocated layout
 
-        entity = entities[0]
+        try:
+            entity = table.get_entity(partition_key=partition_key, row_key=row_key)
+        except ResourceNotFoundError:
+            return None
         return NumberLogResponse.from_entity(NumberLogEntity(**entity))
 
+    @staticmethod
+    def _legacy_id_filter(log_id: str) -> str:
+        """Build the cross-partition filter for an id that is a bare RowKey."""
+        safe_row_key = sanitize_odata_string(log_id)
+        return f"RowKey eq '{safe_row_key}' and RowKey ne 'SEQUENCE'"
+
     @staticmethod
     def get_statistics(
         document_type_code: str | None = None,
@@ -183,6 +652,8 @@ class HistoryService:
     ) -> dict:
         """Get statistics for number generation.
 
+        Read from the HistoryStats counters, not from the logs themselves.
+
         Args:
             document_type_code: Optional filter by document type.
             year: Optional filter by year.
@@ -190,33 +661,4 @@ class HistoryService:
         Returns:
             Dictionary with statistics.
         """
-        filters = HistoryFilter(
-            document_type_code=document_type_code,
-            year=year,
-            page=1,
-            page_size=10000,
-        )
-
-        result = HistoryService.list_history(filters)
-
-        # Count by action
-        generated_count = sum(1 for item in result.items if item.action == "generated")
-        corrected_count = sum(1 for item in result.items if item.action == "corrected")
-
-        # Count by document type
-        by_type: dict[str, int] = {}
-        for item in result.items:
-            by_type[item.document_type_code] = by_type.get(item.document_type_code, 0) + 1
-
-        # Count by user
-        by_user: dict[str, int] = {}
-        for item in result.items:
-            by_user[item.user_name] = by_user.get(item.user_name, 0) + 1
-
-        return {
-            "total": result.total,
-            "generated": generated_count,
-            "corrected": corrected_count,
-            "by_document_type": by_type,
-            "by_user": by_user,
-        }
+        return HistoryStatsService.get_statistics(document_type_code, year)
@@ -0,0 +1,511 @@
+"""History statistics service for Controle PGM - maintains rollup counters of number logs."""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import chain
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableClient, UpdateMode
+
+from core import metrics
+from core.config import BRAZIL_TZ, get_brazil_now, settings
+from core.fanout import map_partitions
+from core.retry import RetryPolicy, is_conflict_error
+from core.security import sanitize_odata_string
+from core.tables import TRANSACTION_LIMIT, get_history_stats_table, get_number_logs_table
+from models.number_log import HistogramBucket, NumberLogEntity
+from services.document_type_service import DocumentTypeService
+
+logger = logging.getLogger(__name__)
+
+# Row holding the counters of a whole "{code}_{year}" partition
+TOTAL_ROW_KEY = "TOTAL"
+# Prefix of the per-user rows of a partition ("USER_{user_id}")
+USER_ROW_PREFIX = "USER_"
+# Prefixes of the time buckets of a partition ("DAY_2025-03-14", "MONTH_2025-03")
+BUCKET_ROW_PREFIXES = {"day": "DAY_", "month": "MONTH_"}
+
+COUNTER_FIELDS = {"generated": "Generated", "corrected": "Corrected"}
+
+# Row marking a partition whose counters missed an update and must be rebuilt
+REBUILD_ROW_KEY = "REBUILD"
+
+# The TOTAL and USER_ rows of a partition ("`" sorts right after "_", so the
+# range is every USER_ row)
+STATS_ROWS_FILTER = (
+    f"(RowKey eq '{TOTAL_ROW_KEY}' or "
+    f"(RowKey ge '{USER_ROW_PREFIX}' and RowKey lt '{USER_ROW_PREFIX[:-1]}`'))"
+)
+
+
+# Columns needed to rebuild the counters from NumberLogs
+_REBUILD_COLUMNS = [
+    "PartitionKey",
+    "DocumentTypeCode",
+    "Year",
+    "Action",
+    "UserId",
+    "UserName",
+    "CreatedAt",
+]
+
+
+class HistoryStatsService:
+    """Service for the HistoryStats rollup table.
+
+    Each NumberLogs partition "{code}_{year}" has a matching HistoryStats
+    partition with a TOTAL row, one USER_{user_id} row per user and one
+    DAY_{yyyy-mm-dd} and MONTH_{yyyy-mm} row per period with logs, each
+    holding Generated and Corrected counters, so statistics and histograms
+    are a read of a few small rows instead of a scan of NumberLogs.
+
+    NumberService adds every committed log to the counters (record_logs)
+    with ETag-guarded merges, retried until HISTORY_STATS_RETRY_DEADLINE_MS.
+    A partition whose update still fails gets a REBUILD row, and
+    rebuild_marked() recounts it from NumberLogs.
+    """
+
+    @staticmethod
+    def _bucket_periods(created_at: datetime) -> dict[str, str]:
+        """Get the day and month periods of a log, in Brazil time."""
+        if created_at.tzinfo is not None:
+            # Azure Tables returns stored datetimes in UTC
+            created_at = created_at.astimezone(BRAZIL_TZ)
+        return {"day": created_at.strftime("%Y-%m-%d"), "month": created_at.strftime("%Y-%m")}
+
+    @staticmethod
+    def _collect_deltas(rows: Iterable[dict]) -> dict[str, dict[str, dict]]:
+        """Count log rows into counter rows, grouped by partition then RowKey."""
+        deltas: dict[str, dict[str, dict]] = {}
+
+        for row in rows:
+            partition = deltas.setdefault(row["PartitionKey"], {})
+            field = COUNTER_FIELDS[row["Action"]]
+            base = {
+                "PartitionKey": row["PartitionKey"],
+                "DocumentTypeCode": row["DocumentTypeCode"],
+                "Year": int(row["Year"]),
+            }
+
+            total = partition.setdefault(
+                TOTAL_ROW_KEY, {**base, "RowKey": TOTAL_ROW_KEY, "Generated": 0, "Corrected": 0}
+            )
+            total[field] += 1
+
+            user_row_key = f"{USER_ROW_PREFIX}{row['UserId']}"
+            user = partition.setdefault(
+                user_row_key,
+                {
+                    **base,
+                    "RowKey": user_row_key,
+                    "UserId": row["UserId"],
+                    "Generated": 0,
+                    "Corrected": 0,
+                },
+            )
+            # Keep the most recent display name of the user
+            user["UserName"] = row["UserName"]
+            user[field] += 1
+
+            periods = HistoryStatsService._bucket_periods(row["CreatedAt"])
+            for granularity, period in periods.items():
+                bucket_row_key = f"{BUCKET_ROW_PREFIXES[granularity]}{period}"
+                bucket = partition.setdefault(
+                    bucket_row_key,
+                    {
+                        **base,
+                        "RowKey": bucket_row_key,
+                        "Granularity": granularity,
+                        "Period": period,
+                        "Generated": 0,
+                        "Corrected": 0,
+                    },
+                )
+                bucket[field] += 1
+
+        return deltas
+
+    @staticmethod
+    def _rows_filter(partition_key: str, row_keys: Iterable[str]) -> str:
+        """Build the OData filter selecting some rows of one partition."""
+        safe_pk = sanitize_odata_string(partition_key)
+        row_filters = " or ".join(f"RowKey eq '{sanitize_odata_string(rk)}'" for rk in row_keys)
+        return f"PartitionKey eq '{safe_pk}' and ({row_filters})"
+
+    @staticmethod
+    def _build_operations(deltas: dict[str, dict], current: dict[str, dict]) -> list[tuple]:
+        """Build ETag-guarded transaction operations adding deltas to the current rows."""
+        operations = []
+        for row_key, delta in deltas.items():
+            existing = current.get(row_key)
+            if existing is None:
+                # Fails with a conflict if created concurrently, then re-read
+                operations.append(("create", delta))
+                continue
+
+            merged = {
+                **delta,
+                "Generated": int(existing.get("Generated", 0)) + delta["Generated"],
+                "Corrected": int(existing.get("Corrected", 0)) + delta["Corrected"],
+            }
+            operations.append(
+                (
+                    "update",
+                    merged,
+                    {
+                        "mode": UpdateMode.MERGE,
+                        "etag": existing.metadata["etag"],
+                        "match_condition": MatchConditions.IfNotModified,
+                    },
+                )
+            )
+        return operations
+
+    @staticmethod
+    def _get_retry_policy() -> RetryPolicy:
+        """Build the conflict retry policy from the history stats retry settings."""
+        return RetryPolicy(
+            base_delay=settings.history_stats_retry_base_delay_ms / 1000,
+            max_delay=settings.history_stats_retry_max_delay_ms / 1000,
+            deadline=settings.history_stats_retry_deadline_ms / 1000,
+        )
+
+    @staticmethod
+    def _apply_partition(table: TableClient, partition_key: str, deltas: dict[str, dict]) -> bool:
+        """Add counter deltas to one partition, retrying ETag conflicts.
+
+        Rows are removed from deltas as they are written, so after a failure
+        deltas holds exactly what is still missing.
+
+        Returns:
+            True if every row was updated, False if the retry deadline ran out.
+        """
+        pending = deltas
+        retry = HistoryStatsService._get_retry_policy().start()
+
+        while True:
+            retry.attempts += 1
+            current = {
+                e["RowKey"]: e
+                for e in table.query_entities(
+                    query_filter=HistoryStatsService._rows_filter(partition_key, pending)
+                )
+            }
+            operations = HistoryStatsService._build_operations(pending, current)
+
+            try:
+                for start in range(0, len(operations), TRANSACTION_LIMIT):
+                    chunk = operations[start : start + TRANSACTION_LIMIT]
+                    table.submit_transaction(chunk)
+                    # Applied: a retry must not add these rows again
+                    for operation in chunk:
+                        pending.pop(operation[1]["RowKey"])
+                return True
+            except Exception as e:
+                if not is_conflict_error(e):
+                    raise
+
+            metrics.increment("history_stats.conflicts", partition=partition_key)
+            delay = retry.next_delay()
+            if delay is None:
+                return False
+            time.sleep(delay)
+
+    @staticmethod
+    def _rebuild_marker(partition_key: str) -> dict:
+        """Build the REBUILD row of a partition whose counters missed an update."""
+        document_type_code, year = partition_key.rsplit("_", 1)
+        return {
+            "PartitionKey": partition_key,
+            "RowKey": REBUILD_ROW_KEY,
+            "DocumentTypeCode": document_type_code,
+            "Year": int(year),
+            "MarkedAt": get_brazil_now(),
+        }
+
+    @staticmethod
+    def _on_partition_failure(partition_key: str, error: str) -> dict:
+        """Report counters that missed an update and build their REBUILD row."""
+        metrics.increment("history_stats.failures", partition=partition_key)
+        logger.error(f"History stats for {partition_key} not updated, marked for rebuild: {error}")
+        return HistoryStatsService._rebuild_marker(partition_key)
+
+    @staticmethod
+    def _on_marker_failure(partition_key: str, error: Exception) -> None:
+        """Report counters that are wrong and not marked for rebuild."""
+        metrics.increment("history_stats.unmarked", partition=partition_key)
+        logger.error(
+            f"History stats for {partition_key} not marked for rebuild, run "
+            f"scripts/rebuild_history_stats.py: {error}"
+        )
+
+    @staticmethod
+    def record_logs(logs: list[NumberLogEntity]) -> None:
+        """Add committed log rows to the counters.
+
+        Never raises: the logs are already written. A partition that can't be
+        updated (retry deadline, storage errors) is marked for rebuild instead.
+
+        Args:
+            logs: Log rows that were just written to NumberLogs.
+        """
+        if not logs:
+            return
+
+        deltas = HistoryStatsService._collect_deltas(log.model_dump() for log in logs)
+        for partition_key, partition_deltas in deltas.items():
+            try:
+                table = get_history_stats_table()
+                if HistoryStatsService._apply_partition(table, partition_key, partition_deltas):
+                    continue
+                error = "too many conflicts"
+            except Exception as e:
+                error = str(e)
+
+            marker = HistoryStatsService._on_partition_failure(partition_key, error)
+            try:
+                # Blind upsert: it can't conflict with the counter updates
+                get_history_stats_table().upsert_entity(marker, mode=UpdateMode.REPLACE)
+            except Exception as e:
+                HistoryStatsService._on_marker_failure(partition_key, e)
+
+    @staticmethod
+    def _build_stats_filter(document_type_code: str | None, year: int | None) -> str:
+        """Build the OData filter selecting the TOTAL and user rows of the statistics."""
+        if document_type_code and year:
+            safe_code = sanitize_odata_string(document_type_code)
+            return f"PartitionKey eq '{safe_code}_{year}' and {STATS_ROWS_FILTER}"
+        if document_type_code:
+            # Every year of the type: a contiguous range of partitions
+            safe_code = sanitize_odata_string(document_type_code)
+            return (
+                f"PartitionKey ge '{safe_code}_' and PartitionKey lt '{safe_code}_~' and "
+                f"{STATS_ROWS_FILTER}"
+            )
+        if year:
+            return f"{STATS_ROWS_FILTER} and Year eq {year}"
+        return STATS_ROWS_FILTER
+
+    @staticmethod
+    def _year_partitions(year: int) -> list[str]:
+        """Get the "{code}_{year}" partition of every document type, active or not."""
+        return [
+            f"{doc_type.code}_{year}"
+            for doc_type in DocumentTypeService.list_rows(include_inactive=True)
+        ]
+
+    @staticmethod
+    def _summarize(rows: Iterable[dict]) -> dict:
+        """Add counter rows up into the statistics dictionary."""
+        generated = 0
+        corrected = 0
+        by_type: dict[str, int] = {}
+        by_user: dict[str, int] = {}
+
+        for row in rows:
+            count = int(row.get("Generated", 0)) + int(row.get("Corrected", 0))
+            if row["RowKey"] == TOTAL_ROW_KEY:
+                generated += int(row.get("Generated", 0))
+                corrected += int(row.get("Corrected", 0))
+                code = row["DocumentTypeCode"]
+                by_type[code] = by_type.get(code, 0) + count
+            elif row["RowKey"].startswith(USER_ROW_PREFIX):
+                name = row.get("UserName", "")
+                by_user[name] = by_user.get(name, 0) + count
+
+        return {
+            "total": generated + corrected,
+            "generated": generated,
+            "corrected": corrected,
+            "by_document_type": by_type,
+            "by_user": by_user,
+        }
+
+    @staticmethod
+    def get_statistics(
+        document_type_code: str | None = None,
+        year: int | None = None,
+    ) -> dict:
+        """Get statistics for number generation from the counters.
+
+        A type reads its partitions as one key range; a year alone reads that
+        year's partition of every document type, concurrently.
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Dictionary with totals by action, document type and user.
+        """
+        table = get_history_stats_table()
+
+        if year and not document_type_code:
+            # One partition per document type, read concurrently instead of a table scan
+            def read(partition_key: str) -> list[dict]:
+                safe_pk = sanitize_odata_string(partition_key)
+                query_filter = f"PartitionKey eq '{safe_pk}' and {STATS_ROWS_FILTER}"
+                return list(table.query_entities(query_filter=query_filter))
+
+            partitions = map_partitions(
+                read, HistoryStatsService._year_partitions(year), "History statistics"
+            )
+            return HistoryStatsService._summarize(chain.from_iterable(partitions))
+
+        stats_filter = HistoryStatsService._build_stats_filter(document_type_code, year)
+        return HistoryStatsService._summarize(table.query_entities(query_filter=stats_filter))
+
+    @staticmethod
+    def _build_histogram_filter(
+        document_type_code: str,
+        year: int,
+        granularity: str,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> str:
+        """Build the OData filter for a RowKey range of buckets in one partition."""
+        prefix = BUCKET_ROW_PREFIXES[granularity]
+        period_format = "%Y-%m-%d" if granularity == "day" else "%Y-%m"
+        safe_code = sanitize_odata_string(document_type_code)
+
+        filter_parts = [f"PartitionKey eq '{safe_code}_{year}'"]
+        if start:
+            filter_parts.append(f"RowKey ge '{prefix}{start.strftime(period_format)}'")
+        else:
+            filter_parts.append(f"RowKey ge '{prefix}'")
+        if end:
+            filter_parts.append(f"RowKey le '{prefix}{end.strftime(period_format)}'")
+        else:
+            # "`" sorts right after "_": the end of the prefix range
+            filter_parts.append(f"RowKey lt '{prefix[:-1]}`'")
+        return " and ".join(filter_parts)
+
+    @staticmethod
+    def _build_buckets(rows: Iterable[dict]) -> list[HistogramBucket]:
+        """Convert bucket rows (already in period order) to response models."""
+        return [
+            HistogramBucket(
+                period=row["Period"],
+                generated=int(row.get("Generated", 0)),
+                corrected=int(row.get("Corrected", 0)),
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    def get_histogram(
+        document_type_code: str,
+        year: int,
+        granularity: str = "month",
+        start: date | None = None,
+        end: date | None = None,
+    ) -> list[HistogramBucket]:
+        """Get generation counts per day or month for one document type and year.
+
+        One partition query over a RowKey range. Periods without logs are omitted.
+
+        Args:
+            document_type_code: Document type code.
+            year: Year of the numbers.
+            granularity: "day" or "month".
+            start: Optional first period (its day or month), inclusive.
+            end: Optional last period (its day or month), inclusive.
+
+        Returns:
+            Buckets in chronological order.
+        """
+        table = get_history_stats_table()
+        query_filter = HistoryStatsService._build_histogram_filter(
+            document_type_code, year, granularity, start, end
+        )
+        return HistoryStatsService._build_buckets(table.query_entities(query_filter=query_filter))
+
+    @staticmethod
+    def _rebuild_partition(partition_key: str) -> None:
+        """Replace the counters of one partition with a recount of its logs."""
+        safe_pk = sanitize_odata_string(partition_key)
+        table = get_history_stats_table()
+        # Before the recount: a failure during it marks the partition again
+        with contextlib.suppress(ResourceNotFoundError):
+            table.delete_entity(partition_key=partition_key, row_key=REBUILD_ROW_KEY)
+
+        # SEQUENCE rows share the partition in the colocated layout
+        logs = get_number_logs_table().query_entities(
+            query_filter=f"PartitionKey eq '{safe_pk}' and RowKey ne 'SEQUENCE'",
+            select=_REBUILD_COLUMNS,
+        )
+        rows = HistoryStatsService._collect_deltas(logs).get(partition_key, {})
+
+        for row in table.query_entities(
+            query_filter=f"PartitionKey eq '{safe_pk}'", select=["PartitionKey", "RowKey"]
+        ):
+            if row["RowKey"] not in rows and row["RowKey"] != REBUILD_ROW_KEY:
+                table.delete_entity(partition_key=partition_key, row_key=row["RowKey"])
+
+        operations = [("upsert", row, {"mode": UpdateMode.REPLACE}) for row in rows.values()]
+        for start in range(0, len(operations), TRANSACTION_LIMIT):
+            table.submit_transaction(operations[start : start + TRANSACTION_LIMIT])
+
+    @staticmethod
+    def rebuild(
+        document_type_code: str | None = None,
+        year: int | None = None,
+        max_workers: int = 8,
+    ) -> int:
+        """Recompute the counters and time buckets from NumberLogs.
+
+        Partitions (one per sequence) are rebuilt in parallel, each with one
+        partition query. Their counter rows are replaced, and rows with no
+        remaining logs are deleted. Logs written while this runs may be
+        counted twice or missed; run it when the API is quiet.
+
+        Args:
+            document_type_code: Optional document type to rebuild (all if omitted).
+            year: Optional year to rebuild (all if omitted).
+            max_workers: Partitions rebuilt concurrently.
+
+        Returns:
+            Number of partitions rebuilt.
+        """
+        # Imported here: NumberService records its logs through this module
+        from services.number_service import NumberService
+
+        partition_keys = [
+            seq.PartitionKey for seq in NumberService.list_sequences(document_type_code, year)
+        ]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # list() re-raises the first failure
+            list(pool.map(HistoryStatsService._rebuild_partition, partition_keys))
+
+        return len(partition_keys)
+
+    @staticmethod
+    def rebuild_marked(max_workers: int = 8) -> int:
+        """Rebuild the partitions marked after a failed counter update.
+
+        Cheap enough to schedule: only marked partitions are recounted.
+
+        Args:
+            max_workers: Partitions rebuilt concurrently.
+
+        Returns:
+            Number of partitions rebuilt.
+        """
+        markers = get_history_stats_table().query_entities(
+            query_filter=f"RowKey eq '{REBUILD_ROW_KEY}'", select=["PartitionKey"]
+        )
+        partition_keys = sorted({marker["PartitionKey"] for marker in markers})
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # list() re-raises the first failure
+            list(pool.map(HistoryStatsService._rebuild_partition, partition_keys))
+
+        return len(partition_keys)
@@ -1,34 +1,243 @@
 """Number service for Controle PGM - handles document number generation."""
 
+import logging
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Any
 from uuid import uuid4
 
 from azure.core import MatchConditions
-from azure.core.exceptions import ResourceNotFoundError
-from azure.data.tables import UpdateMode
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.data.tables import TableClient, UpdateMode
 
-from core.config import get_brazil_now
+from core import metrics
+from core.config import get_brazil_now, settings
 from core.exceptions import (
     NotFoundError,
     SequenceGenerationError,
 )
-from core.tables import get_number_logs_table, get_sequences_table
+from core.fanout import map_partitions
+from core.retry import RetryPolicy, is_conflict_error
+from core.security import sanitize_odata_string
+from core.tables import TRANSACTION_LIMIT, get_number_logs_table, get_sequences_table
+from models.document_type import DocumentTypeEntity
 from models.number_log import NumberLogEntity
 from models.sequence import SequenceEntity
 from models.user import CurrentUser
 
 from .document_type_service import DocumentTypeService
+from .history_cache import HistoryCache
+from .history_index_service import HistoryIndexService
+from .history_stats_service import HistoryStatsService
+from .sequence_combiner import SequenceCombiner
+
+logger = logging.getLogger(__name__)
+
+# Per-worker cache of the last known state of each sequence partition:
+# "{code}_{year}" -> (CurrentNumber, ETag). Filled from the metadata returned by
+# our own writes, so the next generate can go straight to a conditional update.
+# A stale entry only costs a 412 and a re-read.
+_sequence_cache: dict[str, tuple[int, str]] = {}
+_sequence_cache_lock = Lock()
+
+# Combines concurrent generates on the same partition into one increment
+_combiner = SequenceCombiner(max_numbers_per_round=100)
+
+
+def _extract_etag(entity: Any) -> str | None:
+    """Get the ETag from a TableEntity or from write operation metadata."""
+    metadata = getattr(entity, "metadata", None)
+    if metadata and metadata.get("etag"):
+        return metadata["etag"]
+    if isinstance(entity, dict):
+        return entity.get("etag") or entity.get("_metadata", {}).get("etag")
+    return None
 
 
 class NumberService:
     """Service for document number generation with atomic increments."""
 
-    MAX_RETRIES = 5  # Max retries for ETag conflicts
-
     @staticmethod
     def _get_partition_key(document_type_code: str, year: int) -> str:
         """Generate partition key for sequences and logs."""
         return f"{document_type_code}_{year}"
 
+    @staticmethod
+    def _cache_sequence(partition_key: str, current_number: int, etag: str | None) -> None:
+        """Remember the latest known state of a sequence partition."""
+        with _sequence_cache_lock:
+            if etag:
+                _sequence_cache[partition_key] = (current_number, etag)
+            else:
+                _sequence_cache.pop(partition_key, None)
+
+    @staticmethod
+    def _forget_sequence(partition_key: str) -> None:
+        """Drop a cached sequence state (e.g., after an ETag conflict)."""
+        with _sequence_cache_lock:
+            _sequence_cache.pop(partition_key, None)
+
+    @staticmethod
+    def clear_sequence_cache() -> None:
+        """Drop all cached sequence states."""
+        with _sequence_cache_lock:
+            _sequence_cache.clear()
+
+    @staticmethod
+    def _uses_colocated_layout() -> bool:
+        """Check if sequences live in the same NumberLogs partition as their logs."""
+        return settings.sequence_storage_layout == "colocated"
+
+    @staticmethod
+    def _get_sequence_table() -> TableClient:
+        """Get the table holding SEQUENCE rows for the configured layout."""
+        if NumberService._uses_colocated_layout():
+            return get_number_logs_table()
+        return get_sequences_table()
+
+    @staticmethod
+    def _build_sequence_entity(document_type_code: str, year: int, current_number: int) -> dict:
+        """Build the SEQUENCE row for a partition."""
+        seq = {
+            "PartitionKey": NumberService._get_partition_key(document_type_code, year),
+            "RowKey": "SEQUENCE",
+            "DocumentTypeCode": document_type_code,
+            "Year": year,
+            "CurrentNumber": current_number,
+            "UpdatedAt": get_brazil_now(),
+        }
+        if NumberService._uses_colocated_layout():
+            # Only written once the Sequences row is frozen (see _reconcile_sequence)
+            seq["LegacyReconciled"] = True
+        return seq
+
+    @staticmethod
+    def _freeze_legacy_sequence(document_type_code: str, year: int) -> int:
+        """Stop a partition from being numbered through the Sequences table.
+
+        The Sequences row is marked MigratedAt (a marked row with CurrentNumber
+        0 is created when there is none). The split layout refuses marked rows,
+        and the mark changes the row's ETag, so an instance still on the split
+        layout fails its next conditional update, re-reads and stops there.
+
+        Returns:
+            The row's final CurrentNumber.
+        """
+        table = get_sequences_table()
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        while True:
+            now = get_brazil_now()
+            try:
+                legacy = table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
+            except ResourceNotFoundError:
+                try:
+                    table.create_entity(
+                        {
+                            "PartitionKey": partition_key,
+                            "RowKey": "SEQUENCE",
+                            "DocumentTypeCode": document_type_code,
+                            "Year": year,
+                            "CurrentNumber": 0,
+                            "UpdatedAt": now,
+                            "MigratedAt": now,
+                        }
+                    )
+                    return 0
+                except ResourceExistsError:
+                    continue
+
+            if legacy.get("MigratedAt"):
+                return int(legacy["CurrentNumber"])
+
+            try:
+                table.update_entity(
+                    {"PartitionKey": partition_key, "RowKey": "SEQUENCE", "MigratedAt": now},
+                    mode=UpdateMode.MERGE,
+                    etag=_extract_etag(legacy),
+                    match_condition=MatchConditions.IfNotModified,
+                )
+                return int(legacy["CurrentNumber"])
+            except Exception as e:
+                # A number was issued through the split layout meanwhile
+                if not is_conflict_error(e):
+                    raise
+
+    @staticmethod
+    def _reconcile_sequence(document_type_code: str, year: int) -> bool:
+        """Carry a partition's Sequences row into its NumberLogs SEQUENCE row.
+
+        Freezes the Sequences row first, so no number can be issued through it
+        afterwards, then raises the colocated row to at least its CurrentNumber
+        and marks it LegacyReconciled. Idempotent and safe under concurrency.
+
+        Returns:
+            True if the colocated row was written, False if already reconciled.
+        """
+        frozen_number = NumberService._freeze_legacy_sequence(document_type_code, year)
+        table = get_number_logs_table()
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        while True:
+            seq = NumberService._build_sequence_entity(document_type_code, year, frozen_number)
+            seq["LegacyReconciled"] = True
+            try:
+                table.create_entity(seq)
+                return True
+            except ResourceExistsError:
+                pass
+
+            try:
+                current = table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
+            except ResourceNotFoundError:
+                continue
+            if current.get("LegacyReconciled"):
+                return False
+
+            # Copied earlier without the freeze: numbers may have been issued on both sides
+            seq["CurrentNumber"] = max(int(current["CurrentNumber"]), frozen_number)
+            try:
+                table.update_entity(
+                    seq,
+                    mode=UpdateMode.REPLACE,
+                    etag=_extract_etag(current),
+                    match_condition=MatchConditions.IfNotModified,
+                )
+                return True
+            except Exception as e:
+                if not is_conflict_error(e):
+                    raise
+
+    @staticmethod
+    def _ensure_usable(document_type_code: str, year: int, entity: dict | None) -> bool:
+        """Check a SEQUENCE row just read (None if missing) can be numbered from.
+
+        In the colocated layout a missing row, or one never reconciled with the
+        Sequences table, is reconciled first and must be read again.
+
+        Returns:
+            True if the row can be used, False if it must be read again.
+
+        Raises:
+            SequenceGenerationError: If the split layout reads a frozen row.
+        """
+        if NumberService._uses_colocated_layout():
+            if entity is not None and entity.get("LegacyReconciled"):
+                return True
+            NumberService._reconcile_sequence(document_type_code, year)
+            return False
+
+        if entity is not None and entity.get("MigratedAt"):
+            logger.error(
+                f"Sequence {entity['PartitionKey']} was moved to NumberLogs; "
+                "this instance still uses SEQUENCE_STORAGE_LAYOUT=split"
+            )
+            raise SequenceGenerationError(
+                "Sequência migrada para o novo armazenamento. Tente novamente em instantes."
+            )
+        return True
+
     @staticmethod
     def get_current_sequence(document_type_code: str, year: int) -> SequenceEntity:
         """Get current sequence for a document type and year.
@@ -42,44 +251,279 @@ class NumberService:
         Returns:
             SequenceEntity with current number.
         """
-        table = get_sequences_table()
+        table = NumberService._get_sequence_table()
         partition_key = NumberService._get_partition_key(document_type_code, year)
 
         try:
             entity = table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
-            seq = SequenceEntity(**entity)
-            # Try all possible locations for etag
-            etag = entity.get("etag")
-            if not etag and hasattr(entity, "metadata"):
-                etag = entity.metadata.get("etag")
-            if not etag:
-                etag = entity.get("_metadata", {}).get("etag")
-            seq._etag = etag
-            return seq
         except ResourceNotFoundError:
+            entity = None
+        if not NumberService._ensure_usable(document_type_code, year, entity):
+            return NumberService.get_current_sequence(document_type_code, year)
+
+        if entity is not None:
+            seq = SequenceEntity(**entity)
+            seq._etag = _extract_etag(entity)
+        else:
             # Create new sequence starting at 0
-            now = get_brazil_now()
             seq = SequenceEntity(
-                PartitionKey=partition_key,
-                RowKey="SEQUENCE",
-                DocumentTypeCode=document_type_code,
-                Year=year,
-                CurrentNumber=0,
-                UpdatedAt=now,
+                **NumberService._build_sequence_entity(document_type_code, year, 0)
             )
-            table.create_entity(seq.model_dump(exclude={"_etag"}))
+            try:
+                metadata = table.create_entity(seq.model_dump(exclude={"_etag"}))
+                # The create response already carries the ETag, no re-fetch needed
+                seq._etag = _extract_etag(metadata)
+            except ResourceExistsError:
+                # Created concurrently by another request
+                return NumberService.get_current_sequence(document_type_code, year)
 
-            # Re-fetch to get ETag
+        NumberService._cache_sequence(partition_key, seq.CurrentNumber, seq._etag)
+        return seq
+
+    @staticmethod
+    def _read_sequence_state(document_type_code: str, year: int) -> tuple[int, str | None] | None:
+        """Read a sequence's CurrentNumber and ETag, or None if it doesn't exist."""
+        table = NumberService._get_sequence_table()
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+
+        try:
             entity = table.get_entity(partition_key=partition_key, row_key="SEQUENCE")
-            seq = SequenceEntity(**entity)
-            # Try all possible locations for etag
-            etag = entity.get("etag")
-            if not etag and hasattr(entity, "metadata"):
-                etag = entity.metadata.get("etag")
-            if not etag:
-                etag = entity.get("_metadata", {}).get("etag")
-            seq._etag = etag
-            return seq
+        except ResourceNotFoundError:
+            entity = None
+        if not NumberService._ensure_usable(document_type_code, year, entity):
+            return NumberService._read_sequence_state(document_type_code, year)
+        if entity is None:
+            return None
+
+        state = (int(entity["CurrentNumber"]), _extract_etag(entity))
+        NumberService._cache_sequence(partition_key, *state)
+        return state
+
+    @staticmethod
+    def _commit_sequence(
+        document_type_code: str,
+        year: int,
+        new_number: int,
+        etag: str | None,
+        logs: list[NumberLogEntity],
+    ) -> bool:
+        """Write a new CurrentNumber and its log rows.
+
+        With etag=None the sequence is created, otherwise it is replaced only if
+        unchanged. In the colocated layout the sequence write and the log inserts
+        are a single entity-group transaction; in the two-table layout the logs
+        are written after the sequence update succeeds.
+
+        Returns:
+            True if committed, False on an ETag conflict or concurrent creation.
+        """
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+        seq = NumberService._build_sequence_entity(document_type_code, year, new_number)
+
+        if etag is None:
+            seq_operation = ("create", seq)
+        else:
+            seq_operation = (
+                "update",
+                seq,
+                {
+                    "mode": UpdateMode.REPLACE,
+                    "etag": etag,
+                    "match_condition": MatchConditions.IfNotModified,
+                },
+            )
+
+        try:
+            if NumberService._uses_colocated_layout():
+                first_batch = logs[: TRANSACTION_LIMIT - 1]
+                results = get_number_logs_table().submit_transaction(
+                    [seq_operation] + [("create", log.model_dump()) for log in first_batch]
+                )
+                metadata = results[0]
+                remaining_logs = logs[len(first_batch) :]
+            else:
+                table = get_sequences_table()
+                if etag is None:
+                    metadata = table.create_entity(seq)
+                else:
+                    metadata = table.update_entity(seq, **seq_operation[2])
+                remaining_logs = logs
+        except Exception as e:
+            if is_conflict_error(e):
+                # ETag conflict or concurrent creation - caller re-reads and retries
+                NumberService._forget_sequence(partition_key)
+                return False
+            raise
+
+        NumberService._cache_sequence(partition_key, new_number, _extract_etag(metadata))
+        NumberService._write_logs(remaining_logs)
+        NumberService._on_logs_committed(logs)
+        return True
+
+    @staticmethod
+    def _get_active_document_type(document_type_code: str) -> DocumentTypeEntity:
+        """Get a document type that numbers can be generated for.
+
+        Raises:
+            NotFoundError: If document type doesn't exist or is inactive.
+        """
+        doc_type = DocumentTypeService.get_by_code(document_type_code)
+        if not doc_type:
+            raise NotFoundError(f"Tipo de documento '{document_type_code}' não encontrado")
+        if not doc_type.IsActive:
+            raise NotFoundError(f"Tipo de documento '{document_type_code}' está inativo")
+        return doc_type
+
+    @staticmethod
+    def _reserve_numbers(document_type_code: str, year: int, count: int, user: CurrentUser) -> int:
+        """Advance a sequence by count numbers and log each of them.
+
+        Concurrent callers on the same partition in this worker are combined
+        into a single increment (see SequenceCombiner), unless disabled with
+        SEQUENCE_COMBINING_ENABLED=false.
+
+        Returns:
+            The first reserved number; the range is [first, first + count - 1].
+
+        Raises:
+            SequenceGenerationError: If unable to reserve numbers after retries.
+        """
+        if not settings.sequence_combining_enabled:
+            return NumberService._commit_reservations(document_type_code, year, [(user, count)])
+
+        return _combiner.reserve(
+            NumberService._get_partition_key(document_type_code, year),
+            count,
+            user,
+            lambda round_: NumberService._commit_reservations(
+                document_type_code, year, [(r.payload, r.count) for r in round_]
+            ),
+        )
+
+    @staticmethod
+    def _commit_reservations(
+        document_type_code: str, year: int, reservations: list[tuple[CurrentUser, int]]
+    ) -> int:
+        """Reserve numbers for one or more callers with a single increment.
+
+        Uses ETag-based optimistic concurrency to ensure atomic increment.
+        The ETag returned by this worker's last write is reused, so a warm
+        partition needs a single conditional update; the sequence is only
+        re-read after a conflict. Conflicts are retried with jittered backoff
+        until the retry deadline (see _get_retry_policy).
+
+        Args:
+            document_type_code: Document type code.
+            year: Year for the sequence.
+            reservations: (user, count) pairs, served in order from one range.
+
+        Returns:
+            The first number of the whole range.
+
+        Raises:
+            SequenceGenerationError: If unable to reserve numbers before the deadline.
+        """
+        partition_key = NumberService._get_partition_key(document_type_code, year)
+        total = sum(count for _, count in reservations)
+        retry = NumberService._get_retry_policy().start()
+
+        while True:
+            retry.attempts += 1
+
+            # Use the state left by our last write; read only when unknown
+            with _sequence_cache_lock:
+                state = _sequence_cache.get(partition_key)
+            if state is None:
+                state = NumberService._read_sequence_state(document_type_code, year)
+
+            # A new partition is created already holding its first numbers
+            current_number, etag = state if state else (0, None)
+            first_number = current_number + 1
+
+            # Rows of a batch share one timestamp (see _build_log_entity)
+            now = get_brazil_now() if total > 1 else None
+            logs = []
+            number = first_number
+            for user, count in reservations:
+                for _ in range(count):
+                    logs.append(
+                        NumberService._build_log_entity(
+                            document_type_code=document_type_code,
+                            year=year,
+                            number=number,
+                            action="generated",
+                            user=user,
+                            now=now,
+                        )
+                    )
+                    number += 1
+
+            if NumberService._commit_sequence(
+                document_type_code, year, current_number + total, etag, logs
+            ):
+                NumberService._record_contention(partition_key, retry.attempts, retry.elapsed)
+                return first_number
+
+            metrics.increment("sequence.conflicts", partition=partition_key)
+            delay = retry.next_delay()
+            if delay is None:
+                break
+            time.sleep(delay)
+
+        NumberService._record_contention(partition_key, retry.attempts, retry.elapsed, False)
+        logger.warning(
+            f"Sequence {partition_key} gave up after {retry.attempts} attempts "
+            f"in {retry.elapsed:.2f}s"
+        )
+        raise SequenceGenerationError(
+            f"Não foi possível gerar número após {retry.attempts} tentativas. Tente novamente."
+        )
+
+    @staticmethod
+    def _get_retry_policy() -> RetryPolicy:
+        """Build the conflict retry policy from settings."""
+        return RetryPolicy(
+            base_delay=settings.sequence_retry_base_delay_ms / 1000,
+            max_delay=settings.sequence_retry_max_delay_ms / 1000,
+            deadline=settings.sequence_retry_deadline_ms / 1000,
+        )
+
+    @staticmethod
+    def _record_contention(
+        partition_key: str, attempts: int, elapsed: float, succeeded: bool = True
+    ) -> None:
+        """Record per-partition retry metrics for one reservation."""
+        metrics.increment("sequence.attempts", attempts, partition=partition_key)
+        metrics.increment(
+            "sequence.successes" if succeeded else "sequence.failures", partition=partition_key
+        )
+        if attempts > 1:
+            metrics.observe("sequence.retry_seconds", elapsed, partition=partition_key)
+
+    @staticmethod
+    def get_contention_stats(partition_key: str) -> dict[str, float]:
+        """Get this worker's contention metrics for a sequence partition.
+
+        Args:
+            partition_key: Sequence partition (e.g., "OF_2025").
+
+        Returns:
+            Dictionary with attempts per success, conflict rate and retry time.
+        """
+        attempts = metrics.get_counter("sequence.attempts", partition=partition_key)
+        successes = metrics.get_counter("sequence.successes", partition=partition_key)
+        conflicts = metrics.get_counter("sequence.conflicts", partition=partition_key)
+        retry_time = metrics.get_observations("sequence.retry_seconds", partition=partition_key)
+
+        return {
+            "attempts": attempts,
+            "successes": successes,
+            "failures": metrics.get_counter("sequence.failures", partition=partition_key),
+            "attempts_per_success": attempts / successes if successes else 0.0,
+            "conflict_rate": conflicts / attempts if attempts else 0.0,
+            "retry_seconds_total": retry_time["sum"],
+            "retry_seconds_max": retry_time["max"],
+        }
 
     @staticmethod
     def generate_number(
@@ -87,9 +531,6 @@ class NumberService:
     ) -> tuple[int, str, str]:
         """Generate next document number atomically.
 
-        Uses ETag-based optimistic concurrency to ensure atomic increment.
-        Retries on conflict up to MAX_RETRIES times.
-
         Args:
             document_type_code: Document type code (e.g., "OF").
             year: Year for the sequence.
@@ -102,67 +543,42 @@ class NumberService:
             NotFoundError: If document type doesn't exist or is inactive.
             SequenceGenerationError: If unable to generate number after retries.
         """
-        # Verify document type exists and is active
-        doc_type = DocumentTypeService.get_by_code(document_type_code)
-        if not doc_type:
-            raise NotFoundError(f"Tipo de documento '{document_type_code}' não encontrado")
-        if not doc_type.IsActive:
-            raise NotFoundError(f"Tipo de documento '{document_type_code}' está inativo")
+        doc_type = NumberService._get_active_document_type(document_type_code)
 
-        document_type_name = doc_type.Name
-        table = get_sequences_table()
-        partition_key = NumberService._get_partition_key(document_type_code, year)
+        new_number = NumberService._reserve_numbers(document_type_code, year, 1, user)
 
-        for attempt in range(NumberService.MAX_RETRIES):
-            # Get current sequence
-            seq = NumberService.get_current_sequence(document_type_code, year)
+        # Format the number
+        formatted = NumberService.format_number(document_type_code, new_number, year)
 
-            # Increment number
-            new_number = seq.CurrentNumber + 1
+        return new_number, formatted, doc_type.Name
 
-            # Prepare update
-            updated_entity = {
-                "PartitionKey": partition_key,
-                "RowKey": "SEQUENCE",
-                "DocumentTypeCode": document_type_code,
-                "Year": year,
-                "CurrentNumber": new_number,
-                "UpdatedAt": get_brazil_now(),
-            }
+    @staticmethod
+    def generate_batch(
+        document_type_code: str, year: int, count: int, user: CurrentUser
+    ) -> tuple[int, int, str]:
+        """Reserve count contiguous document numbers with a single increment.
 
-            try:
-                # Update with ETag check for optimistic concurrency
-                table.update_entity(
-                    updated_entity,
-                    mode=UpdateMode.REPLACE,
-                    etag=seq._etag,
-                    match_condition=MatchConditions.IfNotModified,
-                )
+        The sequence is advanced by count in one conditional update, and the
+        count log rows are written in transactions of up to TRANSACTION_LIMIT rows.
 
-                # Log the generation
-                NumberService._log_action(
-                    document_type_code=document_type_code,
-                    year=year,
-                    number=new_number,
-                    action="generated",
-                    user=user,
-                )
+        Args:
+            document_type_code: Document type code (e.g., "OF").
+            year: Year for the sequence.
+            count: How many numbers to reserve.
+            user: Current authenticated user.
 
-                # Format the number
-                formatted = NumberService.format_number(document_type_code, new_number, year)
+        Returns:
+            Tuple of (first_number, last_number, document_type_name).
 
-                return new_number, formatted, document_type_name
+        Raises:
+            NotFoundError: If document type doesn't exist or is inactive.
+            SequenceGenerationError: If unable to reserve numbers after retries.
+        """
+        doc_type = NumberService._get_active_document_type(document_type_code)
 
-            except Exception as e:
-                if "412" in str(e) or "PreconditionFailed" in str(e):
-                    # ETag conflict - retry
-                    continue
-                raise
+        first_number = NumberService._reserve_numbers(document_type_code, year, count, user)
 
-        raise SequenceGenerationError(
-            f"Não foi possível gerar número após {NumberService.MAX_RETRIES} tentativas. "
-            "Tente novamente."
-        )
+        return first_number, first_number + count - 1, doc_type.Name
 
     @staticmethod
     def correct_sequence(
@@ -186,33 +602,21 @@ class NumberService:
 
         Raises:
             NotFoundError: If document type doesn't exist.
+            SequenceGenerationError: If the sequence changed while correcting it.
         """
         # Verify document type exists
         doc_type = DocumentTypeService.get_by_code(document_type_code)
         if not doc_type:
             raise NotFoundError(f"Tipo de documento '{document_type_code}' não encontrado")
 
-        table = get_sequences_table()
         partition_key = NumberService._get_partition_key(document_type_code, year)
 
         # Get current sequence
         seq = NumberService.get_current_sequence(document_type_code, year)
         previous_number = seq.CurrentNumber
 
-        # Update sequence
-        updated_entity = {
-            "PartitionKey": partition_key,
-            "RowKey": "SEQUENCE",
-            "DocumentTypeCode": document_type_code,
-            "Year": year,
-            "CurrentNumber": new_number,
-            "UpdatedAt": get_brazil_now(),
-        }
-
-        table.upsert_entity(updated_entity, mode=UpdateMode.REPLACE)
-
-        # Log the correction
-        NumberService._log_action(
+        updated_entity = NumberService._build_sequence_entity(document_type_code, year, new_number)
+        log = NumberService._build_log_entity(
             document_type_code=document_type_code,
             year=year,
             number=new_number,
@@ -222,10 +626,38 @@ class NumberService:
             notes=notes,
         )
 
+        # Conditional: a blind write could undo a concurrent generate or a freeze
+        update = {
+            "mode": UpdateMode.REPLACE,
+            "etag": seq._etag,
+            "match_condition": MatchConditions.IfNotModified,
+        }
+        try:
+            if NumberService._uses_colocated_layout():
+                # Sequence and correction log are written atomically
+                results = get_number_logs_table().submit_transaction(
+                    [("update", updated_entity, update), ("create", log.model_dump())]
+                )
+                metadata = results[0]
+            else:
+                metadata = get_sequences_table().update_entity(updated_entity, **update)
+        except Exception as e:
+            if is_conflict_error(e):
+                NumberService._forget_sequence(partition_key)
+                raise SequenceGenerationError(
+                    "A sequência foi alterada durante a correção. Tente novamente."
+                ) from e
+            raise
+        if not NumberService._uses_colocated_layout():
+            NumberService._write_logs([log])
+
+        NumberService._cache_sequence(partition_key, new_number, _extract_etag(metadata))
+        NumberService._on_logs_committed([log])
+
         return previous_number, new_number
 
     @staticmethod
-    def _log_action(
+    def _build_log_entity(
         document_type_code: str,
         year: int,
         number: int,
@@ -233,16 +665,24 @@ class NumberService:
         user: CurrentUser,
         previous_number: int | None = None,
         notes: str | None = None,
-    ) -> None:
-        """Log a number generation or correction action."""
-        table = get_number_logs_table()
-        now = get_brazil_now()
+        now: datetime | None = None,
+    ) -> NumberLogEntity:
+        """Build the log row for a number generation or correction action.
+
+        Rows built with a shared `now` (a batch) get the inverse number in their
+        RowKey, so within the same second the highest number still sorts first.
+        """
+        if now is None:
+            now = get_brazil_now()
+            tiebreak = ""
+        else:
+            tiebreak = f"{9999999999 - number:010d}_"
 
         # Create inverse timestamp for chronological ordering (newest first)
         inverse_timestamp = 9999999999 - int(now.timestamp())
-        row_key = f"{inverse_timestamp}_{uuid4()}"
+        row_key = f"{inverse_timestamp}_{tiebreak}{uuid4()}"
 
-        log_entity = NumberLogEntity(
+        return NumberLogEntity(
             PartitionKey=NumberService._get_partition_key(document_type_code, year),
             RowKey=row_key,
             DocumentTypeCode=document_type_code,
@@ -256,7 +696,58 @@ class NumberService:
             CreatedAt=now,
         )
 
-        table.create_entity(log_entity.model_dump())
+    @staticmethod
+    def _write_logs(logs: list[NumberLogEntity]) -> None:
+        """Insert log rows, batching rows of the same partition into transactions."""
+        if not logs:
+            return
+
+        table = get_number_logs_table()
+        if len(logs) == 1:
+            table.create_entity(logs[0].model_dump())
+            return
+
+        by_partition: dict[str, list[NumberLogEntity]] = {}
+        for log in logs:
+            by_partition.setdefault(log.PartitionKey, []).append(log)
+
+        limit = TRANSACTION_LIMIT
+        for partition_logs in by_partition.values():
+            for start in range(0, len(partition_logs), limit):
+                table.submit_transaction(
+                    [("create", log.model_dump()) for log in partition_logs[start : start + limit]]
+                )
+
+    @staticmethod
+    def _on_logs_committed(logs: list[NumberLogEntity]) -> None:
+        """Update the history index, statistics and page cache for logs just written."""
+        HistoryIndexService.index_logs(logs)
+        HistoryStatsService.record_logs(logs)
+        # Last: a page read before the index was updated is cached under the old version
+        HistoryCache.bump(log.PartitionKey for log in logs)
+
+    @staticmethod
+    def _log_action(
+        document_type_code: str,
+        year: int,
+        number: int,
+        action: str,
+        user: CurrentUser,
+        previous_number: int | None = None,
+        notes: str | None = None,
+    ) -> None:
+        """Log a number generation or correction action and count it in the statistics."""
+        log = NumberService._build_log_entity(
+            document_type_code=document_type_code,
+            year=year,
+            number=number,
+            action=action,
+            user=user,
+            previous_number=previous_number,
+            notes=notes,
+        )
+        NumberService._write_logs([log])
+        NumberService._on_logs_committed([log])
 
     @staticmethod
     def format_number(code: str, number: int, year: int) -> str:
@@ -273,12 +764,97 @@ class NumberService:
         return f"{code} {str(number).zfill(4)}/{year}"
 
     @staticmethod
-    def list_sequences() -> list[SequenceEntity]:
-        """List all sequences.
+    def _sequences_filter(document_type_code: str | None, year: int | None) -> str:
+        """Build the OData filter selecting SEQUENCE rows of a document type and/or year."""
+        if document_type_code and year:
+            safe_code = sanitize_odata_string(document_type_code)
+            return f"PartitionKey eq '{safe_code}_{year}' and RowKey eq 'SEQUENCE'"
+        if document_type_code:
+            # Every year of the type: a contiguous range of partitions
+            safe_code = sanitize_odata_string(document_type_code)
+            return (
+                f"PartitionKey ge '{safe_code}_' and PartitionKey lt '{safe_code}_~' and "
+                "RowKey eq 'SEQUENCE'"
+            )
+        if year:
+            return f"RowKey eq 'SEQUENCE' and Year eq {year}"
+        return "RowKey eq 'SEQUENCE'"
+
+    @staticmethod
+    def list_sequences(
+        document_type_code: str | None = None, year: int | None = None
+    ) -> list[SequenceEntity]:
+        """List sequences, optionally only those of a document type and/or year.
+
+        In the colocated layout NumberLogs is not scanned: the SEQUENCE rows
+        are read per document type (one row, or the type's partition range),
+        and Sequences rows not reconciled yet are listed with their number.
+
+        Args:
+            document_type_code: Optional document type code.
+            year: Optional year.
 
         Returns:
-            List of all SequenceEntity objects.
+            List of SequenceEntity objects, sorted by partition key.
         """
-        table = get_sequences_table()
-        entities = list(table.query_entities(query_filter="RowKey eq 'SEQUENCE'"))
-        return [SequenceEntity(**entity) for entity in entities]
+        query_filter = NumberService._sequences_filter(document_type_code, year)
+        sequences = {
+            entity["PartitionKey"]: entity
+            for entity in get_sequences_table().query_entities(query_filter=query_filter)
+        }
+
+        if NumberService._uses_colocated_layout():
+            table = get_number_logs_table()
+            codes = (
+                [document_type_code]
+                if document_type_code
+                else [row.code for row in DocumentTypeService.list_rows(include_inactive=True)]
+            )
+
+            def read_type(code: str) -> list[dict]:
+                return list(
+                    table.query_entities(query_filter=NumberService._sequences_filter(code, year))
+                )
+
+            for rows in map_partitions(read_type, codes, "list_sequences"):
+                sequences.update((entity["PartitionKey"], entity) for entity in rows)
+
+        return [SequenceEntity(**entity) for _, entity in sorted(sequences.items())]
+
+    @staticmethod
+    def list_partitions(
+        document_type_code: str | None = None, year: int | None = None
+    ) -> list[str]:
+        """List the "{code}_{year}" NumberLogs partitions that can hold logs.
+
+        A partition's sequence exists before any of its logs is written, so
+        the sequences are a complete list (a partition may have no logs yet).
+
+        Args:
+            document_type_code: Optional filter by document type.
+            year: Optional filter by year.
+
+        Returns:
+            Partition keys in key order.
+        """
+        return [seq.PartitionKey for seq in NumberService.list_sequences(document_type_code, year)]
+
+    @staticmethod
+    def migrate_to_colocated_layout() -> int:
+        """Move every sequence from the Sequences table into its NumberLogs partition.
+
+        Each Sequences row is frozen, then carried into its partition (see
+        _reconcile_sequence). Idempotent; run it after every instance has
+        switched SEQUENCE_STORAGE_LAYOUT to "colocated". Partitions it misses
+        are reconciled on first use.
+
+        Returns:
+            Number of sequences copied or updated.
+        """
+        migrated = 0
+        for legacy in get_sequences_table().query_entities(query_filter="RowKey eq 'SEQUENCE'"):
+            if NumberService._reconcile_sequence(legacy["DocumentTypeCode"], int(legacy["Year"])):
+                migrated += 1
+
+        NumberService.clear_sequence_cache()
+        return migrated
@@ -0,0 +1,232 @@
+"""Per-partition request combining for sequence increments."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from threading import Event, Lock
+from typing import Any
+
+from core import metrics
+from core.exceptions import SequenceGenerationError
+
+
+@dataclass
+class PendingReservation:
+    """A caller waiting for numbers from a sequence partition."""
+
+    count: int
+    payload: Any  # Whatever the commit function needs per caller (e.g., the user)
+    first_number: int | None = None
+    error: BaseException | None = None
+    promoted: bool = False  # Set when this caller must take over as leader
+    done: Event | asyncio.Event = field(default_factory=Event)
+
+
+def _take_round(
+    queues: dict[str, list[PendingReservation]], partition_key: str, max_numbers: int
+) -> list[PendingReservation]:
+    """Take the reservations for the next round of a partition, oldest first."""
+    queue = queues.get(partition_key, [])
+    taken: list[PendingReservation] = []
+    total = 0
+    while queue and (not taken or total + queue[0].count <= max_numbers):
+        reservation = queue.pop(0)
+        taken.append(reservation)
+        total += reservation.count
+    if not queue:
+        queues.pop(partition_key, None)
+    return taken
+
+
+class SequenceCombiner:
+    """Combine concurrent reservations on the same partition into one increment.
+
+    The first caller for a partition becomes the leader: it takes every pending
+    reservation, commits them with a single increment, and hands each caller its
+    own range. Callers arriving meanwhile queue up for the next round, which is
+    led by the first of them. Threads of one worker therefore stop racing each
+    other on the sequence ETag.
+    """
+
+    def __init__(self, max_numbers_per_round: int = 100):
+        self.max_numbers_per_round = max_numbers_per_round
+        self._lock = Lock()
+        self._queues: dict[str, list[PendingReservation]] = {}
+        self._active: set[str] = set()
+
+    def reserve(
+        self,
+        partition_key: str,
+        count: int,
+        payload: Any,
+        commit: Callable[[list[PendingReservation]], int],
+    ) -> int:
+        """Reserve count numbers, possibly together with other callers.
+
+        Args:
+            partition_key: Sequence partition (e.g., "OF_2025").
+            count: How many numbers this caller needs.
+            payload: Caller data passed through to commit.
+            commit: Function that reserves sum(count) numbers for a round of
+                    reservations and returns the first number of the range.
+
+        Returns:
+            The first number reserved for this caller.
+        """
+        pending = PendingReservation(count=count, payload=payload)
+
+        with self._lock:
+            self._queues.setdefault(partition_key, []).append(pending)
+            is_leader = partition_key not in self._active
+            if is_leader:
+                self._active.add(partition_key)
+
+        if not is_leader:
+            pending.done.wait()
+            if pending.promoted:
+                pending.done.clear()
+                pending.promoted = False
+                self._lead(partition_key, commit)
+
+        if not pending.done.is_set():
+            self._lead(partition_key, commit)
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.first_number  # type: ignore[return-value]
+
+    def _lead(self, partition_key: str, commit: Callable[[list[PendingReservation]], int]) -> None:
+        """Run one round and pass leadership to the next waiting caller."""
+        with self._lock:
+            round_ = _take_round(self._queues, partition_key, self.max_numbers_per_round)
+
+        if round_:
+            metrics.increment("sequence.combined_rounds", partition=partition_key)
+            metrics.increment("sequence.combined_requests", len(round_), partition=partition_key)
+            try:
+                first_number = commit(round_)
+            except BaseException as e:
+                for reservation in round_:
+                    reservation.error = e
+            else:
+                for reservation in round_:
+                    reservation.first_number = first_number
+                    first_number += reservation.count
+            finally:
+                for reservation in round_:
+                    reservation.done.set()
+
+        with self._lock:
+            queue = self._queues.get(partition_key)
+            if queue:
+                # Hand over to the oldest waiting caller instead of serving forever
+                successor = queue[0]
+                successor.promoted = True
+                successor.done.set()
+            else:
+                self._active.discard(partition_key)
+
+
+class AsyncSequenceCombiner:
+    """SequenceCombiner for coroutines sharing one event loop.
+
+    Same leader/follower protocol, with asyncio events instead of threads. No
+    lock is needed: queues only change between awaits. A caller cancelled
+    while it waits (client disconnect, function timeout) leaves the queue, and
+    passes leadership on if it had just been promoted.
+    """
+
+    def __init__(self, max_numbers_per_round: int = 100):
+        self.max_numbers_per_round = max_numbers_per_round
+        self._queues: dict[str, list[PendingReservation]] = {}
+        self._active: set[str] = set()
+
+    async def reserve(
+        self,
+        partition_key: str,
+        count: int,
+        payload: Any,
+        commit: Callable[[list[PendingReservation]], Awaitable[int]],
+    ) -> int:
+        """Reserve count numbers, possibly together with other callers.
+
+        See SequenceCombiner.reserve; commit is a coroutine function here.
+        """
+        pending = PendingReservation(count=count, payload=payload, done=asyncio.Event())
+
+        self._queues.setdefault(partition_key, []).append(pending)
+        is_leader = partition_key not in self._active
+        if is_leader:
+            self._active.add(partition_key)
+
+        if not is_leader:
+            try:
+                await pending.done.wait()
+            except asyncio.CancelledError:
+                self._abandon(partition_key, pending)
+                raise
+            if pending.promoted:
+                pending.done.clear()
+                pending.promoted = False
+                await self._lead(partition_key, commit)
+
+        if not pending.done.is_set():
+            await self._lead(partition_key, commit)
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.first_number  # type: ignore[return-value]
+
+    def _abandon(self, partition_key: str, pending: PendingReservation) -> None:
+        """Drop a cancelled follower, handing over leadership if it was promoted."""
+        queue = self._queues.get(partition_key, [])
+        queue[:] = [reservation for reservation in queue if reservation is not pending]
+        if not queue:
+            self._queues.pop(partition_key, None)
+        if pending.promoted:
+            self._hand_over(partition_key)
+
+    def _hand_over(self, partition_key: str) -> None:
+        """Promote the oldest waiting caller, or release the partition."""
+        queue = self._queues.get(partition_key)
+        if queue:
+            # Hand over to the oldest waiting caller instead of serving forever
+            successor = queue[0]
+            successor.promoted = True
+            successor.done.set()
+        else:
+            self._active.discard(partition_key)
+
+    async def _lead(
+        self,
+        partition_key: str,
+        commit: Callable[[list[PendingReservation]], Awaitable[int]],
+    ) -> None:
+        """Run one round and pass leadership to the next waiting caller."""
+        round_ = _take_round(self._queues, partition_key, self.max_numbers_per_round)
+
+        try:
+            if round_:
+                metrics.increment("sequence.combined_rounds", partition=partition_key)
+                metrics.increment(
+                    "sequence.combined_requests", len(round_), partition=partition_key
+                )
+                try:
+                    first_number = await commit(round_)
+                except Exception as e:
+                    for reservation in round_:
+                        reservation.error = e
+                else:
+                    for reservation in round_:
+                        reservation.first_number = first_number
+                        first_number += reservation.count
+        finally:
+            for reservation in round_:
+                if reservation.first_number is None and reservation.error is None:
+                    # The leader was cancelled mid-commit: the increment may or
+                    # may not have landed, so followers must retry
+                    reservation.error = SequenceGenerationError()
+                reservation.done.set()
+            self._hand_over(partition_key)
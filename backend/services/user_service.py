@@ -4,9 +4,10 @@ from datetime import datetime
 from uuid import uuid4
 
 from azure.core.exceptions import ResourceNotFoundError
-from azure.data.tables import UpdateMode
+from azure.data.tables import TableErrorCode, TableTransactionError, UpdateMode
 
 from core.auth import hash_password, verify_password
+from core.config import settings
 from core.exceptions import (
     ConflictError,
     ForbiddenError,
@@ -14,8 +15,15 @@ from core.exceptions import (
     NotFoundError,
 )
 from core.security import add_random_delay, sanitize_odata_string
-from core.tables import get_users_table
-from models.user import UserCreate, UserEntity
+from core.tables import TRANSACTION_LIMIT, get_users_table
+from models.user import (
+    INDEX_ROW_KEY_BOUNDARY,
+    UserCreate,
+    UserEntity,
+    UserResponse,
+    UserRow,
+    email_index_row_key,
+)
 
 
 class UserService:
@@ -33,9 +41,20 @@ class UserService:
         """
         table = get_users_table()
 
-        # Query by email (case-insensitive) with sanitization
+        try:
+            # Point read of the email index row
+            row = table.get_entity(partition_key="USER", row_key=email_index_row_key(email))
+            return UserEntity.from_email_index_row(row)
+        except ResourceNotFoundError:
+            if not settings.user_email_index_fallback:
+                return None
+
+        # Users created before the index was backfilled (case-insensitive, sanitized)
         safe_email = sanitize_odata_string(email.lower())
-        query_filter = f"Email eq '{safe_email}'"
+        query_filter = (
+            f"PartitionKey eq 'USER' and Email eq '{safe_email}' "
+            f"and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+        )
         entities = list(table.query_entities(query_filter=query_filter))
 
         if not entities:
@@ -54,6 +73,9 @@ class UserService:
         Returns:
             UserEntity if found, None otherwise.
         """
+        if user_id.startswith(INDEX_ROW_KEY_BOUNDARY):
+            return None  # Index rows are not users
+
         table = get_users_table()
 
         try:
@@ -109,9 +131,8 @@ class UserService:
         Raises:
             ConflictError: If email already exists.
         """
-        # Check if email already exists
-        existing = UserService.get_by_email(data.email)
-        if existing:
+        # Check if email already exists (users that predate the email index)
+        if settings.user_email_index_fallback and UserService.get_by_email(data.email):
             raise ConflictError("E-mail já cadastrado")
 
         table = get_users_table()
@@ -130,7 +151,18 @@ class UserService:
             UpdatedAt=now,
         )
 
-        table.create_entity(entity.model_dump())
+        # The index row insert fails if the email is taken, so uniqueness is race-free
+        try:
+            table.submit_transaction(
+                [
+                    ("create", entity.model_dump()),
+                    ("create", entity.to_email_index_row()),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code == TableErrorCode.ENTITY_ALREADY_EXISTS:
+                raise ConflictError("E-mail já cadastrado")
+            raise
 
         return entity
 
@@ -159,9 +191,23 @@ class UserService:
         entity_dict.update(updates)
         entity_dict["UpdatedAt"] = datetime.utcnow()
 
-        table.update_entity(entity_dict, mode=UpdateMode.REPLACE)
+        updated = UserEntity(**entity_dict)
+        table.submit_transaction(UserService._update_operations(user, updated))
+
+        return updated
 
-        return UserEntity(**entity_dict)
+    @staticmethod
+    def _update_operations(user: UserEntity, updated: UserEntity) -> list[tuple]:
+        """Build the transaction replacing a user and its email index copy."""
+        # Keep the email index copy in sync; upsert also creates it for older users
+        operations: list[tuple] = [
+            ("update", updated.model_dump(), {"mode": UpdateMode.REPLACE}),
+            ("upsert", updated.to_email_index_row(), {"mode": UpdateMode.REPLACE}),
+        ]
+        old_index_key = email_index_row_key(user.Email)
+        if old_index_key != email_index_row_key(updated.Email):
+            operations.append(("delete", {"PartitionKey": "USER", "RowKey": old_index_key}))
+        return operations
 
     @staticmethod
     def change_password(user_id: str, current_password: str, new_password: str) -> None:
@@ -204,18 +250,11 @@ class UserService:
         Raises:
             NotFoundError: If user not found.
         """
-        import secrets
-        import string
-
         user = UserService.get_by_id(user_id)
         if not user:
             raise NotFoundError("Usuário não encontrado")
 
-        # Generate temporary password
-        alphabet = string.ascii_letters + string.digits
-        temp_password = "".join(secrets.choice(alphabet) for _ in range(12))
-        # Ensure it meets policy
-        temp_password = f"Tmp{temp_password}1"
+        temp_password = UserService._generate_temporary_password()
 
         UserService.update(
             user_id,
@@ -227,6 +266,17 @@ class UserService:
 
         return temp_password
 
+    @staticmethod
+    def _generate_temporary_password() -> str:
+        """Generate a random temporary password that meets the password policy."""
+        import secrets
+        import string
+
+        alphabet = string.ascii_letters + string.digits
+        temp_password = "".join(secrets.choice(alphabet) for _ in range(12))
+        # Ensure it meets policy
+        return f"Tmp{temp_password}1"
+
     @staticmethod
     def list_all() -> list[UserEntity]:
         """List all users.
@@ -235,9 +285,32 @@ class UserService:
             List of all UserEntity objects.
         """
         table = get_users_table()
-        entities = list(table.query_entities(query_filter="PartitionKey eq 'USER'"))
+        entities = list(
+            table.query_entities(
+                query_filter=f"PartitionKey eq 'USER' and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'"
+            )
+        )
         return [UserEntity(**entity) for entity in entities]
 
+    @staticmethod
+    def list_rows() -> list[UserRow]:
+        """List all users, as lightweight rows.
+
+        Returns:
+            List of UserRow tuples (password hashes are never read).
+        """
+        table = get_users_table()
+        entities = table.query_entities(
+            query_filter=f"PartitionKey eq 'USER' and RowKey lt '{INDEX_ROW_KEY_BOUNDARY}'",
+            select=UserResponse.ENTITY_COLUMNS,
+        )
+        return [UserRow.from_row(entity) for entity in entities]
+
+    @staticmethod
+    def _has_other_active_admin(users: list[UserRow], user_id: str) -> bool:
+        """Check if an active admin other than user_id exists."""
+        return any(u.role == "admin" and u.is_active and u.id != user_id for u in users)
+
     @staticmethod
     def deactivate(user_id: str, current_admin_id: str) -> UserEntity:
         """Deactivate a user.
@@ -261,13 +334,10 @@ class UserService:
             raise NotFoundError("Usuário não encontrado")
 
         # Check if this is the last active admin
-        if user.Role == "admin":
-            all_users = UserService.list_all()
-            active_admins = [
-                u for u in all_users if u.Role == "admin" and u.IsActive and u.RowKey != user_id
-            ]
-            if not active_admins:
-                raise ForbiddenError("Não é possível desativar o último administrador ativo")
+        if user.Role == "admin" and not UserService._has_other_active_admin(
+            UserService.list_rows(), user_id
+        ):
+            raise ForbiddenError("Não é possível desativar o último administrador ativo")
 
         return UserService.update(user_id, {"IsActive": False})
 
@@ -297,11 +367,7 @@ class UserService:
             return user  # Already not an admin
 
         # Check if this is the last active admin
-        all_users = UserService.list_all()
-        active_admins = [
-            u for u in all_users if u.Role == "admin" and u.IsActive and u.RowKey != user_id
-        ]
-        if not active_admins:
+        if not UserService._has_other_active_admin(UserService.list_rows(), user_id):
             raise ForbiddenError(
                 "Não é possível remover o papel de administrador do último administrador ativo"
             )
@@ -328,13 +394,48 @@ class UserService:
             raise NotFoundError("Usuário não encontrado")
 
         # Check if this is the last active admin
-        if user.Role == "admin":
-            all_users = UserService.list_all()
-            active_admins = [
-                u for u in all_users if u.Role == "admin" and u.IsActive and u.RowKey != user_id
-            ]
-            if not active_admins:
-                raise ForbiddenError("Não é possível excluir o último administrador ativo")
+        if user.Role == "admin" and not UserService._has_other_active_admin(
+            UserService.list_rows(), user_id
+        ):
+            raise ForbiddenError("Não é possível excluir o último administrador ativo")
+
+        table = get_users_table()
+        try:
+            table.submit_transaction(
+                [
+                    ("delete", {"PartitionKey": "USER", "RowKey": user_id}),
+                    ("delete", {"PartitionKey": "USER", "RowKey": email_index_row_key(user.Email)}),
+                ]
+            )
+        except TableTransactionError as e:
+            if e.error_code not in (
+                TableErrorCode.RESOURCE_NOT_FOUND,
+                TableErrorCode.ENTITY_NOT_FOUND,
+            ):
+                raise
+            # User predates the email index
+            table.delete_entity(partition_key="USER", row_key=user_id)
+
+    @staticmethod
+    def backfill_email_index() -> int:
+        """Create missing email index rows for existing users.
+
+        One-off migration for users created before the index existed. Safe to
+        run more than once.
 
+        Returns:
+            Number of index rows written.
+        """
         table = get_users_table()
-        table.delete_entity(partition_key="USER", row_key=user_id)
+        rows = [user.to_email_index_row() for user in UserService.list_all()]
+
+        # All rows share the USER partition: one transaction per TRANSACTION_LIMIT rows
+        for start in range(0, len(rows), TRANSACTION_LIMIT):
+            table.submit_transaction(
+                [
+                    ("upsert", row, {"mode": UpdateMode.REPLACE})
+                    for row in rows[start : start + TRANSACTION_LIMIT]
+                ]
+            )
+
+        return len(rows)
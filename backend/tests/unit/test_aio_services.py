@@ -0,0 +1,356 @@
+"""Unit tests for the async services and coroutine-aware decorators."""
+
+import asyncio
+import gzip
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableEntity
+
+from core import metrics
+from core.config import settings
+from core.exceptions import NotFoundError
+from core.middleware import handle_errors, require_admin, require_auth
+from models.document_type import DocumentTypeEntity
+from models.user import UserEntity
+from services.aio import NumberService, UserService
+from services.sequence_combiner import AsyncSequenceCombiner
+
+USER = {
+    "user_id": "user-1",
+    "email": "test@example.com",
+    "name": "Test User",
+    "role": "user",
+    "must_change_password": False,
+}
+
+
+async def _async_iter(items):
+    """Mimic the AsyncItemPaged returned by aio query_entities."""
+    for item in items:
+        yield item
+
+
+@pytest.fixture
+def sequences_table(sample_sequence_entity):
+    """Async Sequences table whose conditional updates take a moment."""
+    table = AsyncMock()
+    entity = TableEntity(**sample_sequence_entity)
+    entity._metadata = {"etag": "e0"}
+    table.get_entity.return_value = entity
+    counter = iter(range(1, 1000))
+
+    async def update_entity(*args, **kwargs):
+        await asyncio.sleep(0.01)  # Let other coroutines queue up meanwhile
+        return {"etag": f"etag-{next(counter)}"}
+
+    table.update_entity.side_effect = update_entity
+    return table
+
+
+@pytest.fixture
+def number_service(sequences_table, sample_document_type_entity):
+    """Patch async table access and document type lookup for NumberService."""
+    logs_table = AsyncMock()
+    doc_type = DocumentTypeEntity(**sample_document_type_entity)
+    NumberService.clear_sequence_cache()
+    metrics.reset()
+    with (
+        patch(
+            "services.aio.number_service.get_sequences_table",
+            AsyncMock(return_value=sequences_table),
+        ),
+        patch(
+            "services.aio.number_service.get_number_logs_table", AsyncMock(return_value=logs_table)
+        ),
+        patch(
+            "services.aio.number_service.DocumentTypeService.get_by_code",
+            AsyncMock(return_value=doc_type),
+        ),
+        patch("services.aio.number_service.NumberService._on_logs_committed", AsyncMock()),
+    ):
+        yield logs_table
+    NumberService.clear_sequence_cache()
+
+
+class TestAsyncNumberService:
+    """Tests for async number generation."""
+
+    async def test_generate_number(self, number_service, sequences_table):
+        """Test a generate is one read and one conditional update."""
+        number, formatted, name = await NumberService.generate_number("OF", 2025, USER)
+
+        assert (number, formatted, name) == (43, "OF 0043/2025", "Ofício")
+        sequences_table.update_entity.assert_awaited_once()
+        number_service.create_entity.assert_awaited_once()
+
+    async def test_concurrent_generates_are_combined(self, number_service, sequences_table):
+        """Test coroutines waiting on the same partition share one increment."""
+        results = await asyncio.gather(
+            *(NumberService.generate_number("OF", 2025, USER) for _ in range(5))
+        )
+
+        assert sorted(number for number, _, _ in results) == [43, 44, 45, 46, 47]
+        # The first caller commits alone; the four that queued meanwhile share a round
+        assert sequences_table.update_entity.await_count == 2
+
+    async def test_colocated_first_use_freezes_legacy_sequence(
+        self, number_service, sequences_table, sample_sequence_entity, monkeypatch
+    ):
+        """Test the colocated layout freezes the Sequences row before numbering."""
+        monkeypatch.setattr(settings, "sequence_storage_layout", "colocated")
+        reconciled = TableEntity(**sample_sequence_entity, LegacyReconciled=True)
+        reconciled._metadata = {"etag": "c0"}
+        number_service.get_entity.side_effect = [ResourceNotFoundError("not found"), reconciled]
+        number_service.submit_transaction.return_value = [{"etag": "c1"}, {"etag": "log"}]
+
+        number, _, _ = await NumberService.generate_number("OF", 2025, USER)
+
+        assert number == 43
+        assert "MigratedAt" in sequences_table.update_entity.call_args.args[0]
+        assert number_service.create_entity.call_args.args[0]["CurrentNumber"] == 42
+
+
+class TestAsyncSequenceCombiner:
+    """Tests for cancellation in the async request combiner."""
+
+    @staticmethod
+    def _commit(release: asyncio.Event):
+        """Commit function handing out consecutive numbers once released."""
+        numbers = iter(range(1, 1000))
+
+        async def commit(round_):
+            await release.wait()
+            first = next(numbers)
+            for _ in range(sum(reservation.count for reservation in round_) - 1):
+                next(numbers)
+            return first
+
+        return commit
+
+    async def test_cancelled_follower_does_not_block_the_partition(self):
+        """Test a follower cancelled while waiting is dropped from the queue."""
+        combiner = AsyncSequenceCombiner()
+        release = asyncio.Event()
+        commit = self._commit(release)
+
+        leader = asyncio.create_task(combiner.reserve("OF_2025", 1, None, commit))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(combiner.reserve("OF_2025", 1, None, commit))
+        await asyncio.sleep(0)
+        follower.cancel()
+        release.set()
+
+        assert await leader == 1
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert await asyncio.wait_for(combiner.reserve("OF_2025", 1, None, commit), 1) == 2
+
+    async def test_cancelled_leader_hands_over(self):
+        """Test cancelling the leader mid-commit lets the next caller lead."""
+        combiner = AsyncSequenceCombiner()
+        release = asyncio.Event()
+        commit = self._commit(release)
+
+        leader = asyncio.create_task(combiner.reserve("OF_2025", 1, None, commit))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(combiner.reserve("OF_2025", 1, None, commit))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+
+        assert await asyncio.wait_for(follower, 1) == 1
+
+
+class TestAsyncUserService:
+    """Tests for async user lookups."""
+
+    async def test_verify_credentials_is_point_read(self, sample_user_entity):
+        """Test login reads the email index row without blocking on bcrypt."""
+        table = AsyncMock()
+        table.get_entity.return_value = UserEntity(**sample_user_entity).to_email_index_row()
+        table.query_entities = MagicMock(return_value=_async_iter([]))
+
+        with (
+            patch("services.aio.user_service.get_users_table", AsyncMock(return_value=table)),
+            patch("services.aio.user_service.add_random_delay_async", AsyncMock()),
+        ):
+            user = await UserService.verify_credentials("test@example.com", "TestPassword123")
+
+        assert user.RowKey == sample_user_entity["RowKey"]
+        table.query_entities.assert_not_called()
+
+    async def test_missing_user_index_row_without_fallback(self, monkeypatch):
+        """Test get_by_email returns None without scanning once backfilled."""
+        from core.config import settings
+
+        monkeypatch.setattr(settings, "user_email_index_fallback", False)
+        table = AsyncMock()
+        table.get_entity.side_effect = ResourceNotFoundError("not found")
+
+        with patch("services.aio.user_service.get_users_table", AsyncMock(return_value=table)):
+            assert await UserService.get_by_email("nobody@example.com") is None
+
+
+class TestAsyncHistoryExport:
+    """Tests for the buffered CSV export endpoint."""
+
+    @staticmethod
+    async def _export(req, pages):
+        """Call the export endpoint over a NumberLogs table returning these pages."""
+        from functions.history.export import export_history
+
+        result = MagicMock()
+        result.by_page.return_value = _async_iter([_async_iter(page) for page in pages])
+        table = MagicMock()
+        table.query_entities.return_value = result
+
+        with (
+            patch("services.aio.history_service.get_table_client", AsyncMock(return_value=table)),
+            patch(
+                "services.aio.history_service.NumberService.list_partitions",
+                AsyncMock(return_value=[]),
+            ),
+        ):
+            return await export_history(req)
+
+    async def test_export_reads_every_page(
+        self, mock_http_request_with_cookie, sample_number_log_entity
+    ):
+        """Test the response body holds the header and the rows of every page."""
+        pages = [[sample_number_log_entity] * 2, [sample_number_log_entity]]
+        response = await self._export(mock_http_request_with_cookie(params={"year": "2025"}), pages)
+
+        body = response.get_body().decode("utf-8-sig")
+        assert response.status_code == 200
+        assert body.startswith("Data/Hora;")
+        assert body.count("\r\n") == 4
+
+    async def test_large_export_is_spooled_not_refused(
+        self, monkeypatch, mock_http_request_with_cookie, sample_number_log_entity
+    ):
+        """Test a body past the spool size goes to a temp file and is still sent whole."""
+        monkeypatch.setattr("functions.history.export.SPOOL_MAX_BYTES", 200)
+        pages = [[sample_number_log_entity] * 5, [sample_number_log_entity] * 5]
+        response = await self._export(mock_http_request_with_cookie(params={"year": "2025"}), pages)
+
+        assert response.status_code == 200
+        assert response.get_body().decode("utf-8-sig").count("\r\n") == 11
+
+    async def test_export_is_gzipped_for_clients_that_accept_it(
+        self, mock_http_request_with_cookie, sample_number_log_entity
+    ):
+        """Test the buffered body is compressed when the client sends Accept-Encoding: gzip."""
+        req = mock_http_request_with_cookie(params={"year": "2025"})
+        req.headers["Accept-Encoding"] = "gzip, deflate"
+        response = await self._export(req, [[sample_number_log_entity] * 3])
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        body = gzip.decompress(response.get_body()).decode("utf-8-sig")
+        assert body.count("\r\n") == 4
+
+    async def test_invalid_year_is_a_bad_request(self, mock_http_request_with_cookie):
+        """Test a year that is not a number gets 400, not 500."""
+        response = await self._export(mock_http_request_with_cookie(params={"year": "abc"}), [])
+
+        assert response.status_code == 400
+
+    async def test_mid_stream_error_is_logged_and_closes_the_export(self):
+        """Test a failure after the response started is counted and ends the read."""
+        from functions.history.export import _stream_export
+
+        closed = []
+
+        async def chunks():
+            try:
+                yield b"row\r\n"
+                raise RuntimeError("table read failed")
+            finally:
+                closed.append(True)
+
+        metrics.reset()
+        sent = []
+        with pytest.raises(RuntimeError):
+            async for chunk in _stream_export([b"header\r\n"], chunks()):
+                sent.append(chunk)
+
+        assert sent == [b"header\r\n", b"row\r\n"]
+        assert closed == [True]
+        assert metrics.get_counter("history_export.stream_errors") == 1
+
+
+class TestAsyncPartitionMerge:
+    """Tests for the async newest-first merge of partitions."""
+
+    async def test_rows_come_newest_first_across_partitions(self):
+        """Test rows of every partition are interleaved by RowKey, pages read on demand."""
+        from services.aio.history_service import AsyncPartitionMerge
+        from services.history_query_planner import QueryPlan
+
+        partitions = {
+            "OF_2024": [{"RowKey": "0003"}, {"RowKey": "0005"}],
+            "OF_2025": [{"RowKey": "0001"}, {"RowKey": "0002"}, {"RowKey": "0004"}],
+        }
+
+        def query(query_filter, select, results_per_page):
+            result = MagicMock()
+            rows = partitions[query_filter]
+            result.by_page.return_value = _async_iter(
+                [
+                    _async_iter(rows[i : i + results_per_page])
+                    for i in range(0, len(rows), results_per_page)
+                ]
+            )
+            return result
+
+        table = MagicMock()
+        table.query_entities.side_effect = query
+        plans = [QueryPlan("NumberLogs", p, "partition", p) for p in partitions]
+
+        row_keys = []
+        async with AsyncPartitionMerge(table, plans, per_page=2) as merged:
+            async for row in merged:
+                row_keys.append(row["RowKey"])
+                if len(row_keys) == 3:
+                    break
+
+        assert row_keys == ["0001", "0002", "0003"]
+        # OF_2024's second page is never fetched
+        assert merged.read == 5
+
+
+class TestAsyncDecorators:
+    """Tests for decorators wrapping coroutine handlers."""
+
+    async def test_require_auth_passes_current_user(self, mock_http_request_with_cookie):
+        """Test an async handler receives the authenticated user."""
+
+        @require_auth
+        async def handler(req, current_user):
+            return current_user["email"]
+
+        assert asyncio.iscoroutinefunction(handler)
+        assert await handler(mock_http_request_with_cookie()) == "test@example.com"
+
+    async def test_require_admin_rejects_users(self, mock_http_request_with_cookie):
+        """Test non-admins get 403 from an async admin handler."""
+
+        @require_admin
+        async def handler(req, current_user):
+            return "ok"
+
+        response = await handler(mock_http_request_with_cookie())
+        assert response.status_code == 403
+
+    async def test_handle_errors_maps_exceptions(self, mock_http_request):
+        """Test errors raised by an async handler become JSON responses."""
+
+        @handle_errors
+        async def handler(req):
+            raise NotFoundError("Tipo de documento não encontrado")
+
+        response = await handler(mock_http_request())
+        assert response.status_code == 404
@@ -0,0 +1,64 @@
+"""Unit tests for the in-process TTL cache."""
+
+from unittest.mock import patch
+
+from core.cache import TTLCache
+
+
+class TestTTLCache:
+    """Tests for TTLCache."""
+
+    def test_none_is_a_hit(self):
+        """Test a cached None is distinguishable from a miss."""
+        cache = TTLCache("test", ttl_seconds=60)
+        cache.set("missing", None)
+
+        assert cache.get("missing") == (True, None)
+        assert cache.get("other") == (False, None)
+
+    def test_entries_expire(self):
+        """Test entries are dropped after their TTL."""
+        cache = TTLCache("test", ttl_seconds=10)
+        with patch("core.cache.time.monotonic", return_value=100.0):
+            cache.set("OF", "Ofício")
+        with patch("core.cache.time.monotonic", return_value=109.0):
+            assert cache.get("OF") == (True, "Ofício")
+        with patch("core.cache.time.monotonic", return_value=111.0):
+            assert cache.get("OF") == (False, None)
+
+    def test_least_recently_used_is_evicted(self):
+        """Test the size cap evicts the least recently used entry."""
+        cache = TTLCache("test", ttl_seconds=None, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == (True, 1)
+        assert cache.get("b") == (False, None)
+        assert len(cache) == 2
+
+    def test_invalidate(self):
+        """Test invalidating one key or everything."""
+        cache = TTLCache("test", ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.invalidate("a")
+        assert cache.get("a") == (False, None)
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_weight_cap_evicts_least_recently_used(self):
+        """Test the weight cap evicts entries and skips values heavier than the cap."""
+        cache = TTLCache("test", ttl_seconds=None, max_weight=5, weigh=len)
+        cache.set("a", "xx")
+        cache.set("b", "xx")
+        cache.set("c", "xx")
+
+        assert cache.get("a") == (False, None)
+        assert cache.get("c") == (True, "xx")
+
+        cache.set("big", "xxxxxx")
+        assert cache.get("big") == (False, None)
+        assert cache.stats()["weight"] == 4
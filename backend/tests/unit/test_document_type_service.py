@@ -0,0 +1,150 @@
+"""Unit tests for document type lookups."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableErrorCode, TableTransactionError
+
+from core.config import settings
+from core.exceptions import ConflictError
+from models.document_type import DocumentTypeCreate, DocumentTypeEntity, DocumentTypeResponse
+from services.document_type_service import DocumentTypeService
+
+
+@pytest.fixture
+def doc_types_table():
+    """Patch the DocumentTypes table and start with an empty cache."""
+    table = MagicMock()
+    table.get_entity.side_effect = ResourceNotFoundError("not found")
+    table.query_entities.return_value = []
+    DocumentTypeService.invalidate_cache()
+    with patch("services.document_type_service.get_document_types_table", return_value=table):
+        yield table
+    DocumentTypeService.invalidate_cache()
+
+
+def _index_row(entity: dict) -> dict:
+    """Build the code index row for a document type entity."""
+    return DocumentTypeEntity(**entity).to_code_index_row()
+
+
+class TestGetByCodeCache:
+    """Tests for the per-worker document type cache."""
+
+    def test_repeated_lookups_hit_cache(self, doc_types_table, sample_document_type_entity):
+        """Test only the first lookup reaches Azure Tables."""
+        doc_types_table.get_entity.side_effect = None
+        doc_types_table.get_entity.return_value = _index_row(sample_document_type_entity)
+
+        first = DocumentTypeService.get_by_code("of")
+        second = DocumentTypeService.get_by_code("OF")
+
+        assert first.Code == second.Code == "OF"
+        doc_types_table.get_entity.assert_called_once()
+
+    def test_not_found_is_cached(self, doc_types_table):
+        """Test unknown codes don't query again."""
+        assert DocumentTypeService.get_by_code("XYZ") is None
+        assert DocumentTypeService.get_by_code("XYZ") is None
+        doc_types_table.get_entity.assert_called_once()
+
+    def test_create_invalidates_not_found(self, doc_types_table, sample_document_type_entity):
+        """Test a created type is visible right after a cached miss."""
+        assert DocumentTypeService.get_by_code("OF") is None
+
+        created = DocumentTypeService.create(DocumentTypeCreate(code="OF", name="Ofício"))
+
+        doc_types_table.get_entity.side_effect = None
+        doc_types_table.get_entity.return_value = created.to_code_index_row()
+        assert DocumentTypeService.get_by_code("OF").RowKey == created.RowKey
+
+
+class TestCodeIndex:
+    """Tests for the code-keyed index rows."""
+
+    def test_get_by_code_is_point_read(self, doc_types_table, sample_document_type_entity):
+        """Test lookups read the index row instead of scanning."""
+        doc_types_table.get_entity.side_effect = None
+        doc_types_table.get_entity.return_value = _index_row(sample_document_type_entity)
+
+        doc_type = DocumentTypeService.get_by_code("OF")
+
+        assert doc_type.RowKey == sample_document_type_entity["RowKey"]
+        doc_types_table.get_entity.assert_called_once_with(
+            partition_key="DOCTYPE", row_key="~CODE_OF"
+        )
+        doc_types_table.query_entities.assert_not_called()
+
+    def test_falls_back_to_scan_for_unindexed_types(
+        self, doc_types_table, sample_document_type_entity
+    ):
+        """Test types created before the index are still found."""
+        doc_types_table.query_entities.return_value = [sample_document_type_entity]
+
+        assert DocumentTypeService.get_by_code("OF").Code == "OF"
+        doc_types_table.query_entities.assert_called_once()
+
+    def test_fallback_can_be_disabled(self, doc_types_table, monkeypatch):
+        """Test no scan happens once the index is backfilled."""
+        monkeypatch.setattr(settings, "doctype_code_index_fallback", False)
+
+        assert DocumentTypeService.get_by_code("OF") is None
+        doc_types_table.query_entities.assert_not_called()
+
+    def test_other_index_flags_keep_the_fallback(
+        self, doc_types_table, sample_document_type_entity, monkeypatch
+    ):
+        """Test backfilling the email and history indexes doesn't drop this fallback."""
+        monkeypatch.setattr(settings, "user_email_index_fallback", False)
+        monkeypatch.setattr(settings, "history_index_fallback", False)
+        doc_types_table.query_entities.return_value = [sample_document_type_entity]
+
+        assert DocumentTypeService.get_by_code("OF").Code == "OF"
+
+    def test_create_writes_type_and_index_together(self, doc_types_table):
+        """Test the type and its index row go in one transaction."""
+        created = DocumentTypeService.create(DocumentTypeCreate(code="OF", name="Ofício"))
+
+        operations = doc_types_table.submit_transaction.call_args.args[0]
+        assert [op[0] for op in operations] == ["create", "create"]
+        assert operations[0][1]["RowKey"] == created.RowKey
+        assert operations[1][1]["RowKey"] == "~CODE_OF"
+        assert operations[1][1]["DocumentTypeId"] == created.RowKey
+
+    def test_create_duplicate_code_conflicts(self, doc_types_table):
+        """Test a concurrent create of the same code is rejected."""
+        error = TableTransactionError.__new__(TableTransactionError)
+        error.error_code = TableErrorCode.ENTITY_ALREADY_EXISTS
+        doc_types_table.submit_transaction.side_effect = error
+
+        with pytest.raises(ConflictError):
+            DocumentTypeService.create(DocumentTypeCreate(code="OF", name="Ofício"))
+
+    def test_list_all_excludes_index_rows(self, doc_types_table):
+        """Test listings only select document type rows."""
+        DocumentTypeService.list_all()
+
+        query_filter = doc_types_table.query_entities.call_args.kwargs["query_filter"]
+        assert "RowKey lt '~'" in query_filter
+
+    def test_list_rows_projects_columns(self, doc_types_table, sample_document_type_entity):
+        """Test the listing reads only the columns of a DocumentTypeResponse."""
+        doc_types_table.query_entities.return_value = [sample_document_type_entity]
+
+        items = DocumentTypeService.list_rows()
+
+        kwargs = doc_types_table.query_entities.call_args.kwargs
+        assert kwargs["select"] == DocumentTypeResponse.ENTITY_COLUMNS
+        assert "IsActive eq true" in kwargs["query_filter"]
+        assert [item.code for item in items] == ["OF"]
+
+    def test_backfill_upserts_index_rows(self, doc_types_table, sample_document_type_entity):
+        """Test the backfill writes one index row per type."""
+        doc_types_table.query_entities.return_value = [sample_document_type_entity]
+
+        assert DocumentTypeService.backfill_code_index() == 1
+
+        operations = doc_types_table.submit_transaction.call_args.args[0]
+        assert operations[0][0] == "upsert"
+        assert operations[0][1]["RowKey"] == "~CODE_OF"
@@ -0,0 +1,151 @@
+"""Unit tests for the export snapshots of closed years."""
+
+import gzip
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core import metrics
+from functions.history.export import export_history
+from services.export_snapshot_service import ExportSnapshotService, FilesystemSnapshotStore
+
+CSV = "﻿Data/Hora;Tipo\r\n01/02/2023 10:00:00;OF\r\n".encode()
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Filesystem snapshot store over a temporary directory."""
+    store = FilesystemSnapshotStore(str(tmp_path))
+    metrics.reset()
+    with (
+        patch("services.export_snapshot_service.get_snapshot_store", return_value=store),
+        patch("services.aio.export_snapshot_service.get_snapshot_store", return_value=store),
+        patch("services.export_snapshot_service.is_closed_year", lambda year: year == 2023),
+    ):
+        yield store
+
+
+def _newest(newest: dict[str, str]):
+    """Patch the newest log RowKey of each partition."""
+    return patch(
+        "services.export_snapshot_service.HistoryService.newest_row_keys",
+        return_value=newest,
+    )
+
+
+def _export():
+    """Patch the live CSV export."""
+    return patch(
+        "services.export_snapshot_service.HistoryService.iter_export_csv",
+        return_value=iter([CSV]),
+    )
+
+
+class TestExportSnapshots:
+    """Tests for ExportSnapshotService."""
+
+    def test_written_snapshot_is_served_while_fresh(self, store):
+        """Test a snapshot is the gzip of the live export and is found again."""
+        with _newest({"OF_2023": "8300_b"}), _export():
+            assert ExportSnapshotService.write("OF", 2023) is True
+            snapshot = ExportSnapshotService.find(document_type_code="OF", year=2023)
+
+        assert gzip.decompress(snapshot) == CSV
+        assert metrics.get_counter("export_snapshots.hits") == 1
+
+    def test_new_log_makes_the_snapshot_stale(self, store):
+        """Test a newer log (a late correction) falls back to the live export."""
+        with _newest({"OF_2023": "8300_b"}), _export():
+            ExportSnapshotService.write("OF", 2023)
+        with _newest({"OF_2023": "8200_c"}):
+            assert ExportSnapshotService.find(document_type_code="OF", year=2023) is None
+
+        assert metrics.get_counter("export_snapshots.misses", reason="stale") == 1
+
+    def test_fresh_snapshot_is_not_rewritten(self, store):
+        """Test running the job again skips unchanged years."""
+        with _newest({"OF_2023": "8300_b"}), _export() as export:
+            ExportSnapshotService.write(None, 2023)
+            assert ExportSnapshotService.write(None, 2023) is False
+
+        assert export.call_count == 1
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"year": 2024},
+            {"year": None},
+            {"year": 2023, "user_id": "user-1"},
+            {"year": 2023, "action": "corrected"},
+        ],
+    )
+    def test_only_whole_closed_years_use_snapshots(self, store, params):
+        """Test open years and filtered exports are always generated live."""
+        with _newest({"OF_2023": "8300_b"}), _export():
+            ExportSnapshotService.write(None, 2023)
+        with _newest({"OF_2023": "8300_b"}) as newest:
+            assert ExportSnapshotService.find(**params) is None
+
+        newest.assert_not_called()
+
+    def test_job_writes_each_closed_year_and_type(self, store):
+        """Test the job snapshots closed years only, whole and per document type."""
+        with (
+            patch(
+                "services.export_snapshot_service.NumberService.list_partitions",
+                return_value=["MEM_2023", "OF_2023", "OF_2024"],
+            ),
+            _newest({"OF_2023": "8300_b"}),
+            _export(),
+        ):
+            written = ExportSnapshotService.snapshot_closed_years()
+
+        assert written == ["historico_2023", "historico_MEM_2023", "historico_OF_2023"]
+
+    def test_open_year_is_refused(self, store):
+        """Test a year that can still change is never snapshotted."""
+        with pytest.raises(ValueError):
+            ExportSnapshotService.write(None, 2024)
+
+
+class TestAsyncExportSnapshots:
+    """Tests for the snapshot lookup of the export endpoint."""
+
+    async def test_export_serves_gzip_snapshot(self, store, mock_http_request_with_cookie):
+        """Test a fresh snapshot is sent gzip-encoded without reading NumberLogs."""
+        with _newest({"OF_2023": "8300_b"}), _export():
+            ExportSnapshotService.write("OF", 2023)
+        req = mock_http_request_with_cookie(params={"document_type_code": "of", "year": "2023"})
+        req.headers["Accept-Encoding"] = "gzip, deflate"
+        table = MagicMock()
+
+        with (
+            patch(
+                "services.aio.export_snapshot_service.HistoryService.newest_row_keys",
+                AsyncMock(return_value={"OF_2023": "8300_b"}),
+            ),
+            patch("services.aio.history_service.get_table_client", AsyncMock(return_value=table)),
+        ):
+            response = await export_history(req)
+
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.get_body()) == CSV
+        table.query_entities.assert_not_called()
+
+    async def test_snapshot_is_decompressed_for_other_clients(
+        self, store, mock_http_request_with_cookie
+    ):
+        """Test a client without gzip support gets the plain CSV of the snapshot."""
+        with _newest({"OF_2023": "8300_b"}), _export():
+            ExportSnapshotService.write("OF", 2023)
+        req = mock_http_request_with_cookie(params={"document_type_code": "of", "year": "2023"})
+
+        with patch(
+            "services.aio.export_snapshot_service.HistoryService.newest_row_keys",
+            AsyncMock(return_value={"OF_2023": "8300_b"}),
+        ):
+            response = await export_history(req)
+
+        assert "Content-Encoding" not in response.headers
+        assert response.get_body() == CSV
@@ -0,0 +1,82 @@
+"""Unit tests for the bounded partition fan-out."""
+
+import asyncio
+import logging
+import threading
+import time
+
+from core import metrics
+from core.fanout import gather_partitions, map_partitions
+
+PARTITIONS = ["OF_2023", "OF_2024", "OF_2025", "MEM_2024", "MEM_2025"]
+
+
+class ConcurrencyProbe:
+    """Track how many partition reads run at the same time."""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.running -= 1
+
+
+class TestMapPartitions:
+    """Tests for the thread-pool fan-out."""
+
+    def test_reads_concurrently_up_to_the_limit(self, monkeypatch):
+        """Test partitions overlap, never more than the configured limit."""
+        from core.config import settings
+
+        monkeypatch.setattr(settings, "history_partition_concurrency", 2)
+        probe = ConcurrencyProbe()
+
+        def read(partition: str) -> list[dict]:
+            with probe:
+                time.sleep(0.02)
+            return [{"PartitionKey": partition}]
+
+        results = map_partitions(read, PARTITIONS, "Test query")
+
+        assert [rows[0]["PartitionKey"] for rows in results] == PARTITIONS
+        assert probe.peak == 2
+
+    def test_logs_time_per_partition(self, caplog):
+        """Test one log line reports every partition of the query."""
+        metrics.reset()
+
+        with caplog.at_level(logging.INFO, logger="core.fanout"):
+            map_partitions(lambda p: [{}, {}], PARTITIONS[:2], "Test query")
+
+        assert "Test query: 2 partitions in" in caplog.text
+        assert "OF_2023 2 rows/" in caplog.text
+        assert metrics.get_observations("partition_reads.seconds", query="Test query")["count"] == 2
+
+
+class TestGatherPartitions:
+    """Tests for the asyncio fan-out."""
+
+    async def test_reads_concurrently_up_to_the_limit(self, monkeypatch):
+        """Test tasks overlap, never more than the configured limit."""
+        from core.config import settings
+
+        monkeypatch.setattr(settings, "history_partition_concurrency", 3)
+        probe = ConcurrencyProbe()
+
+        async def read(partition: str) -> list[dict]:
+            with probe:
+                await asyncio.sleep(0.01)
+            return [{"PartitionKey": partition}]
+
+        results = await gather_partitions(read, PARTITIONS, "Test query")
+
+        assert [rows[0]["PartitionKey"] for rows in results] == PARTITIONS
+        assert probe.peak == 3
@@ -0,0 +1,690 @@
+"""Unit tests for HistoryService listing, export and the history index."""
+
+import re
+import time
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core import metrics
+from core.config import BRAZIL_TZ, is_closed_year
+from core.exceptions import BadRequestError
+from core.pagination import decode_cursor, encode_cursor
+from models.number_log import (
+    HistoryFilter,
+    NumberLogEntity,
+    NumberLogResponse,
+    decode_log_id,
+    encode_log_id,
+)
+from services.history_cache import HistoryCache
+from services.history_index_service import HistoryIndexService
+from services.history_query_planner import HistoryQueryPlanner
+from services.history_service import CSV_HEADER, HistoryService
+from services.number_service import NumberService
+
+
+def _log(row_key: str, number: int) -> dict:
+    """Build a NumberLogs row."""
+    return {
+        "PartitionKey": "OF_2025",
+        "RowKey": row_key,
+        "DocumentTypeCode": "OF",
+        "Year": 2025,
+        "Number": number,
+        "Action": "generated",
+        "UserId": "user-1",
+        "UserName": "Test User",
+        "PreviousNumber": None,
+        "Notes": None,
+        "CreatedAt": datetime(2025, 1, 1),
+    }
+
+
+class FakePager:
+    """Mimic the by_page() iterator of an ItemPaged result."""
+
+    def __init__(self, rows: list[dict], start: int, size: int, service_page: int):
+        self._rows = rows
+        self._next = start
+        # The service may return fewer rows than asked for
+        self._size = min(size, service_page)
+        self.continuation_token = None
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        page = self._rows[self._next : self._next + self._size]
+        self._next += len(page)
+        self._done = self._next >= len(self._rows)
+        self.continuation_token = None if self._done else {"next": self._next}
+        return iter(page)
+
+
+class FakeResult:
+    """Mimic the ItemPaged returned by query_entities/list_entities."""
+
+    def __init__(self, rows: list[dict], results_per_page: int | None, service_page: int):
+        self._rows = rows
+        self._size = results_per_page or len(rows)
+        self._service_page = service_page
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def by_page(self, continuation_token=None):
+        start = continuation_token["next"] if continuation_token else 0
+        return FakePager(self._rows, start, self._size, self._service_page)
+
+
+@pytest.fixture
+def logs_table():
+    """NumberLogs table with 7 rows whose service pages hold at most 2 rows."""
+    rows = [_log(f"{i:03d}", 100 - i) for i in range(7)]
+    table = MagicMock()
+    table.rows = rows
+
+    def query(query_filter=None, results_per_page=None, select=None):
+        return FakeResult(rows, results_per_page, service_page=2)
+
+    table.query_entities.side_effect = query
+    table.list_entities.side_effect = lambda **kw: query(**kw)
+    HistoryCache.clear()
+    with (
+        patch("services.history_service.get_table_client", return_value=table),
+        # No partitions listed: multi-partition queries run as one query
+        patch("services.history_service.NumberService.list_partitions", return_value=[]),
+    ):
+        yield table
+
+
+class TestCursorPagination:
+    """Tests for HistoryService.list_history_page."""
+
+    def test_first_page_reads_only_page_size(self, logs_table):
+        """Test short service pages are stitched into one full page."""
+        filters = HistoryFilter(year=2025, page_size=3)
+
+        result = HistoryService.list_history_page(filters)
+
+        assert [item.number for item in result.items] == [100, 99, 98]
+        assert result.total is None
+        assert result.next_cursor is not None
+
+    def test_cursor_walks_every_row_once(self, logs_table):
+        """Test following next_cursor returns each row exactly once."""
+        filters = HistoryFilter(year=2025, page_size=3)
+        seen: list[int] = []
+        cursor = None
+
+        for _ in range(10):
+            result = HistoryService.list_history_page(filters, cursor)
+            seen.extend(item.number for item in result.items)
+            cursor = result.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == [100, 99, 98, 97, 96, 95, 94]
+
+    def test_include_total_counts_all_rows(self, logs_table):
+        """Test include_total counts every matching row."""
+        result = HistoryService.list_history_page(
+            HistoryFilter(year=2025, page_size=3), include_total=True
+        )
+
+        assert result.total == 7
+
+    def test_cursor_rejected_for_other_filters(self, logs_table):
+        """Test a cursor cannot be replayed against different filters."""
+        first = HistoryService.list_history_page(HistoryFilter(year=2025, page_size=3))
+
+        with pytest.raises(BadRequestError):
+            HistoryService.list_history_page(
+                HistoryFilter(year=2024, page_size=3), first.next_cursor
+            )
+
+
+class TestCursorEncoding:
+    """Tests for the opaque cursor format."""
+
+    def test_round_trip(self):
+        """Test a token survives encoding and decoding."""
+        token = {"PartitionKey": "OF_2025", "RowKey": "123_abc"}
+
+        assert decode_cursor(encode_cursor(token, "Year eq 2025"), "Year eq 2025") == token
+
+    def test_garbage_rejected(self):
+        """Test malformed cursors raise BadRequestError."""
+        with pytest.raises(BadRequestError):
+            decode_cursor("not-a-cursor!", None)
+
+
+class TestExport:
+    """Tests for the streaming CSV export."""
+
+    def test_one_chunk_per_page(self, logs_table):
+        """Test rows are rendered page by page after a BOM and header chunk."""
+        chunks = list(HistoryService.iter_export_csv(year=2025))
+
+        # Header chunk + 7 rows in service pages of 2
+        assert len(chunks) == 5
+        assert chunks[0].startswith("\ufeff".encode()) and b"Data/Hora" in chunks[0]
+        assert b"".join(chunks[1:]).decode().count("\r\n") == 7
+
+    def test_export_has_no_row_cap(self, logs_table):
+        """Test the export is not cut at a fixed row count."""
+        logs_table.rows.extend(_log(f"{i:05d}", i) for i in range(7, 10_050))
+
+        csv_text = HistoryService.export_csv(year=2025)
+
+        lines = csv_text.splitlines()
+        assert lines[0] == ";".join(CSV_HEADER)
+        assert len(lines) == 10_051
+
+
+@pytest.fixture
+def index_ready():
+    """HistoryIndex backfilled, with no log waiting for a repair."""
+    with (
+        patch("services.history_query_planner.settings.history_index_fallback", False),
+        patch("services.history_index_service._repairs_pending", False),
+        patch("services.history_index_service._repairs_checked_at", time.monotonic()),
+    ):
+        yield
+
+
+class TestIndexRouting:
+    """Tests for history queries served by the HistoryIndex table."""
+
+    def test_year_only_query_scans_without_backfilled_index(self):
+        """Test the legacy Year filter is kept until the index is backfilled."""
+        with patch("services.history_query_planner.settings.history_index_fallback", True):
+            plan = HistoryQueryPlanner.plan(HistoryFilter(year=2025))
+
+        assert plan.table == "NumberLogs"
+        assert plan.filter.startswith("Year eq 2025")
+
+    def test_year_only_query_reads_one_index_partition(self, index_ready):
+        """Test a year-only query is a single HistoryIndex partition."""
+        plan = HistoryQueryPlanner.plan(HistoryFilter(year=2025, action="corrected"))
+
+        assert plan.table == "HistoryIndex"
+        assert plan.filter == "PartitionKey eq 'YEAR_2025' and Action eq 'corrected'"
+
+    def test_type_and_year_query_keeps_log_partition(self, index_ready):
+        """Test a query naming the partition does not use the index."""
+        plan = HistoryQueryPlanner.plan(HistoryFilter(document_type_code="OF", year=2025))
+
+        assert plan.table == "NumberLogs"
+        assert plan.filter.startswith("PartitionKey eq 'OF_2025'")
+
+    def test_user_query_reads_the_user_partition(self, index_ready):
+        """Test a user filter reads the user's partition even with a year."""
+        plan = HistoryQueryPlanner.plan(HistoryFilter(user_id="user-1", year=2025))
+
+        assert plan.table == "HistoryIndex"
+        assert plan.filter == "PartitionKey eq 'USER_user-1' and Year eq 2025"
+
+    def test_user_query_pages_from_the_index(self, logs_table, index_ready):
+        """Test a user page is read from the index with the page size."""
+        with patch(
+            "services.history_service.get_table_client", return_value=logs_table
+        ) as get_table:
+            response = HistoryService.list_history_page(HistoryFilter(user_id="u1", page_size=3))
+
+        get_table.assert_called_once_with("HistoryIndex")
+        assert logs_table.query_entities.call_args_list[0].kwargs == {
+            "query_filter": "PartitionKey eq 'USER_u1'",
+            "select": NumberLogResponse.ENTITY_COLUMNS,
+            "results_per_page": 3,
+        }
+        assert len(response.items) == 3
+        assert response.next_cursor
+
+    def test_pending_repairs_keep_queries_on_number_logs(self, index_ready):
+        """Test the index serves no reads while a log is marked for repair."""
+        index_table = MagicMock()
+        index_table.query_entities.return_value = iter([{"RowKey": "OF_2025|001"}])
+
+        with (
+            patch("services.history_index_service._repairs_checked_at", None),
+            patch(
+                "services.history_index_service.get_history_index_table",
+                return_value=index_table,
+            ),
+        ):
+            HistoryIndexService.check_repairs()
+            plan = HistoryQueryPlanner.plan(HistoryFilter(year=2025))
+
+        assert plan.table == "NumberLogs"
+
+
+class TestIndexWriter:
+    """Tests for HistoryIndexService."""
+
+    def test_logs_are_copied_to_their_index_partitions(self):
+        """Test committed logs are upserted into their year and user partitions."""
+        index_table = MagicMock()
+        logs = [NumberLogEntity(**_log("001", 1)), NumberLogEntity(**_log("002", 2))]
+
+        with patch(
+            "services.history_index_service.get_history_index_table", return_value=index_table
+        ):
+            HistoryIndexService.index_logs(logs)
+
+        transactions = [call[0][0] for call in index_table.submit_transaction.call_args_list]
+        assert [[op[1]["PartitionKey"] for op in ops] for ops in transactions] == [
+            ["YEAR_2025", "YEAR_2025"],
+            ["USER_user-1", "USER_user-1"],
+        ]
+        assert all(op[0] == "upsert" for ops in transactions for op in ops)
+        assert transactions[1][0][1]["RowKey"] == "001"
+        assert transactions[1][0][1]["LogPartitionKey"] == "OF_2025"
+
+    def test_backfill_indexes_every_page(self, logs_table):
+        """Test the backfill copies every log row, page by page."""
+        index_table = MagicMock()
+
+        with (
+            patch(
+                "services.history_index_service.get_history_index_table",
+                return_value=index_table,
+            ),
+            patch("services.history_index_service.get_number_logs_table", return_value=logs_table),
+        ):
+            indexed = HistoryIndexService.backfill()
+
+        assert indexed == 7
+        written = [
+            op[1] for call in index_table.submit_transaction.call_args_list for op in call[0][0]
+        ]
+        # One copy per index partition (year and user)
+        assert sorted(row["RowKey"] for row in written) == sorted(
+            [f"{i:03d}" for i in range(7)] * 2
+        )
+
+    def test_failed_index_write_marks_the_logs_for_repair(self, index_ready):
+        """Test logs still not indexed at the deadline get a REPAIR marker."""
+        index_table = MagicMock()
+        index_table.submit_transaction.side_effect = [RuntimeError("unavailable"), None]
+        logs = [NumberLogEntity(**_log("001", 1))]
+        metrics.reset()
+
+        with (
+            patch("services.history_index_service.settings.history_index_retry_deadline_ms", 0),
+            patch(
+                "services.history_index_service.get_history_index_table",
+                return_value=index_table,
+            ),
+        ):
+            HistoryIndexService.index_logs(logs)
+            assert HistoryIndexService.repairs_pending()
+
+        marker = index_table.submit_transaction.call_args.args[0][0][1]
+        assert (marker["PartitionKey"], marker["RowKey"]) == ("REPAIR", "OF_2025|001")
+        assert metrics.get_counter("history_index.failures") == 1
+
+    def test_repair_indexes_marked_logs(self):
+        """Test repair copies each marked log and then removes its marker."""
+        index_table = MagicMock()
+        index_table.query_entities.return_value = [
+            {"RowKey": "OF_2025|001", "LogPartitionKey": "OF_2025", "LogRowKey": "001"}
+        ]
+        logs_table = MagicMock()
+        logs_table.get_entity.return_value = _log("001", 1)
+
+        with (
+            patch(
+                "services.history_index_service.get_history_index_table",
+                return_value=index_table,
+            ),
+            patch("services.history_index_service.get_number_logs_table", return_value=logs_table),
+        ):
+            assert HistoryIndexService.repair() == 1
+
+        assert index_table.submit_transaction.call_count == 2  # Year and user partitions
+        index_table.delete_entity.assert_called_once_with("REPAIR", "OF_2025|001")
+
+
+class TestGetById:
+    """Tests for history item ids and HistoryService.get_by_id."""
+
+    def test_item_id_round_trips_the_log_keys(self):
+        """Test a response id encodes the log's PartitionKey and RowKey."""
+        item = NumberLogResponse.from_entity(NumberLogEntity(**_log("001", 1)))
+
+        assert decode_log_id(item.id) == ("OF_2025", "001")
+
+    def test_index_rows_keep_the_log_id(self):
+        """Test an item read from HistoryIndex has the same id as the log."""
+        index_row = NumberLogEntity(**_log("001", 1)).to_index_rows()[0]
+
+        item = NumberLogResponse.from_entity(NumberLogEntity(**index_row))
+
+        assert decode_log_id(item.id) == ("OF_2025", "001")
+
+    def test_encoded_id_is_a_point_read(self):
+        """Test an encoded id reads one entity instead of querying."""
+        table = MagicMock()
+        table.get_entity.return_value = _log("001", 1)
+
+        with patch("services.history_service.get_number_logs_table", return_value=table):
+            item = HistoryService.get_by_id(encode_log_id("OF_2025", "001"))
+
+        table.get_entity.assert_called_once_with(partition_key="OF_2025", row_key="001")
+        table.query_entities.assert_not_called()
+        assert item.number == 1
+
+    def test_legacy_id_is_sanitized(self):
+        """Test a bare RowKey falls back to a sanitized cross-partition query."""
+        table = MagicMock()
+        table.query_entities.return_value = []
+
+        with patch("services.history_service.get_number_logs_table", return_value=table):
+            assert HistoryService.get_by_id("x' or RowKey ne '") is None
+
+        assert table.query_entities.call_args.kwargs["query_filter"] == (
+            "RowKey eq 'x'' RowKey ''' and RowKey ne 'SEQUENCE'"
+        )
+
+
+class TestDateRange:
+    """Tests for from/to filters served as RowKey ranges."""
+
+    @staticmethod
+    def _matches(row_key: str, bounds: list[str]) -> bool:
+        """Evaluate "RowKey ge/lt '...'" bounds the way the service does."""
+        for bound in bounds:
+            _, op, value = bound.split(" ", 2)
+            value = value.strip("'")
+            if (op == "ge" and row_key < value) or (op == "lt" and row_key >= value):
+                return False
+        return True
+
+    @pytest.mark.parametrize(
+        ("created_at", "expected"),
+        [
+            (datetime(2025, 2, 28, 23, 59, 59), False),
+            (datetime(2025, 3, 1, 0, 0, 0), True),
+            (datetime(2025, 3, 31, 23, 59, 59), True),
+            (datetime(2025, 4, 1, 0, 0, 0), False),
+        ],
+    )
+    def test_bounds_select_the_brazil_days(self, created_at, expected):
+        """Test both ends of the range are whole days in Brazil time."""
+        row_key = NumberService._build_log_entity(
+            "OF",
+            2025,
+            1,
+            "generated",
+            {"user_id": "u1", "name": "User"},
+            now=created_at.replace(tzinfo=BRAZIL_TZ),
+        ).RowKey
+
+        bounds = HistoryQueryPlanner._row_key_bounds(date(2025, 3, 1), date(2025, 3, 31))
+
+        assert self._matches(row_key, bounds) is expected
+
+    def test_range_is_part_of_the_partition_query(self):
+        """Test a dated type-and-year query stays a single-partition range query."""
+        filter_query = HistoryQueryPlanner._log_plan(
+            HistoryFilter(document_type_code="OF", year=2025, date_from=date(2025, 3, 1))
+        ).filter
+
+        assert filter_query.startswith("PartitionKey eq 'OF_2025' and RowKey lt '")
+
+
+class TestQueryPlanner:
+    """Tests for HistoryQueryPlanner."""
+
+    def test_type_only_query_reads_its_partition_range(self):
+        """Test a type without a year reads only the type's partitions."""
+        plan = HistoryQueryPlanner.plan(HistoryFilter(document_type_code="OF"))
+
+        assert plan.scan == "partition_range"
+        assert plan.filter.startswith("PartitionKey ge 'OF_' and PartitionKey lt 'OF_~'")
+
+    def test_unnamed_partition_is_a_table_scan(self):
+        """Test a year-only query without the index is reported as a full scan."""
+        with patch("services.history_query_planner.settings.history_index_fallback", True):
+            plan = HistoryQueryPlanner.plan(HistoryFilter(year=2025))
+
+        assert plan.is_full_scan
+        assert plan.table == "NumberLogs"
+
+    def test_page_records_entities_read(self, logs_table):
+        """Test a page query reports its scan and the entities it read."""
+        metrics.reset()
+
+        HistoryService.list_history_page(
+            HistoryFilter(document_type_code="OF", year=2025, page_size=3), include_total=True
+        )
+
+        assert metrics.get_counter("history.queries", scan="partition", table="NumberLogs") == 1
+        assert metrics.get_counter("history.entities_read", scan="partition") == 10
+        assert metrics.get_counter("history.entities_returned", scan="partition") == 3
+
+
+def _partitioned_log(partition_key: str, inverse_ts: int, number: int) -> dict:
+    """Build a NumberLogs row of any partition."""
+    code, year = partition_key.split("_")
+    return {
+        **_log(f"{inverse_ts}_{partition_key}", number),
+        "PartitionKey": partition_key,
+        "DocumentTypeCode": code,
+        "Year": int(year),
+    }
+
+
+@pytest.fixture
+def partitioned_table():
+    """NumberLogs table with interleaved OF_2024 and OF_2025 rows."""
+    rows = [
+        _partitioned_log("OF_2025" if i % 3 else "OF_2024", 1000 + i, 100 - i) for i in range(12)
+    ]
+    table = MagicMock()
+    table.rows = rows
+
+    def query(query_filter=None, results_per_page=None, select=None):
+        partition = re.search(r"PartitionKey eq '([^']+)'", query_filter or "")
+        after = re.search(r"RowKey gt '([^']+)'", query_filter or "")
+        matching = sorted(
+            (
+                r
+                for r in rows
+                if (not partition or r["PartitionKey"] == partition.group(1))
+                and (not after or r["RowKey"] > after.group(1))
+            ),
+            key=lambda r: (r["PartitionKey"], r["RowKey"]),
+        )
+        return FakeResult(matching, results_per_page, service_page=100)
+
+    table.query_entities.side_effect = query
+    metrics.reset()
+    HistoryCache.clear()
+    with (
+        patch("services.history_service.get_table_client", return_value=table),
+        patch(
+            "services.history_service.NumberService.list_partitions",
+            return_value=["OF_2024", "OF_2025"],
+        ),
+    ):
+        yield table
+
+
+class TestPartitionMerge:
+    """Tests for newest-first merges of several partitions."""
+
+    def test_page_is_newest_first_across_partitions(self, partitioned_table):
+        """Test a type-only page interleaves the partitions by date."""
+        result = HistoryService.list_history_page(
+            HistoryFilter(document_type_code="OF", page_size=4)
+        )
+
+        assert [item.number for item in result.items] == [100, 99, 98, 97]
+        assert result.next_cursor is not None
+
+    def test_first_page_reads_about_a_page_per_partition(self, partitioned_table):
+        """Test the merge stops after page_size + 1 rows of each partition."""
+        HistoryService.list_history_page(HistoryFilter(document_type_code="OF", page_size=2))
+
+        assert all(
+            call.kwargs["results_per_page"] == 3
+            for call in partitioned_table.query_entities.call_args_list
+        )
+        assert metrics.get_counter("history.entities_read", scan="partitions") == 6
+
+    def test_merge_is_recorded_as_partition_reads(self, partitioned_table):
+        """Test a year-only merge is reported per partition, total included, not as a table scan."""
+        with patch("services.history_query_planner.settings.history_index_fallback", True):
+            HistoryService.list_history_page(
+                HistoryFilter(year=2025, page_size=2), include_total=True
+            )
+
+        assert metrics.get_counter("history.queries", scan="partitions", table="NumberLogs") == 1
+        assert metrics.get_counter("history.queries", scan="table", table="NumberLogs") == 0
+        assert metrics.get_counter("history.partitions_read", table="NumberLogs") == 2
+        assert all(
+            "PartitionKey eq" in call.kwargs["query_filter"]
+            for call in partitioned_table.query_entities.call_args_list
+        )
+
+    def test_cursor_walks_the_merge_once(self, partitioned_table):
+        """Test following next_cursor returns every row once, newest first."""
+        filters = HistoryFilter(document_type_code="OF", page_size=5)
+        seen: list[int] = []
+        cursor = None
+
+        for _ in range(10):
+            result = HistoryService.list_history_page(filters, cursor)
+            seen.extend(item.number for item in result.items)
+            cursor = result.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == list(range(100, 88, -1))
+
+    def test_continuation_cursor_rejected_by_merge(self, partitioned_table):
+        """Test a cursor of a single-query page is not replayed against a merge."""
+        cursor = encode_cursor({"next": 2}, "NumberLogs:None")
+
+        with pytest.raises(BadRequestError):
+            HistoryService.list_history_page(HistoryFilter(document_type_code="OF"), cursor)
+
+    def test_page_numbers_count_every_partition(self, partitioned_table):
+        """Test legacy pages cut the merged stream and count all of it."""
+        result = HistoryService.list_history(
+            HistoryFilter(document_type_code="OF", page=2, page_size=5)
+        )
+
+        assert [item.number for item in result.items] == [95, 94, 93, 92, 91]
+        assert result.total == 12
+        assert result.total_pages == 3
+
+    def test_export_merges_partitions_newest_first(self, partitioned_table):
+        """Test a type-only export reads every partition and interleaves them by date."""
+        csv_text = HistoryService.export_csv(document_type_code="OF")
+
+        numbers = [int(line.split(";")[3]) for line in csv_text.splitlines()[1:]]
+        assert numbers == list(range(100, 88, -1))
+
+    def test_recent_activity_returns_the_newest_rows(self, partitioned_table):
+        """Test the activity feed is the first page of the merge."""
+        items = HistoryService.recent_activity(limit=3)
+
+        assert [item.number for item in items] == [100, 99, 98]
+
+    def test_newest_row_keys_read_one_row_per_partition(self, partitioned_table):
+        """Test the newest log of each partition is its first row, SEQUENCE excluded."""
+        with patch(
+            "services.history_service.get_number_logs_table", return_value=partitioned_table
+        ):
+            newest = HistoryService.newest_row_keys("OF")
+
+        assert newest == {
+            partition: min(
+                r["RowKey"] for r in partitioned_table.rows if r["PartitionKey"] == partition
+            )
+            for partition in ("OF_2024", "OF_2025")
+        }
+        for call in partitioned_table.query_entities.call_args_list:
+            assert call.kwargs["results_per_page"] == 1
+            assert "RowKey ne 'SEQUENCE'" in call.kwargs["query_filter"]
+
+    def test_partition_plan_keeps_row_conditions(self):
+        """Test narrowing a plan to a partition keeps its filters and resumes after a RowKey."""
+        plan = HistoryQueryPlanner.plan(HistoryFilter(document_type_code="OF", action="corrected"))
+
+        partition_plan = HistoryQueryPlanner.partition_plan(plan, "OF_2024", "0000001005")
+
+        assert partition_plan.scan == "partition"
+        assert partition_plan.filter.startswith(
+            "PartitionKey eq 'OF_2024' and RowKey gt '0000001005' and Action eq 'corrected'"
+        )
+
+
+class TestHistoryCache:
+    """Tests for the per-worker history page cache."""
+
+    def test_repeated_page_is_served_from_the_cache(self, logs_table):
+        """Test the same page is read from Azure Tables once."""
+        metrics.reset()
+        filters = HistoryFilter(document_type_code="OF", year=2025, page_size=3)
+
+        first = HistoryService.list_history_page(filters)
+        reads = logs_table.query_entities.call_count
+        second = HistoryService.list_history_page(filters)
+
+        assert second == first
+        assert logs_table.query_entities.call_count == reads
+        assert metrics.get_counter("cache.misses", cache="history_pages") == 1
+        assert metrics.get_counter("cache.hits", cache="history_pages") == 1
+
+    def test_write_to_the_partition_invalidates_its_pages(self, logs_table):
+        """Test a committed log makes the cached pages of its partition stale."""
+        filters = HistoryFilter(document_type_code="of", year=2025, page=1, page_size=3)
+        HistoryService.list_history(filters)
+
+        HistoryCache.bump(["OF_2025"])
+        HistoryService.list_history(filters)
+
+        assert logs_table.query_entities.call_count == 2
+
+    def test_write_to_another_partition_keeps_the_pages(self, logs_table):
+        """Test pages of other partitions stay cached."""
+        filters = HistoryFilter(document_type_code="OF", year=2025, page_size=3)
+        HistoryService.list_history_page(filters)
+        reads = logs_table.query_entities.call_count
+
+        HistoryCache.bump(["OF_2024", "MEM_2025"])
+        HistoryService.list_history_page(filters)
+
+        assert logs_table.query_entities.call_count == reads
+
+    def test_cursor_pages_are_cached_separately(self, logs_table):
+        """Test each cursor of a walk is its own entry."""
+        filters = HistoryFilter(year=2025, page_size=3)
+        first = HistoryService.list_history_page(filters)
+
+        second = HistoryService.list_history_page(filters, first.next_cursor)
+
+        assert second.items != first.items
+
+    @pytest.mark.parametrize(
+        ("year", "today", "closed"),
+        [
+            (2024, date(2026, 1, 15), True),
+            (2025, date(2026, 1, 15), False),
+            (2025, date(2026, 2, 1), True),
+            (2026, date(2026, 6, 1), False),
+            (None, date(2026, 6, 1), False),
+        ],
+    )
+    def test_closed_years(self, year, today, closed):
+        """Test only years that can no longer get numbers are cached without TTL."""
+        assert is_closed_year(year, today) is closed
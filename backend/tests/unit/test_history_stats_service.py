@@ -0,0 +1,261 @@
+"""Unit tests for the history statistics counters."""
+
+import re
+from datetime import UTC, date, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+from azure.data.tables import TableEntity
+
+from core import metrics
+from core.config import BRAZIL_TZ
+from models.document_type import DocumentTypeRow
+from models.number_log import NumberLogEntity
+from models.sequence import SequenceEntity
+from services.history_stats_service import HistoryStatsService
+
+
+def _log(
+    action: str = "generated",
+    user_id: str = "user-1",
+    code: str = "OF",
+    created_at: datetime = datetime(2025, 1, 1, 12, tzinfo=BRAZIL_TZ),
+) -> NumberLogEntity:
+    """Build a committed log row."""
+    return NumberLogEntity(
+        PartitionKey=f"{code}_2025",
+        RowKey="9999_abc",
+        DocumentTypeCode=code,
+        Year=2025,
+        Number=1,
+        Action=action,
+        UserId=user_id,
+        UserName=f"Name {user_id}",
+        CreatedAt=created_at,
+    )
+
+
+class FakeStatsTable:
+    """In-memory HistoryStats table with ETag checks on transactions."""
+
+    def __init__(self):
+        self.rows: dict[tuple[str, str], TableEntity] = {}
+        self.version = 0
+        self.before_write = None  # Hook to simulate a concurrent writer
+
+    def _store(self, row: dict) -> None:
+        self.version += 1
+        entity = TableEntity(**row)
+        entity._metadata = {"etag": f"e{self.version}"}
+        self.rows[(row["PartitionKey"], row["RowKey"])] = entity
+
+    def query_entities(self, query_filter: str, select=None):
+        partitions = re.findall(r"PartitionKey eq '([^']+)'", query_filter)
+        row_keys = re.findall(r"RowKey eq '([^']+)'", query_filter)
+        ranges = re.findall(r"RowKey (ge|le|lt) '([^']+)'", query_filter)
+
+        def matches(rk: str) -> bool:
+            in_range = all({"ge": rk >= v, "le": rk <= v, "lt": rk < v}[op] for op, v in ranges)
+            if row_keys and ranges:
+                # "(RowKey eq ... or (RowKey ge ... and RowKey lt ...))"
+                return rk in row_keys or in_range
+            return (not row_keys or rk in row_keys) and in_range
+
+        return sorted(
+            (
+                e
+                for (pk, rk), e in self.rows.items()
+                if (not partitions or pk in partitions) and matches(rk)
+            ),
+            key=lambda e: (e["PartitionKey"], e["RowKey"]),
+        )
+
+    def list_entities(self, select=None):
+        return list(self.rows.values())
+
+    def submit_transaction(self, operations):
+        if self.before_write:
+            hook, self.before_write = self.before_write, None
+            hook()
+        for kind, row, *options in operations:
+            key = (row["PartitionKey"], row["RowKey"])
+            if kind == "create" and key in self.rows:
+                raise ResourceExistsError("exists")
+            if kind == "update" and self.rows[key].metadata["etag"] != options[0]["etag"]:
+                raise ResourceModifiedError("modified")
+        for kind, row, *_ in operations:
+            self._store(row)
+
+    def upsert_entity(self, entity, mode=None):
+        self._store(entity)
+
+    def delete_entity(self, partition_key, row_key):
+        if (partition_key, row_key) not in self.rows:
+            raise ResourceNotFoundError("not found")
+        del self.rows[(partition_key, row_key)]
+
+
+@pytest.fixture
+def stats_table():
+    """Patch the HistoryStats table with an in-memory one."""
+    table = FakeStatsTable()
+    metrics.reset()
+    with (
+        patch("services.history_stats_service.get_history_stats_table", return_value=table),
+    ):
+        yield table
+
+
+class TestRecordLogs:
+    """Tests for HistoryStatsService.record_logs."""
+
+    def test_counts_by_partition_user_and_action(self, stats_table):
+        """Test the TOTAL and per-user rows add up the committed logs."""
+        HistoryStatsService.record_logs([_log(), _log(), _log("corrected", "user-2")])
+        HistoryStatsService.record_logs([_log()])
+
+        total = stats_table.rows[("OF_2025", "TOTAL")]
+        assert (total["Generated"], total["Corrected"]) == (3, 1)
+        assert stats_table.rows[("OF_2025", "USER_user-1")]["Generated"] == 3
+        assert stats_table.rows[("OF_2025", "USER_user-2")]["Corrected"] == 1
+
+    def test_conflict_is_retried_without_losing_counts(self, stats_table):
+        """Test a concurrent update is re-read and added to, not overwritten."""
+        HistoryStatsService.record_logs([_log()])
+        concurrent = HistoryStatsService._collect_deltas([_log().model_dump()])["OF_2025"]
+        stats_table.before_write = lambda: HistoryStatsService._apply_partition(
+            stats_table, "OF_2025", concurrent
+        )
+
+        HistoryStatsService.record_logs([_log()])
+
+        assert stats_table.rows[("OF_2025", "TOTAL")]["Generated"] == 3
+        assert metrics.get_counter("history_stats.conflicts", partition="OF_2025") == 1
+
+    def test_failed_update_marks_the_partition_for_rebuild(self, stats_table):
+        """Test counters that can't be updated leave a REBUILD row instead of drifting silently."""
+        submit = stats_table.submit_transaction
+        stats_table.submit_transaction = MagicMock(side_effect=RuntimeError("down"))
+
+        HistoryStatsService.record_logs([_log()])
+
+        assert ("OF_2025", "REBUILD") in stats_table.rows
+        assert metrics.get_counter("history_stats.failures", partition="OF_2025") == 1
+        stats_table.submit_transaction = submit
+
+    def test_rebuild_marked_recounts_only_marked_partitions(self, stats_table):
+        """Test the scheduled rebuild recounts marked partitions and clears the mark."""
+        HistoryStatsService.record_logs([_log(), _log(code="MEM")])
+        stats_table._store(HistoryStatsService._rebuild_marker("OF_2025"))
+        logs_table = MagicMock()
+        logs_table.query_entities.return_value = [_log().model_dump()] * 4
+
+        with patch("services.history_stats_service.get_number_logs_table", return_value=logs_table):
+            assert HistoryStatsService.rebuild_marked() == 1
+
+        assert stats_table.rows[("OF_2025", "TOTAL")]["Generated"] == 4
+        assert stats_table.rows[("MEM_2025", "TOTAL")]["Generated"] == 1
+        assert ("OF_2025", "REBUILD") not in stats_table.rows
+
+
+class TestStatistics:
+    """Tests for reading and rebuilding the counters."""
+
+    def test_get_statistics_sums_counter_rows(self, stats_table):
+        """Test statistics come from the counters of every matching partition."""
+        HistoryStatsService.record_logs(
+            [_log(), _log("corrected"), _log(code="MEM", user_id="user-2")]
+        )
+
+        stats = HistoryStatsService.get_statistics()
+
+        assert stats == {
+            "total": 3,
+            "generated": 2,
+            "corrected": 1,
+            "by_document_type": {"OF": 2, "MEM": 1},
+            "by_user": {"Name user-1": 2, "Name user-2": 1},
+        }
+
+    def test_year_reads_the_partition_of_every_type(self, stats_table):
+        """Test a year alone reads each document type's partition of that year."""
+        HistoryStatsService.record_logs([_log(), _log(code="MEM"), _log("corrected")])
+        doc_types = [
+            DocumentTypeRow(f"id-{code}", code, code, True, datetime.now(), datetime.now())
+            for code in ("MEM", "OF", "PORT")
+        ]
+
+        with patch(
+            "services.history_stats_service.DocumentTypeService.list_rows", return_value=doc_types
+        ):
+            stats = HistoryStatsService.get_statistics(year=2025)
+
+        assert stats["by_document_type"] == {"MEM": 1, "OF": 2}
+
+    def test_type_statistics_are_a_partition_range(self):
+        """Test a type alone is a key range, not a DocumentTypeCode table scan."""
+        stats_filter = HistoryStatsService._build_stats_filter("OF", None)
+
+        assert stats_filter.startswith("PartitionKey ge 'OF_' and PartitionKey lt 'OF_~' and ")
+
+    def test_rebuild_replaces_counters_from_logs(self, stats_table):
+        """Test a rebuild recomputes counts and drops rows with no logs left."""
+        HistoryStatsService.record_logs([_log(user_id="gone")] * 5)
+        logs_table = MagicMock()
+        logs_table.query_entities.return_value = [_log().model_dump(), _log().model_dump()]
+        sequence = SequenceEntity(
+            PartitionKey="OF_2025", DocumentTypeCode="OF", Year=2025, UpdatedAt=datetime.now()
+        )
+
+        with (
+            patch("services.history_stats_service.get_number_logs_table", return_value=logs_table),
+            patch("services.number_service.NumberService.list_sequences", return_value=[sequence]),
+        ):
+            rebuilt = HistoryStatsService.rebuild()
+
+        assert rebuilt == 1
+        assert stats_table.rows[("OF_2025", "TOTAL")]["Generated"] == 2
+        assert stats_table.rows[("OF_2025", "MONTH_2025-01")]["Generated"] == 2
+        assert ("OF_2025", "USER_gone") not in stats_table.rows
+
+
+class TestHistogram:
+    """Tests for the day and month buckets."""
+
+    def test_buckets_use_brazil_dates(self, stats_table):
+        """Test a log read back in UTC lands on its Brazil day."""
+        # 01:30 UTC on Mar 15 is still Mar 14 in Brazil
+        HistoryStatsService.record_logs([_log(created_at=datetime(2025, 3, 15, 1, 30, tzinfo=UTC))])
+
+        assert ("OF_2025", "DAY_2025-03-14") in stats_table.rows
+        assert ("OF_2025", "MONTH_2025-03") in stats_table.rows
+
+    def test_range_of_buckets(self, stats_table):
+        """Test a day range returns only its buckets, in order."""
+        HistoryStatsService.record_logs(
+            [_log(created_at=datetime(2025, 3, day, 12, tzinfo=BRAZIL_TZ)) for day in (1, 2, 2, 20)]
+            + [_log("corrected", created_at=datetime(2025, 3, 2, 12, tzinfo=BRAZIL_TZ))]
+        )
+
+        buckets = HistoryStatsService.get_histogram(
+            "OF", 2025, "day", start=date(2025, 3, 2), end=date(2025, 3, 20)
+        )
+
+        assert [(b.period, b.generated, b.corrected) for b in buckets] == [
+            ("2025-03-02", 2, 1),
+            ("2025-03-20", 1, 0),
+        ]
+
+    def test_statistics_ignore_buckets(self, stats_table):
+        """Test bucket rows are not counted as users in the statistics."""
+        HistoryStatsService.record_logs([_log()])
+
+        stats = HistoryStatsService.get_statistics("OF", 2025)
+
+        assert stats["by_user"] == {"Name user-1": 1}
+        assert stats["total"] == 1
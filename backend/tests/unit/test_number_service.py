@@ -0,0 +1,296 @@
+"""Unit tests for number generation."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+from azure.data.tables import TableEntity
+
+from core import metrics
+from core.exceptions import SequenceGenerationError
+from models.document_type import DocumentTypeEntity
+from services.number_service import NumberService
+
+USER = {
+    "user_id": "user-1",
+    "email": "test@example.com",
+    "name": "Test User",
+    "role": "user",
+    "must_change_password": False,
+}
+
+
+def _table_entity(data: dict, etag: str) -> TableEntity:
+    """Build a TableEntity carrying an ETag, as returned by get_entity."""
+    entity = TableEntity(**data)
+    entity._metadata = {"etag": etag}
+    return entity
+
+
+@pytest.fixture
+def sequences_table():
+    """Mock Sequences table whose writes return a fresh ETag."""
+    table = MagicMock()
+    counter = iter(range(1, 1000))
+    table.update_entity.side_effect = lambda *a, **k: {"etag": f"etag-{next(counter)}"}
+    table.create_entity.side_effect = lambda *a, **k: {"etag": "etag-created"}
+    return table
+
+
+@pytest.fixture
+def number_service(sequences_table, sample_document_type_entity):
+    """Patch table access and document type lookup for NumberService."""
+    logs_table = MagicMock()
+    doc_type = DocumentTypeEntity(**sample_document_type_entity)
+    NumberService.clear_sequence_cache()
+    metrics.reset()
+    with (
+        patch("services.number_service.get_sequences_table", return_value=sequences_table),
+        patch("services.number_service.get_number_logs_table", return_value=logs_table),
+        patch("services.number_service.DocumentTypeService.get_by_code", return_value=doc_type),
+        patch("services.number_service.NumberService._on_logs_committed"),
+    ):
+        yield logs_table
+    NumberService.clear_sequence_cache()
+
+
+class TestGenerateNumber:
+    """Tests for NumberService.generate_number round trips."""
+
+    def test_new_partition_is_created_with_first_number(self, number_service, sequences_table):
+        """Test the first number of a partition costs a read and a create."""
+        sequences_table.get_entity.side_effect = ResourceNotFoundError("not found")
+
+        number, formatted, _ = NumberService.generate_number("OF", 2025, USER)
+
+        assert number == 1
+        assert formatted == "OF 0001/2025"
+        sequences_table.create_entity.assert_called_once()
+        sequences_table.update_entity.assert_not_called()
+
+    def test_warm_partition_skips_read(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test consecutive generates reuse the ETag from the previous write."""
+        sequences_table.get_entity.return_value = _table_entity(sample_sequence_entity, "e0")
+
+        first, _, _ = NumberService.generate_number("OF", 2025, USER)
+        second, _, _ = NumberService.generate_number("OF", 2025, USER)
+
+        assert (first, second) == (43, 44)
+        assert sequences_table.get_entity.call_count == 1
+        assert sequences_table.update_entity.call_args.kwargs["etag"] == "etag-1"
+
+    def test_conflict_rereads_sequence(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test a stale cached ETag is dropped and the sequence re-read."""
+        sequences_table.get_entity.return_value = _table_entity(sample_sequence_entity, "e0")
+        NumberService.generate_number("OF", 2025, USER)
+
+        sample_sequence_entity["CurrentNumber"] = 50
+        sequences_table.get_entity.return_value = _table_entity(sample_sequence_entity, "e9")
+        sequences_table.update_entity.side_effect = [
+            ResourceModifiedError("412 Precondition Failed"),
+            {"etag": "e10"},
+        ]
+
+        number, _, _ = NumberService.generate_number("OF", 2025, USER)
+
+        assert number == 51
+        assert sequences_table.get_entity.call_count == 2
+        stats = NumberService.get_contention_stats("OF_2025")
+        assert stats["conflict_rate"] == 1 / 3
+        assert stats["attempts_per_success"] == 1.5
+
+
+class TestGenerateBatch:
+    """Tests for reserving contiguous ranges."""
+
+    def test_batch_is_one_increment(self, number_service, sequences_table, sample_sequence_entity):
+        """Test a batch advances the sequence once and logs every number."""
+        logs_table = number_service
+        sequences_table.get_entity.return_value = _table_entity(sample_sequence_entity, "e0")
+
+        first, last, _ = NumberService.generate_batch("OF", 2025, 150, USER)
+
+        assert (first, last) == (43, 192)
+        sequences_table.update_entity.assert_called_once()
+        assert sequences_table.update_entity.call_args.args[0]["CurrentNumber"] == 192
+        batches = [c.args[0] for c in logs_table.submit_transaction.call_args_list]
+        assert [len(b) for b in batches] == [100, 50]
+        row_keys = [op[1]["RowKey"] for b in batches for op in b]
+        assert row_keys == sorted(row_keys, reverse=True)  # Highest number sorts first
+
+
+class TestRequestCombining:
+    """Tests for combining concurrent generates in one worker."""
+
+    def test_concurrent_generates_share_increments(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test concurrent callers get distinct numbers from fewer writes."""
+        sequences_table.get_entity.return_value = _table_entity(sample_sequence_entity, "e0")
+        writes = iter(range(1, 1000))
+
+        def slow_update(*args, **kwargs):
+            time.sleep(0.02)
+            return {"etag": f"etag-{next(writes)}"}
+
+        sequences_table.update_entity.side_effect = slow_update
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(
+                pool.map(lambda _: NumberService.generate_number("OF", 2025, USER), range(20))
+            )
+
+        numbers = sorted(number for number, _, _ in results)
+        assert numbers == list(range(43, 63))
+        assert sequences_table.update_entity.call_count < 20
+
+
+class TestColocatedLayout:
+    """Tests for the layout where SEQUENCE rows live with their logs."""
+
+    @pytest.fixture(autouse=True)
+    def colocated(self, monkeypatch):
+        """Switch the storage layout for the duration of a test."""
+        from core.config import settings
+
+        monkeypatch.setattr(settings, "sequence_storage_layout", "colocated")
+
+    def test_generate_is_one_transaction(self, number_service, sample_sequence_entity):
+        """Test the sequence update and log insert are submitted together."""
+        logs_table = number_service
+        logs_table.get_entity.return_value = _table_entity(
+            {**sample_sequence_entity, "LegacyReconciled": True}, "e0"
+        )
+        logs_table.submit_transaction.return_value = [{"etag": "e1"}, {"etag": "log"}]
+
+        number, _, _ = NumberService.generate_number("OF", 2025, USER)
+
+        assert number == 43
+        operations = logs_table.submit_transaction.call_args.args[0]
+        assert [op[0] for op in operations] == ["update", "create"]
+        assert operations[0][2]["etag"] == "e0"
+        assert operations[0][1]["LegacyReconciled"] is True
+        assert operations[1][1]["PartitionKey"] == "OF_2025"
+        logs_table.create_entity.assert_not_called()
+
+    def test_legacy_sequence_is_frozen_then_migrated_on_first_use(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test a partition missing from NumberLogs is seeded from a frozen Sequences row."""
+        logs_table = number_service
+        logs_table.get_entity.side_effect = [
+            ResourceNotFoundError("not found"),
+            _table_entity({**sample_sequence_entity, "LegacyReconciled": True}, "e0"),
+        ]
+        sequences_table.get_entity.return_value = _table_entity(sample_sequence_entity, "old")
+        logs_table.submit_transaction.return_value = [{"etag": "e1"}, {"etag": "log"}]
+
+        number, _, _ = NumberService.generate_number("OF", 2025, USER)
+
+        assert number == 43
+        freeze = sequences_table.update_entity.call_args
+        assert "MigratedAt" in freeze.args[0]
+        assert freeze.kwargs["etag"] == "old"
+        assert logs_table.create_entity.call_args.args[0]["CurrentNumber"] == 42
+
+    def test_early_copy_catches_up_with_split_numbers(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test a copy made before the freeze is raised to the numbers issued since."""
+        logs_table = number_service
+        early_copy = _table_entity(sample_sequence_entity, "copy")
+        logs_table.get_entity.side_effect = [
+            early_copy,
+            early_copy,
+            _table_entity(
+                {**sample_sequence_entity, "CurrentNumber": 50, "LegacyReconciled": True}, "e0"
+            ),
+        ]
+        logs_table.create_entity.side_effect = ResourceExistsError("exists")
+        sequences_table.get_entity.return_value = _table_entity(
+            {**sample_sequence_entity, "CurrentNumber": 50}, "old"
+        )
+        logs_table.submit_transaction.return_value = [{"etag": "e1"}, {"etag": "log"}]
+
+        number, _, _ = NumberService.generate_number("OF", 2025, USER)
+
+        assert number == 51
+        carried = logs_table.update_entity.call_args
+        assert carried.args[0]["CurrentNumber"] == 50
+        assert carried.kwargs["etag"] == "copy"
+
+    def test_list_sequences_reads_each_type_range(self, number_service, sequences_table):
+        """Test listing sequences queries each type's partitions instead of scanning NumberLogs."""
+        logs_table = number_service
+        logs_table.query_entities.return_value = []
+        sequences_table.query_entities.return_value = []
+        rows = [MagicMock(code="MEM"), MagicMock(code="OF")]
+
+        with patch(
+            "services.number_service.DocumentTypeService.list_rows", return_value=rows
+        ) as list_rows:
+            NumberService.list_sequences()
+
+        list_rows.assert_called_once_with(include_inactive=True)
+        filters = [call.kwargs["query_filter"] for call in logs_table.query_entities.call_args_list]
+        assert len(filters) == 2
+        assert all("PartitionKey ge" in query_filter for query_filter in filters)
+
+
+class TestListPartitions:
+    """Tests for listing the NumberLogs partitions of history queries."""
+
+    def test_partitions_are_the_sequences(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test every partition with a sequence is listed, from the type's key range."""
+        sequences_table.query_entities.return_value = [
+            {**sample_sequence_entity, "PartitionKey": "OF_2025"},
+            {**sample_sequence_entity, "PartitionKey": "OF_2024", "Year": 2024},
+        ]
+
+        assert NumberService.list_partitions("OF") == ["OF_2024", "OF_2025"]
+        assert sequences_table.query_entities.call_args.kwargs["query_filter"] == (
+            "PartitionKey ge 'OF_' and PartitionKey lt 'OF_~' and RowKey eq 'SEQUENCE'"
+        )
+
+
+class TestSequenceFreeze:
+    """Tests for the split layout once a partition has moved to NumberLogs."""
+
+    def test_frozen_sequence_is_refused(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test a split instance stops numbering a partition that was moved."""
+        sequences_table.get_entity.return_value = _table_entity(
+            {**sample_sequence_entity, "MigratedAt": datetime.now()}, "frozen"
+        )
+
+        with pytest.raises(SequenceGenerationError):
+            NumberService.generate_number("OF", 2025, USER)
+
+        sequences_table.update_entity.assert_not_called()
+
+    def test_correction_is_conditional(
+        self, number_service, sequences_table, sample_sequence_entity
+    ):
+        """Test a correction can't overwrite a sequence changed since it was read."""
+        sequences_table.get_entity.return_value = _table_entity(sample_sequence_entity, "e0")
+        sequences_table.update_entity.side_effect = ResourceModifiedError("etag mismatch")
+
+        with pytest.raises(SequenceGenerationError):
+            NumberService.correct_sequence("OF", 2025, 10, "fix", USER)
+
+        assert sequences_table.update_entity.call_args.kwargs["etag"] == "e0"
+        sequences_table.upsert_entity.assert_not_called()
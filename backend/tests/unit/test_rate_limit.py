@@ -0,0 +1,60 @@
+"""Unit tests for rate limiting."""
+
+import pytest
+
+from core import rate_limit
+
+
+@pytest.fixture(autouse=True)
+def clean_store():
+    """Start every test with an empty in-memory store."""
+    rate_limit._rate_limit_store.clear()
+    yield
+    rate_limit._rate_limit_store.clear()
+
+
+class TestRequestCost:
+    """Tests for charging a request more than once."""
+
+    def test_cost_counts_against_limit(self):
+        """Test a costly request uses several slots of the window."""
+        assert rate_limit._check_rate_limit_memory("user:1", 10, 60, cost=8) is True
+        assert rate_limit._check_rate_limit_memory("user:1", 10, 60, cost=3) is False
+        assert rate_limit._check_rate_limit_memory("user:1", 10, 60, cost=2) is True
+        assert rate_limit._check_rate_limit_memory("user:1", 10, 60) is False
+
+    def test_decorator_uses_cost_func(self, mock_http_request):
+        """Test the decorator charges what cost_func returns."""
+        calls = []
+
+        @rate_limit.rate_limit(max_requests=5, window_minutes=1, cost_func=lambda req: 3)
+        def handler(req):
+            calls.append(req)
+            return "ok"
+
+        req = mock_http_request(headers={"X-Forwarded-For": "10.0.0.1"})
+        assert handler(req) == "ok"
+        assert handler(req).status_code == 429
+        assert len(calls) == 1
+
+    async def test_decorator_wraps_coroutines(self, mock_http_request):
+        """Test async handlers are awaited and still rate limited."""
+
+        @rate_limit.rate_limit(max_requests=1, window_minutes=1)
+        async def handler(req):
+            return "ok"
+
+        req = mock_http_request(headers={"X-Forwarded-For": "10.0.0.2"})
+        assert await handler(req) == "ok"
+        assert (await handler(req)).status_code == 429
+
+    def test_batch_budget_is_separate_from_generate(self, mock_http_request):
+        """Test batch numbers don't share the per-IP generate window."""
+        from functions.numbers.generate_batch import _batch_key
+
+        req = mock_http_request(headers={"X-Forwarded-For": "10.0.0.3"})
+        key = _batch_key(req)
+
+        assert key == "batch:ip:10.0.0.3"
+        assert rate_limit._check_rate_limit_memory(key, 100, 60, cost=100) is True
+        assert rate_limit._check_rate_limit_memory("ip:10.0.0.3", 30, 60) is True
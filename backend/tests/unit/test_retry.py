@@ -0,0 +1,40 @@
+"""Unit tests for the conflict retry policy."""
+
+from unittest.mock import patch
+
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceModifiedError
+
+from core.retry import RetryPolicy, is_conflict_error
+
+
+class TestConflictDetection:
+    """Tests for typed conflict detection."""
+
+    def test_conflict_errors(self):
+        """Test 412 and 409 errors are retryable conflicts."""
+        assert is_conflict_error(ResourceModifiedError("Precondition Failed"))
+        assert is_conflict_error(ResourceExistsError("EntityAlreadyExists"))
+
+    def test_other_errors_are_not_conflicts(self):
+        """Test unrelated errors (even mentioning 412) are not retried."""
+        assert not is_conflict_error(HttpResponseError("Server busy, retry after 412 ms"))
+        assert not is_conflict_error(ValueError("412"))
+
+
+class TestRetryPolicy:
+    """Tests for decorrelated jitter and the deadline."""
+
+    def test_delays_stay_within_bounds(self):
+        """Test every delay is between base and cap."""
+        state = RetryPolicy(base_delay=0.01, max_delay=0.2, deadline=100).start()
+        delays = [state.next_delay() for _ in range(50)]
+
+        assert all(0.01 <= d <= 0.2 for d in delays)
+        assert max(delays) > 0.01  # Backoff grows beyond the base delay
+
+    def test_deadline_stops_retries(self):
+        """Test no delay is returned once the deadline would be passed."""
+        state = RetryPolicy(base_delay=0.01, max_delay=0.5, deadline=1.0).start()
+
+        with patch("core.retry.time.monotonic", return_value=state.started_at + 0.999):
+            assert state.next_delay() is None
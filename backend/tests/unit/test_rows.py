@@ -0,0 +1,78 @@
+"""Unit tests for the lightweight read-path rows."""
+
+from datetime import UTC, datetime
+
+import pytest
+
+from core.config import BRAZIL_TZ
+from models.document_type import DocumentTypeEntity, DocumentTypeResponse, DocumentTypeRow
+from models.number_log import NumberLogEntity, NumberLogResponse, NumberLogRow
+from models.rows import row_to_json
+from models.user import UserEntity, UserResponse, UserRow
+
+
+def _log_row(created_at: datetime) -> dict:
+    """Build a NumberLogs row as read from Azure Tables."""
+    return {
+        "PartitionKey": "OF_2025",
+        "RowKey": "8250000000_abc",
+        "DocumentTypeCode": "OF",
+        "Year": 2025,
+        "Number": 7,
+        "Action": "corrected",
+        "UserId": "user-1",
+        "UserName": "Test User",
+        "PreviousNumber": 6,
+        "Notes": None,
+        "CreatedAt": created_at,
+    }
+
+
+class TestRowJson:
+    """Tests that rows encode exactly like their response models."""
+
+    @pytest.mark.parametrize(
+        "created_at",
+        [
+            datetime(2025, 1, 1, 12, 0, 0, 123456, tzinfo=UTC),
+            datetime(2025, 1, 1, 9, 0, 0, tzinfo=BRAZIL_TZ),
+            datetime(2025, 1, 1, 12, 0, 0),
+        ],
+    )
+    def test_number_log_row_matches_response(self, created_at):
+        """Test a history row has the same JSON as NumberLogResponse."""
+        row = _log_row(created_at)
+
+        expected = NumberLogResponse.from_entity(NumberLogEntity(**row)).model_dump(mode="json")
+
+        assert row_to_json(NumberLogRow.from_row(row)) == expected
+
+    def test_index_copy_keeps_log_id(self):
+        """Test a HistoryIndex copy encodes the log's own partition in its id."""
+        row = _log_row(datetime(2025, 1, 1, tzinfo=UTC))
+        index_row = NumberLogEntity(**row).to_index_rows()[0]
+
+        assert NumberLogRow.from_row(index_row).id == NumberLogRow.from_row(row).id
+
+    def test_user_and_document_type_rows_match_responses(
+        self, sample_user_entity, sample_document_type_entity
+    ):
+        """Test user and document type rows have the same JSON as their responses."""
+        user = UserResponse.from_entity(UserEntity(**sample_user_entity))
+        doc_type = DocumentTypeResponse.from_entity(
+            DocumentTypeEntity(**sample_document_type_entity)
+        )
+
+        assert row_to_json(UserRow.from_row(sample_user_entity)) == user.model_dump(mode="json")
+        assert row_to_json(
+            DocumentTypeRow.from_row(sample_document_type_entity)
+        ) == doc_type.model_dump(mode="json")
+
+    def test_fields_select_keys(self):
+        """Test a sparse encoding keeps only the requested fields."""
+        row = NumberLogRow.from_row(_log_row(datetime(2025, 1, 1, tzinfo=UTC)))
+
+        assert row_to_json(row, {"number", "created_at"}) == {
+            "number": 7,
+            "created_at": "2025-01-01T00:00:00Z",
+        }
@@ -0,0 +1,64 @@
+"""Unit tests for the Azure Tables client registry."""
+
+import pytest
+
+from core import metrics
+from core.tables import (
+    TABLE_NUMBER_LOGS,
+    TABLE_USERS,
+    bootstrap_tables,
+    get_bootstrap_check_count,
+    get_table_client,
+    is_bootstrapped,
+    reset_table_clients,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """Start every test with an empty registry and metrics."""
+    reset_table_clients()
+    metrics.reset()
+    yield
+    reset_table_clients()
+    metrics.reset()
+
+
+class TestTableClientRegistry:
+    """Tests for per-worker TableClient caching."""
+
+    def test_client_is_built_once(self, mock_table_service):
+        """Test repeated lookups reuse the same TableClient."""
+        first = get_table_client(TABLE_USERS)
+        second = get_table_client(TABLE_USERS)
+
+        assert first is second
+        service = mock_table_service.from_connection_string.return_value
+        service.get_table_client.assert_called_once_with(TABLE_USERS)
+
+    def test_table_checked_once_per_worker(self, mock_table_service):
+        """Test create_table_if_not_exists runs only on first use."""
+        for _ in range(10):
+            get_table_client(TABLE_USERS)
+
+        service = mock_table_service.from_connection_string.return_value
+        service.create_table_if_not_exists.assert_called_once_with(TABLE_USERS)
+        assert get_bootstrap_check_count(TABLE_USERS) == 1
+
+    def test_bootstrap_tables_prewarms_checks(self, mock_table_service):
+        """Test startup bootstrap avoids checks on later lookups."""
+        bootstrap_tables((TABLE_USERS, TABLE_NUMBER_LOGS))
+        assert is_bootstrapped(TABLE_USERS) and is_bootstrapped(TABLE_NUMBER_LOGS)
+        get_table_client(TABLE_USERS)
+        get_table_client(TABLE_NUMBER_LOGS)
+
+        assert get_bootstrap_check_count() == 2
+
+    def test_failed_check_does_not_break_lookup(self, mock_table_service):
+        """Test missing permissions on table creation are tolerated."""
+        service = mock_table_service.from_connection_string.return_value
+        service.create_table_if_not_exists.side_effect = Exception("AuthorizationFailure")
+
+        assert get_table_client(TABLE_USERS) is not None
+        get_table_client(TABLE_USERS)
+        assert get_bootstrap_check_count(TABLE_USERS) == 1
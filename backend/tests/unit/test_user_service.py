@@ -0,0 +1,115 @@
+"""Unit tests for user lookups through the email index and projected listings."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableErrorCode, TableTransactionError
+
+from core.config import settings
+from core.exceptions import BadRequestError, ConflictError, InvalidCredentialsError
+from core.middleware import get_fields_param
+from models.user import UserCreate, UserEntity, UserRow
+from services.user_service import UserService
+
+
+@pytest.fixture
+def users_table():
+    """Patch the Users table; no index rows exist by default."""
+    table = MagicMock()
+    table.get_entity.side_effect = ResourceNotFoundError("not found")
+    table.query_entities.return_value = []
+    with (
+        patch("services.user_service.get_users_table", return_value=table),
+        patch("services.user_service.add_random_delay"),
+    ):
+        yield table
+
+
+class TestEmailIndex:
+    """Tests for the email-keyed index rows."""
+
+    def test_login_is_point_read(self, users_table, sample_user_entity):
+        """Test credentials are verified without scanning the table."""
+        users_table.get_entity.side_effect = None
+        users_table.get_entity.return_value = UserEntity(**sample_user_entity).to_email_index_row()
+
+        user = UserService.verify_credentials("Test@Example.com", "TestPassword123")
+
+        assert user.RowKey == sample_user_entity["RowKey"]
+        users_table.get_entity.assert_called_once_with(
+            partition_key="USER", row_key="~EMAIL_test@example.com"
+        )
+        users_table.query_entities.assert_not_called()
+
+    def test_unindexed_user_found_by_fallback(self, users_table, sample_user_entity):
+        """Test users created before the index can still log in."""
+        users_table.query_entities.return_value = [sample_user_entity]
+
+        user = UserService.verify_credentials("test@example.com", "TestPassword123")
+
+        assert user.Email == "test@example.com"
+
+    def test_unknown_email_without_fallback(self, users_table, monkeypatch):
+        """Test no scan happens once the index is backfilled."""
+        monkeypatch.setattr(settings, "user_email_index_fallback", False)
+
+        with pytest.raises(InvalidCredentialsError):
+            UserService.verify_credentials("nobody@example.com", "whatever")
+        users_table.query_entities.assert_not_called()
+
+    def test_create_writes_user_and_index_together(self, users_table):
+        """Test the user and its index row go in one transaction."""
+        user = UserService.create(
+            UserCreate(email="New@Example.com", name="New User", password="Password123")
+        )
+
+        operations = users_table.submit_transaction.call_args.args[0]
+        assert [op[0] for op in operations] == ["create", "create"]
+        assert operations[1][1]["RowKey"] == "~EMAIL_new@example.com"
+        assert operations[1][1]["UserId"] == user.RowKey
+
+    def test_create_duplicate_email_conflicts(self, users_table, monkeypatch):
+        """Test a concurrent create of the same email is rejected atomically."""
+        monkeypatch.setattr(settings, "user_email_index_fallback", False)
+        error = TableTransactionError.__new__(TableTransactionError)
+        error.error_code = TableErrorCode.ENTITY_ALREADY_EXISTS
+        users_table.submit_transaction.side_effect = error
+
+        with pytest.raises(ConflictError):
+            UserService.create(
+                UserCreate(email="new@example.com", name="New User", password="Password123")
+            )
+
+    def test_update_keeps_index_in_sync(self, users_table, sample_user_entity):
+        """Test updates rewrite the index copy in the same transaction."""
+        users_table.get_entity.side_effect = None
+        users_table.get_entity.return_value = sample_user_entity
+
+        UserService.update(sample_user_entity["RowKey"], {"Name": "Renamed"})
+
+        operations = users_table.submit_transaction.call_args.args[0]
+        assert [op[0] for op in operations] == ["update", "upsert"]
+        assert operations[1][1]["Name"] == "Renamed"
+
+
+class TestProjection:
+    """Tests for user listings read with select= projection."""
+
+    def test_list_rows_never_reads_password_hashes(self, users_table, sample_user_entity):
+        """Test the listing selects only the columns of a UserResponse."""
+        row = {k: v for k, v in sample_user_entity.items() if k != "PasswordHash"}
+        users_table.query_entities.return_value = [row]
+
+        users = UserService.list_rows()
+
+        select = users_table.query_entities.call_args.kwargs["select"]
+        assert "PasswordHash" not in select
+        assert users[0].id == sample_user_entity["RowKey"]
+
+    def test_fields_param_rejects_unknown_fields(self):
+        """Test fields= only accepts fields of the response model."""
+        assert get_fields_param({"fields": "id, name"}, UserRow._fields) == {"id", "name"}
+        assert get_fields_param({}, UserRow._fields) is None
+        with pytest.raises(BadRequestError):
+            get_fields_param({"fields": "id,password_hash"}, UserRow._fields)
@@ -33,11 +33,11 @@ export function HistoryTable({ onExport }: HistoryTableProps) {
   const [loading, setLoading] = useState(true);
   const [exporting, setExporting] = useState(false);
 
-  // Pagination
-  const [page, setPage] = useState(1);
+  // Pagination: cursors[i] loads page i + 1 (undefined for the first page)
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
+  const [pageIndex, setPageIndex] = useState(0);
   const [pageSize] = useState(20);
-  const [totalPages, setTotalPages] = useState(1);
-  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   // Filters
   const [filterType, setFilterType] = useState<string>('');
@@ -53,7 +53,8 @@ export function HistoryTable({ onExport }: HistoryTableProps) {
       setLoading(true);
 
       const params = new URLSearchParams();
-      params.append('page', page.toString());
+      const cursor = cursors[pageIndex];
+      if (cursor) params.append('cursor', cursor);
       params.append('page_size', pageSize.toString());
 
       if (filterType) params.append('document_type_code', filterType);
@@ -63,15 +64,14 @@ export function HistoryTable({ onExport }: HistoryTableProps) {
       const response = await api.get<HistoryResponse>(`/history?${params.toString()}`);
 
       setHistory(response.items);
-      setTotalPages(response.total_pages);
-      setTotal(response.total);
+      setNextCursor(response.next_cursor);
     } catch (err) {
       const message = err instanceof Error ? err.message : 'Erro ao carregar histórico';
       toast.error(message);
     } finally {
       setLoading(false);
     }
-  }, [page, pageSize, filterType, filterYear, filterAction]);
+  }, [cursors, pageIndex, pageSize, filterType, filterYear, filterAction]);
 
   const loadDocumentTypes = async () => {
     try {
@@ -90,8 +90,19 @@ export function HistoryTable({ onExport }: HistoryTableProps) {
     loadHistory();
   }, [loadHistory]);
 
+  const resetPagination = () => {
+    setCursors([undefined]);
+    setPageIndex(0);
+  };
+
   const handleFilterChange = () => {
-    setPage(1);
+    resetPagination();
+  };
+
+  const goToNextPage = () => {
+    if (!nextCursor) return;
+    setCursors((prev) => [...prev.slice(0, pageIndex + 1), nextCursor]);
+    setPageIndex((i) => i + 1);
   };
 
   const handleExport = async () => {
@@ -144,7 +155,7 @@ export function HistoryTable({ onExport }: HistoryTableProps) {
     setFilterType('');
     setFilterYear('');
     setFilterAction('');
-    setPage(1);
+    resetPagination();
   };
 
   const getActionBadge = (action: string) => {
@@ -293,7 +304,9 @@ export function HistoryTable({ onExport }: HistoryTableProps) {
 
         {/* Results summary */}
         <div className="text-sm text-muted-foreground">
-          {loading ? 'Carregando...' : `${total} registro(s) encontrado(s)`}
+          {loading
+            ? 'Carregando...'
+            : `${history.length} registro(s) nesta página`}
         </div>
 
         {/* Table */}
@@ -378,25 +391,25 @@ export function HistoryTable({ onExport }: HistoryTableProps) {
         </div>
 
         {/* Pagination */}
-        {totalPages > 1 && (
+        {(pageIndex > 0 || nextCursor) && (
           <div className="flex items-center justify-between">
             <div className="text-sm text-muted-foreground">
-              Página {page} de {totalPages}
+              Página {pageIndex + 1}
             </div>
             <div className="flex gap-2">
               <Button
                 variant="outline"
                 size="sm"
-                onClick={() => setPage((p) => Math.max(1, p - 1))}
-                disabled={page === 1 || loading}
+                onClick={() => setPageIndex((i) => Math.max(0, i - 1))}
+                disabled={pageIndex === 0 || loading}
               >
                 Anterior
               </Button>
               <Button
                 variant="outline"
                 size="sm"
-                onClick={() => setPage((p) => Math.min(totalPages, p + 1))}
-                disabled={page === totalPages || loading}
+                onClick={goToNextPage}
+                disabled={!nextCursor || loading}
               >
                 Próxima
               </Button>
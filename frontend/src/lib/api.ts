@@ -363,7 +363,10 @@ export const api = {
       year?: number;
       user_id?: string;
       action?: 'generated' | 'corrected';
-      page?: number;
+      from?: string;
+      to?: string;
+      cursor?: string;
+      include_total?: boolean;
       page_size?: number;
     }) => {
       const searchParams = new URLSearchParams();
@@ -379,8 +382,17 @@ export const api = {
       if (params?.action) {
         searchParams.set('action', params.action);
       }
-      if (params?.page) {
-        searchParams.set('page', String(params.page));
+      if (params?.from) {
+        searchParams.set('from', params.from);
+      }
+      if (params?.to) {
+        searchParams.set('to', params.to);
+      }
+      if (params?.cursor) {
+        searchParams.set('cursor', params.cursor);
+      }
+      if (params?.include_total) {
+        searchParams.set('include_total', 'true');
       }
       if (params?.page_size) {
         searchParams.set('page_size', String(params.page_size));
@@ -400,12 +412,72 @@ export const api = {
           notes: string | null;
           created_at: string;
         }>;
-        total: number;
-        page: number;
+        total: number | null;
         page_size: number;
-        total_pages: number;
+        next_cursor: string | null;
       }>(`/history${query ? `?${query}` : ''}`);
     },
+
+    histogram: (params: {
+      document_type_code: string;
+      year: number;
+      granularity?: 'day' | 'month';
+      start?: string;
+      end?: string;
+    }) => {
+      const searchParams = new URLSearchParams();
+      searchParams.set('document_type_code', params.document_type_code);
+      searchParams.set('year', String(params.year));
+      if (params.granularity) {
+        searchParams.set('granularity', params.granularity);
+      }
+      if (params.start) {
+        searchParams.set('start', params.start);
+      }
+      if (params.end) {
+        searchParams.set('end', params.end);
+      }
+
+      return apiFetch<{
+        document_type_code: string;
+        year: number;
+        granularity: 'day' | 'month';
+        buckets: Array<{
+          period: string;
+          generated: number;
+          corrected: number;
+        }>;
+      }>(`/history/histogram?${searchParams.toString()}`);
+    },
+
+    recent: (params?: { limit?: number; document_type_code?: string; year?: number }) => {
+      const searchParams = new URLSearchParams();
+      if (params?.limit) {
+        searchParams.set('limit', String(params.limit));
+      }
+      if (params?.document_type_code) {
+        searchParams.set('document_type_code', params.document_type_code);
+      }
+      if (params?.year) {
+        searchParams.set('year', String(params.year));
+      }
+
+      const query = searchParams.toString();
+      return apiFetch<{
+        items: Array<{
+          id: string;
+          document_type_code: string;
+          year: number;
+          number: number;
+          action: 'generated' | 'corrected';
+          user_id: string;
+          user_name: string;
+          previous_number: number | null;
+          notes: string | null;
+          created_at: string;
+        }>;
+      }>(`/history/recent${query ? `?${query}` : ''}`);
+    },
   },
 };
 
@@ -167,16 +167,33 @@ export interface HistoryFilter {
   year?: number;
   user_id?: string;
   action?: LogAction;
-  page?: number;
+  from?: string; // YYYY-MM-DD, inclusive
+  to?: string; // YYYY-MM-DD, inclusive
+  cursor?: string;
+  include_total?: boolean;
   page_size?: number;
 }
 
 export interface HistoryResponse {
   items: NumberLog[];
-  total: number;
-  page: number;
+  total: number | null;
   page_size: number;
-  total_pages: number;
+  next_cursor: string | null;
+}
+
+export type HistogramGranularity = 'day' | 'month';
+
+export interface HistogramBucket {
+  period: string;
+  generated: number;
+  corrected: number;
+}
+
+export interface HistogramResponse {
+  document_type_code: string;
+  year: number;
+  granularity: HistogramGranularity;
+  buckets: HistogramBucket[];
 }
 
 // ============================================================================
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Backfill index rows for entities created before the indexes existed.
+
+Usage:
+    python scripts/backfill_indexes.py [doctypes|users|history|history-repairs ...]
+
+Steps (per index, all of them when none is given):
+    1. Deploy the code that writes index rows.
+    2. Run this script for the index (idempotent, safe to run while the API is live).
+    3. Disable that index's fallback in the Function App settings:
+       doctypes -> DOCTYPE_CODE_INDEX_FALLBACK=false
+       users    -> USER_EMAIL_INDEX_FALLBACK=false
+       history  -> HISTORY_INDEX_FALLBACK=false
+
+Each flag only covers its own index, so an index that is not backfilled yet
+keeps its fallback.
+
+history-repairs only indexes the logs whose index write failed (the REPAIR
+partition of HistoryIndex); history queries keep reading NumberLogs until it
+runs. It is not part of the default run, which backfills every log anyway.
+"""
+
+import os
+import sys
+
+# Add backend to path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, "backend"))
+
+from services.document_type_service import DocumentTypeService
+from services.history_index_service import HistoryIndexService
+from services.user_service import UserService
+
+INDEXES = ("doctypes", "users", "history", "history-repairs")
+
+
+def main():
+    """Run index backfill."""
+    indexes = sys.argv[1:] or ["doctypes", "users", "history"]
+    unknown = [index for index in indexes if index not in INDEXES]
+    if unknown:
+        sys.exit(f"Unknown index: {', '.join(unknown)} (expected {', '.join(INDEXES)})")
+
+    print("=" * 60)
+    print("Controle PGM - Index Backfill")
+    print("=" * 60)
+    print()
+
+    if "users" in indexes:
+        print("👤 Writing user email index rows...")
+        written = UserService.backfill_email_index()
+        print(f"✅ {written} index row(s) written; set USER_EMAIL_INDEX_FALLBACK=false")
+        print()
+
+    if "doctypes" in indexes:
+        print("📄 Writing document type code index rows...")
+        written = DocumentTypeService.backfill_code_index()
+        print(f"✅ {written} index row(s) written; set DOCTYPE_CODE_INDEX_FALLBACK=false")
+        print()
+
+    if "history" in indexes:
+        print("📜 Indexing number logs by year and user...")
+        indexed = HistoryIndexService.backfill()
+        print(f"✅ {indexed} log(s) indexed; set HISTORY_INDEX_FALLBACK=false")
+        print()
+
+    if "history-repairs" in indexes:
+        print("🩹 Indexing number logs marked for repair...")
+        repaired = HistoryIndexService.repair()
+        print(f"✅ {repaired} log(s) repaired")
+        print()
+
+    print("=" * 60)
+    print("✅ Backfill completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark the per-row cost of encoding history items as JSON.
+
+Usage:
+    python scripts/benchmark_read_path.py [ROWS]
+
+Compares the old read path (NumberLogEntity -> NumberLogResponse ->
+model_dump -> json.dumps) with the NumberLogRow path used by the list
+endpoints, on synthetic rows shaped like Azure Tables results. No storage
+account is needed.
+"""
+
+import json
+import os
+import sys
+import timeit
+from datetime import UTC, datetime, timedelta
+
+# Add backend to path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, "backend"))
+
+from models.number_log import NumberLogEntity, NumberLogResponse, NumberLogRow
+from models.rows import row_to_json
+
+
+def build_rows(count: int) -> list[dict]:
+    """Build table rows as the Azure Tables SDK returns them."""
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+    return [
+        {
+            "PartitionKey": "OF_2025",
+            "RowKey": f"{9999999999 - i:010d}_{i:032x}",
+            "DocumentTypeCode": "OF",
+            "Year": 2025,
+            "Number": i + 1,
+            "Action": "generated" if i % 10 else "corrected",
+            "UserId": f"user-{i % 20}",
+            "UserName": f"Usuário {i % 20}",
+            "PreviousNumber": i if i % 10 == 0 else None,
+            "Notes": "Correção" if i % 10 == 0 else None,
+            "CreatedAt": start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+
+
+def pydantic_path(rows: list[dict]) -> str:
+    """Encode rows the way the list endpoint did before NumberLogRow."""
+    items = [NumberLogResponse.from_entity(NumberLogEntity(**row)) for row in rows]
+    return json.dumps([item.model_dump(mode="json") for item in items], default=str)
+
+
+def row_path(rows: list[dict]) -> str:
+    """Encode rows through NumberLogRow."""
+    items = [NumberLogRow.from_row(row) for row in rows]
+    return json.dumps([row_to_json(item) for item in items], default=str)
+
+
+def main():
+    """Time both paths and print the cost per row."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rows = build_rows(count)
+
+    assert pydantic_path(rows) == row_path(rows), "paths must produce the same JSON"
+
+    print("=" * 60)
+    print(f"Controle PGM - History read path ({count} rows)")
+    print("=" * 60)
+    print()
+
+    results = {}
+    for name, path in (("pydantic", pydantic_path), ("row", row_path)):
+        best = min(timeit.repeat(lambda p=path: p(rows), number=5, repeat=5)) / 5
+        results[name] = best / count * 1_000_000
+        print(f"{name:>10}: {results[name]:7.2f} µs/row")
+
+    print()
+    print(f"⚡ {results['pydantic'] / results['row']:.1f}x faster per row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Migrate sequences to the colocated layout (SEQUENCE row inside each NumberLogs partition).
+
+Usage:
+    python scripts/migrate_sequences.py
+
+Steps (in this order):
+    1. Deploy this version to every instance, still with SEQUENCE_STORAGE_LAYOUT=split.
+       Older versions don't check the freeze mark and would keep numbering
+       through the Sequences table.
+    2. Set SEQUENCE_STORAGE_LAYOUT=colocated in the Function App settings.
+    3. Run this script (idempotent, can be run again at any time).
+
+A partition moves when it is first used with the colocated layout or when this
+script reaches it, whichever comes first: its Sequences row is frozen (marked
+MigratedAt) before its number is carried into NumberLogs, so numbers issued
+through the split layout up to that moment are never issued again. Instances
+still on the split layout get an error for frozen partitions until they switch.
+
+There is no way back to "split" once a partition has been frozen.
+"""
+
+import os
+import sys
+
+# Add backend to path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, "backend"))
+
+from services.number_service import NumberService
+
+
+def main():
+    """Run sequence migration."""
+    print("=" * 60)
+    print("Controle PGM - Sequence Layout Migration")
+    print("=" * 60)
+    print()
+
+    print("📦 Freezing sequences and moving them into NumberLogs partitions...")
+    migrated = NumberService.migrate_to_colocated_layout()
+    print(f"✅ {migrated} sequence(s) copied or updated")
+    print()
+
+    print("=" * 60)
+    print("✅ Migration completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
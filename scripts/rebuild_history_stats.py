@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Rebuild the HistoryStats counters and time buckets from NumberLogs.
+
+Usage:
+    python scripts/rebuild_history_stats.py [DOCUMENT_TYPE_CODE] [YEAR]
+    python scripts/rebuild_history_stats.py --marked
+
+Run it once after deploying the counters (logs written before them are not
+counted). Logs written while it runs may be miscounted, so run it when the API
+is quiet.
+
+--marked only recounts the partitions whose counter update failed (their
+REBUILD row, see the history_stats.failures metric); schedule it.
+"""
+
+import os
+import sys
+
+# Add backend to path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, "backend"))
+
+from services.history_stats_service import HistoryStatsService
+
+
+def main():
+    """Run the statistics rebuild."""
+    marked = sys.argv[1:] == ["--marked"]
+    document_type_code = sys.argv[1].upper() if len(sys.argv) > 1 and not marked else None
+    year = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    print("=" * 60)
+    print("Controle PGM - History Statistics Rebuild")
+    print("=" * 60)
+    print()
+
+    if marked:
+        print("📊 Recounting the partitions marked for rebuild...")
+        rebuilt = HistoryStatsService.rebuild_marked()
+    else:
+        print("📊 Recounting NumberLogs...")
+        rebuilt = HistoryStatsService.rebuild(document_type_code, year)
+    print(f"✅ {rebuilt} partition(s) rebuilt")
+    print()
+
+    print("=" * 60)
+    print("✅ Rebuild completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -60,7 +60,13 @@ def seed_admin_user(service: TableServiceClient) -> None:
         "UpdatedAt": now,
     }
     
-    table.create_entity(admin_entity)
+    # Write the email index row together with the user
+    index_entity = {
+        **admin_entity,
+        "RowKey": "~EMAIL_admin@itajai.sc.gov.br",
+        "UserId": admin_entity["RowKey"],
+    }
+    table.submit_transaction([("create", admin_entity), ("create", index_entity)])
     print(f"✅ Admin user created")
     print(f"   Email: admin@itajai.sc.gov.br")
     print(f"   Password: {default_password}")
@@ -89,7 +95,9 @@ def seed_document_types(service: TableServiceClient) -> None:
     
     for code, name in document_types:
         # Check if already exists
-        existing = list(table.query_entities(query_filter=f"Code eq '{code}'"))
+        existing = list(
+            table.query_entities(query_filter=f"Code eq '{code}' and RowKey lt '~'")
+        )
         if existing:
             print(f"ℹ️  Document type '{code}' already exists")
             continue
@@ -104,7 +112,9 @@ def seed_document_types(service: TableServiceClient) -> None:
             "UpdatedAt": now,
         }
         
-        table.create_entity(entity)
+        # Write the code index row together with the type
+        index_entity = {**entity, "RowKey": f"~CODE_{code}", "DocumentTypeId": entity["RowKey"]}
+        table.submit_transaction([("create", entity), ("create", index_entity)])
         print(f"✅ Document type '{code}' ({name}) created")
         created_count += 1
     
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Write the gzip CSV export snapshots of closed years.
+
+Usage:
+    python scripts/snapshot_exports.py [--force] [YEAR ...]
+
+Writes one snapshot per closed year (every closed year with logs when none
+is given) and one per document type in it, to the store set by
+EXPORT_SNAPSHOT_STORAGE. Snapshots that are still fresh are skipped unless
+--force is given, so it is cheap to run again, e.g. every February and after
+corrections to past years.
+"""
+
+import os
+import sys
+
+# Add backend to path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, "backend"))
+
+from services.export_snapshot_service import ExportSnapshotService
+
+
+def main():
+    """Run the snapshot job."""
+    args = sys.argv[1:]
+    force = "--force" in args
+    years = [int(arg) for arg in args if arg != "--force"] or None
+
+    print("=" * 60)
+    print("Controle PGM - Export Snapshots")
+    print("=" * 60)
+    print()
+
+    print("📦 Writing snapshots of closed years...")
+    written = ExportSnapshotService.snapshot_closed_years(years, force)
+    for name in written:
+        print(f"   {name}")
+    print(f"✅ {len(written)} snapshot(s) written")
+    print()
+
+    print("=" * 60)
+    print("✅ Snapshots completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()